@@ -1,7 +1,10 @@
 # Empty file - Flask app factory will be implemented later 
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
+from app.handlers.slack_handler import SlackEventHandler
 from app.utils.config import Config
+from app.utils import metrics
+from app.utils.health_monitor import PROBE_DOWN
 
 
 def create_app(config_override=None):
@@ -10,7 +13,7 @@ def create_app(config_override=None):
     
     Args:
         config_override: Optional configuration override for testing
-        
+    
     Returns:
         Flask: Configured Flask application instance
     """
@@ -35,11 +38,15 @@ def create_app(config_override=None):
         # Register error handlers
         register_error_handlers(app)
         
+        # Slack event handler (services and workers start on first event)
+        slack_handler = SlackEventHandler(config)
+        app.config['SLACK_HANDLER'] = slack_handler
+        
         # Register routes
-        register_routes(app, config)
+        register_routes(app, config, slack_handler)
         
         return app
-        
+    
     except Exception as e:
         # If configuration fails, create a minimal app that can report the error
         app.config['CONFIGURATION_ERROR'] = str(e)
@@ -47,38 +54,228 @@ def create_app(config_override=None):
         return app
 
 
-def register_routes(app, config):
+def register_routes(app, config, slack_handler):
     """Register application routes."""
     
+    @app.route('/slack/events', methods=['POST'])
+    def slack_events():
+        """Slack Events API endpoint - verifies, acks and queues events."""
+        with metrics.trace('slack_events'):
+            body = request.get_data()
+            
+            with metrics.span('verify_signature'):
+                verified = slack_handler.verify_request(body, request.headers)
+            
+            if not verified:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Invalid request signature',
+                    'error': 'Unauthorized'
+                }), 401
+            
+            payload = request.get_json(silent=True) or {}
+            
+            # Slack sends a one-off challenge when the request URL is configured
+            if payload.get('type') == 'url_verification':
+                return jsonify({'challenge': payload.get('challenge')}), 200
+            
+            if payload.get('type') == 'event_callback':
+                with metrics.span('dispatch'):
+                    dispatched = slack_handler.dispatch(payload)
+                
+                if not dispatched:
+                    # Let Slack retry once the backlog has drained, or on another instance
+                    return jsonify({
+                        'status': 'error',
+                        'message': 'Server is shutting down' if slack_handler.draining else 'Event queue is full',
+                        'error': 'Service Unavailable'
+                    }), 503
+            
+            return '', 200
+    
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint."""
         try:
             # Check if configuration loaded successfully
             if hasattr(config, 'slack_bot_token') and hasattr(config, 'openai_api_key'):
-                return jsonify({
-                    'status': 'healthy',
-                    'message': 'Slack chatbot is running',
-                    'version': '1.0.0',
-                    'services': {
-                        'slack': 'configured',
-                        'openai': 'configured',
-                        'flask': 'running'
-                    }
-                }), 200
+                return jsonify(health_status(slack_handler)), 200
             else:
                 return jsonify({
                     'status': 'unhealthy',
                     'message': 'Configuration incomplete',
                     'error': 'Missing required configuration'
                 }), 500
-                
+        
         except Exception as e:
             return jsonify({
                 'status': 'unhealthy',
                 'message': 'Health check failed',
                 'error': str(e)
             }), 500
+    
+    @app.route('/health/live', methods=['GET'])
+    def liveness_check():
+        """Liveness probe - the process is up and serving requests."""
+        return jsonify({'status': 'alive'}), 200
+    
+    @app.route('/health/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness probe - whether Slack events should be routed here."""
+        status, payload = readiness_status(slack_handler)
+        return jsonify(payload), status
+    
+    @app.route('/health/deep', methods=['GET'])
+    def deep_health_check():
+        """Upstream health - cached results of the background Slack and OpenAI probes."""
+        status, payload = deep_health_status(slack_handler)
+        return jsonify(payload), status
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus metrics endpoint - latency histograms, counters and queue depths."""
+        return Response(metrics_text(slack_handler, get_shared_metrics(app)), status=200,
+                        content_type=metrics.PROMETHEUS_CONTENT_TYPE)
+    
+    @app.after_request
+    def count_request(response):
+        """Count every response by route and status code."""
+        rule = request.url_rule
+        metrics.record_request(rule.rule if rule is not None else 'unmatched', response.status_code)
+        return response
+
+
+def health_status(slack_handler) -> dict:
+    """
+    Build the healthy /health response body.
+    
+    Args:
+        slack_handler: Event handler whose metrics are reported
+    
+    Returns:
+        dict: Status, configured services and handler metrics
+    """
+    return {
+        'status': 'healthy',
+        'message': 'Slack chatbot is running',
+        'version': '1.0.0',
+        'services': {
+            'slack': 'configured',
+            'openai': 'configured',
+            'flask': 'running'
+        },
+        'queue': slack_handler.queue_stats(),
+        'fairness': slack_handler.fairness_stats(),
+        'dedup': slack_handler.dedup_stats(),
+        'thread_cache': slack_handler.thread_cache_stats(),
+        'response_cache': slack_handler.response_cache_stats(),
+        'semantic_cache': slack_handler.semantic_cache_stats(),
+        'retries': slack_handler.retry_stats(),
+        'rate_limit': slack_handler.rate_limit_stats(),
+        'send_queue': slack_handler.send_queue_stats(),
+        'coalescing': slack_handler.coalescing_stats(),
+        'validation': slack_handler.service_status()
+    }
+
+
+def readiness_status(slack_handler):
+    """
+    Build the /health/ready response.
+    
+    Args:
+        slack_handler: Event handler to check
+    
+    Returns:
+        (HTTP status, JSON body): 200 when ready, 503 when events should go elsewhere
+    """
+    readiness = slack_handler.readiness()
+    payload = {'status': 'ready' if readiness['ready'] else 'not_ready', 'checks': readiness['checks']}
+    return (200 if readiness['ready'] else 503), payload
+
+
+def deep_health_status(slack_handler):
+    """
+    Build the /health/deep response from the cached probe results.
+    
+    Args:
+        slack_handler: Event handler whose upstream probes are reported
+    
+    Returns:
+        (HTTP status, JSON body): 503 if an upstream is down, otherwise 200
+        (including before the first probes finish, with status 'unknown')
+    """
+    deep = slack_handler.deep_health()
+    return (503 if deep['status'] == PROBE_DOWN else 200), deep
+
+
+def metrics_text(slack_handler, shared: metrics.SharedMetrics = None) -> str:
+    """
+    Build the /metrics response body.
+    
+    Args:
+        slack_handler: Event handler whose queue depths are reported
+        shared: Metrics shared by the server's processes (default: this process's only)
+    
+    Returns:
+        str: The app's metrics in the Prometheus text format
+    """
+    if shared is not None:
+        return shared.render()
+    return metrics.METRICS.render(gauges=metrics_gauges(slack_handler))
+
+
+def metrics_gauges(slack_handler) -> list:
+    """Get the gauges of an event handler's queues, and of each channel and user it fair queues."""
+    queue = slack_handler.queue_stats()
+    gauges = [
+        ('work_queue_depth', 'Mentions waiting for a worker.', queue['depth']),
+        ('work_queue_busy_workers', 'Mentions being answered.', queue['busy_workers']),
+        ('send_queue_depth', 'Slack replies waiting to be sent.', slack_handler.send_queue_stats()['queued']),
+        ('openai_requests_in_flight', 'Coalesced OpenAI calls in flight.',
+         slack_handler.coalescing_stats()['in_flight'])
+    ]
+    
+    # Every tracked tenant key, so the series stay bounded by FairQueue's max_tracked_keys
+    for tenant_key, tenant in slack_handler.fairness_stats(top=None)['tenants'].items():
+        level, _, tenant_id = tenant_key.partition(':')
+        labels = {'level': level, 'tenant': tenant_id}
+        gauges.append(('tenant_queue_depth', 'Mentions waiting, by channel or user.', tenant['queued'], labels))
+        gauges.append(('tenant_served', 'Mentions taken from the queue since the channel or user was last '
+                       'forgotten as idle.', tenant['served'], labels))
+        gauges.append(('tenant_rejected', 'Mentions refused over quota since the channel or user was last '
+                       'forgotten as idle.', tenant['rejected'], labels))
+    return gauges
+
+
+def get_shared_metrics(app):
+    """
+    Get the metrics an app shares with the server's other processes, set up on first use.
+    
+    Args:
+        app: Flask app from create_app
+    
+    Returns:
+        SharedMetrics, or None without a METRICS_DIR
+    """
+    if 'SHARED_METRICS' not in app.config:
+        app.config['SHARED_METRICS'] = shared_metrics(app.config['BOT_CONFIG'], app.config['SLACK_HANDLER'])
+    return app.config['SHARED_METRICS']
+
+
+def shared_metrics(config, slack_handler):
+    """
+    Share metrics through METRICS_DIR with the server's other processes.
+    
+    Args:
+        config: Application configuration
+        slack_handler: Event handler whose queue depths are reported
+    
+    Returns:
+        SharedMetrics, or None without a METRICS_DIR
+    """
+    if not config.metrics_dir:
+        return None
+    return metrics.SharedMetrics(config.metrics_dir, gauges=lambda: metrics_gauges(slack_handler))
 
 
 def register_error_routes(app):
@@ -92,6 +289,21 @@ def register_error_routes(app):
             'message': 'Configuration failed',
             'error': app.config.get('CONFIGURATION_ERROR', 'Unknown configuration error')
         }), 500
+    
+    @app.route('/health/live', methods=['GET'])
+    def liveness_check_error():
+        """Liveness probe when configuration failed - restarting would not fix it."""
+        return jsonify({'status': 'alive'}), 200
+    
+    @app.route('/health/ready', methods=['GET'])
+    @app.route('/health/deep', methods=['GET'])
+    def readiness_check_error():
+        """Readiness and upstream health when configuration failed."""
+        return jsonify({
+            'status': 'not_ready',
+            'message': 'Configuration failed',
+            'error': app.config.get('CONFIGURATION_ERROR', 'Unknown configuration error')
+        }), 503
 
 
 def register_error_handlers(app):
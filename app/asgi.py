@@ -0,0 +1,223 @@
+import json
+import logging
+from app import deep_health_status, health_status, metrics_text, readiness_status, shared_metrics
+from app.handlers.async_slack_handler import AsyncSlackEventHandler
+from app.utils.config import Config
+from app.utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Paths served, counted by name in the request metrics
+ROUTES = frozenset({'/slack/events', '/health', '/health/live', '/health/ready', '/health/deep', '/metrics'})
+
+
+def create_asgi_app(config_override=None):
+    """
+    ASGI application factory for the asyncio event endpoint.
+    
+    Serves the same /slack/events, /health/* and /metrics routes as the Flask app, with
+    mentions answered by AsyncSlackEventHandler on the server's event loop.
+    Run it with any ASGI server, e.g.
+    ``uvicorn --factory app.asgi:create_asgi_app``.
+    
+    Args:
+        config_override: Optional configuration override for testing
+    
+    Returns:
+        ASGI application callable
+    """
+    try:
+        config = config_override if config_override else Config()
+    except Exception as e:
+        return _error_app(str(e))
+    
+    slack_handler = AsyncSlackEventHandler(config)
+    shared = shared_metrics(config, slack_handler)
+    
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(slack_handler, shared, receive, send)
+            return
+        
+        if scope['type'] != 'http':
+            return
+        
+        method = scope['method']
+        path = scope['path']
+        
+        try:
+            if path == '/slack/events' and method == 'POST':
+                body = await _read_body(receive)
+                status, payload = slack_events(slack_handler, body, _headers(scope))
+            elif path == '/health' and method == 'GET':
+                status, payload = 200, health_status(slack_handler)
+            elif path == '/health/live' and method == 'GET':
+                status, payload = 200, {'status': 'alive'}
+            elif path == '/health/ready' and method == 'GET':
+                status, payload = readiness_status(slack_handler)
+            elif path == '/health/deep' and method == 'GET':
+                status, payload = deep_health_status(slack_handler)
+            elif path == '/metrics' and method == 'GET':
+                metrics.record_request(path, 200)
+                await _send_text(send, 200, metrics_text(slack_handler, shared), metrics.PROMETHEUS_CONTENT_TYPE)
+                return
+            else:
+                status, payload = 404, {
+                    'status': 'error',
+                    'message': 'Endpoint not found',
+                    'error': 'Not Found'
+                }
+        except Exception as e:
+            logger.exception("Unhandled error serving %s %s", method, path)
+            status, payload = 500, {
+                'status': 'error',
+                'message': 'An unexpected error occurred',
+                'error': str(e)
+            }
+        
+        metrics.record_request(path if path in ROUTES else 'unmatched', status)
+        await _send_json(send, status, payload)
+    
+    app.slack_handler = slack_handler
+    return app
+
+
+def slack_events(slack_handler: AsyncSlackEventHandler, body: bytes, headers: dict):
+    """
+    Verify, ack and schedule a Slack Events API request.
+    
+    Args:
+        slack_handler: Event handler
+        body: Raw request body
+        headers: Request headers
+    
+    Returns:
+        (HTTP status, JSON body or None for an empty 200)
+    """
+    with metrics.trace('slack_events'):
+        return _slack_events(slack_handler, body, headers)
+
+
+def _slack_events(slack_handler: AsyncSlackEventHandler, body: bytes, headers: dict):
+    """Handle a Slack Events API request inside its trace (see slack_events)."""
+    with metrics.span('verify_signature'):
+        verified = slack_handler.verify_request(body, headers)
+    
+    if not verified:
+        return 401, {
+            'status': 'error',
+            'message': 'Invalid request signature',
+            'error': 'Unauthorized'
+        }
+    
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        payload = {}
+    
+    # Slack sends a one-off challenge when the request URL is configured
+    if payload.get('type') == 'url_verification':
+        return 200, {'challenge': payload.get('challenge')}
+    
+    if payload.get('type') == 'event_callback' and not _dispatch(slack_handler, payload):
+        # Let Slack retry once the backlog has drained, or on another instance
+        return 503, {
+            'status': 'error',
+            'message': 'Server is shutting down' if slack_handler.draining else 'Event queue is full',
+            'error': 'Service Unavailable'
+        }
+    
+    return 200, None
+
+
+def _dispatch(slack_handler: AsyncSlackEventHandler, payload: dict) -> bool:
+    """Schedule an event, timing it as the dispatch stage."""
+    with metrics.span('dispatch'):
+        return slack_handler.dispatch(payload)
+
+
+def _error_app(error: str):
+    """Build an ASGI app that reports a configuration error on /health."""
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        
+        if scope['path'] == '/health':
+            await _send_json(send, 500, {
+                'status': 'unhealthy',
+                'message': 'Configuration failed',
+                'error': error
+            })
+        elif scope['path'] == '/health/live':
+            await _send_json(send, 200, {'status': 'alive'})
+        elif scope['path'] in ('/health/ready', '/health/deep'):
+            await _send_json(send, 503, {
+                'status': 'not_ready',
+                'message': 'Configuration failed',
+                'error': error
+            })
+        else:
+            await _send_json(send, 404, {
+                'status': 'error',
+                'message': 'Endpoint not found',
+                'error': 'Not Found'
+            })
+    
+    return app
+
+
+async def _lifespan(slack_handler: AsyncSlackEventHandler, shared, receive, send):
+    """Answer ASGI lifespan events, finishing in-flight mentions on shutdown."""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if shared is not None:
+                shared.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await slack_handler.drain_async(timeout=slack_handler.config.server_drain_seconds)
+            await slack_handler.close()
+            if shared is not None:
+                shared.stop()
+                shared.write()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def _read_body(receive) -> bytes:
+    """Read the complete request body."""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _headers(scope) -> dict:
+    """Decode the request headers (names lower-cased, as Slack's verifier accepts)."""
+    return {name.decode('latin-1'): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+async def _send_json(send, status: int, payload):
+    """Send a JSON response, or an empty body when payload is None."""
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    headers = [(b'content-length', str(len(body)).encode('latin-1'))]
+    if payload is not None:
+        headers.append((b'content-type', b'application/json'))
+    
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_text(send, status: int, text: str, content_type: str):
+    """Send a plain text response."""
+    body = text.encode('utf-8')
+    headers = [
+        (b'content-length', str(len(body)).encode('latin-1')),
+        (b'content-type', content_type.encode('latin-1'))
+    ]
+    
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
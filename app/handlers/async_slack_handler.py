@@ -0,0 +1,383 @@
+import asyncio
+import logging
+import queue
+from typing import List, Optional, Union
+from openai import OpenAI
+from app.handlers.slack_handler import ERROR_REPLY, SlackEventHandler
+from app.services.async_openai_service import AsyncOpenAIService
+from app.services.async_slack_service import AsyncSlackService
+from app.utils import metrics
+from app.utils.fair_queue import DEFAULT_TOP_TENANTS
+from app.utils.health_monitor import HealthMonitor
+from app.utils.priority_scheduler import PRIORITY_INTERACTIVE
+from app.utils.send_queue import AsyncChannelSendQueue
+from app.utils.single_flight import SingleFlight
+from app.utils.thread_cache import ThreadHistoryCache
+
+
+logger = logging.getLogger(__name__)
+
+# Settings of the threaded handler this one does not implement, with the
+# check for whether each is turned on
+UNSUPPORTED_SETTINGS = (
+    ('JOB_QUEUE', lambda config: config.job_queue != 'memory'),
+    ('STREAM_RESPONSES', lambda config: config.stream_responses),
+)
+
+
+class AsyncSlackEventHandler(SlackEventHandler):
+    """Slack event handler for asyncio servers.
+    
+    Mentions are answered by tasks on the event loop instead of work queue
+    threads, so an in-flight completion holds no thread while it waits on
+    the API. At most work_queue_size mentions are in flight; beyond that
+    events are rejected so Slack retries them. With fair queuing, mentions
+    beyond that wait in a FairQueue of the same size instead, and are
+    started in turns between channels, then users, as slots free up; a
+    channel or user over its quota is rejected. Verification, dedup, caches
+    and metrics are shared with SlackEventHandler.
+    
+    The durable job queue and streamed replies are only
+    available on the threaded handler; a warning is logged
+    at startup if they are configured (see UNSUPPORTED_SETTINGS). Methods
+    that are coroutines here have an _async suffix, so the threaded
+    handler's methods of the same name keep working.
+    """
+    
+    def __init__(self, config, openai_service: Optional[AsyncOpenAIService] = None,
+                 slack_service: Optional[AsyncSlackService] = None, **kwargs):
+        """
+        Initialize the event handler.
+        
+        Args:
+            config: Application configuration
+            openai_service: Optional async OpenAI service (created from config if None)
+            slack_service: Optional async Slack service (created from config if None)
+            **kwargs: Other SlackEventHandler arguments
+        """
+        super().__init__(config, openai_service=openai_service, slack_service=slack_service, **kwargs)
+        self._tasks = set()
+        self._fair_queue = self._build_fair_queue()
+        self._service_lock = None
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        
+        ignored = self.unsupported_settings()
+        if ignored:
+            logger.warning("Not supported on the async server, ignoring: %s", ", ".join(ignored))
+    
+    def unsupported_settings(self) -> List[str]:
+        """
+        Get the configured settings this handler ignores.
+        
+        Returns:
+            list: Environment variable names, in UNSUPPORTED_SETTINGS order
+        """
+        return [name for name, enabled in UNSUPPORTED_SETTINGS if enabled(self.config)]
+    
+    def dispatch(self, payload: dict) -> bool:
+        """
+        Schedule a Slack event callback on the running event loop.
+        
+        Args:
+            payload: Parsed Events API payload
+        
+        Returns:
+            bool: True if the event was scheduled or ignored, False if too many
+                are in flight or its channel or user is over quota
+        """
+        event = payload.get('event') or {}
+        
+        if event.get('type') == 'message':
+            self._record_thread_message(event)
+            return True
+        
+        if event.get('type') != 'app_mention':
+            logger.debug("Ignoring Slack event type: %s", event.get('type'))
+            return True
+        
+        # Never respond to bot messages (including our own replies)
+        if event.get('bot_id'):
+            return True
+        
+        if self._draining:
+            return False
+        
+        deduplicator = self._get_deduplicator()
+        if deduplicator.is_duplicate(payload):
+            logger.info("Ignoring duplicate delivery of event %s", payload.get('event_id'))
+            return True
+        
+        if self._fair_queue is not None:
+            try:
+                self._fair_queue.put_nowait(((event.get('channel'), event.get('user')), event, PRIORITY_INTERACTIVE))
+            except queue.Full:
+                admitted = False
+            else:
+                admitted = True
+                self._start_waiting()
+        elif len(self._tasks) < self.config.work_queue_size:
+            admitted = True
+            self._start(event)
+        else:
+            admitted = False
+        
+        if not admitted:
+            logger.warning("Too many mentions in flight or over quota - rejecting event %s", payload.get('event_id'))
+            self._rejected += 1
+            deduplicator.forget(payload)
+            return False
+        
+        self._submitted += 1
+        return True
+    
+    async def drain_async(self, timeout: Optional[float] = None):
+        """
+        Stop taking mentions and wait for the ones in flight to be answered.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        self._draining = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        
+        # Finished tasks start the mentions waiting behind them
+        while self._tasks:
+            remaining = deadline - loop.time() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+    
+    async def close(self):
+        """Stop the health probes and close the services' HTTP connections."""
+        if self.health_monitor is not None:
+            self.health_monitor.stop()
+        
+        for service in (self.openai_service, self.slack_service):
+            if service is not None:
+                await service.close()
+    
+    async def process_app_mention_async(self, event: dict):
+        """
+        Answer an app mention in its thread.
+        
+        Args:
+            event: Slack app_mention event
+        """
+        with metrics.trace('app_mention'):
+            channel = event.get('channel')
+            thread_ts = event.get('thread_ts') or event.get('ts')
+            prompt = await self._build_prompt_async(event)
+            use_cache = channel not in self.config.response_cache_exclude_channels
+            
+            try:
+                openai_service = await self._get_openai_service_async()
+                response = await openai_service.get_chat_completion(
+                    prompt, use_cache=use_cache, priority=PRIORITY_INTERACTIVE
+                )
+            except Exception as e:
+                logger.error("Failed to get OpenAI response for %s: %s", channel, e)
+                response = ERROR_REPLY
+            
+            try:
+                slack_service = await self._get_slack_service_async()
+                await slack_service.post_message(channel, response, thread_ts=thread_ts)
+            except Exception as e:
+                logger.error("Failed to post reply to %s: %s", channel, e)
+    
+    async def _build_prompt_async(self, event: dict) -> Union[str, List[dict]]:
+        """
+        Build the completion input for a mention, including its thread's history.
+        
+        Args:
+            event: Slack app_mention event
+        
+        Returns:
+            The mention text for a top-level mention, otherwise the thread as
+            a list of chat messages (the bot's own messages as 'assistant')
+        """
+        text = event.get('text', '')
+        channel = event.get('channel')
+        thread_ts = event.get('thread_ts')
+        
+        if not thread_ts or self.config.thread_history_limit < 1:
+            return text
+        
+        try:
+            slack_service = await self._get_slack_service_async()
+            slack_service.record_message(channel, thread_ts, event)
+            history = await slack_service.get_thread_history(
+                channel, thread_ts, limit=self.config.thread_history_limit
+            )
+        except Exception as e:
+            logger.warning("Failed to get thread history for %s: %s", channel, e)
+            return text
+        
+        if not any(message.get('ts') == event.get('ts') for message in history):
+            history.append({'ts': event.get('ts'), 'text': text, 'is_bot': False})
+        history = history[-self.config.thread_history_limit:]
+        
+        return [
+            {'role': 'assistant' if message.get('is_bot') else 'user', 'content': message.get('text', '')}
+            for message in history
+        ]
+    
+    def queue_stats(self) -> dict:
+        """
+        Get in-flight mention metrics, in the same shape as the work queue's.
+        
+        Returns:
+            dict: Mentions in flight ('busy_workers') and task counts
+        """
+        in_flight = len(self._tasks)
+        return {
+            'depth': self._fair_queue.qsize() if self._fair_queue is not None else 0,
+            'max_size': self.config.work_queue_size,
+            'workers': 0,
+            'busy_workers': in_flight,
+            'utilisation': round(in_flight / self.config.work_queue_size, 4),
+            'submitted': self._submitted,
+            'completed': self._completed,
+            'failed': self._failed,
+            'rejected': self._rejected
+        }
+    
+    def fairness_stats(self, top: Optional[int] = DEFAULT_TOP_TENANTS) -> dict:
+        """
+        Get per channel and user fair admission metrics.
+        
+        Args:
+            top: Number of tenant keys to list (None = every tracked key)
+        
+        Returns:
+            dict: Mentions waiting for a slot, tenant keys tracked and the
+                busiest channels and users ('enabled' is False when mentions
+                are admitted in arrival order)
+        """
+        if self._fair_queue is None:
+            return {'enabled': False, 'depth': 0, 'tracked_keys': 0, 'tenants': {}}
+        
+        return dict(self._fair_queue.stats(top), enabled=True)
+    
+    def _accepting_events(self) -> bool:
+        """Whether dispatch would schedule a mention now."""
+        if self._draining:
+            return False
+        if self._fair_queue is not None:
+            return not self._fair_queue.full()
+        return len(self._tasks) < self.config.work_queue_size
+    
+    def _get_health_monitor(self) -> HealthMonitor:
+        """Get the upstream health monitor, starting its probe task on first use."""
+        if self.health_monitor is None:
+            async def probe_slack():
+                await (await self._get_slack_service_async()).ping()
+            
+            async def probe_openai():
+                await (await self._get_openai_service_async()).ping()
+            
+            self.health_monitor = HealthMonitor(
+                {'slack': probe_slack, 'openai': probe_openai},
+                interval=self.config.health_probe_interval
+            )
+            self.health_monitor.start_task()
+        return self.health_monitor
+    
+    def _start(self, event: dict):
+        """Answer a mention in a task on the running event loop."""
+        task = asyncio.get_running_loop().create_task(self.process_app_mention_async(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+    
+    def _start_waiting(self):
+        """Start waiting mentions, in turns between channels and users, while slots are free."""
+        while len(self._tasks) < self.config.work_queue_size and not self._fair_queue.empty():
+            self._start(self._fair_queue.get_nowait())
+    
+    def _task_done(self, task: asyncio.Task):
+        """Forget a finished mention task, count its outcome and start the next waiting mention."""
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            self._failed += 1
+            if not task.cancelled():
+                logger.error("Mention task failed: %s", task.exception())
+        else:
+            self._completed += 1
+        
+        if self._fair_queue is not None:
+            self._start_waiting()
+    
+    async def _get_openai_service_async(self) -> AsyncOpenAIService:
+        """Get the async OpenAI service, creating and starting it from config on first use."""
+        if self.openai_service is None:
+            async with self._get_service_lock():
+                if self.openai_service is None:
+                    rate_limiter = self._build_rate_limiter()
+                    service = AsyncOpenAIService(
+                        self.config.openai_api_key,
+                        self.config.openai_model,
+                        validation=self.config.service_validation,
+                        max_input_tokens=self.config.openai_max_input_tokens,
+                        response_cache=self._build_response_cache(),
+                        connection_settings=self._connection_settings(),
+                        base_url=self.config.openai_base_url,
+                        retry_policy=self._build_retry_policy(),
+                        rate_limiter=rate_limiter,
+                        single_flight=SingleFlight() if self.config.openai_coalesce_requests else None,
+                        scheduler=self._build_scheduler(rate_limiter)
+                    )
+                    if self.config.semantic_cache:
+                        # Embeddings are requested from a worker thread, so they need a sync client
+                        service.semantic_cache = self._build_semantic_cache(
+                            OpenAI(api_key=self.config.openai_api_key, base_url=self.config.openai_base_url,
+                                   max_retries=0),
+                            retry_policy=service.retry_policy
+                        )
+                    await service.start()
+                    self.openai_service = service
+        return self.openai_service
+    
+    async def _get_slack_service_async(self) -> AsyncSlackService:
+        """Get the async Slack service, creating and starting it from config on first use."""
+        if self.slack_service is None:
+            async with self._get_service_lock():
+                if self.slack_service is None:
+                    service = AsyncSlackService(
+                        self.config.slack_bot_token,
+                        validation=self.config.service_validation,
+                        thread_cache=ThreadHistoryCache(
+                            max_bytes=self.config.thread_cache_max_bytes,
+                            ttl=self.config.thread_cache_ttl_seconds
+                        ),
+                        connection_settings=self._connection_settings(),
+                        base_url=self.config.slack_api_url,
+                        send_queue=self._build_async_send_queue(),
+                        reply_blocks=self.config.slack_reply_blocks
+                    )
+                    await service.start()
+                    self.slack_service = service
+        return self.slack_service
+    
+    def _build_async_send_queue(self) -> Optional[AsyncChannelSendQueue]:
+        """
+        Create the per-channel Slack send queue from config.
+        
+        Returns:
+            The send queue, or None if replies are posted directly
+        """
+        if not self.config.slack_send_queue:
+            return None
+        
+        return AsyncChannelSendQueue(
+            channel_interval=self.config.slack_channel_send_interval,
+            sends_per_minute=self.config.slack_sends_per_minute
+        )
+    
+    def _get_service_lock(self) -> asyncio.Lock:
+        """Get the lock serialising service creation, created on the event loop."""
+        if self._service_lock is None:
+            self._service_lock = asyncio.Lock()
+        return self._service_lock
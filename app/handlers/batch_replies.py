@@ -0,0 +1,169 @@
+import logging
+from typing import List, Optional, Tuple, Union
+from app.services.openai_service import DEFAULT_BATCH_POLL_INTERVAL, OpenAIService
+from app.services.slack_service import SlackService
+
+
+logger = logging.getLogger(__name__)
+
+# Most requests the Batch API accepts in one batch
+MAX_BATCH_REQUESTS = 50000
+
+
+class BatchReplies:
+    """Answer messages through the OpenAI Batch API and post the answers to Slack.
+    
+    For work that does not need an interactive reply, such as nightly channel
+    summaries or backfills: it costs half as much and leaves the interactive
+    rate limits alone. Messages are collected with add() and run() submits
+    them, waits for the batches and posts each answer where it was asked for.
+    
+    The channel and thread to answer in are part of each request's custom_id,
+    so deliver() can post a batch's answers from another process given only
+    the batch ID.
+    """
+    
+    def __init__(self, openai_service: OpenAIService, slack_service: SlackService,
+                 max_requests: int = MAX_BATCH_REQUESTS, poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+                 timeout: Optional[float] = None):
+        """
+        Initialize the batch replies.
+        
+        Args:
+            openai_service: OpenAI service the batches are submitted with
+            slack_service: Slack service the answers are posted with
+            max_requests: Most requests submitted in one batch
+            poll_interval: Seconds between batch status checks
+            timeout: Seconds to wait for a batch at most (default: until it ends)
+        
+        Raises:
+            ValueError: If max_requests is not between 1 and MAX_BATCH_REQUESTS
+        """
+        if not 1 <= max_requests <= MAX_BATCH_REQUESTS:
+            raise ValueError(f"Batch size must be between 1 and {MAX_BATCH_REQUESTS}")
+        
+        self.openai_service = openai_service
+        self.slack_service = slack_service
+        self.max_requests = max_requests
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.pending = []
+        self._submitted = {}
+        self._sequence = 0
+    
+    def add(self, channel: str, message: Union[str, List[dict]], thread_ts: Optional[str] = None) -> str:
+        """
+        Queue a message to be answered in the next batch.
+        
+        Args:
+            channel: Channel to post the answer in
+            message: Message text, or a conversation as for get_chat_completion
+            thread_ts: Optional thread to post the answer in
+        
+        Returns:
+            str: The request's custom_id
+        
+        Raises:
+            ValueError: If channel is empty
+        """
+        if not channel:
+            raise ValueError("Channel cannot be empty")
+        
+        custom_id = f"{self._sequence}:{channel}:{thread_ts or ''}"
+        self._sequence += 1
+        self.pending.append((custom_id, message))
+        return custom_id
+    
+    def submit(self) -> List[str]:
+        """
+        Submit the queued messages, in batches of up to max_requests.
+        
+        Returns:
+            list: The IDs of the batches submitted
+        
+        Raises:
+            ValueError: If a queued message is empty
+            RuntimeError: If a batch cannot be submitted; the messages not yet
+                submitted stay queued
+        """
+        batch_ids = []
+        while self.pending:
+            requests = self.pending[:self.max_requests]
+            batch_id = self.openai_service.submit_batch(requests)
+            del self.pending[:len(requests)]
+            self._submitted[batch_id] = [custom_id for custom_id, _ in requests]
+            batch_ids.append(batch_id)
+        return batch_ids
+    
+    def deliver(self, batch_id: str) -> List[dict]:
+        """
+        Wait for a batch to end and post its answers.
+        
+        Answers to one channel are posted in the order they were added. A
+        request that failed, or that the batch did not get to before it
+        expired or was cancelled, is not posted.
+        
+        Args:
+            batch_id: ID returned by submit
+        
+        Returns:
+            list: Per request, in the order added, a post_messages result: a
+                dict with 'channel', 'ok', the posted answer's 'ts' and the
+                'error' if it was not posted
+        
+        Raises:
+            TimeoutError: If the batch is still running after timeout seconds
+            RuntimeError: If the batch failed as a whole or its results cannot be read
+        """
+        batch = self.openai_service.wait_for_batch(batch_id, self.poll_interval, self.timeout)
+        if batch.status == 'failed':
+            raise RuntimeError(f"OpenAI batch {batch_id} failed: {batch.errors}")
+        
+        answers = self.openai_service.get_batch_results(batch)
+        custom_ids = self._submitted.pop(batch_id, None) or list(answers)
+        
+        results = {}
+        posts = []
+        for custom_id in sorted(custom_ids, key=_sequence_number):
+            _, channel, thread_ts = _destination(custom_id)
+            answer = answers.get(custom_id) or {'error': f"OpenAI batch {batch_id} ended {batch.status} before answering"}
+            if answer.get('error'):
+                results[custom_id] = {'channel': channel, 'ok': False, 'ts': None, 'error': answer['error']}
+            else:
+                posts.append((custom_id, (channel, answer['text'], thread_ts)))
+        
+        posted = self.slack_service.post_messages([message for _, message in posts])
+        results.update((custom_id, result) for (custom_id, _), result in zip(posts, posted))
+        
+        logger.info("Delivered OpenAI batch %s: %d of %d answers posted", batch_id,
+                    sum(result['ok'] for result in results.values()), len(results))
+        return [results[custom_id] for custom_id in sorted(results, key=_sequence_number)]
+    
+    def run(self) -> List[dict]:
+        """
+        Submit the queued messages, then wait for and deliver every batch.
+        
+        Returns:
+            list: Per message, in the order added, the result of posting its
+                answer, as for deliver
+        
+        Raises:
+            TimeoutError: If a batch is still running after timeout seconds
+            RuntimeError: If a batch cannot be submitted, failed or its results
+                cannot be read
+        """
+        results = []
+        for batch_id in self.submit():
+            results.extend(self.deliver(batch_id))
+        return results
+
+
+def _destination(custom_id: str) -> Tuple[int, str, Optional[str]]:
+    """Split a custom_id made by BatchReplies.add into its sequence number, channel and thread."""
+    sequence, channel, thread_ts = custom_id.split(':', 2)
+    return int(sequence), channel, thread_ts or None
+
+
+def _sequence_number(custom_id: str) -> int:
+    """Order custom_ids in the order their messages were added."""
+    return _destination(custom_id)[0]
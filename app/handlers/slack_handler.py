@@ -1 +1,822 @@
-# Empty file - Slack event handlers will be implemented later 
\ No newline at end of file
+import logging
+import threading
+import time
+from typing import Callable, List, Mapping, Optional, Tuple, Union
+from slack_sdk.signature import SignatureVerifier
+from app.handlers.streaming_reply import StreamingReply
+from app.services.openai_service import OpenAIService
+from app.services.slack_service import SlackService
+from app.utils import metrics
+from app.utils.dedup_cache import EventDeduplicator, InMemoryDedupBackend
+from app.utils.fair_queue import DEFAULT_TOP_TENANTS, FairQueue
+from app.utils.health_monitor import HealthMonitor, overall_status
+from app.utils.http_pool import ConnectionSettings
+from app.utils.job_queue import Job, JobQueue, SqliteJobStore
+from app.utils.priority_scheduler import PRIORITY_INTERACTIVE, PriorityScheduler
+from app.utils.response_cache import InMemoryResponseBackend, ResponseCache, SqliteResponseBackend
+from app.utils.rate_limiter import RateLimiter
+from app.utils.retry import RetryPolicy
+from app.utils.send_queue import ChannelSendQueue
+from app.utils.single_flight import SingleFlight
+from app.utils.semantic_cache import OpenAIEmbedder, SemanticCache
+from app.utils.thread_cache import ThreadHistoryCache
+from app.utils.work_queue import WorkQueue
+
+
+logger = logging.getLogger(__name__)
+
+ERROR_REPLY = "Sorry, I couldn't process your request right now. Please try again later."
+
+
+class SlackEventHandler:
+    """Handler for Slack Events API requests.
+    
+    Requests are verified and acknowledged on the request thread; the OpenAI
+    call and the Slack reply run on a bounded work queue so the endpoint can
+    ack well inside Slack's 3 second retry window.
+    """
+    
+    def __init__(self, config, openai_service: Optional[OpenAIService] = None,
+                 slack_service: Optional[SlackService] = None,
+                 work_queue: Optional[WorkQueue] = None,
+                 deduplicator: Optional[EventDeduplicator] = None,
+                 job_queue: Optional[JobQueue] = None):
+        """
+        Initialize the event handler.
+        
+        Services and the work queue are created on first use so that building
+        the Flask app does not make any network calls.
+        
+        Args:
+            config: Application configuration
+            openai_service: Optional OpenAI service (created from config if None)
+            slack_service: Optional Slack service (created from config if None)
+            work_queue: Optional work queue (created from config if None)
+            deduplicator: Optional event deduplicator (created from config if None)
+            job_queue: Optional durable job queue (created from config if None and
+                JOB_QUEUE is not 'memory'); replaces the work queue
+        """
+        self.config = config
+        self.openai_service = openai_service
+        self.slack_service = slack_service
+        self.work_queue = work_queue
+        self.deduplicator = deduplicator
+        self.job_queue = job_queue
+        self.health_monitor = None
+        self._draining = False
+        self._lock = threading.Lock()
+        # Held while a service is built, which can call the API with eager
+        # validation; dispatch never takes it, so acks do not wait on the build
+        self._build_lock = threading.Lock()
+        self._verifier = None
+    
+    def verify_request(self, body: Union[str, bytes], headers: Mapping[str, str]) -> bool:
+        """
+        Verify the Slack request signature.
+        
+        Args:
+            body: Raw request body
+            headers: Request headers
+        
+        Returns:
+            bool: True if the request was signed with the app's signing secret
+        """
+        try:
+            if self._verifier is None:
+                self._verifier = SignatureVerifier(self.config.slack_signing_secret)
+            return self._verifier.is_valid_request(body, headers)
+        except Exception as e:
+            logger.warning("Slack request verification failed: %s", e)
+            return False
+    
+    def dispatch(self, payload: dict) -> bool:
+        """
+        Queue a Slack event callback for background processing.
+        
+        Args:
+            payload: Parsed Events API payload
+        
+        Returns:
+            bool: True if the event was queued or ignored, False if the queue is
+                full or the handler is draining
+        """
+        event = payload.get('event') or {}
+        
+        if event.get('type') == 'message':
+            self._record_thread_message(event)
+            return True
+        
+        if event.get('type') != 'app_mention':
+            logger.debug("Ignoring Slack event type: %s", event.get('type'))
+            return True
+        
+        # Never respond to bot messages (including our own replies)
+        if event.get('bot_id'):
+            return True
+        
+        # Shutting down: Slack's retry will reach an instance that is still serving
+        if self._draining:
+            return False
+        
+        # Slack re-delivers events it thinks were not acked; answer each once
+        deduplicator = self._get_deduplicator()
+        if deduplicator.is_duplicate(payload):
+            logger.info("Ignoring duplicate delivery of event %s", payload.get('event_id'))
+            return True
+        
+        job_queue = self._get_job_queue()
+        if job_queue is not None:
+            queued = job_queue.submit(
+                payload.get('event_id') or f"{event.get('channel')}:{event.get('ts')}", event,
+                *self._job_tenants(event)
+            )
+        else:
+            queued = self._get_work_queue().submit_keyed(
+                (event.get('channel'), event.get('user')), self.process_app_mention, event,
+                priority=PRIORITY_INTERACTIVE
+            )
+        
+        if not queued:
+            logger.warning("Work queue full or over quota - rejecting event %s", payload.get('event_id'))
+            # Let the retry we are asking Slack for be processed
+            deduplicator.forget(payload)
+            return False
+        
+        return True
+    
+    @property
+    def draining(self) -> bool:
+        """Whether mentions are being turned away because the server is shutting down."""
+        return self._draining
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop taking mentions and wait for the ones queued or in flight to be answered.
+        
+        Called when the server shuts down. New mentions are rejected so Slack
+        retries them elsewhere, queued replies are sent, and the health probes
+        stop. With a durable job queue only the running jobs are waited for;
+        queued ones are left for the next process.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits until done)
+        
+        Returns:
+            bool: True if every mention was answered in time
+        """
+        self._draining = True
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        drained = True
+        for queue in (self.job_queue, self.work_queue):
+            if queue is not None:
+                # Every queue shares the one deadline
+                remaining = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+                drained = queue.drain(remaining) and drained
+                queue.shutdown(wait=False)
+        
+        send_queue = getattr(self.slack_service, 'send_queue', None)
+        if send_queue is not None:
+            send_queue.close(max(deadline - time.monotonic(), 0.0) if deadline is not None else None)
+        if self.slack_service is not None:
+            self.slack_service.close()
+        
+        if self.health_monitor is not None:
+            self.health_monitor.stop()
+        
+        if not drained:
+            logger.warning("Shutting down with %d mentions unanswered", self.queue_stats()['depth'])
+        return drained
+    
+    def resume_jobs(self):
+        """Start the durable job queue's workers, answering mentions a previous process left queued."""
+        job_queue = self._get_job_queue()
+        if job_queue is not None:
+            job_queue.start()
+    
+    def process_app_mention(self, event: dict, on_reply: Optional[Callable[[], None]] = None):
+        """
+        Answer an app mention in its thread. Runs on a work queue worker.
+        
+        Args:
+            event: Slack app_mention event
+            on_reply: Called once the reply has been posted
+        """
+        with metrics.trace('app_mention'):
+            channel = event.get('channel')
+            thread_ts = event.get('thread_ts') or event.get('ts')
+            prompt = self._build_prompt(event)
+            use_cache = channel not in self.config.response_cache_exclude_channels
+            
+            if self.config.stream_responses:
+                self._stream_reply(prompt, channel, thread_ts, use_cache=use_cache, on_reply=on_reply)
+                return
+            
+            try:
+                response = self._get_openai_service().get_chat_completion(
+                    prompt, use_cache=use_cache, priority=PRIORITY_INTERACTIVE
+                )
+            except Exception as e:
+                logger.error("Failed to get OpenAI response for %s: %s", channel, e)
+                response = ERROR_REPLY
+            
+            try:
+                self._get_slack_service().post_message(channel, response, thread_ts=thread_ts)
+            except Exception as e:
+                logger.error("Failed to post reply to %s: %s", channel, e)
+                return
+            
+            if on_reply is not None:
+                on_reply()
+    
+    def _process_job(self, job: Job):
+        """
+        Answer the mention in a durable job. Runs on a job queue worker.
+        
+        Args:
+            job: Leased job whose payload is the app_mention event
+        
+        Raises:
+            RuntimeError: If the reply was not posted, so the job is retried
+        """
+        if job.replied:
+            logger.info("Reply to %s was posted before the job was interrupted", job.key)
+            return
+        
+        replied = []
+        
+        def on_reply():
+            self.job_queue.store.mark_replied(job)
+            replied.append(True)
+        
+        self.process_app_mention(job.payload, on_reply=on_reply)
+        if not replied:
+            raise RuntimeError(f"Reply to {job.key} was not posted")
+    
+    def _build_prompt(self, event: dict) -> Union[str, List[dict]]:
+        """
+        Build the completion input for a mention, including its thread's history.
+        
+        Args:
+            event: Slack app_mention event
+        
+        Returns:
+            The mention text for a top-level mention, otherwise the thread as
+            a list of chat messages (the bot's own messages as 'assistant')
+        """
+        text = event.get('text', '')
+        channel = event.get('channel')
+        thread_ts = event.get('thread_ts')
+        
+        if not thread_ts or self.config.thread_history_limit < 1:
+            return text
+        
+        try:
+            slack_service = self._get_slack_service()
+            slack_service.record_message(channel, thread_ts, event)
+            history = slack_service.get_thread_history(channel, thread_ts, limit=self.config.thread_history_limit)
+        except Exception as e:
+            logger.warning("Failed to get thread history for %s: %s", channel, e)
+            return text
+        
+        # conversations.replies returns the oldest messages; keep the latest ones
+        if not any(message.get('ts') == event.get('ts') for message in history):
+            history.append({'ts': event.get('ts'), 'text': text, 'is_bot': False})
+        history = history[-self.config.thread_history_limit:]
+        
+        return [
+            {'role': 'assistant' if message.get('is_bot') else 'user', 'content': message.get('text', '')}
+            for message in history
+        ]
+    
+    def _record_thread_message(self, event: dict):
+        """
+        Add a thread reply the bot was sent to the thread cache.
+        
+        Args:
+            event: Slack message event
+        """
+        if not event.get('thread_ts') or event.get('subtype'):
+            return
+        
+        # Nothing is cached until the Slack service has been used
+        if self.slack_service is not None:
+            self.slack_service.record_message(event.get('channel'), event['thread_ts'], event)
+    
+    def _stream_reply(self, text: Union[str, List[dict]], channel: str, thread_ts: Optional[str],
+                      use_cache: bool = True, on_reply: Optional[Callable[[], None]] = None):
+        """
+        Answer with a placeholder reply that is edited as the completion streams in.
+        
+        Args:
+            text: Message text from the mention, or the thread as chat messages
+            channel: Channel to reply in
+            thread_ts: Thread to reply in
+            use_cache: Whether a cached response may be used
+            on_reply: Called once the reply has been completed
+        """
+        reply = StreamingReply(
+            self._get_slack_service(),
+            channel,
+            thread_ts=thread_ts,
+            update_interval=self.config.stream_update_interval
+        )
+        
+        try:
+            reply.start()
+        except Exception as e:
+            logger.error("Failed to post reply to %s: %s", channel, e)
+            return
+        
+        try:
+            try:
+                fragments = self._get_openai_service().stream_chat_completion(
+                    text, use_cache=use_cache, priority=PRIORITY_INTERACTIVE
+                )
+            except Exception as e:
+                logger.error("Failed to get OpenAI response for %s: %s", channel, e)
+                reply.finish(ERROR_REPLY)
+            else:
+                reply.relay(fragments, error_text=ERROR_REPLY)
+                logger.info("Streamed reply to %s: first text after %.3fs, %d updates",
+                            channel, reply.first_text_latency or 0.0, len(reply.updates))
+        except Exception as e:
+            logger.error("Failed to update reply in %s: %s", channel, e)
+            return
+        
+        if on_reply is not None:
+            on_reply()
+    
+    def queue_stats(self) -> dict:
+        """
+        Get work queue metrics.
+        
+        Returns:
+            dict: Queue depth and worker utilisation metrics
+        """
+        if self.job_queue is not None:
+            return self.job_queue.stats()
+        
+        if self.work_queue is None:
+            return {
+                'depth': 0,
+                'max_size': self.config.work_queue_size,
+                'workers': 0,
+                'busy_workers': 0,
+                'utilisation': 0.0,
+                'submitted': 0,
+                'completed': 0,
+                'failed': 0,
+                'rejected': 0
+            }
+        
+        return self.work_queue.stats()
+    
+    def fairness_stats(self, top: Optional[int] = DEFAULT_TOP_TENANTS) -> dict:
+        """
+        Get per channel and user fair queuing metrics.
+        
+        Args:
+            top: Number of tenant keys to list (None = every tracked key)
+        
+        Returns:
+            dict: Mentions waiting, tenant keys tracked and the busiest channels
+                and users ('enabled' is False when mentions are answered in
+                arrival order)
+        """
+        if self.job_queue is not None and self.config.fair_queue:
+            return dict(self.job_queue.store.tenant_stats(top), enabled=True)
+        
+        fair_queue = self.work_queue.fair_queue if self.work_queue is not None else None
+        if fair_queue is None:
+            return {'enabled': False, 'depth': 0, 'tracked_keys': 0, 'tenants': {}}
+        
+        return dict(fair_queue.stats(top), enabled=True)
+    
+    def dedup_stats(self) -> dict:
+        """
+        Get event dedup metrics.
+        
+        Returns:
+            dict: Duplicate (hits) and new (misses) event counts
+        """
+        if self.deduplicator is None:
+            return {'hits': 0, 'misses': 0}
+        
+        return self.deduplicator.stats()
+    
+    def thread_cache_stats(self) -> dict:
+        """
+        Get thread history cache metrics.
+        
+        Returns:
+            dict: Hit rate, evictions and memory use of the thread cache
+        """
+        if self.slack_service is None:
+            return {
+                'hits': 0,
+                'misses': 0,
+                'hit_rate': 0.0,
+                'evictions': 0,
+                'threads': 0,
+                'bytes': 0
+            }
+        
+        return self.slack_service.thread_cache.stats()
+    
+    def response_cache_stats(self) -> dict:
+        """
+        Get response cache metrics.
+        
+        Returns:
+            dict: Hit ratio and estimated latency saved ('enabled' is False when caching is off)
+        """
+        cache = self.openai_service.response_cache if self.openai_service is not None else None
+        if cache is None:
+            return {'enabled': False, 'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'saved_seconds': 0.0}
+        
+        return dict(cache.stats(), enabled=True)
+    
+    def semantic_cache_stats(self) -> dict:
+        """
+        Get semantic cache metrics.
+        
+        Returns:
+            dict: Hit ratio, cached entries and index memory ('enabled' is False when off)
+        """
+        cache = self.openai_service.semantic_cache if self.openai_service is not None else None
+        if cache is None:
+            return {'enabled': False, 'hits': 0, 'misses': 0, 'hit_ratio': 0.0, 'entries': 0}
+        
+        return dict(cache.stats(), enabled=True)
+    
+    def retry_stats(self) -> dict:
+        """
+        Get OpenAI retry metrics.
+        
+        Returns:
+            dict: Calls, retries, give-ups and seconds spent waiting to retry
+        """
+        policy = self.openai_service.retry_policy if self.openai_service is not None else None
+        if policy is None:
+            return {'calls': 0, 'retries': 0, 'give_ups': 0, 'wait_seconds': 0.0}
+        
+        return policy.stats()
+    
+    def rate_limit_stats(self) -> dict:
+        """
+        Get client-side OpenAI rate limiter metrics.
+        
+        Returns:
+            dict: Requests let through, how many waited, seconds waited and the
+                current limits ('enabled' is False when off), plus per priority
+                class stats under 'priorities' when they are scheduled
+        """
+        limiter = self.openai_service.rate_limiter if self.openai_service is not None else None
+        if limiter is None:
+            return {'enabled': False, 'requests': 0, 'throttled': 0, 'wait_seconds': 0.0}
+        
+        stats = dict(limiter.stats(), enabled=True)
+        if self.openai_service.scheduler is not None:
+            stats['priorities'] = self.openai_service.scheduler.stats()
+        return stats
+    
+    def send_queue_stats(self) -> dict:
+        """
+        Get Slack send queue metrics.
+        
+        Returns:
+            dict: Queued replies, sends made and rate limited retries ('enabled' is False when off)
+        """
+        send_queue = getattr(self.slack_service, 'send_queue', None)
+        if send_queue is None:
+            return {'enabled': False, 'queued': 0, 'channels': 0, 'sent': 0, 'failed': 0, 'rate_limited': 0}
+        
+        return dict(send_queue.stats(), enabled=True)
+    
+    def coalescing_stats(self) -> dict:
+        """
+        Get metrics for OpenAI calls shared by concurrent identical prompts.
+        
+        Returns:
+            dict: Calls made, requests that shared one and calls in flight ('enabled' is False when off)
+        """
+        single_flight = self.openai_service.single_flight if self.openai_service is not None else None
+        if single_flight is None:
+            return {'enabled': False, 'calls': 0, 'coalesced': 0, 'in_flight': 0}
+        
+        return dict(single_flight.stats(), enabled=True)
+    
+    def service_status(self) -> dict:
+        """
+        Get the cached credential validation result for each service.
+        
+        Returns:
+            dict: Validation status per service ('not_started' before first use)
+        """
+        status = {}
+        for name, service in (('openai', self.openai_service), ('slack', self.slack_service)):
+            if service is None:
+                status[name] = {'state': 'not_started'}
+            else:
+                status[name] = service.validation_status()
+        return status
+    
+    def readiness(self) -> dict:
+        """
+        Check whether this instance should be sent Slack events.
+        
+        Upstream outages are left out: every instance shares them, so taking
+        this one out of rotation would not help (see deep_health). Upstream
+        probes are started here so deep_health has results soon after boot.
+        
+        Returns:
+            dict: 'ready' and the checks behind it
+        """
+        self._get_health_monitor()
+        accepting = self._accepting_events()
+        if accepting:
+            events = 'accepting'
+        else:
+            events = 'draining' if self._draining else 'queue_full'
+        return {'ready': accepting, 'checks': {'events': events}}
+    
+    def deep_health(self) -> dict:
+        """
+        Get the cached results of the upstream probes, starting them on first use.
+        
+        Returns:
+            dict: Overall status ('up', 'down' or 'unknown') and each upstream's last probe result
+        """
+        results = self._get_health_monitor().results()
+        return {'status': overall_status(results), 'checks': results}
+    
+    def _accepting_events(self) -> bool:
+        """Whether dispatch would queue a mention now."""
+        return not self._draining and self.queue_stats()['depth'] < self.config.work_queue_size
+    
+    def _get_health_monitor(self) -> HealthMonitor:
+        """Get the upstream health monitor, creating and starting it on first use."""
+        if self.health_monitor is None:
+            with self._lock:
+                if self.health_monitor is None:
+                    self.health_monitor = HealthMonitor(
+                        {
+                            'slack': lambda: self._get_slack_service().ping(),
+                            'openai': lambda: self._get_openai_service().ping()
+                        },
+                        interval=self.config.health_probe_interval
+                    )
+                    self.health_monitor.start()
+        return self.health_monitor
+    
+    def _get_work_queue(self) -> WorkQueue:
+        """Get the work queue, creating it from config on first use."""
+        if self.work_queue is None:
+            with self._lock:
+                if self.work_queue is None:
+                    self.work_queue = WorkQueue(
+                        max_size=self.config.work_queue_size,
+                        num_workers=self.config.worker_count,
+                        name="slack-events",
+                        fair_queue=self._build_fair_queue()
+                    )
+        return self.work_queue
+    
+    def _build_fair_queue(self) -> Optional[FairQueue]:
+        """
+        Create the per channel and user fair queue for mentions from config.
+        
+        Returns:
+            The fair queue, or None to answer mentions in arrival order
+        """
+        if not self.config.fair_queue:
+            return None
+        
+        return FairQueue(
+            maxsize=self.config.work_queue_size,
+            key_names=('channel', 'user'),
+            quantum=self.config.fair_queue_quantum,
+            quotas=(self.config.fair_queue_max_per_channel, self.config.fair_queue_max_per_user)
+        )
+    
+    def _job_tenants(self, event: dict) -> Tuple[tuple, tuple]:
+        """
+        Get the tenant keys and quotas a mention is stored under on the job queue.
+        
+        Args:
+            event: Slack app_mention event
+        
+        Returns:
+            (tenant keys, quotas) for the channel and user, or empty ones to
+            claim mentions in arrival order
+        """
+        if not self.config.fair_queue:
+            return (), ()
+        
+        levels = (('channel', event.get('channel'), self.config.fair_queue_max_per_channel),
+                  ('user', event.get('user'), self.config.fair_queue_max_per_user))
+        # Mentions without a channel or user share turns but have no quota, as on the fair queue
+        return (tuple(f"{name}:{value or ''}" for name, value, _ in levels),
+                tuple(quota if value else 0 for _, value, quota in levels))
+    
+    def _get_job_queue(self) -> Optional[JobQueue]:
+        """
+        Get the durable job queue selected in config, creating it on first use.
+        
+        Returns:
+            The job queue, or None if mentions go to the in-process work queue
+        
+        Raises:
+            ValueError: If the configured backend is unknown
+        """
+        if self.job_queue is None and self.config.job_queue != 'memory':
+            with self._lock:
+                if self.job_queue is None:
+                    if self.config.job_queue != 'sqlite':
+                        raise ValueError(f"Invalid job queue backend: {self.config.job_queue}")
+                    
+                    self.job_queue = JobQueue(
+                        SqliteJobStore(self.config.job_queue_path),
+                        self._process_job,
+                        num_workers=self.config.worker_count,
+                        max_size=self.config.work_queue_size,
+                        visibility_timeout=self.config.job_visibility_timeout_seconds,
+                        max_attempts=self.config.job_max_attempts,
+                        retention=self.config.dedup_ttl_seconds,
+                        failed_retention=self.config.job_failed_retention_seconds,
+                        name="slack-jobs"
+                    )
+        return self.job_queue
+    
+    def _get_deduplicator(self) -> EventDeduplicator:
+        """Get the event deduplicator, creating it from config on first use."""
+        if self.deduplicator is None:
+            with self._lock:
+                if self.deduplicator is None:
+                    self.deduplicator = EventDeduplicator(
+                        InMemoryDedupBackend(max_size=self.config.dedup_max_size),
+                        ttl=self.config.dedup_ttl_seconds
+                    )
+        return self.deduplicator
+    
+    def _get_openai_service(self) -> OpenAIService:
+        """Get the OpenAI service, creating it from config on first use."""
+        if self.openai_service is None:
+            with self._build_lock:
+                if self.openai_service is None:
+                    rate_limiter = self._build_rate_limiter()
+                    service = OpenAIService(
+                        self.config.openai_api_key,
+                        self.config.openai_model,
+                        validation=self.config.service_validation,
+                        max_input_tokens=self.config.openai_max_input_tokens,
+                        response_cache=self._build_response_cache(),
+                        connection_settings=self._connection_settings(),
+                        base_url=self.config.openai_base_url,
+                        retry_policy=self._build_retry_policy(),
+                        rate_limiter=rate_limiter,
+                        single_flight=SingleFlight() if self.config.openai_coalesce_requests else None,
+                        scheduler=self._build_scheduler(rate_limiter)
+                    )
+                    if self.config.semantic_cache:
+                        service.semantic_cache = self._build_semantic_cache(
+                            service.client, retry_policy=service.retry_policy
+                        )
+                    with self._lock:
+                        self.openai_service = service
+        return self.openai_service
+    
+    def _connection_settings(self) -> ConnectionSettings:
+        """Build the HTTP connection settings for the API clients from config."""
+        return ConnectionSettings(
+            pool_size=self.config.http_pool_size,
+            connect_timeout=self.config.http_connect_timeout,
+            read_timeout=self.config.http_read_timeout,
+            keepalive_expiry=self.config.http_keepalive_seconds
+        )
+    
+    def _build_response_cache(self) -> Optional[ResponseCache]:
+        """
+        Create the response cache selected in config.
+        
+        Returns:
+            The response cache, or None if caching is off
+        
+        Raises:
+            ValueError: If the configured backend is unknown
+        """
+        backend = self.config.response_cache
+        if backend == 'off':
+            return None
+        
+        if backend == 'memory':
+            store = InMemoryResponseBackend(max_entries=self.config.response_cache_max_entries)
+        elif backend == 'sqlite':
+            store = SqliteResponseBackend(
+                self.config.response_cache_path,
+                max_entries=self.config.response_cache_max_entries
+            )
+        else:
+            raise ValueError(f"Invalid response cache backend: {backend}")
+        
+        return ResponseCache(store, ttl=self.config.response_cache_ttl_seconds)
+    
+    def _build_retry_policy(self) -> RetryPolicy:
+        """Create the retry policy for OpenAI requests from config."""
+        return RetryPolicy(
+            max_retries=self.config.openai_max_retries,
+            base_delay=self.config.openai_retry_base_delay,
+            max_delay=self.config.openai_retry_max_delay,
+            deadline=self.config.openai_retry_deadline
+        )
+    
+    def _build_rate_limiter(self) -> Optional[RateLimiter]:
+        """
+        Create the client-side OpenAI rate limiter from config.
+        
+        Returns:
+            The rate limiter, or None if no limit is configured
+        """
+        if self.config.openai_requests_per_minute <= 0 and self.config.openai_tokens_per_minute <= 0:
+            return None
+        
+        return RateLimiter(
+            requests_per_minute=self.config.openai_requests_per_minute,
+            tokens_per_minute=self.config.openai_tokens_per_minute,
+            burst_seconds=self.config.openai_rate_limit_burst_seconds
+        )
+    
+    def _build_scheduler(self, rate_limiter: Optional[RateLimiter]) -> Optional[PriorityScheduler]:
+        """
+        Create the priority scheduler for the rate limiter's budget from config.
+        
+        Without OPENAI_REQUESTS_PER_MINUTE or OPENAI_TOKENS_PER_MINUTE there is
+        no budget to share, as requests go out as soon as they are made; mentions
+        still go ahead of other jobs on the work queue.
+        
+        Returns:
+            The scheduler, or None without a rate limiter or when turned off
+        """
+        if rate_limiter is None or not self.config.openai_priority_scheduling:
+            return None
+        
+        return PriorityScheduler(rate_limiter, max_wait=self.config.openai_priority_max_wait)
+    
+    def _build_semantic_cache(self, client, retry_policy: Optional[RetryPolicy] = None) -> SemanticCache:
+        """
+        Create the semantic cache from config, embedding with the OpenAI client.
+        
+        Args:
+            client: OpenAI client used for the Embeddings API
+            retry_policy: Retries for rate limited embedding requests
+        
+        Returns:
+            The semantic cache
+        
+        Raises:
+            RuntimeError: If numpy is not installed
+        """
+        return SemanticCache(
+            OpenAIEmbedder(client, model=self.config.semantic_cache_embedding_model, retry_policy=retry_policy),
+            threshold=self.config.semantic_cache_threshold,
+            ttl=self.config.response_cache_ttl_seconds,
+            capacity=self.config.semantic_cache_max_entries,
+            dtype=self.config.semantic_cache_dtype
+        )
+    
+    def _get_slack_service(self) -> SlackService:
+        """Get the Slack service, creating it from config on first use."""
+        if self.slack_service is None:
+            with self._build_lock:
+                if self.slack_service is None:
+                    service = SlackService(
+                        self.config.slack_bot_token,
+                        validation=self.config.service_validation,
+                        thread_cache=ThreadHistoryCache(
+                            max_bytes=self.config.thread_cache_max_bytes,
+                            ttl=self.config.thread_cache_ttl_seconds
+                        ),
+                        connection_settings=self._connection_settings(),
+                        base_url=self.config.slack_api_url,
+                        send_queue=self._build_send_queue(),
+                        reply_blocks=self.config.slack_reply_blocks
+                    )
+                    with self._lock:
+                        self.slack_service = service
+        return self.slack_service
+    
+    def _build_send_queue(self) -> Optional[ChannelSendQueue]:
+        """
+        Create the per-channel Slack send queue from config.
+        
+        Returns:
+            The send queue, or None if replies are posted directly
+        """
+        if not self.config.slack_send_queue:
+            return None
+        
+        return ChannelSendQueue(
+            channel_interval=self.config.slack_channel_send_interval,
+            sends_per_minute=self.config.slack_sends_per_minute
+        )
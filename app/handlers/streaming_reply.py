@@ -0,0 +1,169 @@
+import logging
+import time
+from typing import Callable, Iterable, Optional
+from app.services.slack_service import SlackService
+from app.utils.message_splitter import MAX_MESSAGE_CHARS, split_message
+
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_TEXT = "_Thinking..._"
+
+
+class StreamingReply:
+    """Relay a streamed completion into one Slack reply that is edited as text arrives.
+    
+    A placeholder is posted first. The first text fragment is shown as soon as
+    it arrives; after that chat.update is called at most once per
+    update_interval, which keeps the edits within Slack's per-method limits.
+    A reply too long for one message shows its first chunk while streaming;
+    the rest is posted as follow-up messages when it is finished.
+    """
+    
+    def __init__(self, slack_service: SlackService, channel: str, thread_ts: Optional[str] = None,
+                 update_interval: float = 1.0, placeholder: str = PLACEHOLDER_TEXT,
+                 max_final_attempts: int = 3, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the streaming reply.
+        
+        Args:
+            slack_service: Slack service used to post and update the reply
+            channel: Channel to reply in
+            thread_ts: Optional thread timestamp for thread replies
+            update_interval: Minimum seconds between message updates
+            placeholder: Text shown until the first fragment arrives
+            max_final_attempts: Attempts for the final update before giving up
+            clock: Monotonic clock (injectable for tests)
+            sleep: Sleep function used between final update attempts
+        
+        Raises:
+            ValueError: If update_interval is negative or max_final_attempts is below 1
+        """
+        if update_interval < 0:
+            raise ValueError("Update interval cannot be negative")
+        
+        if max_final_attempts < 1:
+            raise ValueError("Final update attempts must be at least 1")
+        
+        self.slack_service = slack_service
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.update_interval = update_interval
+        self.placeholder = placeholder
+        self.max_final_attempts = max_final_attempts
+        self.clock = clock
+        self.sleep = sleep
+        
+        self.ts = None
+        self.text = ""
+        self.started_at = None
+        self.first_text_latency = None
+        self.updates = []  # (seconds since start, characters shown)
+        self._shown_text = None
+        self._last_update_at = None
+    
+    def start(self) -> str:
+        """
+        Post the placeholder reply.
+        
+        Returns:
+            str: Timestamp of the reply message
+        
+        Raises:
+            RuntimeError: If the placeholder cannot be posted
+        """
+        self.started_at = self.clock()
+        self.ts = self.slack_service.start_message(self.channel, self.placeholder, thread_ts=self.thread_ts)
+        return self.ts
+    
+    def relay(self, fragments: Iterable[str], error_text: str) -> str:
+        """
+        Consume text fragments, updating the reply at the throttled cadence.
+        
+        Args:
+            fragments: Iterator of response text fragments
+            error_text: Text shown (after any partial answer) if the stream fails
+        
+        Returns:
+            str: The final reply text
+        
+        Raises:
+            RuntimeError: If the final update fails after all attempts
+        """
+        if self.ts is None:
+            self.start()
+        
+        try:
+            for fragment in fragments:
+                self.text += fragment
+                self._maybe_update()
+        except Exception as e:
+            logger.error("Streaming response to %s failed: %s", self.channel, e)
+            partial = self.text.strip()
+            self.text = f"{partial}\n\n{error_text}" if partial else error_text
+        
+        final_text = self.text.strip() or error_text
+        self.finish(final_text)
+        return final_text
+    
+    def finish(self, text: str):
+        """
+        Show the complete reply, retrying if Slack rejects the update.
+        
+        Args:
+            text: Final reply text
+        
+        Raises:
+            RuntimeError: If the update or the follow-up messages fail
+        """
+        chunks = split_message(text) if len(text) > MAX_MESSAGE_CHARS else [text]
+        self._finish_update(chunks[0])
+        
+        if len(chunks) > 1:
+            self.slack_service.post_message(self.channel, "\n\n".join(chunks[1:]), thread_ts=self.thread_ts)
+    
+    def _finish_update(self, text: str):
+        """Update the reply to its final text, retrying up to max_final_attempts times."""
+        if text == self._shown_text:
+            return
+        
+        for attempt in range(1, self.max_final_attempts + 1):
+            try:
+                self._update(text)
+                return
+            except RuntimeError as e:
+                if attempt == self.max_final_attempts:
+                    raise
+                logger.warning("Final reply update failed (attempt %d): %s", attempt, e)
+                self.sleep(max(self.update_interval, 1.0))
+    
+    def _maybe_update(self):
+        """Update the reply if there is new text and the interval has passed."""
+        text = self.text.strip()
+        if len(text) > MAX_MESSAGE_CHARS:
+            text = split_message(text)[0]
+        if not text or text == self._shown_text:
+            return
+        
+        # Show the first text immediately; throttle the rest
+        if self._last_update_at is not None and self.clock() - self._last_update_at < self.update_interval:
+            return
+        
+        try:
+            self._update(text)
+        except RuntimeError as e:
+            # Try again on the next fragment after the interval
+            logger.warning("Intermediate reply update failed: %s", e)
+            self._last_update_at = self.clock()
+    
+    def _update(self, text: str):
+        """Send a chat.update and record when it happened."""
+        self.slack_service.update_message(self.channel, self.ts, text, thread_ts=self.thread_ts)
+        
+        now = self.clock()
+        if self.first_text_latency is None:
+            self.first_text_latency = now - self.started_at
+        self._shown_text = text
+        self._last_update_at = now
+        self.updates.append((now - self.started_at, len(text)))
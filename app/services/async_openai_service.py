@@ -0,0 +1,275 @@
+import asyncio
+import functools
+import time
+from typing import AsyncIterator, List, Optional, Tuple, Union
+import openai
+from openai import AsyncOpenAI
+from app.services.openai_service import COMPLETION_PARAMS, STREAM_OPTIONS, OpenAIService, build_http_client
+from app.utils.credential_check import (
+    CredentialCheck, VALIDATION_BACKGROUND, VALIDATION_EAGER, VALIDATION_LAZY, VALIDATION_MODES
+)
+from app.utils import metrics
+from app.utils.http_pool import ConnectionSettings
+from app.utils.priority_scheduler import PRIORITY_NORMAL
+from app.utils.response_cache import ResponseCache
+
+
+class AsyncOpenAIService(OpenAIService):
+    """OpenAI service for asyncio code, built on AsyncOpenAI.
+    
+    Message formatting, context packing, caching and error mapping are the
+    same as OpenAIService. The constructor makes no API calls; await start()
+    on the event loop to run 'eager' or 'background' validation.
+    """
+    
+    def __init__(self, api_key: str, model: str = "gpt-4", validation: str = VALIDATION_EAGER, **kwargs):
+        """
+        Initialize the async OpenAI service.
+        
+        Args:
+            api_key: OpenAI API key
+            model: OpenAI model to use (default: gpt-4)
+            validation: When to check the API key - 'eager' (in start(), default),
+                'lazy' (the first chat completion validates it) or 'background'
+                (a task created by start())
+            **kwargs: Other OpenAIService arguments
+        
+        Raises:
+            ValueError: If API key is empty or None, validation mode is unknown,
+                or max_input_tokens is less than 1
+        """
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Invalid validation mode: {validation}")
+        
+        super().__init__(api_key, model, validation=VALIDATION_LAZY, **kwargs)
+        self.validation = validation
+    
+    def _create_client(self, api_key: str, connection_settings: Optional[ConnectionSettings],
+                       base_url: Optional[str]):
+        """Create the async OpenAI API client."""
+        client_options = {}
+        if connection_settings is not None:
+            client_options['http_client'] = build_http_client(connection_settings, asynchronous=True)
+        if base_url is not None:
+            client_options['base_url'] = base_url
+        if self.retry_policy is not None:
+            client_options['max_retries'] = 0
+        return AsyncOpenAI(api_key=api_key, **client_options)
+    
+    async def start(self):
+        """
+        Run the configured startup validation. Call once from the event loop.
+        
+        Raises:
+            ValueError: If validation is 'eager' and the API key is invalid
+        """
+        if self.validation == VALIDATION_EAGER:
+            try:
+                await self.credential_check.run_async()
+            except Exception as e:
+                raise ValueError(f"Failed to initialize OpenAI client: {e}")
+        elif self.validation == VALIDATION_BACKGROUND:
+            self.credential_check.start_task()
+    
+    async def close(self):
+        """Close the client's HTTP connections."""
+        await self.client.close()
+    
+    async def ping(self):
+        """
+        Check that the API is reachable and accepts the key, with a models call that uses no tokens.
+        
+        Raises:
+            RuntimeError: If the request fails
+        """
+        try:
+            await self.client.models.retrieve(self.model)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API check failed: {e}")
+    
+    async def _validate_api_key(self):
+        """Validate the API key by making a test request."""
+        try:
+            await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": "test"}],
+                max_tokens=1
+            )
+        except openai.AuthenticationError:
+            raise ValueError("Invalid OpenAI API key")
+        except openai.RateLimitError:
+            # Rate limit is fine - means API key is valid
+            pass
+        except Exception as e:
+            raise ValueError(f"OpenAI API key validation failed: {e}")
+    
+    async def get_chat_completion(self, message: Union[str, List[dict]], use_cache: bool = True,
+                                  priority: str = PRIORITY_NORMAL) -> str:
+        """
+        Get chat completion response from OpenAI.
+        
+        Args:
+            message: User message text to send to OpenAI, or a conversation
+                as a list of {'role': ..., 'content': ...} dicts
+            use_cache: Whether the response caches (if configured) may be used
+            priority: Priority class the request waits for rate limit budget in
+        
+        Returns:
+            Response text from OpenAI
+        
+        Raises:
+            ValueError: If message is empty or None
+            RuntimeError: If OpenAI API call fails
+        """
+        messages = self._prepare_messages(message)
+        
+        cached, cache_fill = await self._lookup_caches_async(messages, use_cache)
+        if cached is not None:
+            return cached
+        
+        # Identical requests of one priority class already in flight share
+        # their answer, cached or not; whether it is cached is up to the
+        # request that made the call
+        if self.single_flight is not None:
+            key = (priority, ResponseCache.make_key(messages, self.model, **COMPLETION_PARAMS))
+            text, _ = await self.single_flight.do_async(key, self._complete_async, messages, cache_fill, priority)
+            return text
+        
+        return await self._complete_async(messages, cache_fill, priority)
+    
+    async def _complete_async(self, messages: List[dict], cache_fill: Optional[dict] = None,
+                              priority: str = PRIORITY_NORMAL) -> str:
+        """Await a completion and cache its text, mapping API errors."""
+        try:
+            started_at = time.monotonic()
+            response = await self._create_completion_async(
+                priority,
+                model=self.model,
+                messages=messages,
+                **COMPLETION_PARAMS
+            )
+            
+            if self.credential_check.state != CredentialCheck.VALID:
+                self.credential_check.mark_valid()
+            
+            metrics.record_usage(getattr(response, 'usage', None))
+            text = self._completion_text(response)
+            await self._fill_caches_async(cache_fill, text, time.monotonic() - started_at)
+            return text
+        
+        except Exception as e:
+            raise self._api_error(e)
+    
+    async def stream_chat_completion(self, message: Union[str, List[dict]], use_cache: bool = True,
+                                     priority: str = PRIORITY_NORMAL) -> AsyncIterator[str]:
+        """
+        Stream a chat completion response from OpenAI.
+        
+        Args:
+            message: User message text to send to OpenAI, or a conversation
+                as a list of {'role': ..., 'content': ...} dicts
+            use_cache: Whether the response caches (if configured) may be used
+            priority: Priority class the request waits for rate limit budget in
+        
+        Returns:
+            Async iterator over response text fragments as they are generated
+        
+        Raises:
+            ValueError: If message is empty or None
+            RuntimeError: If OpenAI API call fails (also raised mid-stream)
+        """
+        messages = self._prepare_messages(message)
+        
+        cached, cache_fill = await self._lookup_caches_async(messages, use_cache)
+        if cached is not None:
+            return _single_fragment(cached)
+        
+        try:
+            started_at = time.monotonic()
+            stream = await self._create_completion_async(
+                priority,
+                model=self.model,
+                messages=messages,
+                stream=True,
+                stream_options=STREAM_OPTIONS,
+                **COMPLETION_PARAMS
+            )
+            
+            if self.credential_check.state != CredentialCheck.VALID:
+                self.credential_check.mark_valid()
+        
+        except Exception as e:
+            raise self._api_error(e)
+        
+        return self._aiter_stream(stream, cache_fill, started_at)
+    
+    async def _create_completion_async(self, priority: str = PRIORITY_NORMAL, **kwargs):
+        """Await chat.completions.create, through the rate limiter and retry policy if there are any."""
+        request = self.client.chat.completions.create
+        if self.rate_limiter is not None:
+            request = functools.partial(
+                self._create_limited_async, self._request_tokens(kwargs['messages']), priority
+            )
+        
+        with metrics.span('openai_request'):
+            if self.retry_policy is None:
+                return await request(**kwargs)
+            return await self.retry_policy.call_async(request, **kwargs)
+    
+    async def _create_limited_async(self, tokens: int, priority: str, **kwargs):
+        """Wait on the event loop for rate limiter budget (by priority class with a scheduler), then create."""
+        with metrics.span('rate_limit_wait'):
+            if self.scheduler is not None:
+                await self.scheduler.acquire_async(tokens, priority)
+            else:
+                await self.rate_limiter.acquire_async(tokens)
+        try:
+            raw_response = await self.client.chat.completions.with_raw_response.create(**kwargs)
+        except openai.APIStatusError as e:
+            self.rate_limiter.update_from_headers(e.response.headers)
+            raise
+        
+        self.rate_limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse()
+    
+    async def _lookup_caches_async(self, messages: List[dict],
+                                   use_cache: bool) -> Tuple[Optional[str], Optional[dict]]:
+        """Look a request up in the caches, off the event loop if embeddings are needed."""
+        if self.semantic_cache is not None and use_cache:
+            return await asyncio.to_thread(self._lookup_caches, messages, use_cache)
+        return self._lookup_caches(messages, use_cache)
+    
+    async def _fill_caches_async(self, fill: Optional[dict], text: str, latency: float):
+        """Store a fresh answer in the caches, off the event loop if embeddings are needed."""
+        if fill is not None and 'question' in fill:
+            await asyncio.to_thread(self._fill_caches, fill, text, latency)
+        else:
+            self._fill_caches(fill, text, latency)
+    
+    async def _aiter_stream(self, stream, cache_fill: Optional[dict] = None,
+                            started_at: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield the text deltas of a streamed completion, mapping API errors."""
+        fragments = []
+        try:
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        fragments.append(delta)
+                        yield delta
+                else:
+                    metrics.record_usage(getattr(chunk, 'usage', None))
+        except openai.APIError as e:
+            metrics.record_error('openai', 'api_error')
+            raise RuntimeError(f"OpenAI API error: {e}")
+        except Exception as e:
+            metrics.record_error('openai', 'request_failed')
+            raise RuntimeError(f"Failed to get OpenAI response: {e}")
+        
+        if cache_fill is not None:
+            await self._fill_caches_async(cache_fill, "".join(fragments).strip(), time.monotonic() - started_at)
+
+
+async def _single_fragment(text: str) -> AsyncIterator[str]:
+    """Yield a cached response as one fragment."""
+    yield text
@@ -0,0 +1,369 @@
+import asyncio
+from typing import Iterable, List, Optional, Sequence, Tuple
+from slack_sdk.errors import SlackApiError
+from app.services.slack_service import (
+    DEFAULT_POST_CONCURRENCY, SlackService, _group_posts, _partial_post_error, _post_result
+)
+from app.utils import metrics
+from app.utils.credential_check import VALIDATION_BACKGROUND, VALIDATION_EAGER, VALIDATION_LAZY, VALIDATION_MODES
+from app.utils.http_pool import ConnectionSettings
+
+try:
+    import aiohttp
+    from slack_sdk.web.async_client import AsyncWebClient
+except ImportError:  # Optional - only needed for the async service
+    aiohttp = None
+    AsyncWebClient = None
+
+
+class AsyncSlackService(SlackService):
+    """Slack service for asyncio code, built on slack_sdk's AsyncWebClient.
+    
+    Argument checks, the thread cache and error mapping are the same as
+    SlackService. The constructor makes no API calls; await start() on the
+    event loop to open the shared HTTP session and run 'eager' or
+    'background' validation. Its send_queue, if any, is an
+    AsyncChannelSendQueue.
+    """
+    
+    def __init__(self, bot_token: str, validation: str = VALIDATION_EAGER, **kwargs):
+        """
+        Initialize the async Slack service.
+        
+        Args:
+            bot_token: Slack bot token (starts with xoxb-)
+            validation: When to call auth.test - 'eager' (in start(), default),
+                'lazy' (on first use) or 'background' (a task created by start())
+            **kwargs: Other SlackService arguments
+        
+        Raises:
+            ValueError: If bot token is empty or None, or validation mode is unknown
+            RuntimeError: If aiohttp is not installed
+        """
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Invalid validation mode: {validation}")
+        
+        self.connection_settings = kwargs.get('connection_settings')
+        super().__init__(bot_token, validation=VALIDATION_LAZY, **kwargs)
+        self.validation = validation
+    
+    def _create_client(self, bot_token: str, connection_settings: Optional[ConnectionSettings],
+                       base_url: Optional[str]):
+        """Create the async Slack Web API client."""
+        if AsyncWebClient is None:
+            raise RuntimeError("aiohttp is required for the async Slack service - pip install aiohttp")
+        
+        client_options = {}
+        if base_url is not None:
+            client_options['base_url'] = base_url
+        if connection_settings is not None:
+            client_options['timeout'] = int(connection_settings.read_timeout)
+        return AsyncWebClient(token=bot_token, **client_options)
+    
+    async def start(self):
+        """
+        Open the shared HTTP session and run the configured startup validation.
+        Call once from the event loop.
+        
+        Without a session AsyncWebClient opens a new one (and new connections)
+        for every call.
+        
+        Raises:
+            RuntimeError: If validation is 'eager' and the bot token is invalid
+        """
+        if aiohttp is not None and getattr(self.client, 'session', None) is None:
+            self.client.session = self._create_session()
+        
+        if self.validation == VALIDATION_EAGER:
+            try:
+                await self.ensure_validated()
+            except Exception as e:
+                raise RuntimeError(f"Failed to initialize Slack client: {e}")
+        elif self.validation == VALIDATION_BACKGROUND:
+            self.credential_check.start_task()
+    
+    async def close(self):
+        """Close the shared HTTP session."""
+        session = getattr(self.client, 'session', None)
+        if session is not None:
+            await session.close()
+    
+    def _create_session(self):
+        """Create an aiohttp session with the configured pool and timeouts."""
+        settings = self.connection_settings or ConnectionSettings()
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.pool_size, keepalive_timeout=settings.keepalive_expiry),
+            timeout=aiohttp.ClientTimeout(sock_connect=settings.connect_timeout, sock_read=settings.read_timeout)
+        )
+    
+    async def ensure_validated(self):
+        """
+        Call auth.test if it has not succeeded yet, so bot_user_id and team_id are set.
+        
+        Raises:
+            RuntimeError: If the bot token is invalid or the API test fails
+        """
+        if self.bot_user_id is None:
+            await self.credential_check.run_async()
+    
+    async def ping(self):
+        """
+        Check that Slack is reachable and accepts the bot token, with auth.test.
+        
+        Raises:
+            RuntimeError: If the API call fails or the token is invalid
+        """
+        await self._validate_bot_token()
+    
+    async def _validate_bot_token(self):
+        """Validate the bot token by calling auth.test API."""
+        try:
+            self._handle_auth_response(await self.client.auth_test())
+        
+        except SlackApiError as e:
+            self._raise_auth_error(e.response["error"])
+        except Exception as e:
+            raise RuntimeError(f"Failed to validate Slack bot token: {e}")
+    
+    async def post_message(self, channel: str, text: str, thread_ts: Optional[str] = None) -> bool:
+        """
+        Post a message to a Slack channel.
+        
+        Text longer than one message allows is split at paragraph or code
+        block boundaries and posted as consecutive messages.
+        
+        Args:
+            channel: Channel ID (e.g., 'C1234567890') or channel name (e.g., 'general')
+            text: Message text to post
+            thread_ts: Optional thread timestamp for thread replies
+        
+        Returns:
+            bool: True if message was posted successfully
+        
+        Raises:
+            ValueError: If channel or text is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        await self._send_posts(self._reply_messages(self._message_params(channel, text, thread_ts)))
+        return True
+    
+    async def post_messages(self, messages: Iterable[Sequence],
+                            max_concurrency: int = DEFAULT_POST_CONCURRENCY) -> List[dict]:
+        """
+        Post many messages, to several channels at once.
+        
+        Messages to one channel are posted one after another in the order
+        given; up to max_concurrency channels are posted to concurrently.
+        A message that fails does not stop the others.
+        
+        Args:
+            messages: (channel, text) or (channel, text, thread_ts) tuples
+            max_concurrency: Maximum number of channels posted to at once
+        
+        Returns:
+            list: Per message, in the order given, a dict with 'channel', 'ok',
+                the posted message's 'ts' and the 'error' if it failed
+        
+        Raises:
+            ValueError: If max_concurrency is less than 1
+        """
+        if max_concurrency < 1:
+            raise ValueError("Post concurrency must be at least 1")
+        
+        results, channels = _group_posts(messages, self._message_params)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def post_channel(posts: List[Tuple[int, dict]]):
+            async with semaphore:
+                for index, message_params in posts:
+                    try:
+                        response = (await self._send_posts(self._reply_messages(message_params)))[0]
+                    except Exception as e:
+                        results[index] = _post_result(message_params["channel"], error=e)
+                    else:
+                        results[index] = _post_result(message_params["channel"], ts=response.get("ts"))
+        
+        await asyncio.gather(*(post_channel(posts) for posts in channels.values()))
+        return results
+    
+    async def start_message(self, channel: str, text: str, thread_ts: Optional[str] = None) -> str:
+        """
+        Post a message that will be edited later with update_message.
+        
+        Args:
+            channel: Channel ID (e.g., 'C1234567890') or channel name (e.g., 'general')
+            text: Initial message text (e.g. a placeholder)
+            thread_ts: Optional thread timestamp for thread replies
+        
+        Returns:
+            str: Timestamp (ts) of the posted message
+        
+        Raises:
+            ValueError: If channel or text is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        response = await self._post_message(channel, text, thread_ts)
+        return response.get("ts")
+    
+    async def update_message(self, channel: str, ts: str, text: str, thread_ts: Optional[str] = None) -> bool:
+        """
+        Replace the text of a message the bot posted.
+        
+        Args:
+            channel: Channel ID the message was posted to
+            ts: Timestamp of the message to update
+            text: New message text
+            thread_ts: Thread the message is in, so its cached copy is updated too
+        
+        Returns:
+            bool: True if the message was updated successfully
+        
+        Raises:
+            ValueError: If channel, ts or text is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        self._check_update(channel, ts, text)
+        
+        try:
+            with metrics.span('slack_update'):
+                response = await self.client.chat_update(
+                    channel=channel.strip(),
+                    ts=ts,
+                    text=text.strip()
+                )
+            return self._handle_update_response(response, channel, ts, text, thread_ts)
+        
+        except SlackApiError as e:
+            self._raise_update_error(e.response.get("error", "unknown"), channel, ts)
+        
+        except Exception as e:
+            metrics.record_error('slack', 'request_failed')
+            raise RuntimeError(f"Failed to update Slack message: {e}")
+    
+    async def get_thread_history(self, channel: str, thread_ts: str, limit: int = 200) -> List[dict]:
+        """
+        Get the messages of a thread, oldest first, from the thread cache or conversations.replies.
+        
+        Args:
+            channel: Channel ID the thread is in
+            thread_ts: Timestamp of the thread's parent message
+            limit: Maximum number of messages to fetch
+        
+        Returns:
+            List of messages with 'ts', 'user', 'text' and 'is_bot'
+        
+        Raises:
+            ValueError: If channel or thread_ts is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        channel = self._check_thread(channel, thread_ts)
+        cached = self.thread_cache.get(channel, thread_ts)
+        if cached is not None:
+            return cached
+        
+        messages = []
+        cursor = None
+        
+        try:
+            while len(messages) < limit:
+                with metrics.span('slack_history'):
+                    response = await self.client.conversations_replies(
+                        **self._replies_params(channel, thread_ts, limit - len(messages), cursor)
+                    )
+                cursor = self._handle_replies_response(response, messages)
+                if cursor is None:
+                    break
+        
+        except SlackApiError as e:
+            self._raise_api_error(e.response.get("error", "unknown"), channel)
+        
+        except Exception as e:
+            metrics.record_error('slack', 'request_failed')
+            raise RuntimeError(f"Failed to fetch Slack thread history: {e}")
+        
+        messages = messages[:limit]
+        self.thread_cache.put(channel, thread_ts, messages)
+        return messages
+    
+    async def _post_message(self, channel: str, text: str, thread_ts: Optional[str] = None):
+        """
+        Call chat.postMessage and map its errors.
+        
+        Returns:
+            The Slack API response
+        """
+        return await self._send_post(self._message_params(channel, text, thread_ts))
+    
+    async def _send_posts(self, messages: List[dict]) -> list:
+        """
+        Post messages to one channel in order.
+        
+        With a send queue they are sent back to back, with no other reply to
+        the channel in between.
+        
+        Args:
+            messages: chat.postMessage parameters from _reply_messages
+        
+        Returns:
+            list: The Slack API responses
+        
+        Raises:
+            RuntimeError: On the first message that fails, saying how many
+                were posted before it; the ones after it are not posted
+        """
+        if len(messages) == 1:
+            return [await self._send_post(messages[0])]
+        
+        responses = []
+        try:
+            if self.send_queue is None:
+                for message_params in messages:
+                    responses.append(await self._send_post(message_params))
+                return responses
+            
+            async def post(**message_params):
+                response = await self.client.chat_postMessage(**message_params)
+                responses.append(self._handle_post_response(response, message_params))
+                return response
+            
+            with metrics.span('slack_post'):
+                await self.send_queue.call_all(messages[0]["channel"], post, messages)
+            return responses
+        
+        except RuntimeError as e:
+            raise _partial_post_error(e, len(responses), len(messages)) from e
+        
+        except SlackApiError as e:
+            try:
+                self._raise_api_error(e.response.get("error", "unknown"), messages[0]["channel"])
+            except RuntimeError as error:
+                raise _partial_post_error(error, len(responses), len(messages)) from e
+        
+        except Exception as e:
+            metrics.record_error('slack', 'request_failed')
+            raise _partial_post_error(f"Failed to post message to Slack: {e}", len(responses), len(messages))
+    
+    async def _send_post(self, message_params: dict):
+        """
+        Call chat.postMessage with parameters from _message_params and map its errors.
+        
+        Returns:
+            The Slack API response
+        """
+        try:
+            # In turn with the channel's other replies when there is a send queue
+            with metrics.span('slack_post'):
+                if self.send_queue is None:
+                    response = await self.client.chat_postMessage(**message_params)
+                else:
+                    response = await self.send_queue.call(
+                        message_params["channel"], self.client.chat_postMessage, **message_params
+                    )
+            return self._handle_post_response(response, message_params)
+        
+        except SlackApiError as e:
+            self._raise_api_error(e.response.get("error", "unknown"), message_params["channel"])
+        
+        except Exception as e:
+            metrics.record_error('slack', 'request_failed')
+            raise RuntimeError(f"Failed to post message to Slack: {e}")
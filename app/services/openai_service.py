@@ -1,38 +1,497 @@
-from typing import Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
+import functools
+import json
+import logging
+import threading
+import time
 import openai
 from openai import OpenAI
+from openai.types.chat import ChatCompletion
 import re
 
+try:
+    import tiktoken
+except ImportError:  # Optional - token counts are estimated without it
+    tiktoken = None
+
+try:
+    import httpx2 as httpx  # HTTP library of newer openai releases
+except ImportError:
+    import httpx
+from app.utils.credential_check import (
+    CredentialCheck, VALIDATION_BACKGROUND, VALIDATION_EAGER, VALIDATION_MODES
+)
+from app.utils import metrics
+from app.utils.http_pool import ConnectionSettings
+from app.utils.priority_scheduler import PRIORITY_NORMAL, PriorityScheduler
+from app.utils.rate_limiter import RateLimiter
+from app.utils.response_cache import ResponseCache
+from app.utils.retry import RetryPolicy
+from app.utils.semantic_cache import SemanticCache
+from app.utils.single_flight import SingleFlight
+
+
+logger = logging.getLogger(__name__)
+
+# Roles accepted in a conversation passed to the completion methods
+MESSAGE_ROLES = ('system', 'user', 'assistant')
+
+# Sampling parameters sent with every completion (also part of the response cache key)
+COMPLETION_PARAMS = {
+    'max_tokens': 1000,  # Reasonable limit for responses
+    'temperature': 0.7   # Balanced creativity
+}
+
+# Streamed completions end with a chunk reporting the tokens used
+STREAM_OPTIONS = {'include_usage': True}
+
+# Batch API: the endpoint each request in a batch calls, and the window its
+# results are due in (the only one offered, at half the synchronous price)
+BATCH_ENDPOINT = '/v1/chat/completions'
+BATCH_COMPLETION_WINDOW = '24h'
+
+# Batch statuses that will not change any more
+BATCH_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+# Seconds between batch status checks while waiting for one to finish
+DEFAULT_BATCH_POLL_INTERVAL = 30.0
+
+# Tokens the chat format adds per message (role and separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Word, number, punctuation and whitespace runs, roughly how BPE tokenizers pre-split text
+_TOKEN_ESTIMATE_PATTERN = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?(?:[^\s\w]|_)+|\s+")
+
+# A Slack entity (user/channel mention or link) or a stray '<'. Links keep
+# their text (or URL); mentions are dropped.
+_SLACK_ENTITY_PATTERN = re.compile(
+    r'<(?:(?:@U[A-Z0-9]+(?:\|[^>]+)?'
+    r'|#C[A-Z0-9]+(?:\|[^>]+)?'
+    r'|https?://[^|>]+\|(?P<label>[^>]+)'
+    r'|(?P<url>https?://[^>]+))>)?'
+)
+
+_FORMATTING_MARK_PATTERN = re.compile(r'([*_`~])')
+
+# Bold, italic, code, strikethrough - the order the marks are paired in
+_MARK_ORDER = ('*', '_', '`', '~')
+
+_SEQUENTIAL_PATTERNS = (
+    # Remove user mentions like <@U123456> or <@U123456|username>
+    (re.compile(r'<@U[A-Z0-9]+(?:\|[^>]+)?>'), ''),
+    # Remove channel mentions like <#C123456> or <#C123456|channel-name>
+    (re.compile(r'<#C[A-Z0-9]+(?:\|[^>]+)?>'), ''),
+    # Remove link formatting like <https://example.com|Link Text> -> Link Text
+    # or <https://example.com> -> https://example.com
+    (re.compile(r'<(https?://[^|>]+)\|([^>]+)>'), r'\2'),
+    (re.compile(r'<(https?://[^>]+)>'), r'\1'),
+    # Remove bold, italic, code and strikethrough formatting characters
+    (re.compile(r'\*([^*]+)\*'), r'\1'),
+    (re.compile(r'_([^_]+)_'), r'\1'),
+    (re.compile(r'`([^`]+)`'), r'\1'),
+    (re.compile(r'~([^~]+)~'), r'\1'),
+    # Clean up multiple spaces
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def _replace_slack_entities(message: str) -> Optional[str]:
+    """
+    Replace Slack mentions and links in a single scan.
+    
+    Args:
+        message: Raw message from Slack
+        
+    Returns:
+        Message with entities replaced, or None if nested or unterminated
+        angle brackets mean one scan could differ from rule-by-rule passes
+    """
+    pieces = []
+    position = 0
+    stray_bracket = -1
+    
+    for match in _SLACK_ENTITY_PATTERN.finditer(message):
+        start, end = match.span()
+        if end - start == 1:
+            stray_bracket = start
+            continue
+        
+        if message.find('<', start + 1, end) >= 0:
+            return None
+        if stray_bracket >= 0:
+            if message.find('>', stray_bracket, start) < 0:
+                return None
+            stray_bracket = -1
+        
+        pieces.append(message[position:start])
+        pieces.append(match.group('label') or match.group('url') or '')
+        position = end
+    
+    pieces.append(message[position:])
+    return ''.join(pieces)
+
+
+def _strip_formatting_marks(parts: list) -> list:
+    """
+    Remove paired formatting marks from a message split on those marks.
+    
+    Each kind of mark is paired in turn like the original substitution
+    passes: consecutive marks of one kind form a pair when text survives
+    between them, and both are removed.
+    
+    Args:
+        parts: Message split by _FORMATTING_MARK_PATTERN (marks at odd indices)
+        
+    Returns:
+        The same list with paired marks replaced by empty strings
+    """
+    positions = {mark: [] for mark in _MARK_ORDER}
+    for index in range(1, len(parts), 2):
+        positions[parts[index]].append(index)
+    
+    for mark in _MARK_ORDER:
+        indices = positions[mark]
+        i = 0
+        while i + 1 < len(indices):
+            left, right = indices[i], indices[i + 1]
+            if any(parts[left + 1:right]):
+                parts[left] = parts[right] = ''
+                i += 2
+            else:
+                i += 1
+    
+    return parts
+
+
+def _format_slack_message_sequential(message: str) -> str:
+    """
+    Format a Slack message with one substitution pass per formatting rule.
+    
+    Reference implementation for OpenAIService.format_slack_message, used
+    for messages with nested or unterminated angle brackets.
+    
+    Args:
+        message: Raw message from Slack
+        
+    Returns:
+        Cleaned message with Slack formatting removed
+    """
+    for pattern, replacement in _SEQUENTIAL_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return message.strip()
+
+
+def _estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a tokenizer.
+    
+    Each pre-split piece is counted as one token per 6 characters, which
+    slightly over-counts compared with GPT tokenizers.
+    
+    Args:
+        text: Text to count
+    
+    Returns:
+        int: Estimated number of tokens
+    """
+    return sum((len(piece) + 5) // 6 for piece in _TOKEN_ESTIMATE_PATTERN.findall(text))
+
+
+def _load_encoder(model: str) -> Optional[Callable[[str], list]]:
+    """Get the tiktoken encode function for a model, or None if it is unavailable."""
+    if tiktoken is None:
+        return None
+    
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return encoding.encode
+    except Exception as e:
+        # Encodings are downloaded on first use and may be unreachable
+        logger.warning("tiktoken encoding unavailable, estimating token counts: %s", e)
+        return None
+
+
+class TokenCounter:
+    """Count message tokens, caching the count of each message text.
+    
+    Thread history is re-sent on every turn, so most texts have been counted
+    before; the cache turns those into a dictionary lookup.
+    """
+    
+    def __init__(self, model: str = "gpt-4", max_entries: int = 4096,
+                 encode: Optional[Callable[[str], list]] = None):
+        """
+        Initialize the token counter.
+        
+        Args:
+            model: Model whose tokenizer is used (when tiktoken is installed)
+            max_entries: Maximum number of cached counts (0 disables caching)
+            encode: Tokenizer function (default: tiktoken for the model, else an estimate)
+        """
+        self.max_entries = max_entries
+        if encode is None:
+            encode = _load_encoder(model)
+        self._count = (lambda text: len(encode(text))) if encode is not None else _estimate_tokens
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+        
+        Args:
+            text: Text to count
+        
+        Returns:
+            int: Number of tokens
+        """
+        with self._lock:
+            tokens = self._cache.get(text)
+            if tokens is not None:
+                self._hits += 1
+                self._cache.move_to_end(text)
+                return tokens
+            self._misses += 1
+        
+        tokens = self._count(text)
+        
+        if self.max_entries > 0:
+            with self._lock:
+                self._cache[text] = tokens
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        
+        return tokens
+    
+    def count_message(self, message: dict) -> int:
+        """
+        Count the tokens a chat message uses, including the per-message overhead.
+        
+        Args:
+            message: Chat message with 'role' and 'content'
+        
+        Returns:
+            int: Number of tokens
+        """
+        return self.count(message.get("content") or "") + MESSAGE_TOKEN_OVERHEAD
+    
+    def stats(self) -> dict:
+        """
+        Get cache metrics.
+        
+        Returns:
+            dict: Cache hits, misses and cached entries
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'entries': len(self._cache)}
+
+
+class ContextPacker:
+    """Fit a conversation into an input token budget.
+    
+    The latest message is always kept. The first message (the question that
+    started the thread) is kept if it fits, then the most recent turns are
+    added until the budget is used; the turns in between are replaced by a
+    short note saying how many were left out.
+    """
+    
+    def __init__(self, counter: TokenCounter, max_input_tokens: int = 6000):
+        """
+        Initialize the context packer.
+        
+        Args:
+            counter: Token counter used to size messages
+            max_input_tokens: Token budget for the packed messages
+        
+        Raises:
+            ValueError: If max_input_tokens is less than 1
+        """
+        if max_input_tokens < 1:
+            raise ValueError("Input token budget must be at least 1")
+        
+        self.counter = counter
+        self.max_input_tokens = max_input_tokens
+    
+    def pack(self, messages: List[dict]) -> List[dict]:
+        """
+        Select the messages to send.
+        
+        Args:
+            messages: Conversation, oldest first
+        
+        Returns:
+            The kept messages in their original order, with a system note
+            in place of any dropped turns
+        """
+        if not messages:
+            return []
+        
+        sizes = [self.counter.count_message(message) for message in messages]
+        if sum(sizes) <= self.max_input_tokens:
+            return list(messages)
+        
+        last = len(messages) - 1
+        budget = self.max_input_tokens - sizes[last]
+        if budget < 0:
+            logger.warning("Latest message alone uses %d tokens (budget %d)", sizes[last], self.max_input_tokens)
+        
+        # Room for the omission note, which is sized once we know the count
+        budget -= self.counter.count_message(self._omitted_note(len(messages)))
+        
+        keep_first = last > 0 and sizes[0] <= budget
+        if keep_first:
+            budget -= sizes[0]
+        
+        start = last
+        while start - 1 > (0 if keep_first else -1) and sizes[start - 1] <= budget:
+            start -= 1
+            budget -= sizes[start]
+        
+        head = [messages[0]] if keep_first else []
+        omitted = start - len(head)
+        note = [self._omitted_note(omitted)] if omitted else []
+        return head + note + messages[start:]
+    
+    @staticmethod
+    def _omitted_note(count: int) -> dict:
+        """Build the system message that stands in for dropped turns."""
+        noun = "message" if count == 1 else "messages"
+        return {"role": "system", "content": f"{count} earlier {noun} in this conversation were omitted."}
+
+
+def build_http_client(settings: ConnectionSettings, asynchronous: bool = False):
+    """
+    Build the HTTP client for the OpenAI SDK with pooled keep-alive connections.
+    
+    Args:
+        settings: Connection pool size, timeouts and keep-alive
+        asynchronous: Build a client for AsyncOpenAI instead of OpenAI
+    
+    Returns:
+        openai.DefaultHttpxClient (or DefaultAsyncHttpxClient): Client to pass
+            as OpenAI(http_client=...)
+    """
+    client_class = openai.DefaultAsyncHttpxClient if asynchronous else openai.DefaultHttpxClient
+    return client_class(
+        limits=httpx.Limits(
+            max_connections=settings.pool_size,
+            max_keepalive_connections=settings.pool_size,
+            keepalive_expiry=settings.keepalive_expiry
+        ),
+        timeout=openai.Timeout(settings.read_timeout, connect=settings.connect_timeout)
+    )
+
 
 class OpenAIService:
     """Service for interacting with OpenAI Chat Completions API."""
     
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    def __init__(self, api_key: str, model: str = "gpt-4", validation: str = VALIDATION_EAGER,
+                 max_input_tokens: int = 6000, response_cache: Optional[ResponseCache] = None,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 connection_settings: Optional[ConnectionSettings] = None, base_url: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 single_flight: Optional[SingleFlight] = None, scheduler: Optional[PriorityScheduler] = None):
         """
         Initialize OpenAI service.
         
         Args:
             api_key: OpenAI API key
             model: OpenAI model to use (default: gpt-4)
+            validation: When to check the API key - 'eager' (in the constructor,
+                default), 'lazy' (the first chat completion validates it) or
+                'background' (on a background thread)
+            max_input_tokens: Token budget for a conversation sent to the model
+            response_cache: Optional cache reused for identical prompts
+            semantic_cache: Optional cache reused for reworded standalone questions
+            connection_settings: Connection pool size, timeouts and keep-alive
+                (default: the OpenAI client's defaults)
+            base_url: API base URL (default: the OpenAI client's default)
+            retry_policy: Retries for rate limited and failed completions (default:
+                the OpenAI client's built-in retries)
+            rate_limiter: Client-side requests/tokens per minute limiter that
+                completions wait on (default: none)
+            single_flight: Shares one completion between concurrent identical
+                requests (default: every request is sent)
+            scheduler: Shares the rate limiter's budget between priority
+                classes (default: requests wait in arrival order); wraps
+                rate_limiter
         
         Raises:
-            ValueError: If API key is empty or None
+            ValueError: If API key is empty or None, validation mode is unknown,
+                or max_input_tokens is less than 1
         """
         if not api_key:
             raise ValueError("OpenAI API key cannot be empty or None")
         
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Invalid validation mode: {validation}")
+        
         self.model = model
+        self.validation = validation
+        self.token_counter = TokenCounter(model)
+        self.context_packer = ContextPacker(self.token_counter, max_input_tokens)
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.single_flight = single_flight
+        self.scheduler = scheduler
+        self.credential_check = CredentialCheck(self._validate_api_key, name="openai")
         
         try:
             # Initialize OpenAI client with API key
-            self.client = OpenAI(api_key=api_key)
+            self.client = self._create_client(api_key, connection_settings, base_url)
             
             # Test the API key by making a simple request
             # This will raise an exception if the API key is invalid
-            self._validate_api_key()
+            if validation == VALIDATION_EAGER:
+                self.credential_check.run()
             
         except Exception as e:
             raise ValueError(f"Failed to initialize OpenAI client: {e}")
+        
+        if validation == VALIDATION_BACKGROUND:
+            self.credential_check.start_background()
+    
+    def _create_client(self, api_key: str, connection_settings: Optional[ConnectionSettings],
+                       base_url: Optional[str]):
+        """Create the OpenAI API client."""
+        client_options = {}
+        if connection_settings is not None:
+            client_options['http_client'] = build_http_client(connection_settings)
+        if base_url is not None:
+            client_options['base_url'] = base_url
+        if self.retry_policy is not None:
+            # The retry policy replaces the client's own retries
+            client_options['max_retries'] = 0
+        return OpenAI(api_key=api_key, **client_options)
+    
+    def validation_status(self) -> dict:
+        """
+        Get the cached result of API key validation.
+        
+        Returns:
+            dict: State ('pending', 'valid' or 'invalid'), error and check time
+        """
+        return self.credential_check.status()
+    
+    def ping(self):
+        """
+        Check that the API is reachable and accepts the key, with a models call that uses no tokens.
+        
+        Raises:
+            RuntimeError: If the request fails
+        """
+        try:
+            self.client.models.retrieve(self.model)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API check failed: {e}")
     
     def _validate_api_key(self):
         """Validate the API key by making a test request."""
@@ -68,41 +527,95 @@ class OpenAIService:
         if not message:
             return ""
         
-        # Remove user mentions like <@U123456> or <@U123456|username>
-        message = re.sub(r'<@U[A-Z0-9]+(?:\|[^>]+)?>', '', message)
-        
-        # Remove channel mentions like <#C123456> or <#C123456|channel-name>
-        message = re.sub(r'<#C[A-Z0-9]+(?:\|[^>]+)?>', '', message)
+        # Replace user/channel mentions and links in one scan
+        if '<' in message:
+            replaced = _replace_slack_entities(message)
+            if replaced is None:
+                return _format_slack_message_sequential(message)
+            message = replaced
         
-        # Remove link formatting like <https://example.com|Link Text> -> Link Text
-        # or <https://example.com> -> https://example.com
-        message = re.sub(r'<(https?://[^|>]+)\|([^>]+)>', r'\2', message)  # Link with text
-        message = re.sub(r'<(https?://[^>]+)>', r'\1', message)  # Link without text
+        # Remove bold, italic, code and strikethrough marks in one split
+        parts = _FORMATTING_MARK_PATTERN.split(message)
+        if len(parts) > 1:
+            message = ''.join(_strip_formatting_marks(parts))
         
-        # Remove special formatting characters
-        # Bold: *text* -> text
-        message = re.sub(r'\*([^*]+)\*', r'\1', message)
+        # Clean up multiple spaces and strip
+        return ' '.join(message.split())
+    
+    def _prepare_message(self, message: str) -> str:
+        """
+        Validate and format a user message for the Chat Completions API.
         
-        # Italic: _text_ -> text  
-        message = re.sub(r'_([^_]+)_', r'\1', message)
+        Args:
+            message: User message text
+            
+        Returns:
+            Formatted message text
+            
+        Raises:
+            ValueError: If message is empty or None, or empty after formatting
+        """
+        if not message or not message.strip():
+            raise ValueError("Message cannot be empty or None")
         
-        # Code: `text` -> text
-        message = re.sub(r'`([^`]+)`', r'\1', message)
+        # Format the message to remove Slack-specific formatting
+        formatted_message = self.format_slack_message(message)
         
-        # Strikethrough: ~text~ -> text
-        message = re.sub(r'~([^~]+)~', r'\1', message)
+        # Check again after formatting
+        if not formatted_message.strip():
+            raise ValueError("Message cannot be empty after formatting")
         
-        # Clean up multiple spaces and strip
-        message = re.sub(r'\s+', ' ', message).strip()
+        return formatted_message.strip()
+    
+    def _prepare_messages(self, message: Union[str, List[dict]]) -> List[dict]:
+        """
+        Build the Chat Completions message list for a message or a conversation.
         
-        return message
+        Args:
+            message: User message text, or a conversation as a list of
+                {'role': ..., 'content': ...} dicts, oldest first
+            
+        Returns:
+            List of formatted messages; conversation entries that are empty
+            after formatting are dropped and older turns that do not fit the
+            input token budget are left out
+            
+        Raises:
+            ValueError: If the message or conversation is empty, a role is
+                unknown, or nothing is left after formatting
+        """
+        with metrics.span('format_message'):
+            if isinstance(message, str) or message is None:
+                return [{"role": "user", "content": self._prepare_message(message)}]
+            
+            if not message:
+                raise ValueError("Messages cannot be empty")
+            
+            messages = []
+            for entry in message:
+                role = entry.get("role")
+                if role not in MESSAGE_ROLES:
+                    raise ValueError(f"Invalid message role: {role}")
+                
+                content = self.format_slack_message(entry.get("content") or "").strip()
+                if content:
+                    messages.append({"role": role, "content": content})
+            
+            if not messages:
+                raise ValueError("Message cannot be empty after formatting")
+            
+            return self.context_packer.pack(messages)
     
-    def get_chat_completion(self, message: str) -> str:
+    def get_chat_completion(self, message: Union[str, List[dict]], use_cache: bool = True,
+                            priority: str = PRIORITY_NORMAL) -> str:
         """
         Get chat completion response from OpenAI.
         
         Args:
-            message: User message text to send to OpenAI
+            message: User message text to send to OpenAI, or a conversation
+                as a list of {'role': ..., 'content': ...} dicts
+            use_cache: Whether the response caches (if configured) may be used
+            priority: Priority class the request waits for rate limit budget in
             
         Returns:
             Response text from OpenAI
@@ -111,38 +624,432 @@ class OpenAIService:
             ValueError: If message is empty or None
             RuntimeError: If OpenAI API call fails
         """
-        if not message or not message.strip():
-            raise ValueError("Message cannot be empty or None")
+        messages = self._prepare_messages(message)
         
-        # Format the message to remove Slack-specific formatting
-        formatted_message = self.format_slack_message(message)
+        cached, cache_fill = self._lookup_caches(messages, use_cache)
+        if cached is not None:
+            return cached
         
-        # Check again after formatting
-        if not formatted_message.strip():
-            raise ValueError("Message cannot be empty after formatting")
+        # Identical requests already in flight share their answer, cached or
+        # not; whether it is cached is up to the request that made the call.
+        # Only requests of one priority class share, so a mention never waits
+        # for budget behind a bulk request's place in the queue
+        if self.single_flight is not None:
+            key = (priority, ResponseCache.make_key(messages, self.model, **COMPLETION_PARAMS))
+            text, _ = self.single_flight.do(key, self._complete, messages, cache_fill, priority)
+            return text
         
+        return self._complete(messages, cache_fill, priority)
+    
+    def _complete(self, messages: List[dict], cache_fill: Optional[dict] = None,
+                  priority: str = PRIORITY_NORMAL) -> str:
+        """
+        Request a completion and cache its text.
+        
+        Args:
+            messages: Prepared chat messages
+            cache_fill: Second value returned by _lookup_caches
+            priority: Priority class of the request
+        
+        Returns:
+            Response text from OpenAI
+        
+        Raises:
+            RuntimeError: If OpenAI API call fails
+        """
         try:
             # Call OpenAI Chat Completions API
-            response = self.client.chat.completions.create(
+            started_at = time.monotonic()
+            response = self._create_completion(
+                priority,
                 model=self.model,
-                messages=[
-                    {"role": "user", "content": formatted_message.strip()}
-                ],
-                max_tokens=1000,  # Reasonable limit for responses
-                temperature=0.7   # Balanced creativity
+                messages=messages,
+                **COMPLETION_PARAMS
             )
             
-            # Extract response text from API response
-            if response.choices and len(response.choices) > 0:
-                return response.choices[0].message.content.strip()
-            else:
-                raise RuntimeError("OpenAI API returned empty response")
+            # A successful call proves the API key when validation was deferred
+            if self.credential_check.state != CredentialCheck.VALID:
+                self.credential_check.mark_valid()
+            
+            metrics.record_usage(getattr(response, 'usage', None))
+            text = self._completion_text(response)
+            self._fill_caches(cache_fill, text, time.monotonic() - started_at)
+            return text
                 
-        except openai.AuthenticationError:
-            raise RuntimeError("OpenAI API authentication failed")
-        except openai.RateLimitError:
-            raise RuntimeError("OpenAI API rate limit exceeded - please try again later")
+        except Exception as e:
+            raise self._api_error(e)
+    
+    def stream_chat_completion(self, message: Union[str, List[dict]], use_cache: bool = True,
+                               priority: str = PRIORITY_NORMAL) -> Iterator[str]:
+        """
+        Stream a chat completion response from OpenAI.
+        
+        The request is sent before this returns, so authentication and rate
+        limit errors are raised here rather than on first iteration. A cached
+        response is returned as a single fragment.
+        
+        Args:
+            message: User message text to send to OpenAI, or a conversation
+                as a list of {'role': ..., 'content': ...} dicts
+            use_cache: Whether the response caches (if configured) may be used
+            priority: Priority class the request waits for rate limit budget in
+            
+        Returns:
+            Iterator over response text fragments as they are generated
+            
+        Raises:
+            ValueError: If message is empty or None
+            RuntimeError: If OpenAI API call fails (also raised mid-stream)
+        """
+        messages = self._prepare_messages(message)
+        
+        cached, cache_fill = self._lookup_caches(messages, use_cache)
+        if cached is not None:
+            return iter([cached])
+        
+        try:
+            # Call OpenAI Chat Completions API with streaming enabled
+            started_at = time.monotonic()
+            stream = self._create_completion(
+                priority,
+                model=self.model,
+                messages=messages,
+                stream=True,
+                stream_options=STREAM_OPTIONS,
+                **COMPLETION_PARAMS
+            )
+            
+            if self.credential_check.state != CredentialCheck.VALID:
+                self.credential_check.mark_valid()
+                
+        except Exception as e:
+            raise self._api_error(e)
+        
+        return self._iter_stream(stream, cache_fill, started_at)
+    
+    def submit_batch(self, requests: Iterable[Tuple[str, Union[str, List[dict]]]],
+                     metadata: Optional[dict] = None) -> str:
+        """
+        Submit chat completions to the Batch API, for work that can wait.
+        
+        The requests are written to a JSONL file, one completion per line,
+        which is uploaded and started as a batch. Batches are answered within
+        24 hours at half the price and count against separate rate limits, so
+        they do not hold up interactive completions. Responses are not cached.
+        
+        Args:
+            requests: (custom_id, message) pairs; the message is a message text
+                or a conversation as for get_chat_completion, and the custom_id
+                identifies its result
+            metadata: Optional labels stored with the batch
+        
+        Returns:
+            str: The batch ID
+        
+        Raises:
+            ValueError: If there are no requests, a custom_id is repeated or a
+                message is empty
+            RuntimeError: If uploading the file or creating the batch fails
+        """
+        lines = []
+        custom_ids = set()
+        for custom_id, message in requests:
+            if custom_id in custom_ids:
+                raise ValueError(f"Duplicate batch request ID: {custom_id}")
+            custom_ids.add(custom_id)
+            
+            body = dict(model=self.model, messages=self._prepare_messages(message), **COMPLETION_PARAMS)
+            lines.append(json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': body}))
+        
+        if not lines:
+            raise ValueError("Batch must have at least one request")
+        
+        batch_options = {} if metadata is None else {'metadata': metadata}
+        try:
+            input_file = self._call_api(self.client.files.create, purpose='batch',
+                                        file=('batch.jsonl', "\n".join(lines).encode(), 'application/jsonl'))
+            batch = self._call_api(self.client.batches.create, input_file_id=input_file.id,
+                                   endpoint=BATCH_ENDPOINT, completion_window=BATCH_COMPLETION_WINDOW,
+                                   **batch_options)
+        except Exception as e:
+            raise self._api_error(e)
+        
+        logger.info("Submitted OpenAI batch %s with %d requests", batch.id, len(lines))
+        return batch.id
+    
+    def get_batch(self, batch_id: str):
+        """
+        Look up a batch.
+        
+        Args:
+            batch_id: ID returned by submit_batch
+        
+        Returns:
+            The Batch, with its status, request counts and result file IDs
+        
+        Raises:
+            RuntimeError: If the request fails
+        """
+        try:
+            return self._call_api(self.client.batches.retrieve, batch_id)
+        except Exception as e:
+            raise self._api_error(e)
+    
+    def wait_for_batch(self, batch_id: str, poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+                       timeout: Optional[float] = None):
+        """
+        Poll a batch until it has finished, failed, expired or been cancelled.
+        
+        Args:
+            batch_id: ID returned by submit_batch
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait at most (default: until the batch ends,
+                which the API guarantees within its completion window)
+        
+        Returns:
+            The finished Batch
+        
+        Raises:
+            TimeoutError: If the batch is still running after timeout seconds
+            RuntimeError: If a status check fails
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            batch = self.get_batch(batch_id)
+            if batch.status in BATCH_FINAL_STATUSES:
+                return batch
+            if deadline is not None and time.monotonic() + poll_interval > deadline:
+                raise TimeoutError(f"OpenAI batch {batch_id} still {batch.status} after {timeout} seconds")
+            time.sleep(poll_interval)
+    
+    def get_batch_results(self, batch) -> Dict[str, dict]:
+        """
+        Download the answers of a finished batch.
+        
+        Args:
+            batch: A Batch returned by wait_for_batch (or get_batch once final)
+        
+        Returns:
+            dict: Per custom_id, a dict with the answer 'text' or the 'error'
+                it failed with. Requests the batch did not get to (e.g. as it
+                expired first) are left out.
+        
+        Raises:
+            RuntimeError: If the batch has not finished or a download fails
+        """
+        if batch.status not in BATCH_FINAL_STATUSES:
+            raise RuntimeError(f"OpenAI batch {batch.id} has not finished: {batch.status}")
+        
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            try:
+                content = self._call_api(self.client.files.content, file_id).text
+            except Exception as e:
+                raise self._api_error(e)
+            
+            for line in content.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    results[entry['custom_id']] = self._batch_result(entry)
+        return results
+    
+    def _batch_result(self, entry: dict) -> dict:
+        """Turn one line of a batch output or error file into a result, counting its tokens."""
+        response = entry.get('response') or {}
+        body = response.get('body') or {}
+        
+        if entry.get('error'):
+            error = entry['error'].get('message') or entry['error'].get('code')
+        elif response.get('status_code') != 200:
+            error = (body.get('error') or {}).get('message') or f"HTTP {response.get('status_code')}"
+        else:
+            completion = ChatCompletion.model_validate(body)
+            metrics.record_usage(completion.usage)
+            try:
+                return {'text': self._completion_text(completion), 'error': None}
+            except RuntimeError as e:
+                error = str(e)
+        
+        metrics.record_error('openai', 'batch_request_failed')
+        return {'text': None, 'error': f"OpenAI API error: {error}"}
+    
+    def _call_api(self, request: Callable, *args, **kwargs):
+        """Make an API request, through the retry policy if there is one."""
+        if self.retry_policy is None:
+            return request(*args, **kwargs)
+        return self.retry_policy.call(request, *args, **kwargs)
+    
+    def _create_completion(self, priority: str = PRIORITY_NORMAL, **kwargs):
+        """Call chat.completions.create, through the rate limiter and retry policy if there are any."""
+        request = self.client.chat.completions.create
+        if self.rate_limiter is not None:
+            request = functools.partial(self._create_limited, self._request_tokens(kwargs['messages']), priority)
+        
+        with metrics.span('openai_request'):
+            if self.retry_policy is None:
+                return request(**kwargs)
+            return self.retry_policy.call(request, **kwargs)
+    
+    def _create_limited(self, tokens: int, priority: str, **kwargs):
+        """
+        Wait for rate limiter budget, then call chat.completions.create.
+        
+        Each attempt waits, as retries count against the limits too. With a
+        scheduler, more urgent classes get the budget first. The limiter
+        learns the limits from the headers of every response, including
+        errors.
+        
+        Args:
+            tokens: Estimated tokens of the request
+            priority: Priority class of the request
+            **kwargs: chat.completions.create arguments
+        
+        Returns:
+            The parsed completion (or stream)
+        """
+        with metrics.span('rate_limit_wait'):
+            if self.scheduler is not None:
+                self.scheduler.acquire(tokens, priority)
+            else:
+                self.rate_limiter.acquire(tokens)
+        try:
+            raw_response = self.client.chat.completions.with_raw_response.create(**kwargs)
+        except openai.APIStatusError as e:
+            self.rate_limiter.update_from_headers(e.response.headers)
+            raise
+        
+        self.rate_limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse()
+    
+    def _request_tokens(self, messages: List[dict]) -> int:
+        """
+        Estimate the tokens a request counts against the tokens per minute limit.
+        
+        OpenAI counts the prompt plus max_tokens when the request is made.
+        """
+        prompt_tokens = sum(self.token_counter.count_message(message) for message in messages)
+        return prompt_tokens + COMPLETION_PARAMS['max_tokens']
+    
+    @staticmethod
+    def _completion_text(response) -> str:
+        """
+        Extract the response text from a chat completion.
+        
+        Raises:
+            RuntimeError: If the completion has no choices
+        """
+        if response.choices and len(response.choices) > 0:
+            return response.choices[0].message.content.strip()
+        raise RuntimeError("OpenAI API returned empty response")
+    
+    def _api_error(self, error: Exception) -> RuntimeError:
+        """
+        Map an exception from a completion request to the error raised to callers.
+        
+        Args:
+            error: Exception raised while calling the API
+        
+        Returns:
+            RuntimeError describing the failure (an authentication failure also
+            marks the API key invalid)
+        """
+        if isinstance(error, openai.AuthenticationError):
+            metrics.record_error('openai', 'authentication')
+            self.credential_check.mark_invalid("Invalid OpenAI API key")
+            return RuntimeError("OpenAI API authentication failed")
+        if isinstance(error, openai.RateLimitError):
+            metrics.record_error('openai', 'rate_limit')
+            return RuntimeError("OpenAI API rate limit exceeded - please try again later")
+        if isinstance(error, openai.APIError):
+            metrics.record_error('openai', 'api_error')
+            return RuntimeError(f"OpenAI API error: {error}")
+        metrics.record_error('openai', 'request_failed')
+        return RuntimeError(f"Failed to get OpenAI response: {error}")
+    
+    def _lookup_caches(self, messages: List[dict], use_cache: bool) -> Tuple[Optional[str], Optional[dict]]:
+        """
+        Look a request up in the exact and semantic response caches.
+        
+        Args:
+            messages: Prepared chat messages
+            use_cache: Whether caches may be used for this request
+        
+        Returns:
+            (cached answer or None, what to pass to _fill_caches once the answer is known)
+        """
+        if not use_cache:
+            return None, None
+        
+        fill = {}
+        
+        if self.response_cache is not None:
+            fill['key'] = self.response_cache.make_key(messages, self.model, **COMPLETION_PARAMS)
+            cached = self.response_cache.get(fill['key'])
+            if cached is not None:
+                return cached, None
+        
+        # Rewording only means the same thing for a standalone question
+        if self.semantic_cache is not None and len(messages) == 1:
+            question = messages[0]['content']
+            try:
+                cached, fill['vector'] = self.semantic_cache.lookup(question)
+            except Exception as e:
+                logger.warning("Semantic cache lookup failed: %s", e)
+                return None, fill or None
+            
+            if cached is not None:
+                return cached, None
+            fill['question'] = question
+        
+        return None, fill or None
+    
+    def _fill_caches(self, fill: Optional[dict], text: str, latency: float):
+        """
+        Store a fresh answer in the caches it was looked up in.
+        
+        Args:
+            fill: Second value returned by _lookup_caches
+            text: Answer text
+            latency: Seconds the API call took
+        """
+        if fill is None or not text:
+            return
+        
+        if 'key' in fill:
+            self.response_cache.put(fill['key'], text, latency=latency)
+        
+        if 'question' in fill:
+            try:
+                self.semantic_cache.store(fill['question'], text, vector=fill.get('vector'))
+            except Exception as e:
+                logger.warning("Semantic cache store failed: %s", e)
+    
+    def _iter_stream(self, stream, cache_fill: Optional[dict] = None,
+                     started_at: Optional[float] = None) -> Iterator[str]:
+        """Yield the text deltas of a streamed completion, mapping API errors.
+        
+        The complete text is cached once the stream finishes without error.
+        """
+        fragments = []
+        try:
+            for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        fragments.append(delta)
+                        yield delta
+                else:
+                    # The last chunk carries the usage and no choices
+                    metrics.record_usage(getattr(chunk, 'usage', None))
         except openai.APIError as e:
+            metrics.record_error('openai', 'api_error')
             raise RuntimeError(f"OpenAI API error: {e}")
         except Exception as e:
-            raise RuntimeError(f"Failed to get OpenAI response: {e}") 
\ No newline at end of file
+            metrics.record_error('openai', 'request_failed')
+            raise RuntimeError(f"Failed to get OpenAI response: {e}")
+        
+        if cache_fill is not None:
+            self._fill_caches(cache_fill, "".join(fragments).strip(), time.monotonic() - started_at)
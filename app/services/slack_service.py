@@ -1,20 +1,61 @@
-from typing import Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from app.utils import metrics
+from app.utils.credential_check import (
+    CredentialCheck, VALIDATION_BACKGROUND, VALIDATION_EAGER, VALIDATION_MODES
+)
+from app.utils.http_pool import ConnectionSettings, HTTPConnectionPool, PooledWebClient
+from app.utils.message_splitter import (
+    MAX_MESSAGE_CHARS, MAX_SECTION_CHARS, pack_sections, section_block, split_message
+)
+from app.utils.send_queue import ChannelSendQueue
+from app.utils.thread_cache import ThreadHistoryCache, compact_message
+
+
+# Slack error codes with their own message, counted by name in the error metrics
+API_ERROR_CODES = frozenset({
+    "channel_not_found", "not_in_channel", "is_archived", "msg_too_long",
+    "rate_limited", "invalid_auth", "thread_not_found"
+})
+UPDATE_ERROR_CODES = frozenset({"message_not_found", "cant_update_message"})
+
+# Channels post_messages sends to at once
+DEFAULT_POST_CONCURRENCY = 8
 
 
 class SlackService:
     """Service for interacting with Slack Web API."""
     
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, validation: str = VALIDATION_EAGER,
+                 thread_cache: Optional[ThreadHistoryCache] = None,
+                 connection_settings: Optional[ConnectionSettings] = None, base_url: Optional[str] = None,
+                 send_queue: Optional[ChannelSendQueue] = None, reply_blocks: bool = False,
+                 post_workers: int = DEFAULT_POST_CONCURRENCY):
         """
         Initialize Slack service.
         
         Args:
             bot_token: Slack bot token (starts with xoxb-)
+            validation: When to call auth.test - 'eager' (in the constructor,
+                default), 'lazy' (on first use) or 'background' (on a
+                background thread)
+            thread_cache: Cache for thread histories (default: a new ThreadHistoryCache)
+            connection_settings: Reuse keep-alive connections from a pool with these
+                settings (default: the WebClient's new connection per call)
+            base_url: Web API base URL (default: the WebClient's default)
+            send_queue: Per-channel queue that paces chat.postMessage calls and
+                retries rate limited ones (default: post immediately)
+            reply_blocks: Pack text too long for one message into Block Kit
+                sections, which takes fewer messages than plain chunks
+            post_workers: Threads of the pool post_messages posts to channels
+                from, started on first use and kept until close()
             
         Raises:
-            ValueError: If bot token is empty or None
+            ValueError: If bot token is empty or None, validation mode is
+                unknown, or post_workers is less than 1
             RuntimeError: If bot token is invalid or API test fails
         """
         if not bot_token:
@@ -23,45 +64,130 @@ class SlackService:
         if not bot_token.startswith('xoxb-'):
             raise ValueError("Invalid Slack bot token format - must start with 'xoxb-'")
         
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Invalid validation mode: {validation}")
+        
+        if post_workers < 1:
+            raise ValueError("Post workers must be at least 1")
+        
         self.bot_token = bot_token
+        self.validation = validation
+        self.bot_user_id = None
+        self.team_id = None
+        self.thread_cache = thread_cache if thread_cache is not None else ThreadHistoryCache()
+        self.send_queue = send_queue
+        self.reply_blocks = reply_blocks
+        self.post_workers = post_workers
+        self._post_executor = ThreadPoolExecutor(max_workers=post_workers, thread_name_prefix="slack-post")
+        self._validation_lock = threading.Lock()
+        self.credential_check = CredentialCheck(self._validate_bot_token, name="slack")
         
         try:
             # Initialize Slack WebClient with bot token
-            self.client = WebClient(token=bot_token)
+            self.client = self._create_client(bot_token, connection_settings, base_url)
             
             # Test the bot token by calling auth.test
-            self._validate_bot_token()
+            if validation == VALIDATION_EAGER:
+                self.credential_check.run()
             
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Slack client: {e}")
+        
+        if validation == VALIDATION_BACKGROUND:
+            self.credential_check.start_background()
+    
+    def _create_client(self, bot_token: str, connection_settings: Optional[ConnectionSettings],
+                       base_url: Optional[str]):
+        """Create the Slack Web API client."""
+        client_options = {}
+        if base_url is not None:
+            client_options['base_url'] = base_url
+        
+        if connection_settings is None:
+            return WebClient(token=bot_token, **client_options)
+        
+        return PooledWebClient(
+            token=bot_token,
+            timeout=int(connection_settings.read_timeout),
+            pool=HTTPConnectionPool(connection_settings),
+            **client_options
+        )
+    
+    def ensure_validated(self):
+        """
+        Call auth.test if it has not succeeded yet, so bot_user_id and team_id are set.
+        
+        Raises:
+            RuntimeError: If the bot token is invalid or the API test fails
+        """
+        with self._validation_lock:
+            if self.bot_user_id is None:
+                self.credential_check.run()
+    
+    def validation_status(self) -> dict:
+        """
+        Get the cached result of bot token validation.
+        
+        Returns:
+            dict: State ('pending', 'valid' or 'invalid'), error and check time
+        """
+        return self.credential_check.status()
+    
+    def ping(self):
+        """
+        Check that Slack is reachable and accepts the bot token, with auth.test.
+        
+        Raises:
+            RuntimeError: If the API call fails or the token is invalid
+        """
+        self._validate_bot_token()
     
     def _validate_bot_token(self):
         """Validate the bot token by calling auth.test API."""
         try:
             # Test the token with auth.test API call
-            response = self.client.auth_test()
-            
-            if not response.get("ok"):
-                raise RuntimeError("Slack auth test failed")
-            
-            # Store bot info for later use
-            self.bot_user_id = response.get("user_id")
-            self.team_id = response.get("team_id")
+            self._handle_auth_response(self.client.auth_test())
             
         except SlackApiError as e:
-            if e.response["error"] == "invalid_auth":
-                raise RuntimeError("Invalid Slack bot token")
-            elif e.response["error"] == "account_inactive":
-                raise RuntimeError("Slack account is inactive")
-            else:
-                raise RuntimeError(f"Slack API error during validation: {e.response['error']}")
+            self._raise_auth_error(e.response["error"])
         except Exception as e:
             raise RuntimeError(f"Failed to validate Slack bot token: {e}")
     
+    def _handle_auth_response(self, response):
+        """
+        Store the bot's identity from an auth.test response.
+        
+        Raises:
+            RuntimeError: If the auth test failed
+        """
+        if not response.get("ok"):
+            raise RuntimeError("Slack auth test failed")
+        
+        # Store bot info for later use
+        self.bot_user_id = response.get("user_id")
+        self.team_id = response.get("team_id")
+    
+    def _raise_auth_error(self, error_code: str):
+        """
+        Raise a RuntimeError describing an auth.test error code.
+        
+        Raises:
+            RuntimeError: Always
+        """
+        if error_code == "invalid_auth":
+            raise RuntimeError("Invalid Slack bot token")
+        elif error_code == "account_inactive":
+            raise RuntimeError("Slack account is inactive")
+        else:
+            raise RuntimeError(f"Slack API error during validation: {error_code}")
+    
     def post_message(self, channel: str, text: str, thread_ts: Optional[str] = None) -> bool:
         """
         Post a message to a Slack channel.
         
+        Text longer than one message allows is split at paragraph or code
+        block boundaries and posted as consecutive messages.
+        
         Args:
             channel: Channel ID (e.g., 'C1234567890') or channel name (e.g., 'general')
             text: Message text to post
@@ -74,51 +200,504 @@ class SlackService:
             ValueError: If channel or text is empty
             RuntimeError: If API call fails with specific error details
         """
-        if not channel or not channel.strip():
-            raise ValueError("Channel cannot be empty or None")
+        self._send_posts(self._reply_messages(self._message_params(channel, text, thread_ts)))
+        return True
+    
+    def post_messages(self, messages: Iterable[Sequence],
+                      max_concurrency: int = DEFAULT_POST_CONCURRENCY) -> List[dict]:
+        """
+        Post many messages, to several channels at once.
         
-        if not text or not text.strip():
-            raise ValueError("Message text cannot be empty or None")
+        Messages to one channel are posted one after another in the order
+        given; up to max_concurrency channels are posted to concurrently,
+        from the service's pool of post_workers threads. A message that
+        fails does not stop the others.
         
-        try:
-            # Prepare the message parameters
-            message_params = {
-                "channel": channel.strip(),
-                "text": text.strip()
-            }
+        Args:
+            messages: (channel, text) or (channel, text, thread_ts) tuples
+            max_concurrency: Maximum number of channels posted to at once
+                (no more than post_workers)
+        
+        Returns:
+            list: Per message, in the order given, a dict with 'channel', 'ok',
+                the posted message's 'ts' and the 'error' if it failed
+        
+        Raises:
+            ValueError: If max_concurrency is less than 1
+        """
+        if max_concurrency < 1:
+            raise ValueError("Post concurrency must be at least 1")
+        
+        results, channels = _group_posts(messages, self._message_params)
+        
+        def post_channel(posts: List[Tuple[int, dict]]):
+            for index, message_params in posts:
+                try:
+                    response = self._send_posts(self._reply_messages(message_params))[0]
+                except Exception as e:
+                    results[index] = _post_result(message_params["channel"], error=e)
+                else:
+                    results[index] = _post_result(message_params["channel"], ts=response.get("ts"))
+        
+        pending = iter(list(channels.values()))
+        pending_lock = threading.Lock()
+        
+        def post_channels():
+            while True:
+                with pending_lock:
+                    posts = next(pending, None)
+                if posts is None:
+                    return
+                post_channel(posts)
+        
+        runners = [self._post_executor.submit(post_channels)
+                   for _ in range(min(max_concurrency, self.post_workers, len(channels)))]
+        for runner in runners:
+            runner.result()
+        
+        return results
+    
+    def close(self):
+        """Stop the post_messages thread pool once its posts are done."""
+        self._post_executor.shutdown(wait=False)
+    
+    def start_message(self, channel: str, text: str, thread_ts: Optional[str] = None) -> str:
+        """
+        Post a message that will be edited later with update_message.
+        
+        Args:
+            channel: Channel ID (e.g., 'C1234567890') or channel name (e.g., 'general')
+            text: Initial message text (e.g. a placeholder)
+            thread_ts: Optional thread timestamp for thread replies
             
-            # Add thread timestamp if provided
-            if thread_ts:
-                message_params["thread_ts"] = thread_ts
+        Returns:
+            str: Timestamp (ts) of the posted message
             
-            # Call Slack Web API to post the message
-            response = self.client.chat_postMessage(**message_params)
+        Raises:
+            ValueError: If channel or text is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        response = self._post_message(channel, text, thread_ts)
+        return response.get("ts")
+    
+    def update_message(self, channel: str, ts: str, text: str, thread_ts: Optional[str] = None) -> bool:
+        """
+        Replace the text of a message the bot posted.
+        
+        Args:
+            channel: Channel ID the message was posted to
+            ts: Timestamp of the message to update
+            text: New message text
+            thread_ts: Thread the message is in, so its cached copy is updated too
+            
+        Returns:
+            bool: True if the message was updated successfully
             
-            # Check if the message was posted successfully
-            if response.get("ok"):
-                return True
-            else:
-                raise RuntimeError(f"Slack API returned error: {response.get('error', 'Unknown error')}")
+        Raises:
+            ValueError: If channel, ts or text is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        self._check_update(channel, ts, text)
+        
+        try:
+            # Call Slack Web API to update the message
+            with metrics.span('slack_update'):
+                response = self.client.chat_update(
+                    channel=channel.strip(),
+                    ts=ts,
+                    text=text.strip()
+                )
+            return self._handle_update_response(response, channel, ts, text, thread_ts)
                 
         except SlackApiError as e:
-            error_code = e.response.get("error", "unknown")
+            self._raise_update_error(e.response.get("error", "unknown"), channel, ts)
+        
+        except Exception as e:
+            metrics.record_error('slack', 'request_failed')
+            raise RuntimeError(f"Failed to update Slack message: {e}")
+    
+    def get_thread_history(self, channel: str, thread_ts: str, limit: int = 200) -> List[dict]:
+        """
+        Get the messages of a thread, oldest first.
+        
+        Threads are served from the thread cache when possible; on a miss the
+        thread is fetched with conversations.replies and cached.
+        
+        Args:
+            channel: Channel ID the thread is in
+            thread_ts: Timestamp of the thread's parent message
+            limit: Maximum number of messages to fetch
+            
+        Returns:
+            List of messages with 'ts', 'user', 'text' and 'is_bot'
+            
+        Raises:
+            ValueError: If channel or thread_ts is empty
+            RuntimeError: If API call fails with specific error details
+        """
+        channel = self._check_thread(channel, thread_ts)
+        cached = self.thread_cache.get(channel, thread_ts)
+        if cached is not None:
+            return cached
+        
+        messages = []
+        cursor = None
+        
+        try:
+            while len(messages) < limit:
+                with metrics.span('slack_history'):
+                    response = self.client.conversations_replies(
+                        **self._replies_params(channel, thread_ts, limit - len(messages), cursor)
+                    )
+                cursor = self._handle_replies_response(response, messages)
+                if cursor is None:
+                    break
+                
+        except SlackApiError as e:
+            self._raise_api_error(e.response.get("error", "unknown"), channel)
+        
+        except Exception as e:
+            metrics.record_error('slack', 'request_failed')
+            raise RuntimeError(f"Failed to fetch Slack thread history: {e}")
+        
+        messages = messages[:limit]
+        self.thread_cache.put(channel, thread_ts, messages)
+        return messages
+    
+    def _check_thread(self, channel: str, thread_ts: str) -> str:
+        """
+        Validate the arguments of get_thread_history.
+        
+        Returns:
+            The channel ID without surrounding whitespace
+        
+        Raises:
+            ValueError: If channel or thread_ts is empty
+        """
+        if not channel or not channel.strip():
+            raise ValueError("Channel cannot be empty or None")
+        
+        if not thread_ts:
+            raise ValueError("Thread timestamp cannot be empty or None")
+        
+        return channel.strip()
+    
+    @staticmethod
+    def _replies_params(channel: str, thread_ts: str, remaining: int, cursor: Optional[str]) -> dict:
+        """Build the parameters for one conversations.replies page."""
+        params = {
+            "channel": channel,
+            "ts": thread_ts,
+            "limit": min(remaining, 200)
+        }
+        if cursor:
+            params["cursor"] = cursor
+        return params
+    
+    @staticmethod
+    def _handle_replies_response(response, messages: List[dict]) -> Optional[str]:
+        """
+        Add one conversations.replies page to messages.
+        
+        Returns:
+            The cursor of the next page, or None if this was the last page
+        
+        Raises:
+            RuntimeError: If Slack returned an error
+        """
+        if not response.get("ok"):
+            raise RuntimeError(f"Slack API returned error: {response.get('error', 'Unknown error')}")
+        
+        messages.extend(compact_message(message) for message in response.get("messages", []))
+        
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more") or not cursor:
+            return None
+        return cursor
+    
+    def record_message(self, channel: str, thread_ts: str, message: dict, is_bot: Optional[bool] = None) -> bool:
+        """
+        Add a message the bot has seen to the cached copy of its thread.
+        
+        Args:
+            channel: Channel ID the thread is in
+            thread_ts: Timestamp of the thread's parent message
+            message: Slack message or event dict
+            is_bot: Whether the message came from a bot (default: it has a bot_id)
             
-            if error_code == "channel_not_found":
-                raise RuntimeError(f"Channel not found: {channel}")
-            elif error_code == "not_in_channel":
-                raise RuntimeError(f"Bot is not in channel: {channel}")
-            elif error_code == "is_archived":
-                raise RuntimeError(f"Channel is archived: {channel}")
-            elif error_code == "msg_too_long":
-                raise RuntimeError("Message text is too long")
-            elif error_code == "rate_limited":
-                raise RuntimeError("Rate limit exceeded - please try again later")
-            elif error_code == "invalid_auth":
-                raise RuntimeError("Invalid authentication token")
-            elif error_code == "thread_not_found":
-                raise RuntimeError("Thread not found for the provided thread_ts")
-            else:
-                raise RuntimeError(f"Slack API error: {error_code}")
+        Returns:
+            bool: True if the thread was cached and the message was added
+        """
+        if not message.get('ts'):
+            return False
+        
+        return self.thread_cache.append(channel, thread_ts, compact_message(message, is_bot=is_bot))
+    
+    def _post_message(self, channel: str, text: str, thread_ts: Optional[str] = None):
+        """
+        Call chat.postMessage and map its errors.
+        
+        Returns:
+            The Slack API response
+        """
+        return self._send_post(self._message_params(channel, text, thread_ts))
+    
+    def _reply_messages(self, message_params: dict) -> List[dict]:
+        """
+        Split chat.postMessage parameters whose text is too long for one message.
+        
+        Args:
+            message_params: Parameters from _message_params
+        
+        Returns:
+            list: Parameters of each message to post, in order
+        """
+        text = message_params["text"]
+        if len(text) <= MAX_MESSAGE_CHARS:
+            return [message_params]
+        
+        if not self.reply_blocks:
+            return [dict(message_params, text=chunk) for chunk in split_message(text)]
+        
+        # The text of a message with blocks is its notification and thread cache copy
+        return [
+            dict(message_params, text="\n\n".join(sections), blocks=[section_block(section) for section in sections])
+            for sections in pack_sections(split_message(text, MAX_SECTION_CHARS))
+        ]
+    
+    def _send_posts(self, messages: List[dict]) -> list:
+        """
+        Post messages to one channel in order.
+        
+        With a send queue they are all queued at once, so each goes out as
+        soon as the channel may send again rather than after the previous
+        one's response has been handled here.
+        
+        Args:
+            messages: chat.postMessage parameters from _reply_messages
+        
+        Returns:
+            list: The Slack API responses
+        
+        Raises:
+            RuntimeError: On the first message that fails, saying how many
+                were posted before it; the ones after it are not posted
+        """
+        if self.send_queue is None or len(messages) == 1:
+            futures = [None] * len(messages)
+        else:
+            futures = self.send_queue.submit_all(messages[0]["channel"], self.client.chat_postMessage, messages)
+        
+        responses = []
+        for message_params, future in zip(messages, futures):
+            try:
+                responses.append(self._send_post(message_params, future))
+            except RuntimeError as e:
+                if len(messages) == 1:
+                    raise
+                raise _partial_post_error(e, len(responses), len(messages)) from e
+        return responses
+    
+    def _send_post(self, message_params: dict, future: Optional[Future] = None):
+        """
+        Call chat.postMessage with parameters from _message_params and map its errors.
+        
+        Args:
+            message_params: chat.postMessage parameters
+            future: The call already queued on the send queue, to wait for
+        
+        Returns:
+            The Slack API response
+        """
+        try:
+            # Call Slack Web API to post the message, in turn with the channel's other replies
+            with metrics.span('slack_post'):
+                if future is not None:
+                    response = future.result()
+                elif self.send_queue is None:
+                    response = self.client.chat_postMessage(**message_params)
+                else:
+                    response = self.send_queue.call(
+                        message_params["channel"], self.client.chat_postMessage, **message_params
+                    )
+            return self._handle_post_response(response, message_params)
+                
+        except SlackApiError as e:
+            self._raise_api_error(e.response.get("error", "unknown"), message_params["channel"])
         
         except Exception as e:
-            raise RuntimeError(f"Failed to post message to Slack: {e}") 
\ No newline at end of file
+            metrics.record_error('slack', 'request_failed')
+            raise RuntimeError(f"Failed to post message to Slack: {e}")
+    
+    def _message_params(self, channel: str, text: str, thread_ts: Optional[str] = None) -> dict:
+        """
+        Validate a message and build the chat.postMessage parameters.
+        
+        Raises:
+            ValueError: If channel or text is empty
+        """
+        if not channel or not channel.strip():
+            raise ValueError("Channel cannot be empty or None")
+        
+        if not text or not text.strip():
+            raise ValueError("Message text cannot be empty or None")
+        
+        # Prepare the message parameters
+        message_params = {
+            "channel": channel.strip(),
+            "text": text.strip()
+        }
+        
+        # Add thread timestamp if provided
+        if thread_ts:
+            message_params["thread_ts"] = thread_ts
+        
+        return message_params
+    
+    def _handle_post_response(self, response, message_params: dict):
+        """
+        Check a chat.postMessage response and record the reply in its cached thread.
+        
+        Returns:
+            The Slack API response
+        
+        Raises:
+            RuntimeError: If Slack returned an error
+        """
+        # Check if the message was posted successfully
+        if not response.get("ok"):
+            raise RuntimeError(f"Slack API returned error: {response.get('error', 'Unknown error')}")
+        
+        # A successful post proves the token when validation was deferred
+        if self.credential_check.state == CredentialCheck.PENDING:
+            self.credential_check.mark_valid()
+        
+        # Keep a cached copy of the thread current with our own reply
+        thread_ts = message_params.get("thread_ts")
+        if thread_ts:
+            self.record_message(message_params["channel"], thread_ts, {
+                'ts': response.get("ts"),
+                'user': self.bot_user_id,
+                'text': message_params["text"]
+            }, is_bot=True)
+        return response
+    
+    def _check_update(self, channel: str, ts: str, text: str):
+        """
+        Validate the arguments of update_message.
+        
+        Raises:
+            ValueError: If channel, ts or text is empty
+        """
+        if not channel or not channel.strip():
+            raise ValueError("Channel cannot be empty or None")
+        
+        if not ts:
+            raise ValueError("Message timestamp cannot be empty or None")
+        
+        if not text or not text.strip():
+            raise ValueError("Message text cannot be empty or None")
+    
+    def _handle_update_response(self, response, channel: str, ts: str, text: str,
+                                thread_ts: Optional[str]) -> bool:
+        """
+        Check a chat.update response and update the cached copy of the message.
+        
+        Raises:
+            RuntimeError: If Slack returned an error
+        """
+        if not response.get("ok"):
+            raise RuntimeError(f"Slack API returned error: {response.get('error', 'Unknown error')}")
+        
+        if thread_ts:
+            self.thread_cache.update_text(channel.strip(), thread_ts, ts, text.strip())
+        return True
+    
+    def _raise_update_error(self, error_code: str, channel: str, ts: str):
+        """
+        Raise a RuntimeError describing a chat.update error code.
+        
+        Raises:
+            RuntimeError: Always
+        """
+        if error_code in UPDATE_ERROR_CODES:
+            metrics.record_error('slack', error_code)
+        
+        if error_code == "message_not_found":
+            raise RuntimeError(f"Message not found: {ts}")
+        elif error_code == "cant_update_message":
+            raise RuntimeError(f"Message cannot be updated: {ts}")
+        else:
+            self._raise_api_error(error_code, channel)
+    
+    def _raise_api_error(self, error_code: str, channel: str):
+        """
+        Raise a RuntimeError describing a Slack API error code.
+        
+        Raises:
+            RuntimeError: Always
+        """
+        metrics.record_error('slack', error_code if error_code in API_ERROR_CODES else 'other')
+        
+        if error_code == "channel_not_found":
+            raise RuntimeError(f"Channel not found: {channel}")
+        elif error_code == "not_in_channel":
+            raise RuntimeError(f"Bot is not in channel: {channel}")
+        elif error_code == "is_archived":
+            raise RuntimeError(f"Channel is archived: {channel}")
+        elif error_code == "msg_too_long":
+            raise RuntimeError("Message text is too long")
+        elif error_code == "rate_limited":
+            raise RuntimeError("Rate limit exceeded - please try again later")
+        elif error_code == "invalid_auth":
+            self.credential_check.mark_invalid("Invalid Slack bot token")
+            raise RuntimeError("Invalid authentication token")
+        elif error_code == "thread_not_found":
+            raise RuntimeError("Thread not found for the provided thread_ts")
+        else:
+            raise RuntimeError(f"Slack API error: {error_code}")
+
+
+def _partial_post_error(error: Exception, posted: int, total: int) -> RuntimeError:
+    """Build the error for a multi-message reply that failed part way."""
+    return RuntimeError(f"{error} (posted {posted} of {total} messages)")
+
+
+def _group_posts(messages: Iterable[Sequence], message_params: Callable) -> Tuple[list, Dict[str, list]]:
+    """
+    Validate messages for post_messages and group them by channel.
+    
+    Args:
+        messages: (channel, text) or (channel, text, thread_ts) tuples
+        message_params: SlackService._message_params
+    
+    Returns:
+        The results list, filled in for invalid messages, and per channel
+        its (index, chat.postMessage parameters) in the order given
+    """
+    results = []
+    channels = {}
+    
+    for index, message in enumerate(messages):
+        channel, text = message[0], message[1]
+        thread_ts = message[2] if len(message) > 2 else None
+        try:
+            params = message_params(channel, text, thread_ts)
+        except ValueError as e:
+            results.append(_post_result(channel, error=e))
+            continue
+        
+        results.append(None)
+        channels.setdefault(params["channel"], []).append((index, params))
+    
+    return results, channels
+
+
+def _post_result(channel: str, ts: Optional[str] = None, error: Optional[Exception] = None) -> dict:
+    """Build one post_messages result."""
+    return {
+        'channel': channel,
+        'ok': error is None,
+        'ts': ts,
+        'error': None if error is None else str(error)
+    }
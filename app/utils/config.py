@@ -37,10 +37,116 @@ class Config:
         """Load optional environment variables with default values."""
         # OpenAI model (default to gpt-4)
         self.openai_model = os.getenv('OPENAI_MODEL', 'gpt-4')
+        self.openai_max_input_tokens = int(os.getenv('OPENAI_MAX_INPUT_TOKENS', '6000'))
         
         # Flask configuration
         self.flask_env = os.getenv('FLASK_ENV', 'development')
         self.flask_port = int(os.getenv('FLASK_PORT', '3000'))
         
         # Logging
-        self.log_level = os.getenv('LOG_LEVEL', 'INFO') 
\ No newline at end of file
+        self.log_level = os.getenv('LOG_LEVEL', 'INFO')
+        
+        # Event processing (bounded work queue and worker pool)
+        self.worker_count = int(os.getenv('WORKER_COUNT', '4'))
+        self.work_queue_size = int(os.getenv('WORK_QUEUE_SIZE', '100'))
+        
+        # Fair queuing: workers take turns between channels, then between the users
+        # in a channel; quotas cap the mentions one channel or user may have waiting (0 = none)
+        self.fair_queue = os.getenv('FAIR_QUEUE', 'true').lower() in ('1', 'true', 'yes')
+        self.fair_queue_quantum = int(os.getenv('FAIR_QUEUE_QUANTUM', '1'))
+        self.fair_queue_max_per_channel = int(os.getenv('FAIR_QUEUE_MAX_PER_CHANNEL', '50'))
+        self.fair_queue_max_per_user = int(os.getenv('FAIR_QUEUE_MAX_PER_USER', '20'))
+        
+        # Duplicate event suppression (Slack retries unacked events)
+        self.dedup_ttl_seconds = float(os.getenv('DEDUP_TTL_SECONDS', '600'))
+        self.dedup_max_size = int(os.getenv('DEDUP_MAX_SIZE', '10000'))
+        
+        # When services check their credentials: eager, lazy or background
+        self.service_validation = os.getenv('SERVICE_VALIDATION', 'lazy')
+        
+        # Streaming replies (placeholder edited as the completion arrives)
+        self.stream_responses = os.getenv('STREAM_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+        self.stream_update_interval = float(os.getenv('STREAM_UPDATE_INTERVAL', '1.0'))
+        
+        # Thread history sent as context for mentions inside threads
+        self.thread_history_limit = int(os.getenv('THREAD_HISTORY_LIMIT', '50'))
+        self.thread_cache_max_bytes = int(os.getenv('THREAD_CACHE_MAX_BYTES', '5242880'))
+        self.thread_cache_ttl_seconds = float(os.getenv('THREAD_CACHE_TTL_SECONDS', '300'))
+        
+        # Reuse answers to identical prompts: off, memory or sqlite
+        self.response_cache = os.getenv('RESPONSE_CACHE', 'off').lower()
+        self.response_cache_ttl_seconds = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+        self.response_cache_max_entries = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+        self.response_cache_path = os.getenv('RESPONSE_CACHE_PATH', 'response_cache.sqlite3')
+        self.semantic_cache = os.getenv('SEMANTIC_CACHE', 'false').lower() in ('1', 'true', 'yes')
+        self.semantic_cache_threshold = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+        self.semantic_cache_max_entries = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '10000'))
+        self.semantic_cache_dtype = os.getenv('SEMANTIC_CACHE_DTYPE', 'int8')
+        self.semantic_cache_embedding_model = os.getenv('SEMANTIC_CACHE_EMBEDDING_MODEL', 'text-embedding-3-small')
+        self.response_cache_exclude_channels = [
+            channel.strip() for channel in os.getenv('RESPONSE_CACHE_EXCLUDE_CHANNELS', '').split(',')
+            if channel.strip()
+        ]
+        
+        # Keep-alive connection pools for the OpenAI and Slack API clients
+        self.http_pool_size = int(os.getenv('HTTP_POOL_SIZE', '10'))
+        self.http_connect_timeout = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+        self.http_read_timeout = float(os.getenv('HTTP_READ_TIMEOUT', '60'))
+        self.http_keepalive_seconds = float(os.getenv('HTTP_KEEPALIVE_SECONDS', '60'))
+        
+        # Retries for rate limited or failed OpenAI requests
+        self.openai_max_retries = int(os.getenv('OPENAI_MAX_RETRIES', '3'))
+        self.openai_retry_base_delay = float(os.getenv('OPENAI_RETRY_BASE_DELAY', '0.5'))
+        self.openai_retry_max_delay = float(os.getenv('OPENAI_RETRY_MAX_DELAY', '20'))
+        self.openai_retry_deadline = float(os.getenv('OPENAI_RETRY_DEADLINE', '60'))
+        
+        # Client-side OpenAI rate limit (0 = learn the limit from response headers);
+        # the limiter is on when either limit is set
+        self.openai_requests_per_minute = float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '0'))
+        self.openai_tokens_per_minute = float(os.getenv('OPENAI_TOKENS_PER_MINUTE', '0'))
+        self.openai_rate_limit_burst_seconds = float(os.getenv('OPENAI_RATE_LIMIT_BURST_SECONDS', '10'))
+        
+        # Share the rate limit budget by priority: mentions before background jobs,
+        # except that a request waiting the max wait goes next (needs a requests
+        # or tokens per minute limit above)
+        self.openai_priority_scheduling = os.getenv('OPENAI_PRIORITY_SCHEDULING', 'true').lower() in ('1', 'true', 'yes')
+        self.openai_priority_max_wait = float(os.getenv('OPENAI_PRIORITY_MAX_WAIT', '30'))
+        
+        # Per-channel FIFO for Slack replies, paced to chat.postMessage rate limits
+        self.slack_send_queue = os.getenv('SLACK_SEND_QUEUE', 'true').lower() in ('1', 'true', 'yes')
+        self.slack_channel_send_interval = float(os.getenv('SLACK_CHANNEL_SEND_INTERVAL', '1'))
+        self.slack_sends_per_minute = float(os.getenv('SLACK_SENDS_PER_MINUTE', '100'))
+        
+        # Send replies too long for one message as Block Kit sections (fewer messages than plain chunks)
+        self.slack_reply_blocks = os.getenv('SLACK_REPLY_BLOCKS', 'false').lower() in ('1', 'true', 'yes')
+        
+        # Share one OpenAI call between concurrent identical prompts
+        self.openai_coalesce_requests = os.getenv('OPENAI_COALESCE_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+        
+        # Seconds between the background Slack/OpenAI probes behind /health/deep
+        self.health_probe_interval = float(os.getenv('HEALTH_PROBE_INTERVAL', '30'))
+        
+        # Production server (main.py): gunicorn worker processes, threads per
+        # process, loading the app before forking, and seconds allowed on
+        # shutdown for in-flight mentions to be answered
+        self.server_workers = int(os.getenv('SERVER_WORKERS', '2'))
+        self.server_threads = int(os.getenv('SERVER_THREADS', '8'))
+        self.server_preload = os.getenv('SERVER_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+        self.server_drain_seconds = float(os.getenv('SERVER_DRAIN_SECONDS', '30'))
+        
+        # Directory where server processes share their metrics, so /metrics
+        # reports every gunicorn worker whichever one is scraped (empty: a new
+        # temporary directory when SERVER_WORKERS > 1)
+        self.metrics_dir = os.getenv('METRICS_DIR', '')
+        
+        # API base URLs, e.g. to point at local stubs (default: the real APIs)
+        self.openai_base_url = os.getenv('OPENAI_BASE_URL') or None
+        self.slack_api_url = os.getenv('SLACK_API_URL') or None
+        
+        # Where accepted mentions wait for a worker: memory (in-process, lost on
+        # restart) or sqlite (durable, redelivered after visibility timeout)
+        self.job_queue = os.getenv('JOB_QUEUE', 'memory').lower()
+        self.job_queue_path = os.getenv('JOB_QUEUE_PATH', 'jobs.sqlite3')
+        self.job_visibility_timeout_seconds = float(os.getenv('JOB_VISIBILITY_TIMEOUT_SECONDS', '300'))
+        self.job_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+        self.job_failed_retention_seconds = float(os.getenv('JOB_FAILED_RETENTION_SECONDS', '604800'))
\ No newline at end of file
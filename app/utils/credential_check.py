@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Service startup validation modes
+VALIDATION_EAGER = 'eager'            # Probe credentials in the constructor
+VALIDATION_LAZY = 'lazy'              # Let the first real API call validate them
+VALIDATION_BACKGROUND = 'background'  # Probe credentials on a background thread
+
+VALIDATION_MODES = (VALIDATION_EAGER, VALIDATION_LAZY, VALIDATION_BACKGROUND)
+
+
+class CredentialCheck:
+    """Cached outcome of a service's credential validation."""
+    
+    PENDING = 'pending'
+    VALID = 'valid'
+    INVALID = 'invalid'
+    
+    def __init__(self, probe: Callable[[], None], name: str = "credentials"):
+        """
+        Initialize the credential check.
+        
+        Args:
+            probe: Callable that raises if the credentials are invalid
+            name: Name used for the background thread and log messages
+        """
+        self.probe = probe
+        self.name = name
+        self._lock = threading.Lock()
+        self._state = self.PENDING
+        self._error = None
+        self._checked_at = None
+        self._thread = None
+        self._task = None
+    
+    def run(self):
+        """
+        Run the probe now and cache the result.
+        
+        Raises:
+            Exception: Whatever the probe raised, after recording it
+        """
+        try:
+            self.probe()
+        except Exception as e:
+            self.mark_invalid(str(e))
+            raise
+        self.mark_valid()
+    
+    async def run_async(self):
+        """
+        Await an async probe now and cache the result.
+        
+        Raises:
+            Exception: Whatever the probe raised, after recording it
+        """
+        try:
+            await self.probe()
+        except Exception as e:
+            self.mark_invalid(str(e))
+            raise
+        self.mark_valid()
+    
+    def start_task(self) -> asyncio.Task:
+        """
+        Run an async probe as a task on the running event loop.
+        
+        Returns:
+            asyncio.Task: The task running the probe
+        """
+        async def target():
+            try:
+                await self.run_async()
+            except Exception as e:
+                logger.warning("%s validation failed: %s", self.name, e)
+        
+        with self._lock:
+            if self._task is None:
+                self._task = asyncio.get_running_loop().create_task(target(), name=f"{self.name}-validation")
+            return self._task
+    
+    def start_background(self) -> threading.Thread:
+        """
+        Run the probe on a daemon thread.
+        
+        Returns:
+            threading.Thread: The thread running the probe
+        """
+        def target():
+            try:
+                self.run()
+            except Exception as e:
+                logger.warning("%s validation failed: %s", self.name, e)
+        
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=target,
+                    name=f"{self.name}-validation",
+                    daemon=True
+                )
+                self._thread.start()
+            return self._thread
+    
+    def wait(self, timeout: Optional[float] = None):
+        """
+        Wait for a background probe to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def mark_valid(self):
+        """Record that the credentials were accepted."""
+        with self._lock:
+            self._state = self.VALID
+            self._error = None
+            self._checked_at = time.time()
+    
+    def mark_invalid(self, error: str):
+        """
+        Record that the credentials were rejected.
+        
+        Args:
+            error: Description of the failure
+        """
+        with self._lock:
+            self._state = self.INVALID
+            self._error = error
+            self._checked_at = time.time()
+    
+    @property
+    def state(self) -> str:
+        """Current state: pending, valid or invalid."""
+        with self._lock:
+            return self._state
+    
+    def status(self) -> dict:
+        """
+        Get the cached validation result.
+        
+        Returns:
+            dict: State, error message and check time (epoch seconds)
+        """
+        with self._lock:
+            return {
+                'state': self._state,
+                'error': self._error,
+                'checked_at': self._checked_at
+            }
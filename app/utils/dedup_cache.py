@@ -0,0 +1,166 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class DedupBackend(ABC):
+    """Storage interface for seen event keys.
+    
+    Implement this with a shared store (e.g. Redis ``SET NX EX``) to
+    deduplicate across processes.
+    """
+    
+    @abstractmethod
+    def add(self, key: str, ttl: float) -> bool:
+        """
+        Record a key if it has not been seen within its TTL.
+        
+        Args:
+            key: Event key
+            ttl: Seconds the key should be remembered for
+        
+        Returns:
+            bool: True if the key was added, False if it was already present
+        """
+    
+    @abstractmethod
+    def discard(self, key: str):
+        """
+        Forget a key so a later delivery is processed again.
+        
+        Args:
+            key: Event key
+        """
+
+
+class InMemoryDedupBackend(DedupBackend):
+    """Bounded in-process LRU of seen keys with per-key expiry."""
+    
+    def __init__(self, max_size: int = 10000):
+        """
+        Initialize the in-memory backend.
+        
+        Args:
+            max_size: Maximum number of keys kept; least recently seen keys are evicted first
+        
+        Raises:
+            ValueError: If max_size is less than 1
+        """
+        if max_size < 1:
+            raise ValueError("Dedup cache size must be at least 1")
+        
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def add(self, key: str, ttl: float) -> bool:
+        """Record a key if it has not been seen within its TTL."""
+        now = time.monotonic()
+        
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > now:
+                self._entries.move_to_end(key)
+                return False
+            
+            self._entries[key] = now + ttl
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            
+            return True
+    
+    def discard(self, key: str):
+        """Forget a key so a later delivery is processed again."""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class EventDeduplicator:
+    """Detect repeated deliveries of the same Slack event."""
+    
+    def __init__(self, backend: Optional[DedupBackend] = None, ttl: float = 600.0):
+        """
+        Initialize the deduplicator.
+        
+        Args:
+            backend: Storage for seen keys (default: InMemoryDedupBackend)
+            ttl: Seconds an event key is remembered for
+        """
+        self.backend = backend if backend is not None else InMemoryDedupBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    @staticmethod
+    def event_key(payload: dict) -> Optional[str]:
+        """
+        Get the dedup key for an Events API payload.
+        
+        Args:
+            payload: Parsed Events API payload
+        
+        Returns:
+            The event_id, else the message's client_msg_id, else None
+        """
+        if payload.get('event_id'):
+            return f"event:{payload['event_id']}"
+        
+        client_msg_id = (payload.get('event') or {}).get('client_msg_id')
+        if client_msg_id:
+            return f"msg:{client_msg_id}"
+        
+        return None
+    
+    def is_duplicate(self, payload: dict) -> bool:
+        """
+        Check a payload and remember it as seen.
+        
+        Args:
+            payload: Parsed Events API payload
+        
+        Returns:
+            bool: True if the same event was already seen within the TTL
+        """
+        key = self.event_key(payload)
+        if key is None:
+            return False
+        
+        duplicate = not self.backend.add(key, self.ttl)
+        
+        with self._lock:
+            if duplicate:
+                self._hits += 1
+            else:
+                self._misses += 1
+        
+        return duplicate
+    
+    def forget(self, payload: dict):
+        """
+        Forget a payload so Slack's next retry of it is processed.
+        
+        Args:
+            payload: Parsed Events API payload
+        """
+        key = self.event_key(payload)
+        if key is not None:
+            self.backend.discard(key)
+    
+    def stats(self) -> dict:
+        """
+        Get dedup hit/miss counters.
+        
+        Returns:
+            dict: Hits (duplicates suppressed) and misses (new events)
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses}
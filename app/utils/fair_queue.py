@@ -0,0 +1,254 @@
+import queue
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from app.utils.priority_scheduler import DEFAULT_MAX_WAIT, PRIORITIES, PRIORITY_NORMAL, WeightedClasses
+
+
+# Most tenant keys whose counters are kept once they have nothing queued;
+# the least recently seen are forgotten first
+DEFAULT_MAX_TRACKED_KEYS = 1000
+
+# Tenants listed by FairQueue.stats, busiest first
+DEFAULT_TOP_TENANTS = 10
+
+
+class _DeficitRoundRobin:
+    """Deficit round robin over flows, each a FIFO or a nested round robin.
+    
+    Every item costs 1. A flow that comes up is credited `quantum` and
+    serves items until its credit runs out, then goes to the back of the
+    round. A flow is dropped as soon as it is empty, so memory follows what
+    is queued, not how many keys have been seen.
+    """
+    
+    def __init__(self, quantum: int, levels: int):
+        self.quantum = quantum
+        self.levels = levels
+        self.size = 0
+        self._flows = {}
+        self._deficits = {}
+        self._active = deque()
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def push(self, keys: Tuple[str, ...], item):
+        """Queue an item under one key per level."""
+        key = keys[0]
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = deque() if self.levels == 1 else _DeficitRoundRobin(self.quantum, self.levels - 1)
+            self._flows[key] = flow
+            self._deficits[key] = 0
+            self._active.append(key)
+        
+        if self.levels == 1:
+            flow.append(item)
+        else:
+            flow.push(keys[1:], item)
+        self.size += 1
+    
+    def pop(self):
+        """Take the next item in round robin order."""
+        key = self._active[0]
+        if self._deficits[key] < 1:
+            self._deficits[key] += self.quantum
+        
+        flow = self._flows[key]
+        item = flow.popleft() if self.levels == 1 else flow.pop()
+        self._deficits[key] -= 1
+        self.size -= 1
+        
+        if not len(flow):
+            # An emptied flow starts from nothing if its key comes back
+            self._active.popleft()
+            del self._flows[key]
+            del self._deficits[key]
+        elif self._deficits[key] < 1:
+            self._active.rotate(-1)
+        return item
+
+
+class FairQueue(queue.Queue):
+    """Queue that shares its consumers fairly between tenants.
+    
+    Items are put as (key, item) pairs, where key has one tenant key per
+    level, e.g. (channel, user), and get returns the item. Items are served
+    by deficit round robin at each level: round robin over channels, and
+    within a channel over its users, so one busy channel or user cannot
+    make everyone else wait behind its backlog. Each key's items are served
+    in the order they were put.
+    
+    An item can also be put as (key, item, priority) with a priority class
+    (default normal). Each class has its own round robin, and the classes
+    are served by weighted fair queuing as in ClassQueue, so mentions go
+    ahead of bulk jobs and tenants take turns within each class.
+    
+    Each level can have a quota of queued items per key; put raises
+    queue.Full when it is reached, as when the whole queue is full. A None
+    key part has no quota.
+    
+    Counters are kept per tenant key (e.g. 'user:U123'). Keys with nothing
+    queued are forgotten least recently seen first beyond max_tracked_keys,
+    so memory stays bounded however many tenants there are. A None item
+    (a shutdown sentinel) is served once every keyed item has been.
+    """
+    
+    def __init__(self, maxsize: int = 0, key_names: Sequence[str] = ('channel', 'user'), quantum: int = 1,
+                 quotas: Sequence[int] = (), max_tracked_keys: int = DEFAULT_MAX_TRACKED_KEYS,
+                 weights: Optional[Dict[str, float]] = None, max_wait: float = DEFAULT_MAX_WAIT,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the fair queue.
+        
+        Args:
+            maxsize: Maximum number of items queued in total (0 = unbounded)
+            key_names: Name of each key level, outermost first
+            quantum: Items a key is served in a row when its turn comes
+            quotas: Per level, the most items one key may have queued, e.g.
+                per channel and per user (0 or missing = no quota)
+            max_tracked_keys: Most idle tenant keys whose counters are kept
+            weights: Weight per priority class (default: DEFAULT_WEIGHTS)
+            max_wait: Seconds after which a waiting priority class goes next
+            clock: Monotonic clock (injectable for tests)
+        
+        Raises:
+            ValueError: If there are no key levels, more quotas than levels,
+                a negative quota, quantum or max_tracked_keys is less than 1,
+                or the priority weights are invalid
+        """
+        if not key_names:
+            raise ValueError("Fair queue needs at least one key level")
+        if len(quotas) > len(key_names):
+            raise ValueError("Fair queue has more quotas than key levels")
+        if any(quota < 0 for quota in quotas):
+            raise ValueError("Fair queue quotas cannot be negative")
+        if quantum < 1:
+            raise ValueError("Fair queue quantum must be at least 1")
+        if max_tracked_keys < 1:
+            raise ValueError("Tracked tenant keys must be at least 1")
+        
+        self.key_names = tuple(key_names)
+        self.quantum = quantum
+        self.quotas = tuple(quotas) + (0,) * (len(key_names) - len(quotas))
+        self.max_tracked_keys = max_tracked_keys
+        self.classes = WeightedClasses(weights, max_wait)
+        self.clock = clock
+        super().__init__(maxsize)
+    
+    def _init(self, maxsize: int):
+        self._round_robins = {
+            priority: _DeficitRoundRobin(self.quantum, len(self.key_names)) for priority in PRIORITIES
+        }
+        self._waiting_since = {}
+        self._sentinels = deque()
+        self._tenants = OrderedDict()
+    
+    def _qsize(self) -> int:
+        return sum(len(round_robin) for round_robin in self._round_robins.values()) + len(self._sentinels)
+    
+    def _put(self, entry):
+        if entry is None:
+            self._sentinels.append(None)
+            return
+        
+        key, item, priority = entry if len(entry) == 3 else (*entry, PRIORITY_NORMAL)
+        round_robin = self._round_robins.get(priority)
+        if round_robin is None:
+            raise ValueError(f"Invalid priority: {priority}")
+        keys = tuple('' if part is None else str(part) for part in key)
+        if len(keys) != len(self.key_names):
+            raise ValueError(f"Fair queue key must have {len(self.key_names)} parts")
+        
+        tenants = [self._tenant(name, value) for name, value in zip(self.key_names, keys)]
+        for part, tenant, quota in zip(key, tenants, self.quotas):
+            # Items without a tenant share turns but have no quota
+            if quota and part is not None and tenant['queued'] >= quota:
+                tenant['rejected'] += 1
+                raise queue.Full
+        
+        for tenant in tenants:
+            tenant['submitted'] += 1
+            tenant['queued'] += 1
+        now = self.clock()
+        if not round_robin:
+            self.classes.activate(priority)
+            self._waiting_since[priority] = now
+        round_robin.push(keys, (keys, now, item))
+    
+    def _get(self):
+        if not self._waiting_since:
+            return self._sentinels.popleft()
+        
+        now = self.clock()
+        priority, _ = self.classes.pick(self._waiting_since, now)
+        round_robin = self._round_robins[priority]
+        keys, queued_at, item = round_robin.pop()
+        if round_robin:
+            self._waiting_since[priority] = now
+        else:
+            del self._waiting_since[priority]
+        
+        waited = now - queued_at
+        for name, value in zip(self.key_names, keys):
+            tenant = self._tenant(name, value)
+            tenant['queued'] -= 1
+            tenant['served'] += 1
+            tenant['wait_seconds'] += waited
+        return item
+    
+    def _tenant(self, name: str, value: str) -> dict:
+        """Get a tenant key's counters, forgetting the least recently seen idle keys. Called with the lock held."""
+        tenant_key = f"{name}:{value}"
+        tenant = self._tenants.get(tenant_key)
+        if tenant is None:
+            self._forget_idle_tenants()
+            tenant = {'queued': 0, 'submitted': 0, 'served': 0, 'rejected': 0, 'wait_seconds': 0.0}
+            self._tenants[tenant_key] = tenant
+        else:
+            self._tenants.move_to_end(tenant_key)
+        return tenant
+    
+    def _forget_idle_tenants(self):
+        """Make room for one more tenant key by dropping idle ones. Called with the lock held."""
+        excess = len(self._tenants) + 1 - self.max_tracked_keys
+        if excess <= 0:
+            return
+        
+        # The most recently seen keys may belong to the item being put
+        recent = list(self._tenants)[-len(self.key_names):]
+        idle = [tenant_key for tenant_key, tenant in self._tenants.items()
+                if not tenant['queued'] and tenant_key not in recent]
+        for tenant_key in idle[:excess]:
+            del self._tenants[tenant_key]
+    
+    def stats(self, top: int = DEFAULT_TOP_TENANTS) -> dict:
+        """
+        Get per tenant metrics.
+        
+        Args:
+            top: Number of tenant keys to list
+        
+        Returns:
+            dict: Items queued, tenant keys tracked, and for the tenant keys
+                with the most items submitted, their items queued now,
+                submitted, served and rejected by quota and mean seconds waited
+        """
+        with self.mutex:
+            busiest = sorted(self._tenants.items(), key=lambda entry: entry[1]['submitted'], reverse=True)[:top]
+            return {
+                'depth': self._qsize(),
+                'tracked_keys': len(self._tenants),
+                'tenants': {
+                    tenant_key: {
+                        'queued': tenant['queued'],
+                        'submitted': tenant['submitted'],
+                        'served': tenant['served'],
+                        'rejected': tenant['rejected'],
+                        'mean_wait_seconds': round(tenant['wait_seconds'] / tenant['served'], 3)
+                        if tenant['served'] else 0.0
+                    }
+                    for tenant_key, tenant in busiest
+                }
+            }
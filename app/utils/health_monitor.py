@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Upstream probe states
+PROBE_UP = 'up'
+PROBE_DOWN = 'down'
+PROBE_UNKNOWN = 'unknown'  # Not probed yet, or the last result is too old to trust
+
+
+class HealthMonitor:
+    """Probe upstream services on a schedule and cache the results.
+    
+    Each probe is a callable (a coroutine function for start_task) that
+    raises if its service is unreachable. Probes run one after another every
+    interval seconds on a background thread or task, so a health check only
+    reads the cached results and costs the same however often it is polled.
+    A result older than stale_after is reported as unknown, which covers a
+    probe loop that has stopped or a probe that hangs.
+    """
+    
+    def __init__(self, probes: Dict[str, Callable], interval: float = 30.0,
+                 stale_after: Optional[float] = None, name: str = "health-probe"):
+        """
+        Initialize the monitor; nothing is probed until it is started.
+        
+        Args:
+            probes: Probe callable per upstream name
+            interval: Seconds between probe rounds
+            stale_after: Seconds after which a result is no longer trusted
+                (default: three intervals)
+            name: Name of the background thread or task
+        
+        Raises:
+            ValueError: If interval is not positive
+        """
+        if interval <= 0:
+            raise ValueError("Probe interval must be positive")
+        
+        self.probes = dict(probes)
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else 3 * interval
+        self.name = name
+        
+        self._lock = threading.Lock()
+        self._results = {
+            probe_name: {'status': PROBE_UNKNOWN, 'error': None, 'latency_ms': None, 'checked_at': None}
+            for probe_name in self.probes
+        }
+        self._stop = threading.Event()
+        self._thread = None
+        self._task = None
+    
+    def run_once(self):
+        """Run every probe now and cache the results."""
+        for probe_name, probe in self.probes.items():
+            started_at = time.monotonic()
+            try:
+                probe()
+            except Exception as e:
+                self._record(probe_name, started_at, e)
+            else:
+                self._record(probe_name, started_at)
+    
+    async def run_once_async(self):
+        """Await every async probe now and cache the results."""
+        for probe_name, probe in self.probes.items():
+            started_at = time.monotonic()
+            try:
+                await probe()
+            except Exception as e:
+                self._record(probe_name, started_at, e)
+            else:
+                self._record(probe_name, started_at)
+    
+    def start(self) -> threading.Thread:
+        """
+        Probe on a daemon thread until stopped.
+        
+        Returns:
+            threading.Thread: The probe thread
+        """
+        def target():
+            while not self._stop.is_set():
+                self.run_once()
+                self._stop.wait(self.interval)
+        
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=target, name=self.name, daemon=True)
+                self._thread.start()
+            return self._thread
+    
+    def start_task(self) -> asyncio.Task:
+        """
+        Probe with async probes in a task on the running event loop until stopped.
+        
+        Returns:
+            asyncio.Task: The probe task
+        """
+        async def target():
+            while not self._stop.is_set():
+                await self.run_once_async()
+                await asyncio.sleep(self.interval)
+        
+        with self._lock:
+            if self._task is None:
+                self._task = asyncio.get_running_loop().create_task(target(), name=self.name)
+            return self._task
+    
+    def stop(self):
+        """Stop probing."""
+        self._stop.set()
+        with self._lock:
+            if self._task is not None:
+                self._task.cancel()
+    
+    def results(self) -> dict:
+        """
+        Get the cached probe results.
+        
+        Returns:
+            dict: Per upstream, its status ('up', 'down' or 'unknown'), the
+                last error, probe latency and check time (epoch seconds)
+        """
+        now = time.time()
+        with self._lock:
+            results = {probe_name: dict(result) for probe_name, result in self._results.items()}
+        
+        for result in results.values():
+            if result['checked_at'] is not None and now - result['checked_at'] > self.stale_after:
+                result['status'] = PROBE_UNKNOWN
+        return results
+    
+    def _record(self, probe_name: str, started_at: float, error: Optional[Exception] = None):
+        """Cache one probe's outcome."""
+        if error is not None:
+            logger.warning("%s health probe failed: %s", probe_name, error)
+        
+        result = {
+            'status': PROBE_UP if error is None else PROBE_DOWN,
+            'error': None if error is None else str(error),
+            'latency_ms': round((time.monotonic() - started_at) * 1000, 1),
+            'checked_at': time.time()
+        }
+        with self._lock:
+            self._results[probe_name] = result
+
+
+def overall_status(results: dict) -> str:
+    """
+    Summarise probe results.
+    
+    Args:
+        results: HealthMonitor.results()
+    
+    Returns:
+        str: 'down' if any upstream is down, 'unknown' if any is not known to
+            be up, otherwise 'up'
+    """
+    statuses = {result['status'] for result in results.values()}
+    if PROBE_DOWN in statuses:
+        return PROBE_DOWN
+    if PROBE_UNKNOWN in statuses:
+        return PROBE_UNKNOWN
+    return PROBE_UP
@@ -0,0 +1,293 @@
+import http.client
+import inspect
+import io
+import logging
+import select
+import ssl
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackRequestError
+from slack_sdk.http_retry import ConnectionErrorRetryHandler
+from slack_sdk.version import __version__ as slack_sdk_version
+
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean an idle keep-alive connection was closed by the server
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# HTTP methods that can be sent again after a connection error without repeating a side effect
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'))
+
+# Slack Web API methods that only read, so a call lost to a connection error can be repeated
+READ_ONLY_SLACK_METHODS = frozenset((
+    'auth.test', 'conversations.history', 'conversations.info', 'conversations.replies', 'users.info'
+))
+
+# slack_sdk's internal that PooledWebClient replaces, and its parameters in
+# the versions requirements.txt allows
+_URLLIB_HOOK = '_perform_urllib_http_request_internal'
+_URLLIB_HOOK_PARAMETERS = ['self', 'url', 'req']
+
+
+class ConnectionSettings:
+    """HTTP connection pool, timeout and keep-alive settings shared by the API clients."""
+    
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0,
+                 read_timeout: float = 60.0, keepalive_expiry: float = 60.0):
+        """
+        Initialize the settings.
+        
+        Args:
+            pool_size: Maximum connections kept open per host
+            connect_timeout: Seconds allowed to establish a connection
+            read_timeout: Seconds allowed to wait for response data
+            keepalive_expiry: Seconds an idle connection is kept for reuse
+        
+        Raises:
+            ValueError: If pool_size is less than 1
+        """
+        if pool_size < 1:
+            raise ValueError("Connection pool size must be at least 1")
+        
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_expiry = keepalive_expiry
+
+
+class HTTPConnectionPool:
+    """Keep-alive HTTP(S) connections reused across requests, per host."""
+    
+    def __init__(self, settings: Optional[ConnectionSettings] = None,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        """
+        Initialize the pool.
+        
+        Args:
+            settings: Pool size, timeouts and keep-alive (default: ConnectionSettings())
+            ssl_context: SSL context for HTTPS connections (default: system defaults)
+        """
+        self.settings = settings if settings is not None else ConnectionSettings()
+        self.ssl_context = ssl_context
+        self._idle = {}  # (scheme, host, port) -> [(connection, idle since)]
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._created = 0
+        self._reused = 0
+    
+    def request(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, str, http.client.HTTPMessage, bytes]:
+        """
+        Send a request over a pooled connection and read the whole response.
+        
+        Args:
+            method: HTTP method
+            url: Absolute http(s) URL
+            body: Request body
+            headers: Request headers
+        
+        Returns:
+            (status, reason, response headers, response body)
+        
+        Raises:
+            OSError: If the request fails (http.client and socket errors). A
+                reused connection the server had closed is retried on a new
+                one only for idempotent methods, as a POST may have been
+                received before the connection dropped
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        
+        with self._lock:
+            self._requests += 1
+        
+        connection, reused = self._acquire(key)
+        try:
+            response = self._send(connection, method, path, body, headers)
+        except _STALE_CONNECTION_ERRORS:
+            connection.close()
+            if not reused or method.upper() not in IDEMPOTENT_METHODS:
+                raise
+            # The server closed the idle connection; retry once on a new one
+            connection, _ = self._acquire(key, fresh=True)
+            try:
+                response = self._send(connection, method, path, body, headers)
+            except Exception:
+                connection.close()
+                raise
+        except Exception:
+            connection.close()
+            raise
+        
+        data = response.read()
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(key, connection)
+        
+        return response.status, response.reason, response.msg, data
+    
+    def stats(self) -> dict:
+        """
+        Get pool metrics.
+        
+        Returns:
+            dict: Requests sent, connections created (TCP handshakes), reused
+                connections and idle connections
+        """
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'connections_created': self._created,
+                'connections_reused': self._reused,
+                'idle': sum(len(idle) for idle in self._idle.values())
+            }
+    
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+    
+    def _acquire(self, key: Tuple[str, str, int], fresh: bool = False):
+        """Get an idle connection for a host, or open a new one."""
+        now = time.monotonic()
+        expired = []
+        connection = None
+        
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and not fresh:
+                candidate, idle_since = idle.pop()
+                if now - idle_since < self.settings.keepalive_expiry and not self._is_dropped(candidate):
+                    connection = candidate
+                    self._reused += 1
+                    break
+                expired.append(candidate)
+            
+            if connection is None:
+                self._created += 1
+        
+        for candidate in expired:
+            candidate.close()
+        
+        if connection is not None:
+            return connection, True
+        
+        scheme, host, port = key
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(
+                host, port, timeout=self.settings.connect_timeout, context=self.ssl_context
+            )
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=self.settings.connect_timeout)
+        
+        connection.connect()
+        connection.sock.settimeout(self.settings.read_timeout)
+        return connection, False
+    
+    def _release(self, key: Tuple[str, str, int], connection: http.client.HTTPConnection):
+        """Return a connection to the idle pool, closing it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.settings.pool_size:
+                idle.append((connection, time.monotonic()))
+                return
+        
+        connection.close()
+    
+    @staticmethod
+    def _is_dropped(connection: http.client.HTTPConnection) -> bool:
+        """Whether the server closed an idle connection: its socket is readable (EOF) or gone."""
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, TypeError, ValueError):
+            return True
+        return bool(readable)
+    
+    @staticmethod
+    def _send(connection, method: str, path: str, body: Optional[bytes], headers: Optional[Dict[str, str]]):
+        """Send one request on a connection and return the response."""
+        connection.request(method, path, body=body, headers=headers or {})
+        return connection.getresponse()
+
+
+class ReadOnlyConnectionErrorRetryHandler(ConnectionErrorRetryHandler):
+    """Retry Slack calls lost to a connection error, unless they may have posted something.
+    
+    Every Web API call is a POST, so the stock handler would send a
+    chat.postMessage the server had already received a second time.
+    """
+    
+    def _can_retry(self, *, state, request, response=None, error=None) -> bool:
+        method = urlsplit(request.url).path.rstrip('/').rsplit('/', 1)[-1]
+        if method not in READ_ONLY_SLACK_METHODS:
+            return False
+        return super()._can_retry(state=state, request=request, response=response, error=error)
+
+
+def slack_sdk_hook_matches() -> bool:
+    """Whether the installed slack_sdk still sends requests through the internal PooledWebClient replaces."""
+    hook = getattr(WebClient, _URLLIB_HOOK, None)
+    return hook is not None and list(inspect.signature(hook).parameters) == _URLLIB_HOOK_PARAMETERS
+
+
+class PooledWebClient(WebClient):
+    """Slack WebClient that sends API calls over pooled keep-alive connections.
+    
+    The stock client opens a new connection (TCP and TLS handshake) for
+    every API call. slack_sdk has no public transport hook, so this replaces
+    an internal of the versions pinned in requirements.txt; with any other
+    version that changed it, calls go through the stock transport instead.
+    Connection errors are retried only for read-only API methods.
+    """
+    
+    def __init__(self, *args, pool: Optional[HTTPConnectionPool] = None, **kwargs):
+        """
+        Initialize the client.
+        
+        Args:
+            *args: WebClient arguments
+            pool: Connection pool (default: a new HTTPConnectionPool)
+            **kwargs: WebClient keyword arguments; retry_handlers defaults to
+                retrying connection errors of read-only methods
+        """
+        kwargs.setdefault('retry_handlers', [ReadOnlyConnectionErrorRetryHandler()])
+        super().__init__(*args, **kwargs)
+        self.pool = pool if pool is not None else HTTPConnectionPool(ssl_context=self.ssl)
+        if not slack_sdk_hook_matches():
+            logger.warning("slack_sdk %s changed the transport PooledWebClient replaces - Slack calls are not pooled",
+                           slack_sdk_version)
+            self.pool = None
+    
+    def _perform_urllib_http_request_internal(self, url, req):
+        """Send the prepared urllib request over the connection pool."""
+        if self.proxy is not None or self.pool is None:
+            return super()._perform_urllib_http_request_internal(url, req)
+        
+        if not url.lower().startswith("http"):
+            raise SlackRequestError(f"Invalid URL detected: {url}")
+        
+        status, reason, headers, body = self.pool.request(
+            req.get_method(), url, body=req.data, headers=dict(req.header_items())
+        )
+        
+        # The base client handles rate limits and other errors from urllib's HTTPError
+        if status >= 400:
+            raise HTTPError(url, status, reason, headers, io.BytesIO(body))
+        
+        if headers.get_content_type() == "application/gzip":
+            return {"status": status, "headers": headers, "body": body}
+        
+        return {"status": status, "headers": headers, "body": body.decode(headers.get_content_charset() or "utf-8")}
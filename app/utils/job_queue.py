@@ -0,0 +1,860 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence
+from app.utils.fair_queue import DEFAULT_MAX_TRACKED_KEYS, DEFAULT_TOP_TENANTS
+
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = 'queued'  # Waiting, or leased to a worker until its visibility timeout
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'  # Gave up after max_attempts
+
+# Seconds an idle worker waits before looking for jobs whose lease has expired
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Seconds failed jobs are kept for inspection before they are purged
+DEFAULT_FAILED_RETENTION = 7 * 24 * 3600.0
+
+# Most tenant keys a job can be queued under, e.g. its channel and user
+MAX_TENANT_LEVELS = 2
+
+# SQLite columns holding a job's tenant keys, outermost first
+TENANT_COLUMNS = tuple(f"tenant{level}" for level in range(MAX_TENANT_LEVELS))
+
+
+class Job:
+    """A leased job: its payload and delivery state."""
+    
+    __slots__ = ('id', 'key', 'payload', 'attempts', 'replied', 'tenants')
+    
+    def __init__(self, id: int, key: str, payload: dict, attempts: int, replied: bool,
+                 tenants: Sequence[str] = ()):
+        self.id = id
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.replied = replied
+        self.tenants = tuple(tenants)
+
+
+class JobStore(ABC):
+    """Storage interface for queued jobs.
+    
+    Delivery is at least once: a claimed job is hidden from other claims
+    until its visibility timeout, and is handed out again if it has not
+    been completed by then (e.g. because the process died). Implement this
+    with a shared store (e.g. Redis or SQS) to spread jobs across hosts.
+    
+    A job can be queued under up to MAX_TENANT_LEVELS tenant keys, outermost
+    first (e.g. 'channel:C1', 'user:U1'). Claims take turns between tenants
+    as FairQueue does: the job of the least recently served outermost key,
+    then of the least recently served key within it, oldest first. The
+    turns are kept in the store, so every process sharing it takes part in
+    one round robin. Per tenant counters are kept for the tenant keys with
+    jobs queued and, beyond those, the most recently seen max_tracked_keys.
+    """
+    
+    @abstractmethod
+    def enqueue(self, key: str, payload: dict, tenants: Sequence[str] = (), quotas: Sequence[int] = ()) -> bool:
+        """
+        Add a job unless one with the same key already exists.
+        
+        Args:
+            key: Idempotency key (the Slack event_id)
+            payload: JSON-serialisable job data
+            tenants: Tenant keys the job takes turns under, outermost first
+            quotas: Per tenant key, the most jobs it may have queued (0 or missing = no quota)
+        
+        Returns:
+            bool: True if the job was added, False if the key was already queued or done
+        
+        Raises:
+            queue.Full: If a tenant key already has its quota of jobs queued
+            ValueError: If there are more than MAX_TENANT_LEVELS tenant keys
+        """
+    
+    @abstractmethod
+    def claim(self, visibility_timeout: float) -> Optional[Job]:
+        """
+        Lease the next visible queued job, taking turns between tenants.
+        
+        Args:
+            visibility_timeout: Seconds before the job is handed out again
+        
+        Returns:
+            The leased job, or None if no job is ready
+        """
+    
+    @abstractmethod
+    def mark_replied(self, job: Job):
+        """
+        Record that a job's reply was posted, so a redelivery does not post it again.
+        
+        Args:
+            job: Leased job
+        """
+    
+    @abstractmethod
+    def complete(self, job: Job):
+        """
+        Mark a job done.
+        
+        Args:
+            job: Leased job
+        """
+    
+    @abstractmethod
+    def retry(self, job: Job, delay: float, max_attempts: int) -> bool:
+        """
+        Return a failed job to the queue, or give up on it.
+        
+        Args:
+            job: Leased job
+            delay: Seconds before the job is visible again
+            max_attempts: Deliveries after which the job is marked failed
+        
+        Returns:
+            bool: True if the job will be retried, False if it was marked failed
+        """
+    
+    @abstractmethod
+    def purge(self, before: float, failed_before: Optional[float] = None) -> int:
+        """
+        Delete done jobs finished before a time; their keys can be enqueued again.
+        
+        Args:
+            before: Epoch seconds
+            failed_before: Epoch seconds before which failed jobs are deleted
+                too (None keeps every failed job)
+        
+        Returns:
+            int: Number of jobs deleted
+        """
+    
+    @abstractmethod
+    def depth(self) -> int:
+        """
+        Count queued jobs, including leased ones.
+        
+        Returns:
+            int: Number of queued jobs
+        """
+    
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """
+        Count jobs by state.
+        
+        Returns:
+            dict: Number of queued, done and failed jobs
+        """
+    
+    @abstractmethod
+    def tenant_stats(self, top: Optional[int] = DEFAULT_TOP_TENANTS) -> dict:
+        """
+        Get per tenant metrics, in the same shape as FairQueue.stats.
+        
+        Args:
+            top: Number of tenant keys to list (None = every tracked key)
+        
+        Returns:
+            dict: Jobs queued, tenant keys tracked, and for the tenant keys
+                with the most jobs submitted, their jobs queued now,
+                submitted, first claimed, rejected by quota and mean seconds
+                waited for a first claim
+        """
+
+
+def _check_tenants(tenants: Sequence[str]):
+    """Reject more tenant levels than a store orders claims by."""
+    if len(tenants) > MAX_TENANT_LEVELS:
+        raise ValueError(f"Jobs can have at most {MAX_TENANT_LEVELS} tenant keys")
+
+
+def _format_tenant_stats(depth: int, tracked_keys: int, busiest: list) -> dict:
+    """Shape (tenant key, queued, submitted, served, rejected, wait_seconds) rows like FairQueue.stats."""
+    return {
+        'depth': depth,
+        'tracked_keys': tracked_keys,
+        'tenants': {
+            tenant_key: {
+                'queued': queued,
+                'submitted': submitted,
+                'served': served,
+                'rejected': rejected,
+                'mean_wait_seconds': round(wait_seconds / served, 3) if served else 0.0
+            }
+            for tenant_key, queued, submitted, served, rejected, wait_seconds in busiest
+        }
+    }
+
+
+class InMemoryJobStore(JobStore):
+    """Jobs kept in process memory. Not durable; for tests and single-process development."""
+    
+    def __init__(self, max_tracked_keys: int = DEFAULT_MAX_TRACKED_KEYS):
+        """
+        Initialize an empty store.
+        
+        Args:
+            max_tracked_keys: Most idle tenant keys whose counters are kept
+        """
+        self.max_tracked_keys = max_tracked_keys
+        self._jobs = {}  # id -> [key, payload, status, attempts, visible_at, replied, updated_at, tenants]
+        self._keys = {}  # key -> id
+        self._tenants = OrderedDict()  # tenant key -> counters and last_served turn
+        self._next_id = 1
+        self._turn = 0
+        self._lock = threading.Lock()
+    
+    def enqueue(self, key: str, payload: dict, tenants: Sequence[str] = (), quotas: Sequence[int] = ()) -> bool:
+        """Add a job unless one with the same key already exists."""
+        _check_tenants(tenants)
+        
+        with self._lock:
+            if key in self._keys:
+                return False
+            
+            counters = [self._tenant(tenant_key, tenants) for tenant_key in tenants]
+            for tenant, quota in zip(counters, quotas):
+                if quota and tenant['queued'] >= quota:
+                    tenant['rejected'] += 1
+                    raise queue.Full
+            
+            for tenant in counters:
+                tenant['submitted'] += 1
+                tenant['queued'] += 1
+            job_id = self._next_id
+            self._next_id += 1
+            self._keys[key] = job_id
+            self._jobs[job_id] = [key, payload, JOB_QUEUED, 0, 0.0, False, time.time(), tuple(tenants)]
+            return True
+    
+    def claim(self, visibility_timeout: float) -> Optional[Job]:
+        """Lease the next visible queued job, taking turns between tenants."""
+        now = time.time()
+        
+        with self._lock:
+            ready = [job_id for job_id, job in self._jobs.items() if job[2] == JOB_QUEUED and job[4] <= now]
+            if not ready:
+                return None
+            
+            job_id = min(ready, key=lambda job_id: (
+                [self._tenants[tenant_key]['last_served'] for tenant_key in self._jobs[job_id][7]], job_id
+            ))
+            job = self._jobs[job_id]
+            self._turn += 1
+            for tenant_key in job[7]:
+                tenant = self._tenants[tenant_key]
+                tenant['last_served'] = self._turn
+                if job[3] == 0:
+                    tenant['served'] += 1
+                    tenant['wait_seconds'] += now - job[6]
+            
+            job[3] += 1
+            job[4] = now + visibility_timeout
+            return Job(job_id, job[0], job[1], job[3], job[5], job[7])
+    
+    def mark_replied(self, job: Job):
+        """Record that a job's reply was posted."""
+        with self._lock:
+            self._jobs[job.id][5] = True
+    
+    def complete(self, job: Job):
+        """Mark a job done."""
+        with self._lock:
+            self._dequeued(job)
+            self._jobs[job.id][2] = JOB_DONE
+            self._jobs[job.id][6] = time.time()
+    
+    def retry(self, job: Job, delay: float, max_attempts: int) -> bool:
+        """Return a failed job to the queue, or give up on it."""
+        with self._lock:
+            stored = self._jobs[job.id]
+            stored[6] = time.time()
+            if stored[3] >= max_attempts:
+                self._dequeued(job)
+                stored[2] = JOB_FAILED
+                return False
+            
+            stored[4] = stored[6] + delay
+            return True
+    
+    def purge(self, before: float, failed_before: Optional[float] = None) -> int:
+        """Delete done jobs finished before a time, and failed jobs given up on before another."""
+        cutoffs = {JOB_DONE: before}
+        if failed_before is not None:
+            cutoffs[JOB_FAILED] = failed_before
+        
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job[2] in cutoffs and job[6] < cutoffs[job[2]]]
+            for job_id in expired:
+                del self._keys[self._jobs.pop(job_id)[0]]
+            return len(expired)
+    
+    def depth(self) -> int:
+        """Count queued jobs, including leased ones."""
+        return self.counts()[JOB_QUEUED]
+    
+    def counts(self) -> Dict[str, int]:
+        """Count jobs by state."""
+        counts = {JOB_QUEUED: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job[2]] += 1
+        return counts
+    
+    def tenant_stats(self, top: Optional[int] = DEFAULT_TOP_TENANTS) -> dict:
+        """Get per tenant metrics, in the same shape as FairQueue.stats."""
+        depth = self.depth()
+        with self._lock:
+            busiest = sorted(self._tenants.items(), key=lambda entry: entry[1]['submitted'], reverse=True)[:top]
+            return _format_tenant_stats(depth, len(self._tenants), [
+                (tenant_key, tenant['queued'], tenant['submitted'], tenant['served'], tenant['rejected'],
+                 tenant['wait_seconds'])
+                for tenant_key, tenant in busiest
+            ])
+    
+    def _tenant(self, tenant_key: str, keep: Sequence[str]) -> dict:
+        """Get a tenant key's counters, forgetting the least recently seen idle keys. Called with the lock held."""
+        tenant = self._tenants.get(tenant_key)
+        if tenant is not None:
+            self._tenants.move_to_end(tenant_key)
+            return tenant
+        
+        excess = len(self._tenants) + 1 - self.max_tracked_keys
+        if excess > 0:
+            idle = [key for key, counters in self._tenants.items() if not counters['queued'] and key not in keep]
+            for key in idle[:excess]:
+                del self._tenants[key]
+        
+        tenant = {'queued': 0, 'submitted': 0, 'served': 0, 'rejected': 0, 'wait_seconds': 0.0, 'last_served': 0}
+        self._tenants[tenant_key] = tenant
+        return tenant
+    
+    def _dequeued(self, job: Job):
+        """Take a job that is finishing off its tenants' queued counts, once. Called with the lock held."""
+        if self._jobs[job.id][2] != JOB_QUEUED:
+            return
+        for tenant_key in self._jobs[job.id][7]:
+            self._tenants[tenant_key]['queued'] -= 1
+
+
+class SqliteJobStore(JobStore):
+    """Jobs stored in a SQLite file in WAL mode, so they survive restarts.
+    
+    Several processes may share the file: claims take the write lock before
+    choosing a job, so a job is leased to one worker at a time, and tenants'
+    turns are kept in a table of their own, so the processes share them. A
+    job's tenant keys are stored one column per level, so claims join them
+    to their turns on the tenants primary key. Commits do
+    not wait for an fsync (synchronous=NORMAL); a committed job survives the
+    process crashing, though the last commits can be lost if the host loses
+    power.
+    """
+    
+    def __init__(self, path: str, max_tracked_keys: int = DEFAULT_MAX_TRACKED_KEYS):
+        """
+        Open the job database, creating the tables if needed.
+        
+        Args:
+            path: Database file path (':memory:' for a private in-memory database)
+            max_tracked_keys: Most idle tenant keys whose counters are kept
+        """
+        self.path = path
+        self.max_tracked_keys = max_tracked_keys
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            tenant_columns = ', '.join(f"{column} TEXT" for column in TENANT_COLUMNS)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, visible_at REAL NOT NULL, "
+                f"replied INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, {tenant_columns})"
+            )
+            self._upgrade()
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tenants ("
+                "key TEXT PRIMARY KEY, queued INTEGER NOT NULL DEFAULT 0, submitted INTEGER NOT NULL DEFAULT 0, "
+                "served INTEGER NOT NULL DEFAULT 0, rejected INTEGER NOT NULL DEFAULT 0, "
+                "wait_seconds REAL NOT NULL DEFAULT 0, last_served INTEGER NOT NULL DEFAULT 0, "
+                "seen_at REAL NOT NULL)"
+            )
+    
+    def _upgrade(self):
+        """Give a jobs table from an earlier version one tenant column per level. Called with the lock held."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+            for column in TENANT_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+            if 'tenants' in columns and TENANT_COLUMNS[0] not in columns:
+                # Jobs stored while tenant keys were kept as one JSON list
+                assignments = ', '.join(
+                    f"{column} = json_extract(tenants, '$[{level}]')" for level, column in enumerate(TENANT_COLUMNS)
+                )
+                self._conn.execute(f"UPDATE jobs SET {assignments} WHERE status = ?", (JOB_QUEUED,))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+    
+    def enqueue(self, key: str, payload: dict, tenants: Sequence[str] = (), quotas: Sequence[int] = ()) -> bool:
+        """Add a job unless one with the same key already exists."""
+        _check_tenants(tenants)
+        now = time.time()
+        
+        with self._lock:
+            if not tenants:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO jobs (key, payload, status, visible_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(payload), JOB_QUEUED, 0.0, now)
+                )
+                return cursor.rowcount == 1
+            
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                added = self._enqueue_for_tenants(key, payload, tenants, quotas, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        if added is None:
+            raise queue.Full
+        return added
+    
+    def _enqueue_for_tenants(self, key: str, payload: dict, tenants: Sequence[str], quotas: Sequence[int],
+                             now: float) -> Optional[bool]:
+        """Add a job and count it for its tenants, or None if one is over quota. Called in a transaction."""
+        if self._conn.execute("SELECT 1 FROM jobs WHERE key = ?", (key,)).fetchone() is not None:
+            return False
+        
+        for tenant_key in tenants:
+            self._conn.execute(
+                "INSERT INTO tenants (key, seen_at) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET seen_at = ?",
+                (tenant_key, now, now)
+            )
+        self._forget_idle_tenants(tenants)
+        
+        for tenant_key, quota in zip(tenants, quotas):
+            queued = self._conn.execute("SELECT queued FROM tenants WHERE key = ?", (tenant_key,)).fetchone()[0]
+            if quota and queued >= quota:
+                self._conn.execute("UPDATE tenants SET rejected = rejected + 1 WHERE key = ?", (tenant_key,))
+                return None
+        
+        self._conn.execute(
+            f"INSERT INTO jobs (key, payload, status, visible_at, updated_at, {', '.join(TENANT_COLUMNS)}) "
+            f"VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(TENANT_COLUMNS))})",
+            (key, json.dumps(payload), JOB_QUEUED, 0.0, now,
+             *tenants, *[None] * (len(TENANT_COLUMNS) - len(tenants)))
+        )
+        self._conn.executemany(
+            "UPDATE tenants SET submitted = submitted + 1, queued = queued + 1 WHERE key = ?",
+            [(tenant_key,) for tenant_key in tenants]
+        )
+        return True
+    
+    def _forget_idle_tenants(self, keep: Sequence[str]):
+        """Drop the least recently seen idle tenant keys beyond max_tracked_keys. Called in a transaction."""
+        excess = self._conn.execute("SELECT COUNT(*) FROM tenants").fetchone()[0] - self.max_tracked_keys
+        if excess <= 0:
+            return
+        
+        self._conn.execute(
+            f"DELETE FROM tenants WHERE key IN (SELECT key FROM tenants WHERE queued = 0 "
+            f"AND key NOT IN ({', '.join('?' * len(keep))}) ORDER BY seen_at LIMIT ?)",
+            (*keep, excess)
+        )
+    
+    def claim(self, visibility_timeout: float) -> Optional[Job]:
+        """Lease the next visible queued job, taking turns between tenants."""
+        now = time.time()
+        
+        # Least recently served outermost tenant key first, then the next level, then oldest
+        joins = ' '.join(
+            f"LEFT JOIN tenants t{level} ON t{level}.key = jobs.{column}"
+            for level, column in enumerate(TENANT_COLUMNS)
+        )
+        turns = ', '.join(f"COALESCE(t{level}.last_served, 0)" for level in range(MAX_TENANT_LEVELS))
+        columns = ', '.join(f"jobs.{column}" for column in TENANT_COLUMNS)
+        
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT jobs.id, jobs.key, jobs.payload, jobs.attempts, jobs.replied, jobs.updated_at, "
+                    f"{columns} FROM jobs {joins} WHERE jobs.status = ? AND jobs.visible_at <= ? "
+                    f"ORDER BY {turns}, jobs.id LIMIT 1",
+                    (JOB_QUEUED, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET attempts = attempts + 1, visible_at = ?, updated_at = ? WHERE id = ?",
+                        (now + visibility_timeout, now, row[0])
+                    )
+                    tenants = [tenant_key for tenant_key in row[6:] if tenant_key is not None]
+                    if tenants:
+                        self._served(tenants, first=row[3] == 0, waited=now - row[5])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        if row is None:
+            return None
+        return Job(row[0], row[1], json.loads(row[2]), row[3] + 1, bool(row[4]), tenants)
+    
+    def _served(self, tenants: Sequence[str], first: bool, waited: float):
+        """Give a claimed job's tenants the latest turn. Called in a transaction."""
+        turn = self._conn.execute("SELECT COALESCE(MAX(last_served), 0) + 1 FROM tenants").fetchone()[0]
+        self._conn.executemany(
+            "UPDATE tenants SET last_served = ?, served = served + ?, wait_seconds = wait_seconds + ? WHERE key = ?",
+            [(turn, int(first), waited if first else 0.0, tenant_key) for tenant_key in tenants]
+        )
+    
+    def mark_replied(self, job: Job):
+        """Record that a job's reply was posted."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET replied = 1 WHERE id = ?", (job.id,))
+    
+    def complete(self, job: Job):
+        """Mark a job done."""
+        with self._lock:
+            self._finish(job, JOB_DONE, time.time())
+    
+    def retry(self, job: Job, delay: float, max_attempts: int) -> bool:
+        """Return a failed job to the queue, or give up on it."""
+        now = time.time()
+        
+        with self._lock:
+            if job.attempts >= max_attempts:
+                self._finish(job, JOB_FAILED, now)
+                return False
+            
+            self._conn.execute(
+                "UPDATE jobs SET visible_at = ?, updated_at = ? WHERE id = ?", (now + delay, now, job.id)
+            )
+            return True
+    
+    def purge(self, before: float, failed_before: Optional[float] = None) -> int:
+        """Delete done jobs finished before a time, and failed jobs given up on before another."""
+        cutoffs = [(JOB_DONE, before)]
+        if failed_before is not None:
+            cutoffs.append((JOB_FAILED, failed_before))
+        
+        with self._lock:
+            return sum(
+                self._conn.execute("DELETE FROM jobs WHERE status = ? AND updated_at < ?", cutoff).rowcount
+                for cutoff in cutoffs
+            )
+    
+    def depth(self) -> int:
+        """Count queued jobs, including leased ones."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (JOB_QUEUED,)).fetchone()[0]
+    
+    def counts(self) -> Dict[str, int]:
+        """Count jobs by state."""
+        counts = {JOB_QUEUED: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        with self._lock:
+            for status, count in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[status] = count
+        return counts
+    
+    def tenant_stats(self, top: Optional[int] = DEFAULT_TOP_TENANTS) -> dict:
+        """Get per tenant metrics, in the same shape as FairQueue.stats."""
+        depth = self.depth()
+        with self._lock:
+            tracked_keys = self._conn.execute("SELECT COUNT(*) FROM tenants").fetchone()[0]
+            busiest = self._conn.execute(
+                "SELECT key, queued, submitted, served, rejected, wait_seconds FROM tenants "
+                "ORDER BY submitted DESC, seen_at DESC LIMIT ?",
+                (-1 if top is None else top,)
+            ).fetchall()
+        return _format_tenant_stats(depth, tracked_keys, busiest)
+    
+    def _finish(self, job: Job, status: str, now: float):
+        """Mark a leased job done or failed and take it off its tenants' queued counts. Called with the lock held."""
+        if not job.tenants:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, now, job.id))
+            return
+        
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (status, now, job.id, JOB_QUEUED)
+            )
+            if cursor.rowcount == 1:
+                self._conn.executemany(
+                    "UPDATE tenants SET queued = queued - 1 WHERE key = ?",
+                    [(tenant_key,) for tenant_key in job.tenants]
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Durable queue of Slack mentions served by a pool of worker threads.
+    
+    Jobs are written to a JobStore before the event is acknowledged, so a
+    mention accepted by a process that then restarts or is frozen is
+    answered once a worker (in this process or the next) claims it after
+    its visibility timeout. A job that raises is retried with exponential
+    backoff up to max_attempts. Keys are kept for retention seconds after a
+    job is done, so a redelivered event is not answered twice, and failed
+    jobs for failed_retention seconds. Jobs
+    submitted with tenant keys are claimed in turns between tenants (see
+    JobStore), and a tenant over its quota is refused like a full queue.
+    
+    Workers start on start() or the first submit, and stop taking new jobs
+    on shutdown; jobs still queued then are left for the next process.
+    """
+    
+    def __init__(self, store: JobStore, handler: Callable[[Job], None], num_workers: int = 4,
+                 max_size: int = 100, visibility_timeout: float = 300.0, max_attempts: int = 5,
+                 retry_delay: float = 1.0, retention: float = 600.0,
+                 failed_retention: float = DEFAULT_FAILED_RETENTION,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, name: str = "job-queue"):
+        """
+        Initialize the job queue.
+        
+        Args:
+            store: Where jobs are kept
+            handler: Called with each claimed job; raising retries it
+            num_workers: Number of worker threads
+            max_size: Maximum number of queued jobs
+            visibility_timeout: Seconds a claimed job stays hidden; longer than a job can take
+            max_attempts: Deliveries before a job is marked failed
+            retry_delay: Seconds before the first retry, doubled for each later one
+            retention: Seconds done jobs are kept for deduplication
+            failed_retention: Seconds failed jobs are kept before they are purged
+            poll_interval: Seconds an idle worker waits before checking for expired leases
+            name: Prefix for worker thread names
+        
+        Raises:
+            ValueError: If num_workers, max_size or max_attempts is less than 1, or
+                visibility_timeout is not positive
+        """
+        if num_workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        
+        if max_size < 1:
+            raise ValueError("Job queue size must be at least 1")
+        
+        if max_attempts < 1:
+            raise ValueError("Job attempts must be at least 1")
+        
+        if visibility_timeout <= 0:
+            raise ValueError("Visibility timeout must be positive")
+        
+        self.store = store
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_size = max_size
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self.failed_retention = failed_retention
+        self.poll_interval = poll_interval
+        self.name = name
+        
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._workers = []
+        self._stopping = False
+        self._last_purge = 0.0
+        
+        # Metrics
+        self._busy_workers = 0
+        self._submitted = 0
+        self._completed = 0
+        self._retried = 0
+        self._failed = 0
+        self._rejected = 0
+    
+    def start(self):
+        """Start the worker threads if they are not already running."""
+        with self._lock:
+            if self._workers or self._stopping:
+                return
+            
+            for index in range(self.num_workers):
+                worker = threading.Thread(target=self._run_worker, name=f"{self.name}-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+    
+    def submit(self, key: str, payload: dict, tenants: Sequence[str] = (), quotas: Sequence[int] = ()) -> bool:
+        """
+        Store a job for a worker to run.
+        
+        Args:
+            key: Idempotency key; a key already stored is not queued again
+            payload: JSON-serialisable job data
+            tenants: Tenant keys the job takes turns under, outermost first
+            quotas: Per tenant key, the most jobs it may have queued (0 or missing = no quota)
+        
+        Returns:
+            bool: True if the job was stored or is a duplicate, False if the
+                queue is full or a tenant is over its quota
+        """
+        self.start()
+        
+        if self.store.depth() >= self.max_size:
+            with self._lock:
+                self._rejected += 1
+            return False
+        
+        try:
+            added = self.store.enqueue(key, payload, tenants, quotas)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+        
+        if not added:
+            logger.info("Job %s is already queued", key)
+            return True
+        
+        with self._lock:
+            self._submitted += 1
+            self._wakeup.notify()
+        return True
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop claiming jobs and wait for the running ones to finish.
+        
+        Queued jobs stay in the store for the next process.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits until done)
+        
+        Returns:
+            bool: True if every running job finished, False if the timeout passed first
+        """
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+            return self._idle.wait_for(lambda: self._busy_workers == 0, timeout)
+    
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the worker threads once their current jobs finish.
+        
+        Args:
+            wait: Whether to wait for the worker threads to exit
+        """
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+            workers = list(self._workers)
+            self._workers = []
+        
+        if wait:
+            for worker in workers:
+                worker.join()
+    
+    def stats(self) -> dict:
+        """
+        Get queue depth and job outcome metrics.
+        
+        Returns:
+            dict: Stored job counts and this process's worker metrics
+        """
+        counts = self.store.counts()
+        
+        with self._lock:
+            return {
+                'depth': counts[JOB_QUEUED],
+                'max_size': self.max_size,
+                'workers': len(self._workers),
+                'busy_workers': self._busy_workers,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'retried': self._retried,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'dead_letters': counts[JOB_FAILED]
+            }
+    
+    def _run_worker(self):
+        """Claim and run jobs until shutdown."""
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                self._busy_workers += 1
+            
+            try:
+                job = self.store.claim(self.visibility_timeout)
+                if job is not None:
+                    self._run_job(job)
+            except Exception:
+                job = None
+                logger.exception("Job queue worker failed")
+            finally:
+                with self._lock:
+                    self._busy_workers -= 1
+                    self._idle.notify_all()
+            
+            if job is None:
+                self._purge()
+                with self._lock:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+    
+    def _run_job(self, job: Job):
+        """Run one claimed job and record its outcome."""
+        try:
+            self.handler(job)
+        except Exception:
+            logger.exception("Job %s failed on attempt %d", job.key, job.attempts)
+            retried = self.store.retry(job, self.retry_delay * 2 ** (job.attempts - 1), self.max_attempts)
+            with self._lock:
+                if retried:
+                    self._retried += 1
+                else:
+                    self._failed += 1
+            if not retried:
+                logger.error("Giving up on job %s after %d attempts", job.key, job.attempts)
+            return
+        
+        self.store.complete(job)
+        with self._lock:
+            self._completed += 1
+    
+    def _purge(self):
+        """Delete done and failed jobs past their retention, at most once per retention period."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge < self.retention:
+                return
+            self._last_purge = now
+        
+        self.store.purge(now - self.retention, now - self.failed_retention)
@@ -0,0 +1,160 @@
+from typing import Iterator, List
+
+
+# Longest message text posted as one message; Slack truncates text far
+# beyond this and recommends staying under it
+MAX_MESSAGE_CHARS = 4000
+
+# Block Kit limits: text of one section block, and blocks in one message
+MAX_SECTION_CHARS = 3000
+MAX_BLOCKS = 50
+
+# Most characters packed into one message's section blocks
+MAX_BLOCK_MESSAGE_CHARS = 12000
+
+FENCE = "```"
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+    """
+    Split text into chunks of at most limit characters.
+    
+    Chunks end at paragraph boundaries where possible, then at line
+    boundaries, then between words. A code block split across chunks is
+    closed at the end of one chunk and reopened (with its language) at the
+    start of the next, so each chunk renders on its own.
+    
+    Args:
+        text: Message text
+        limit: Maximum characters per chunk
+    
+    Returns:
+        list: The chunks in order; [text] if it already fits
+    
+    Raises:
+        ValueError: If limit is too small to hold a code fence and some text
+    """
+    if limit < 4 * len(FENCE) + 16:
+        raise ValueError(f"Chunk limit must be at least {4 * len(FENCE) + 16} characters")
+    
+    text = text.strip()
+    if len(text) <= limit:
+        return [text]
+    
+    chunks = []
+    for paragraph in _paragraphs(text):
+        # A paragraph that has to be split starts in the current chunk if it has a fair amount of room
+        room = limit - len(chunks[-1]) - 2 if chunks else 0
+        for piece in _split_paragraph(paragraph, limit, room if room >= limit // 4 else limit):
+            if chunks and len(chunks[-1]) + 2 + len(piece) <= limit:
+                chunks[-1] += "\n\n" + piece
+            else:
+                chunks.append(piece)
+    return chunks
+
+
+def pack_sections(sections: List[str], max_chars: int = MAX_BLOCK_MESSAGE_CHARS,
+                  max_blocks: int = MAX_BLOCKS) -> List[List[str]]:
+    """
+    Group consecutive sections into as few messages as the limits allow.
+    
+    Args:
+        sections: Section texts, each at most MAX_SECTION_CHARS
+        max_chars: Maximum characters of section text per message
+        max_blocks: Maximum sections per message
+    
+    Returns:
+        list: Per message, its sections in order
+    """
+    messages = []
+    size = 0
+    
+    for section in sections:
+        if messages and len(messages[-1]) < max_blocks and size + len(section) <= max_chars:
+            messages[-1].append(section)
+            size += len(section)
+        else:
+            messages.append([section])
+            size = len(section)
+    return messages
+
+
+def section_block(text: str) -> dict:
+    """
+    Build a Block Kit section showing mrkdwn text.
+    
+    Args:
+        text: Section text, at most MAX_SECTION_CHARS
+    
+    Returns:
+        dict: The section block
+    """
+    return {'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}}
+
+
+def _paragraphs(text: str) -> List[str]:
+    """Split text at blank lines, keeping each code block in one paragraph."""
+    paragraphs = []
+    lines = []
+    in_fence = False
+    
+    for line in text.split("\n"):
+        if not in_fence and not line.strip():
+            if lines:
+                paragraphs.append("\n".join(lines))
+                lines = []
+            continue
+        
+        lines.append(line)
+        if line.count(FENCE) % 2:
+            in_fence = not in_fence
+    
+    if lines:
+        paragraphs.append("\n".join(lines))
+    return paragraphs
+
+
+def _split_paragraph(paragraph: str, limit: int, first_limit: int) -> List[str]:
+    """Split one paragraph at line boundaries, closing and reopening code blocks it is split inside.
+    
+    The first piece is at most first_limit characters, the others at most limit.
+    """
+    if len(paragraph) <= limit:
+        return [paragraph]
+    
+    pieces = []
+    lines = []
+    size = 0
+    fence = None  # Opening line of the code block open after `lines`
+    
+    # Lines at most half the limit leave room for the fence lines around them
+    for line in _fit_lines(paragraph.split("\n"), limit // 2):
+        fence_after = fence
+        if line.count(FENCE) % 2:
+            fence_after = None if fence else line.strip()
+        closing = len(FENCE) + 1 if fence_after else 0
+        
+        if lines and size + 1 + len(line) + closing > (limit if pieces else first_limit):
+            pieces.append("\n".join(lines + [FENCE] if fence else lines))
+            lines = [fence] if fence else []
+            size = len(fence) if fence else 0
+        
+        size += len(line) + (1 if lines else 0)
+        lines.append(line)
+        fence = fence_after
+    
+    if lines:
+        pieces.append("\n".join(lines))
+    return pieces
+
+
+def _fit_lines(lines: List[str], width: int) -> Iterator[str]:
+    """Yield lines, breaking any longer than width between words, or anywhere if a word is too long."""
+    for line in lines:
+        while len(line) > width:
+            cut = line.rfind(" ", 0, width + 1)
+            if cut <= 0:
+                cut = width
+            yield line[:cut].rstrip()
+            line = line[cut:].lstrip()
+        yield line
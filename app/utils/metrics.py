@@ -0,0 +1,716 @@
+import bisect
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import weakref
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets (a +Inf bucket is implied)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Quantiles reported next to each histogram on /metrics
+REPORTED_QUANTILES = (0.5, 0.95, 0.99)
+
+# Prometheus text exposition format served by /metrics
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds between writes of a process's metrics to the shared metrics directory
+DEFAULT_SHARE_INTERVAL = 5.0
+
+_current_trace = contextvars.ContextVar('trace', default=None)
+
+
+class _ThreadToken:
+    """Kept in a thread's local storage; collected when the thread exits."""
+    
+    __slots__ = ('__weakref__',)
+
+
+class _Sharded:
+    """Per-thread shards of a metric's state.
+    
+    Each thread updates only its own shard, so updates take no lock and a
+    scrape, which adds the shards up, never blocks a request thread. When a
+    thread exits, its shard is folded into a base total, so totals never go
+    down and a server that starts a thread per request keeps one shard per
+    live thread, not one per thread it ever ran.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = {}  # id -> shard of each live thread
+        self._base = self._new_shard()
+        self._lock = threading.Lock()
+    
+    def _shard(self):
+        """Get the calling thread's shard, creating it on first use."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+            token = _ThreadToken()
+            with self._lock:
+                self._shards[id(shard)] = shard
+            # The thread's local storage, and so the token, is dropped when it exits
+            weakref.finalize(token, self._retire, shard)
+            self._local.token = token
+            self._local.shard = shard
+            return shard
+    
+    def _retire(self, shard):
+        """Fold an exited thread's shard into the base total."""
+        with self._lock:
+            self._merge(self._base, shard)
+            del self._shards[id(shard)]
+    
+    def _all_shards(self) -> list:
+        """Get a copy of the base total and every live thread's shard."""
+        with self._lock:
+            base = self._new_shard()
+            self._merge(base, self._base)
+            return [base] + list(self._shards.values())
+    
+    def _new_shard(self):
+        """Build an empty shard."""
+        raise NotImplementedError
+    
+    def _merge(self, total, shard):
+        """Add a shard into a total in place."""
+        raise NotImplementedError
+
+
+class Histogram(_Sharded):
+    """Fixed-bucket latency histogram, cheap to update from many threads."""
+    
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+        
+        Args:
+            bounds: Increasing bucket upper bounds in seconds
+        """
+        self.bounds = tuple(bounds)
+        super().__init__()
+    
+    def _new_shard(self) -> list:
+        """A count per bucket (the last for values above every bound), then the sum."""
+        return [0] * (len(self.bounds) + 1) + [0.0]
+    
+    def _merge(self, total: list, shard: list):
+        for index, value in enumerate(list(shard)):
+            total[index] += value
+    
+    def observe(self, value: float):
+        """
+        Record one duration.
+        
+        Args:
+            value: Duration in seconds
+        """
+        shard = self._shard()
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+    
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        Add up the histogram's shards.
+        
+        Returns:
+            (count per bucket, last one for values above every bound; sum; count)
+        """
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        for shard in self._all_shards():
+            shard = list(shard)
+            for index in range(len(counts)):
+                counts[index] += shard[index]
+            total += shard[-1]
+        return counts, total, sum(counts)
+    
+    def quantile(self, q: float, counts: Optional[List[int]] = None) -> float:
+        """
+        Estimate a quantile by interpolating within its bucket, like Prometheus' histogram_quantile.
+        
+        Args:
+            q: Quantile between 0 and 1
+            counts: Bucket counts from snapshot() (default: the current counts)
+        
+        Returns:
+            Estimated duration in seconds (0.0 for an empty histogram)
+        """
+        if counts is None:
+            counts = self.snapshot()[0]
+        return _quantile(self.bounds, counts, q)
+
+
+def _quantile(bounds: Sequence[float], counts: Sequence[int], q: float) -> float:
+    """Estimate a quantile from bucket counts (see Histogram.quantile)."""
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index == len(bounds):
+                # Above the last bound there is nothing to interpolate against
+                return bounds[-1]
+            lower = bounds[index - 1] if index > 0 else 0.0
+            return lower + (bounds[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+
+class Span:
+    """Times one stage of a request; use as a context manager."""
+    
+    __slots__ = ('name', 'histogram', 'started_at')
+    
+    def __init__(self, name: str, histogram: Histogram):
+        self.name = name
+        self.histogram = histogram
+    
+    def __enter__(self):
+        self.started_at = perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = perf_counter() - self.started_at
+        self.histogram.observe(elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.name, elapsed))
+        return False
+
+
+class Trace:
+    """Collects the spans of one request and logs them as a single line when it ends.
+    
+    The line is logfmt, e.g. ``trace=slack_events pid=4242 total_ms=1.902
+    verify_signature_ms=0.087 dispatch_ms=0.311``; a stage timed more than
+    once reports its total. The pid tells gunicorn workers' lines apart. The
+    trace's own duration is recorded under its name as well.
+    """
+    
+    __slots__ = ('name', 'registry', 'spans', 'started_at', '_token')
+    
+    def __init__(self, name: str, registry: 'MetricsRegistry'):
+        self.name = name
+        self.registry = registry
+        self.spans = []
+    
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        self.started_at = perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = perf_counter() - self.started_at
+        _current_trace.reset(self._token)
+        self.registry.histogram(self.name).observe(elapsed)
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s", self.format(elapsed))
+        return False
+    
+    def format(self, elapsed: float) -> str:
+        """Build the logfmt line for the trace."""
+        stages = {}
+        for name, duration in self.spans:
+            stages[name] = stages.get(name, 0.0) + duration
+        
+        fields = [f"trace={self.name}", f"pid={os.getpid()}", f"total_ms={elapsed * 1000:.3f}"]
+        fields.extend(f"{name}_ms={duration * 1000:.3f}" for name, duration in stages.items())
+        return ' '.join(fields)
+
+
+class Counter(_Sharded):
+    """Monotonic counter, optionally split by label values."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize a counter at zero.
+        
+        Args:
+            name: Metric name without the registry namespace, e.g. 'errors_total'
+            documentation: HELP text
+            labelnames: Names of the labels each increment is split by
+        """
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def _new_shard(self) -> dict:
+        return {}
+    
+    def _merge(self, total: dict, shard: dict):
+        for labelvalues, value in shard.copy().items():
+            total[labelvalues] = total.get(labelvalues, 0) + value
+    
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """
+        Add to the counter.
+        
+        Args:
+            *labelvalues: A value for each of the counter's labels, in order
+            amount: Non-negative amount to add
+        
+        Raises:
+            ValueError: If the number of label values is wrong or amount is negative
+        """
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"Counter {self.name} takes {len(self.labelnames)} label values")
+        
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+    
+    def values(self) -> Dict[tuple, float]:
+        """
+        Add up the counter's shards.
+        
+        Returns:
+            dict: Total per tuple of label values
+        """
+        totals = {}
+        for shard in self._all_shards():
+            for labelvalues, value in shard.copy().items():
+                totals[labelvalues] = totals.get(labelvalues, 0) + value
+        return totals
+
+
+class MetricsRegistry:
+    """Named latency histograms and counters, exported in the Prometheus text format."""
+    
+    def __init__(self, namespace: str = "slackbot"):
+        """
+        Initialize an empty registry.
+        
+        Args:
+            namespace: Prefix of the exported metric names
+        """
+        self.namespace = namespace
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+    
+    def histogram(self, name: str) -> Histogram:
+        """
+        Get the histogram of a stage, creating it on first use.
+        
+        Args:
+            name: Stage name
+        
+        Returns:
+            The stage's histogram
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        Get a counter, creating it on first use.
+        
+        Args:
+            name: Metric name without the namespace, e.g. 'errors_total'
+            documentation: HELP text
+            labelnames: Names of the counter's labels
+        
+        Returns:
+            The counter
+        """
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter(name, documentation, labelnames))
+        return counter
+    
+    def span(self, name: str) -> Span:
+        """
+        Time a stage.
+        
+        Args:
+            name: Stage name, e.g. 'openai_request'
+        
+        Returns:
+            Context manager recording the stage's duration
+        """
+        return Span(name, self.histogram(name))
+    
+    def trace(self, name: str) -> Trace:
+        """
+        Time a request and log the breakdown of the spans inside it.
+        
+        Args:
+            name: Request name, e.g. 'slack_events'
+        
+        Returns:
+            Context manager collecting the spans entered within it
+        """
+        return Trace(name, self)
+    
+    def reset(self):
+        """Drop every histogram and counter."""
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+    
+    def snapshot(self) -> dict:
+        """
+        Get the current value of every histogram and counter.
+        
+        Returns:
+            dict: JSON-serialisable values, as taken by render_snapshot() and
+            merge_snapshots()
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        
+        result = {'histograms': {}, 'counters': {}}
+        for stage, histogram in histograms:
+            counts, total, _ = histogram.snapshot()
+            result['histograms'][stage] = {'bounds': list(histogram.bounds), 'counts': counts, 'sum': total}
+        for counter_name, counter in counters:
+            result['counters'][counter_name] = {
+                'documentation': counter.documentation,
+                'labelnames': list(counter.labelnames),
+                'values': [[list(labelvalues), value] for labelvalues, value in counter.values().items()]
+            }
+        return result
+    
+    def render(self, gauges: Iterable[tuple] = ()) -> str:
+        """
+        Export the metrics in the Prometheus text format.
+        
+        Args:
+            gauges: (name, HELP text, value) of point-in-time values to
+                include, such as queue depths, or (name, HELP text, value,
+                labels) for one series of a labelled gauge
+        
+        Returns:
+            str: Metrics text for a /metrics response
+        """
+        return self.render_snapshot(self.snapshot(), gauges)
+    
+    def render_snapshot(self, snapshot: dict, gauges: Iterable[tuple] = ()) -> str:
+        """
+        Export metrics from snapshot() in the Prometheus text format.
+        
+        Each stage has a <namespace>_stage_duration_seconds histogram series,
+        and its p50/p95/p99 estimated from the buckets as
+        <namespace>_stage_duration_quantile_seconds gauges.
+        
+        Args:
+            snapshot: Values from snapshot() or merge_snapshots()
+            gauges: (name, HELP text, value) of point-in-time values to
+                include, such as queue depths, or (name, HELP text, value,
+                labels) for one series of a labelled gauge
+        
+        Returns:
+            str: Metrics text for a /metrics response
+        """
+        name = f"{self.namespace}_stage_duration_seconds"
+        quantile_name = f"{self.namespace}_stage_duration_quantile_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each stage of handling a request.",
+            f"# TYPE {name} histogram"
+        ]
+        quantile_lines = [
+            f"# HELP {quantile_name} Stage duration quantiles estimated from the histogram buckets.",
+            f"# TYPE {quantile_name} gauge"
+        ]
+        
+        for stage, histogram in sorted(snapshot['histograms'].items()):
+            bounds, counts = histogram['bounds'], histogram['counts']
+            count = sum(counts)
+            label = _escape_label(stage)
+            
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{label}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{stage="{label}"}} {count}')
+            
+            for q in REPORTED_QUANTILES:
+                quantile_lines.append(
+                    f'{quantile_name}{{stage="{label}",quantile="{q}"}} {_quantile(bounds, counts, q)}'
+                )
+        
+        lines.extend(quantile_lines)
+        
+        for counter_name, counter in sorted(snapshot['counters'].items()):
+            name = f"{self.namespace}_{counter_name}"
+            lines.append(f"# HELP {name} {counter['documentation']}")
+            lines.append(f"# TYPE {name} counter")
+            for labelvalues, value in sorted((tuple(labels), value) for labels, value in counter['values']):
+                lines.append(f"{name}{_labels(counter['labelnames'], labelvalues)} {value}")
+        
+        # Series of a labelled gauge share one HELP and TYPE
+        series = {}
+        for gauge_name, documentation, value, *labels in gauges:
+            series.setdefault(gauge_name, (documentation, []))[1].append((labels[0] if labels else {}, value))
+        
+        for gauge_name, (documentation, values) in series.items():
+            name = f"{self.namespace}_{gauge_name}"
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values:
+                lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {value}")
+        
+        return '\n'.join(lines) + '\n'
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """
+    Add up registry snapshots, e.g. of several worker processes.
+    
+    Histogram buckets and sums and counter values with the same labels are
+    added; a histogram whose bounds differ from the first one seen is skipped.
+    
+    Args:
+        snapshots: Values from MetricsRegistry.snapshot()
+    
+    Returns:
+        dict: The totals, in the same form
+    """
+    histograms = {}
+    counters = {}
+    for snapshot in snapshots:
+        for stage, histogram in snapshot.get('histograms', {}).items():
+            merged = histograms.setdefault(stage, {'bounds': list(histogram['bounds']),
+                                                   'counts': [0] * len(histogram['counts']), 'sum': 0.0})
+            if merged['bounds'] != list(histogram['bounds']):
+                logger.warning("Skipping %s histogram with different bucket bounds", stage)
+                continue
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], histogram['counts'])]
+            merged['sum'] += histogram['sum']
+        for counter_name, counter in snapshot.get('counters', {}).items():
+            merged = counters.setdefault(counter_name, {'documentation': counter['documentation'],
+                                                        'labelnames': list(counter['labelnames']), 'values': {}})
+            for labels, value in counter['values']:
+                merged['values'][tuple(labels)] = merged['values'].get(tuple(labels), 0) + value
+    
+    for counter in counters.values():
+        counter['values'] = [[list(labels), value] for labels, value in counter['values'].items()]
+    return {'histograms': histograms, 'counters': counters}
+
+
+class SharedMetrics:
+    """Metrics of every process sharing a directory, e.g. the gunicorn workers of one server.
+    
+    Each process's registry only sees the requests that process handled, and
+    a scrape reaches whichever worker accepts the connection. So each process
+    writes its snapshot and gauges to <directory>/metrics-<pid>.json every
+    interval seconds and before answering a scrape, and a scrape adds up every
+    file. Counters and histograms of workers that have exited are kept, so
+    totals never go down; gauges only count live workers.
+    """
+    
+    def __init__(self, directory: str, registry: Optional['MetricsRegistry'] = None,
+                 gauges: Optional[Callable[[], Iterable[tuple]]] = None,
+                 interval: float = DEFAULT_SHARE_INTERVAL):
+        """
+        Initialize sharing through a directory.
+        
+        Args:
+            directory: Directory shared by the processes, created if missing
+            registry: Registry to share (default: the app's)
+            gauges: Returns this process's gauges, as taken by MetricsRegistry.render
+            interval: Seconds between writes of this process's metrics
+        """
+        if interval <= 0:
+            raise ValueError("Metrics share interval must be positive")
+        self.directory = directory
+        self.registry = registry if registry is not None else METRICS
+        self.gauges = gauges or (lambda: ())
+        self.interval = interval
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def start(self):
+        """Start writing this process's metrics in the background; again after a fork."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._run, name="metrics-share", daemon=True).start()
+    
+    def stop(self):
+        """Stop the background writes."""
+        self._stop.set()
+    
+    def _run(self):
+        """Write this process's metrics until stopped."""
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning("Failed to share metrics: %s", e)
+    
+    def _path(self, pid: int) -> str:
+        """Get a process's metrics file."""
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+    
+    def write(self):
+        """Write this process's current metrics, replacing its file at once."""
+        state = dict(self.registry.snapshot(), gauges=[list(gauge) for gauge in self.gauges()])
+        path = self._path(os.getpid())
+        with self._write_lock:
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(state, f)
+            os.replace(f"{path}.tmp", path)
+    
+    def collect(self) -> List[Tuple[int, dict]]:
+        """
+        Read every process's metrics.
+        
+        Returns:
+            (pid, state) of each file in the directory
+        """
+        states = []
+        for path in sorted(glob.glob(os.path.join(self.directory, 'metrics-*.json'))):
+            try:
+                pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+                with open(path) as f:
+                    states.append((pid, json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable metrics file %s: %s", path, e)
+        return states
+    
+    def render(self) -> str:
+        """
+        Export every process's metrics added up, in the Prometheus text format.
+        
+        Returns:
+            str: Metrics text for a /metrics response
+        """
+        self.start()
+        self.write()
+        
+        snapshots = []
+        gauges = {}
+        for pid, state in self.collect():
+            snapshots.append(state)
+            if not _is_alive(pid):
+                continue
+            for name, documentation, value, *labels in state.get('gauges', []):
+                labels = labels[0] if labels else {}
+                series = (name, tuple(sorted(labels.items())))
+                total = gauges.get(series, (documentation, labels, 0))[2]
+                gauges[series] = (documentation, labels, total + value)
+        
+        return self.registry.render_snapshot(
+            merge_snapshots(snapshots),
+            gauges=[(name, documentation, value, labels)
+                    for (name, _), (documentation, labels, value) in gauges.items()]
+        )
+
+
+def clear_shared_metrics(directory: str):
+    """Remove the metrics files left in a directory, e.g. by a previous server run."""
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _is_alive(pid: int) -> bool:
+    """Check whether a process is running."""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labelnames: Sequence[str], labelvalues: Sequence[str]) -> str:
+    """Format a label set, e.g. {service="openai",category="rate_limit"}."""
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label(str(value))}"' for name, value in zip(labelnames, labelvalues))
+    return '{' + pairs + '}'
+
+
+# Registry the app's services and routes record into
+METRICS = MetricsRegistry()
+
+
+def span(name: str) -> Span:
+    """Time a stage in the app's registry (see MetricsRegistry.span)."""
+    return METRICS.span(name)
+
+
+def trace(name: str) -> Trace:
+    """Time a request in the app's registry (see MetricsRegistry.trace)."""
+    return METRICS.trace(name)
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Get a counter in the app's registry (see MetricsRegistry.counter)."""
+    return METRICS.counter(name, documentation, labelnames)
+
+
+def record_request(route: str, status: int):
+    """Count an HTTP request served by the app."""
+    METRICS.counter(
+        'http_requests_total', 'HTTP requests served, by route and status code.', ('route', 'status')
+    ).inc(route, str(status))
+
+
+def record_error(service: str, category: str):
+    """Count a failed OpenAI or Slack API call by the error it was mapped to."""
+    METRICS.counter(
+        'api_errors_total', 'Failed OpenAI and Slack API calls, by service and error category.',
+        ('service', 'category')
+    ).inc(service, category)
+
+
+def record_usage(usage):
+    """
+    Count the tokens of a completion from its usage field.
+    
+    Args:
+        usage: The response's usage (None when the API did not report it)
+    """
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    if not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int):
+        return
+    
+    tokens = METRICS.counter('openai_tokens_total', 'OpenAI tokens used, by prompt or completion.', ('type',))
+    tokens.inc('prompt', amount=prompt_tokens)
+    tokens.inc('completion', amount=completion_tokens)
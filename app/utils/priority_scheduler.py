@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+from app.utils.rate_limiter import RateLimiter
+
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first: live @mentions, ordinary background
+# work, and bulk jobs such as summaries and backfills
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_BULK = 'bulk'
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK)
+
+# Share of the rate limit budget each class gets while all of them are waiting
+DEFAULT_WEIGHTS = {PRIORITY_INTERACTIVE: 8, PRIORITY_NORMAL: 3, PRIORITY_BULK: 1}
+
+# Seconds after which a waiting request goes next, whatever its class
+DEFAULT_MAX_WAIT = 30.0
+
+
+class WeightedClasses:
+    """Chooses which priority class is served next, by weighted fair queuing.
+    
+    Each class's virtual time advances by 1/weight per item it is served,
+    and the waiting class with the lowest virtual time goes next, ties going
+    to the more urgent class. While every class is waiting they are served
+    in proportion to their weights; a class alone is served every time. A
+    class that has waited max_wait seconds goes next whatever its weight, so
+    a low weight is never starved outright.
+    
+    Not thread-safe; callers hold their own lock.
+    """
+    
+    def __init__(self, weights: Optional[Dict[str, float]] = None, max_wait: float = DEFAULT_MAX_WAIT):
+        """
+        Initialize the classes.
+        
+        Args:
+            weights: Weight per priority class (default: DEFAULT_WEIGHTS)
+            max_wait: Seconds after which a waiting class goes next
+        
+        Raises:
+            ValueError: If a class is missing or unknown, a weight is not
+                positive or max_wait is not positive
+        """
+        weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        if set(weights) != set(PRIORITIES):
+            raise ValueError(f"Priority weights must be given for exactly {', '.join(PRIORITIES)}")
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError("Priority weights must be positive")
+        if max_wait <= 0:
+            raise ValueError("Maximum wait must be positive")
+        
+        self.weights = weights
+        self.max_wait = max_wait
+        self._virtual_times = {priority: 0.0 for priority in PRIORITIES}
+        self._virtual_time = 0.0
+    
+    def activate(self, priority: str):
+        """Note that a class with nothing waiting has something again; it gets no credit for the time it had not."""
+        self._virtual_times[priority] = max(self._virtual_times[priority], self._virtual_time)
+    
+    def pick(self, waiting_since: Dict[str, float], now: float) -> Tuple[str, bool]:
+        """
+        Choose the class to serve next.
+        
+        Args:
+            waiting_since: For each class with something waiting, since when
+                it has been waiting to be served
+            now: Current time on the same clock
+        
+        Returns:
+            (class, whether it goes next for having waited max_wait)
+        """
+        waiting = [priority for priority in PRIORITIES if priority in waiting_since]
+        oldest = min(waiting, key=waiting_since.get)
+        promoted = now - waiting_since[oldest] >= self.max_wait
+        priority = oldest if promoted else min(waiting, key=self._virtual_times.get)
+        
+        self._virtual_time = self._virtual_times[priority]
+        self._virtual_times[priority] += 1.0 / self.weights[priority]
+        return priority, promoted
+
+
+class ClassQueue(queue.Queue):
+    """Queue with a FIFO per priority class, served by weighted fair queuing between them.
+    
+    Items are put as (priority, item) pairs and get returns the item; see
+    WeightedClasses for the order classes are served in. A class's wait
+    runs from when it was last served or, if it had nothing queued, from its
+    first item's put. A None item (a shutdown sentinel) is served once every
+    other item has been.
+    """
+    
+    def __init__(self, maxsize: int = 0, weights: Optional[Dict[str, float]] = None,
+                 max_wait: float = DEFAULT_MAX_WAIT, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the queue.
+        
+        Args:
+            maxsize: Maximum number of items queued in total (0 = unbounded)
+            weights: Weight per priority class (default: DEFAULT_WEIGHTS)
+            max_wait: Seconds after which a waiting class goes next
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.classes = WeightedClasses(weights, max_wait)
+        self.clock = clock
+        super().__init__(maxsize)
+    
+    def _init(self, maxsize: int):
+        self._lanes = {priority: deque() for priority in PRIORITIES}
+        self._waiting_since = {}
+        self._sentinels = deque()
+    
+    def _qsize(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values()) + len(self._sentinels)
+    
+    def _put(self, entry):
+        if entry is None:
+            self._sentinels.append(None)
+            return
+        
+        priority, item = entry
+        lane = self._lanes.get(priority)
+        if lane is None:
+            raise ValueError(f"Invalid priority: {priority}")
+        if not lane:
+            self.classes.activate(priority)
+            self._waiting_since[priority] = self.clock()
+        lane.append(item)
+    
+    def _get(self):
+        if not self._waiting_since:
+            return self._sentinels.popleft()
+        
+        now = self.clock()
+        priority, _ = self.classes.pick(self._waiting_since, now)
+        lane = self._lanes[priority]
+        item = lane.popleft()
+        if lane:
+            self._waiting_since[priority] = now
+        else:
+            del self._waiting_since[priority]
+        return item
+
+
+class _Ticket:
+    """A request waiting for its turn; granted is set for a coroutine waiting on it."""
+    
+    __slots__ = ('priority', 'enqueued_at', 'granted')
+    
+    def __init__(self, priority: str, enqueued_at: float, granted: Optional[asyncio.Future] = None):
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.granted = granted
+
+
+class PriorityScheduler:
+    """Share a rate limiter's budget between priority classes.
+    
+    Requests wait in one FIFO queue per class and take turns reserving
+    budget from the rate limiter. A turn lasts until the budget covers the
+    request, so at most one request is ever waiting inside the limiter and a
+    request that arrives meanwhile is not queued behind everything before it.
+    
+    The class to go next is chosen by weighted fair queuing (see
+    WeightedClasses): while every class is busy they get the budget in
+    proportion to their weights, and a class alone gets all of it. A request
+    that has waited max_wait seconds goes next whatever its class.
+    
+    Threads wait with acquire and coroutines with acquire_async; both take
+    turns in the same queues.
+    """
+    
+    def __init__(self, rate_limiter: RateLimiter, weights: Optional[Dict[str, float]] = None,
+                 max_wait: float = DEFAULT_MAX_WAIT, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            rate_limiter: Limiter whose budget is shared
+            weights: Weight per priority class (default: DEFAULT_WEIGHTS)
+            max_wait: Seconds after which a waiting request goes next
+            clock: Monotonic clock (injectable for tests)
+        
+        Raises:
+            ValueError: If a class is missing or unknown, a weight is not
+                positive or max_wait is not positive
+        """
+        self.classes = WeightedClasses(weights, max_wait)
+        self.rate_limiter = rate_limiter
+        self.weights = self.classes.weights
+        self.max_wait = max_wait
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._turn = None
+        self._stats = {priority: {'requests': 0, 'promoted': 0, 'wait_seconds': 0.0} for priority in PRIORITIES}
+    
+    def acquire(self, tokens: int = 0, priority: str = PRIORITY_NORMAL) -> float:
+        """
+        Wait for this request's turn, then until the rate limiter's budget covers it.
+        
+        Args:
+            tokens: Estimated tokens the request uses (prompt plus max_tokens)
+            priority: Priority class of the request
+        
+        Returns:
+            Seconds waited
+        
+        Raises:
+            ValueError: If priority is unknown
+        """
+        ticket = self._enqueue(priority)
+        with self._cond:
+            while self._turn is not ticket:
+                self._cond.wait()
+        
+        try:
+            self.rate_limiter.acquire(tokens)
+        finally:
+            waited = self._release(ticket)
+        return waited
+    
+    async def acquire_async(self, tokens: int = 0, priority: str = PRIORITY_NORMAL) -> float:
+        """
+        Wait on the event loop for this request's turn, then until the rate limiter's budget covers it.
+        
+        Args:
+            tokens: Estimated tokens the request uses (prompt plus max_tokens)
+            priority: Priority class of the request
+        
+        Returns:
+            Seconds waited
+        
+        Raises:
+            ValueError: If priority is unknown
+        """
+        ticket = self._enqueue(priority, asyncio.get_running_loop().create_future())
+        try:
+            await ticket.granted
+            await self.rate_limiter.acquire_async(tokens)
+        finally:
+            # Also on cancellation, which may come before or after the turn
+            waited = self._release(ticket)
+        return waited
+    
+    def _enqueue(self, priority: str, granted: Optional[asyncio.Future] = None) -> _Ticket:
+        """Queue a request for its turn."""
+        if priority not in self._queues:
+            raise ValueError(f"Invalid priority: {priority}")
+        
+        ticket = _Ticket(priority, self.clock(), granted)
+        with self._cond:
+            queue = self._queues[priority]
+            if not queue:
+                self.classes.activate(priority)
+            queue.append(ticket)
+            self._grant_next()
+        return ticket
+    
+    def _release(self, ticket: _Ticket) -> float:
+        """End a request's turn, or take it out of its queue if its turn never came, and return its wait."""
+        with self._cond:
+            waited = self.clock() - ticket.enqueued_at
+            if self._turn is ticket:
+                self._stats[ticket.priority]['wait_seconds'] += waited
+                self._turn = None
+                self._grant_next()
+            else:
+                self._queues[ticket.priority].remove(ticket)
+        return waited
+    
+    def _grant_next(self):
+        """Give the turn to the next request if it is free. Called with the lock held."""
+        if self._turn is not None:
+            return
+        
+        waiting = [priority for priority in PRIORITIES if self._queues[priority]]
+        if not waiting:
+            return
+        
+        now = self.clock()
+        priority, promoted = self.classes.pick(
+            {priority: self._queues[priority][0].enqueued_at for priority in waiting}, now
+        )
+        if promoted:
+            self._stats[priority]['promoted'] += 1
+            logger.debug("Promoting a %s request that waited %.1fs", priority,
+                         now - self._queues[priority][0].enqueued_at)
+        
+        self._stats[priority]['requests'] += 1
+        self._turn = self._queues[priority].popleft()
+        if self._turn.granted is not None:
+            self._turn.granted.get_loop().call_soon_threadsafe(_grant, self._turn.granted)
+        self._cond.notify_all()
+    
+    def stats(self) -> dict:
+        """
+        Get scheduler metrics.
+        
+        Returns:
+            dict: Per priority class, its weight, requests let through, how
+                many went first for having waited max_wait, requests waiting
+                now and seconds waited in total
+        """
+        with self._cond:
+            return {
+                priority: {
+                    'weight': self.weights[priority],
+                    'requests': self._stats[priority]['requests'],
+                    'promoted': self._stats[priority]['promoted'],
+                    'queued': len(self._queues[priority]),
+                    'wait_seconds': round(self._stats[priority]['wait_seconds'], 3)
+                }
+                for priority in PRIORITIES
+            }
+
+
+def _grant(granted: asyncio.Future):
+    """Wake a coroutine whose turn has come, unless it was cancelled meanwhile."""
+    if not granted.done():
+        granted.set_result(None)
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Token bucket refilled at a per-minute limit.
+    
+    Reservations may overdraw the bucket; a negative level is the debt that
+    earlier callers are still waiting out, so later callers queue behind them.
+    A limit of 0 means the limit is unknown and nothing is held back.
+    """
+    
+    def __init__(self, per_minute: float, burst_seconds: float, now: float):
+        self.level = 0.0
+        self.updated_at = now
+        self.set_limit(per_minute, burst_seconds)
+        self.level = self.capacity
+    
+    def set_limit(self, per_minute: float, burst_seconds: float):
+        """Change the limit, keeping the level within the new capacity."""
+        self.limit = per_minute
+        self.rate = per_minute / 60.0
+        # Always room for one unit, so a tiny limit still lets requests through
+        self.capacity = max(self.rate * burst_seconds, 1.0) if per_minute > 0 else 0.0
+        self.level = min(self.level, self.capacity)
+    
+    def refill(self, now: float):
+        """Add what has accrued since the last update."""
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def reserve(self, amount: float) -> float:
+        """Take an amount from the bucket and return the seconds until it is paid off."""
+        if self.limit <= 0:
+            return 0.0
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+
+class RateLimiter:
+    """Client-side limiter for requests and tokens per minute.
+    
+    Each request reserves one request and its estimated tokens, then waits
+    until both budgets cover it, so a burst is queued and spread out rather
+    than sent into a 429. Reservations are served in arrival order.
+    
+    The limits start at the configured values and follow the
+    x-ratelimit-limit-* response headers once they are seen. The
+    x-ratelimit-remaining-* headers lower the budgets when other clients of
+    the same organisation have used them up.
+    """
+    
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 burst_seconds: float = 10.0, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            requests_per_minute: Request limit (0 if unknown until a response header gives it)
+            tokens_per_minute: Token limit (0 if unknown until a response header gives it)
+            burst_seconds: Seconds of each limit that may be sent back to back
+            clock: Monotonic clock (injectable for tests)
+            sleep: Sleep function for sync callers (injectable for tests)
+        
+        Raises:
+            ValueError: If a limit is negative or burst_seconds is not positive
+        """
+        if requests_per_minute < 0 or tokens_per_minute < 0:
+            raise ValueError("Rate limits cannot be negative")
+        if burst_seconds <= 0:
+            raise ValueError("Burst window must be positive")
+        
+        self.burst_seconds = burst_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        now = clock()
+        self._requests = _Bucket(requests_per_minute, burst_seconds, now)
+        self._tokens = _Bucket(tokens_per_minute, burst_seconds, now)
+        self._acquired = 0
+        self._throttled = 0
+        self._wait_seconds = 0.0
+    
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve budget for one request without waiting.
+        
+        Args:
+            tokens: Estimated tokens the request uses (prompt plus max_tokens)
+        
+        Returns:
+            Seconds to wait before sending the request
+        """
+        with self._lock:
+            now = self.clock()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            delay = max(self._requests.reserve(1), self._tokens.reserve(tokens))
+            
+            self._acquired += 1
+            if delay > 0:
+                self._throttled += 1
+                self._wait_seconds += delay
+        
+        if delay > 0:
+            logger.debug("Rate limiter holding an OpenAI request for %.2fs", delay)
+        return delay
+    
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Wait until the budgets cover one request.
+        
+        Args:
+            tokens: Estimated tokens the request uses (prompt plus max_tokens)
+        
+        Returns:
+            Seconds waited
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+    
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Wait on the event loop until the budgets cover one request.
+        
+        Args:
+            tokens: Estimated tokens the request uses (prompt plus max_tokens)
+        
+        Returns:
+            Seconds waited
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+    
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """
+        Learn the limits and remaining budgets from OpenAI response headers.
+        
+        Args:
+            headers: Response headers (case-insensitive mapping), of a
+                successful or a failed request
+        """
+        if not headers:
+            return
+        
+        with self._lock:
+            now = self.clock()
+            for name, bucket in (('requests', self._requests), ('tokens', self._tokens)):
+                limit = _header_number(headers, f'x-ratelimit-limit-{name}')
+                if limit is not None and limit > 0 and limit != bucket.limit:
+                    logger.info("OpenAI %s per minute limit is %d", name, limit)
+                    bucket.refill(now)
+                    was_unknown = bucket.limit <= 0
+                    bucket.set_limit(limit, self.burst_seconds)
+                    if was_unknown:
+                        bucket.level = bucket.capacity
+                
+                remaining = _header_number(headers, f'x-ratelimit-remaining-{name}')
+                if remaining is not None and bucket.limit > 0:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, remaining)
+    
+    def stats(self) -> dict:
+        """
+        Get rate limiter metrics.
+        
+        Returns:
+            dict: Requests let through, how many had to wait, seconds waited
+                and the current limits (0 when unknown)
+        """
+        with self._lock:
+            return {
+                'requests': self._acquired,
+                'throttled': self._throttled,
+                'wait_seconds': round(self._wait_seconds, 3),
+                'requests_per_minute': int(self._requests.limit),
+                'tokens_per_minute': int(self._tokens.limit)
+            }
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    """Read a numeric header, or None if it is missing or malformed."""
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class ResponseCacheBackend(ABC):
+    """Storage interface for cached completions."""
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response that has not expired.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The cached response, or None if missing or expired
+        """
+    
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: float):
+        """
+        Store a response.
+        
+        Args:
+            key: Cache key
+            value: Response text
+            ttl: Seconds the response stays valid
+        """
+
+
+class InMemoryResponseBackend(ResponseCacheBackend):
+    """Bounded in-process LRU of responses with per-entry expiry."""
+    
+    def __init__(self, max_entries: int = 1000):
+        """
+        Initialize the in-memory backend.
+        
+        Args:
+            max_entries: Maximum number of responses kept; least recently used are evicted first
+        
+        Raises:
+            ValueError: If max_entries is less than 1
+        """
+        if max_entries < 1:
+            raise ValueError("Response cache size must be at least 1")
+        
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires at)
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response that has not expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def set(self, key: str, value: str, ttl: float):
+        """Store a response."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SqliteResponseBackend(ResponseCacheBackend):
+    """Responses stored in a SQLite file so they survive restarts."""
+    
+    def __init__(self, path: str, max_entries: int = 1000):
+        """
+        Initialize the SQLite backend, creating the table if needed.
+        
+        Args:
+            path: Database file path (':memory:' for a private in-memory database)
+            max_entries: Maximum number of responses kept; least recently used are evicted first
+        
+        Raises:
+            ValueError: If max_entries is less than 1
+        """
+        if max_entries < 1:
+            raise ValueError("Response cache size must be at least 1")
+        
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_last_used ON response_cache (last_used)"
+            )
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response that has not expired."""
+        now = time.time()
+        
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                return None
+            
+            self._conn.execute("UPDATE response_cache SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+    
+    def set(self, key: str, value: str, ttl: float):
+        """Store a response."""
+        now = time.time()
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Cache of completions for repeated identical prompts."""
+    
+    def __init__(self, backend: Optional[ResponseCacheBackend] = None, ttl: float = 3600.0):
+        """
+        Initialize the response cache.
+        
+        Args:
+            backend: Storage for responses (default: InMemoryResponseBackend)
+            ttl: Seconds a response is reused for
+        """
+        self.backend = backend if backend is not None else InMemoryResponseBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stored = 0
+        self._stored_latency = 0.0
+    
+    @staticmethod
+    def make_key(messages: List[dict], model: str, **params) -> str:
+        """
+        Build the cache key for a request.
+        
+        Message text is case-folded and its whitespace collapsed, so trivially
+        different phrasings of the same prompt share an entry.
+        
+        Args:
+            messages: Formatted chat messages
+            model: Model name
+            **params: Other request parameters that change the response
+        
+        Returns:
+            str: Hex digest identifying the request
+        """
+        normalised = [
+            [message.get('role'), ' '.join((message.get('content') or '').casefold().split())]
+            for message in messages
+        ]
+        payload = json.dumps([model, normalised, sorted(params.items())], separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response and count the lookup.
+        
+        Args:
+            key: Cache key from make_key
+        
+        Returns:
+            The cached response, or None on a miss
+        """
+        value = self.backend.get(key)
+        
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        
+        return value
+    
+    def put(self, key: str, value: str, latency: float = 0.0):
+        """
+        Store a response.
+        
+        Args:
+            key: Cache key from make_key
+            value: Response text
+            latency: Seconds the API call took, used to estimate time saved by hits
+        """
+        self.backend.set(key, value, self.ttl)
+        
+        with self._lock:
+            self._stored += 1
+            self._stored_latency += latency
+    
+    def stats(self) -> dict:
+        """
+        Get cache metrics.
+        
+        Returns:
+            dict: Hits, misses, hit ratio and the estimated seconds saved by hits
+                (hits times the mean latency of the calls that filled the cache)
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            mean_latency = self._stored_latency / self._stored if self._stored else 0.0
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'mean_miss_latency': round(mean_latency, 4),
+                'saved_seconds': round(self._hits * mean_latency, 3)
+            }
@@ -0,0 +1,256 @@
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import threading
+import time
+from typing import Callable, Mapping, Optional
+import openai
+
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: rate limits, server errors and dropped connections
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError  # Includes APITimeoutError
+)
+
+# Durations in x-ratelimit-reset-* headers, e.g. "20ms", "1s", "6m0s", "1h2m3.5s"
+_DURATION_PART_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a rate limit reset duration such as "6m0s" or "250ms".
+    
+    Args:
+        value: Duration text
+    
+    Returns:
+        Seconds, or None if the text is not a duration
+    """
+    value = (value or '').strip()
+    parts = _DURATION_PART_PATTERN.findall(value)
+    if not parts or ''.join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after(headers: Optional[Mapping[str, str]], now: Optional[float] = None) -> Optional[float]:
+    """
+    Read how long the server asked us to wait from response headers.
+    
+    Retry-After-Ms and Retry-After (seconds or an HTTP date) are used first.
+    Otherwise the x-ratelimit-reset-* header of each exhausted limit (its
+    x-ratelimit-remaining-* is 0) is used, taking the longest.
+    
+    Args:
+        headers: Response headers (case-insensitive mapping)
+        now: Current epoch time, for Retry-After dates (default: time.time())
+    
+    Returns:
+        Seconds to wait, or None if the headers give no hint
+    """
+    if not headers:
+        return None
+    
+    try:
+        if headers.get('retry-after-ms') is not None:
+            return max(float(headers['retry-after-ms']) / 1000, 0.0)
+    except ValueError:
+        pass
+    
+    value = headers.get('retry-after')
+    if value is not None:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            parsed = email.utils.parsedate_tz(value)
+            if parsed is not None:
+                now = time.time() if now is None else now
+                return max(email.utils.mktime_tz(parsed) - now, 0.0)
+    
+    resets = []
+    for limit in ('requests', 'tokens'):
+        if headers.get(f'x-ratelimit-remaining-{limit}') == '0':
+            reset = parse_duration(headers.get(f'x-ratelimit-reset-{limit}'))
+            if reset is not None:
+                resets.append(reset)
+    
+    return max(resets) if resets else None
+
+
+class RetryPolicy:
+    """Retry OpenAI calls that failed with a transient error.
+    
+    Waits follow the server's Retry-After / x-ratelimit-reset-* hint when
+    there is one, and exponential backoff with full jitter otherwise. A call
+    gives up after max_retries retries, or when the next wait would pass the
+    overall deadline; the last error is then raised unchanged.
+    """
+    
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 deadline: float = 60.0, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep, jitter: Callable[[], float] = random.random):
+        """
+        Initialize the retry policy.
+        
+        Args:
+            max_retries: Retries after the first attempt (0 disables retrying)
+            base_delay: Backoff ceiling in seconds before the first retry; doubles per retry
+            max_delay: Longest backoff ceiling in seconds
+            deadline: Seconds from the first attempt after which no retry is started
+            clock: Monotonic clock (injectable for tests)
+            sleep: Sleep function for sync calls (injectable for tests)
+            jitter: Returns a float in [0, 1) scaling each backoff
+        
+        Raises:
+            ValueError: If max_retries is negative
+        """
+        if max_retries < 0:
+            raise ValueError("Retry count cannot be negative")
+        
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.clock = clock
+        self.sleep = sleep
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._retries = 0
+        self._give_ups = 0
+        self._wait_seconds = 0.0
+    
+    def call(self, function: Callable, *args, **kwargs):
+        """
+        Call a function, retrying transient OpenAI errors.
+        
+        Args:
+            function: Function making the API request
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
+        
+        Returns:
+            The function's return value
+        
+        Raises:
+            Exception: The last error, once retrying is given up or if it is not retryable
+        """
+        started_at = self._start()
+        retries = 0
+        
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(e, retries, started_at)
+                if delay is None:
+                    raise
+            
+            retries += 1
+            self.sleep(delay)
+    
+    async def call_async(self, function: Callable, *args, **kwargs):
+        """
+        Await a coroutine function, retrying transient OpenAI errors.
+        
+        Args:
+            function: Coroutine function making the API request
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
+        
+        Returns:
+            The awaited return value
+        
+        Raises:
+            Exception: The last error, once retrying is given up or if it is not retryable
+        """
+        started_at = self._start()
+        retries = 0
+        
+        while True:
+            try:
+                return await function(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(e, retries, started_at)
+                if delay is None:
+                    raise
+            
+            retries += 1
+            await asyncio.sleep(delay)
+    
+    def backoff(self, retries: int) -> float:
+        """
+        Get a full-jitter backoff delay.
+        
+        Args:
+            retries: Retries already made
+        
+        Returns:
+            Seconds to wait, uniformly drawn from [0, min(max_delay, base_delay * 2 ** retries))
+        """
+        return self.jitter() * min(self.max_delay, self.base_delay * 2 ** retries)
+    
+    def stats(self) -> dict:
+        """
+        Get retry metrics.
+        
+        Returns:
+            dict: Calls, retries made, calls given up on and seconds spent waiting
+        """
+        with self._lock:
+            return {
+                'calls': self._calls,
+                'retries': self._retries,
+                'give_ups': self._give_ups,
+                'wait_seconds': round(self._wait_seconds, 3)
+            }
+    
+    def _start(self) -> float:
+        """Count a call and return its start time."""
+        with self._lock:
+            self._calls += 1
+        return self.clock()
+    
+    def _next_delay(self, error: Exception, retries: int, started_at: float) -> Optional[float]:
+        """
+        Decide whether to retry after an error.
+        
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if not self._is_retryable(error):
+            return None
+        
+        response = getattr(error, 'response', None)
+        delay = retry_after(getattr(response, 'headers', None))
+        if delay is None:
+            delay = self.backoff(retries)
+        
+        elapsed = self.clock() - started_at
+        if retries >= self.max_retries or elapsed + delay > self.deadline:
+            with self._lock:
+                self._give_ups += 1
+            logger.warning("Giving up on OpenAI request after %d retries (%.1fs): %s", retries, elapsed, error)
+            return None
+        
+        with self._lock:
+            self._retries += 1
+            self._wait_seconds += delay
+        logger.info("Retrying OpenAI request in %.2fs after %s", delay, type(error).__name__)
+        return delay
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Check whether an error is transient."""
+        if not isinstance(error, RETRYABLE_ERRORS):
+            return False
+        
+        # A used-up quota is a 429 too, but waiting will not fix it
+        return getattr(error, 'code', None) != 'insufficient_quota'
@@ -0,0 +1,338 @@
+import hashlib
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional - only needed for the semantic cache
+    np = None
+
+
+# Storage types for index vectors: int8 quarters float32 memory, float16 halves it
+INDEX_DTYPES = ('float16', 'int8')
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def _require_numpy():
+    """Raise a clear error when numpy is not installed."""
+    if np is None:
+        raise RuntimeError("numpy is required for the semantic cache - pip install numpy")
+
+
+def _normalise(vectors):
+    """Scale each row to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Embedder(ABC):
+    """Turns texts into unit-length embedding vectors, a batch at a time."""
+    
+    dim = 0
+    
+    @abstractmethod
+    def embed(self, texts: Sequence[str]):
+        """
+        Embed a batch of texts.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows
+        """
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic offline embedder hashing words and word pairs into a fixed-size vector.
+    
+    It only matches reworded questions that share most of their words, but it
+    needs no network access, which makes it suitable for tests and benchmarks.
+    """
+    
+    def __init__(self, dim: int = 256):
+        """
+        Initialize the embedder.
+        
+        Args:
+            dim: Vector dimension
+        """
+        _require_numpy()
+        self.dim = dim
+    
+    def embed(self, texts: Sequence[str]):
+        """Embed a batch of texts."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        
+        for row, text in enumerate(texts):
+            words = _WORD_PATTERN.findall(text.casefold())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        
+        return _normalise(vectors)
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI Embeddings API, requested in batches."""
+    
+    def __init__(self, client, model: str = "text-embedding-3-small", dim: int = 256, batch_size: int = 256,
+                 retry_policy=None):
+        """
+        Initialize the embedder.
+        
+        Args:
+            client: OpenAI client
+            model: Embedding model
+            dim: Vector dimension requested from the API (text-embedding-3 models can shorten vectors)
+            batch_size: Maximum texts per API request
+            retry_policy: Optional RetryPolicy for rate limited requests
+        """
+        _require_numpy()
+        self.client = client
+        self.model = model
+        self.dim = dim
+        self.batch_size = batch_size
+        self.retry_policy = retry_policy
+    
+    def embed(self, texts: Sequence[str]):
+        """Embed a batch of texts."""
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            request = {
+                'model': self.model,
+                'input': list(texts[start:start + self.batch_size]),
+                'dimensions': self.dim
+            }
+            if self.retry_policy is None:
+                response = self.client.embeddings.create(**request)
+            else:
+                response = self.retry_policy.call(self.client.embeddings.create, **request)
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        
+        return _normalise(np.asarray(rows, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+class VectorIndex(ABC):
+    """Fixed-capacity nearest-neighbour index over unit vectors, addressed by slot.
+    
+    Implement this with an ANN library (e.g. FAISS or hnswlib) when brute
+    force search is too slow for the number of cached entries.
+    """
+    
+    capacity = 0
+    
+    @abstractmethod
+    def add(self, vectors) -> List[int]:
+        """
+        Add vectors, overwriting the oldest slots once the index is full.
+        
+        Args:
+            vectors: Array of shape (n, dim) with unit-length rows
+        
+        Returns:
+            The slot each vector was stored in
+        """
+    
+    @abstractmethod
+    def search(self, query, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Find the most similar stored vectors.
+        
+        Args:
+            query: Unit-length vector
+            k: Number of neighbours
+        
+        Returns:
+            (slot, cosine similarity) pairs, most similar first
+        """
+
+
+class BruteForceIndex(VectorIndex):
+    """Exact search over a compact NumPy array of vectors, used as a ring buffer."""
+    
+    def __init__(self, dim: int, capacity: int = 10000, dtype: str = 'int8', block_size: int = 4096):
+        """
+        Initialize the index.
+        
+        Args:
+            dim: Vector dimension
+            capacity: Maximum number of vectors
+            dtype: Storage type - 'int8' (scaled by 127, fastest to score) or 'float16'
+            block_size: Rows scored at a time; blocks are converted to float32 for
+                scoring, so this bounds temporary memory and keeps it in cache
+        
+        Raises:
+            ValueError: If capacity is less than 1 or dtype is unknown
+        """
+        _require_numpy()
+        
+        if capacity < 1:
+            raise ValueError("Semantic cache size must be at least 1")
+        
+        if dtype not in INDEX_DTYPES:
+            raise ValueError(f"Invalid index dtype: {dtype}")
+        
+        self.dim = dim
+        self.capacity = capacity
+        self.dtype = dtype
+        self.block_size = block_size
+        self._scale = 127.0 if dtype == 'int8' else 1.0
+        self._vectors = np.zeros((capacity, dim), dtype=np.int8 if dtype == 'int8' else np.float16)
+        self._size = 0
+        self._next = 0
+    
+    def add(self, vectors) -> List[int]:
+        """Add vectors, overwriting the oldest slots once the index is full."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dtype == 'int8':
+            vectors = np.clip(np.rint(vectors * self._scale), -127, 127)
+        
+        slots = (self._next + np.arange(len(vectors))) % self.capacity
+        self._vectors[slots] = vectors
+        self._next = int((self._next + len(vectors)) % self.capacity)
+        self._size = min(self._size + len(vectors), self.capacity)
+        return slots.tolist()
+    
+    def search(self, query, k: int = 1) -> List[Tuple[int, float]]:
+        """Find the most similar stored vectors."""
+        if self._size == 0:
+            return []
+        
+        query = np.asarray(query, dtype=np.float32) / self._scale
+        best_slots = []
+        best_scores = []
+        
+        for start in range(0, self._size, self.block_size):
+            block = self._vectors[start:min(start + self.block_size, self._size)]
+            scores = block.astype(np.float32) @ query
+            top = np.argpartition(scores, -k)[-k:] if len(scores) > k else np.arange(len(scores))
+            best_slots.append(top + start)
+            best_scores.append(scores[top])
+        
+        slots = np.concatenate(best_slots)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(scores)[::-1][:k]
+        return [(int(slots[i]), float(scores[i])) for i in order]
+    
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes allocated for stored vectors."""
+        return self._vectors.nbytes
+    
+    def __len__(self) -> int:
+        return self._size
+
+
+class SemanticCache:
+    """Reuse answers to questions whose embeddings are close to a cached question's."""
+    
+    def __init__(self, embedder: Embedder, index: Optional[VectorIndex] = None, threshold: float = 0.92,
+                 ttl: float = 3600.0, capacity: int = 10000, dtype: str = 'int8'):
+        """
+        Initialize the semantic cache.
+        
+        Args:
+            embedder: Embedder for questions
+            index: Vector index (default: BruteForceIndex with the given capacity and dtype)
+            threshold: Minimum cosine similarity for a cached answer to be reused
+            ttl: Seconds an answer is reused for
+            capacity: Maximum cached answers when the default index is used
+            dtype: Vector storage type when the default index is used
+        
+        Raises:
+            RuntimeError: If numpy is not installed
+        """
+        _require_numpy()
+        
+        self.embedder = embedder
+        self.index = index if index is not None else BruteForceIndex(embedder.dim, capacity, dtype)
+        self.threshold = threshold
+        self.ttl = ttl
+        self._responses = [None] * self.index.capacity
+        self._expires_at = np.zeros(self.index.capacity)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def lookup(self, text: str):
+        """
+        Find a cached answer to a similar question.
+        
+        Args:
+            text: Formatted question
+        
+        Returns:
+            (answer or None, the question's embedding) - pass the embedding to store
+            so a miss is not embedded twice
+        """
+        vector = self.embedder.embed([text])[0]
+        now = time.monotonic()
+        
+        with self._lock:
+            # A few neighbours, in case the closest ones have expired
+            for slot, score in self.index.search(vector, k=4):
+                if score < self.threshold:
+                    break
+                if self._expires_at[slot] > now:
+                    self._hits += 1
+                    return self._responses[slot], vector
+            
+            self._misses += 1
+            return None, vector
+    
+    def store(self, text: str, response: str, vector=None):
+        """
+        Cache an answer.
+        
+        Args:
+            text: Formatted question
+            response: Answer text
+            vector: The question's embedding, if already computed
+        """
+        if vector is None:
+            vector = self.embedder.embed([text])[0]
+        self._add(np.asarray(vector).reshape(1, -1), [response])
+    
+    def store_many(self, texts: Sequence[str], responses: Sequence[str]):
+        """
+        Cache several answers, embedding the questions in one batch (e.g. to preload FAQs).
+        
+        Args:
+            texts: Formatted questions
+            responses: Answer for each question
+        """
+        if texts:
+            self._add(self.embedder.embed(texts), list(responses))
+    
+    def _add(self, vectors, responses: List[str]):
+        """Add embedded questions and their answers to the index."""
+        expires_at = time.monotonic() + self.ttl
+        
+        with self._lock:
+            for slot, response in zip(self.index.add(vectors), responses):
+                self._responses[slot] = response
+                self._expires_at[slot] = expires_at
+    
+    def stats(self) -> dict:
+        """
+        Get cache metrics.
+        
+        Returns:
+            dict: Hits, misses, hit ratio, cached entries and index memory in bytes
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self.index),
+                'memory_bytes': getattr(self.index, 'memory_bytes', None)
+            }
@@ -0,0 +1,495 @@
+import asyncio
+import collections
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, List, Optional
+from slack_sdk.errors import SlackApiError
+from app.utils.rate_limiter import RateLimiter
+
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying a rate limited send whose response has no Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class _Send:
+    """A queued API call and the future that receives its result.
+    
+    Sends submitted together by submit_all share a batch, and a failing one
+    cancels the rest of its batch.
+    """
+    
+    __slots__ = ('function', 'args', 'kwargs', 'future', 'batch')
+    
+    def __init__(self, function: Callable, args: tuple, kwargs: dict, batch: Optional[object] = None):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.batch = batch
+
+
+class _Channel:
+    """Pending sends of one channel and when the next may go out."""
+    
+    __slots__ = ('pending', 'next_send_at', 'busy')
+    
+    def __init__(self):
+        self.pending = collections.deque()
+        self.next_send_at = 0.0
+        self.busy = False
+
+
+class ChannelSendQueue:
+    """Send Slack messages through a FIFO per channel, paced to Slack's rate limits.
+    
+    Slack allows chat.postMessage about once per second per channel, within a
+    workspace-wide budget. Each channel's sends go out in submission order,
+    at least channel_interval apart, and all of them share a RateLimiter for
+    the workspace budget. A send rejected with rate_limited goes back to the
+    head of its channel's queue and is retried after the response's
+    Retry-After, so replies are delayed but never dropped.
+    
+    Sends run on a few sender threads, started on first submit; a channel is
+    only sent to by one of them at a time, so a busy channel does not hold
+    up the others.
+    """
+    
+    def __init__(self, channel_interval: float = 1.0, sends_per_minute: float = 100,
+                 num_senders: int = 4, name: str = "slack-send"):
+        """
+        Initialize the send queue.
+        
+        Args:
+            channel_interval: Minimum seconds between sends to one channel
+            sends_per_minute: Workspace-wide send budget (0 for no limit)
+            num_senders: Number of sender threads
+            name: Prefix for sender thread names
+        
+        Raises:
+            ValueError: If channel_interval is negative or num_senders is less than 1
+        """
+        if channel_interval < 0:
+            raise ValueError("Channel send interval cannot be negative")
+        
+        if num_senders < 1:
+            raise ValueError("Sender count must be at least 1")
+        
+        self.channel_interval = channel_interval
+        self.num_senders = num_senders
+        self.name = name
+        self.limiter = RateLimiter(requests_per_minute=sends_per_minute, burst_seconds=1.0)
+        
+        self._condition = threading.Condition()
+        self._channels = {}
+        self._senders = []
+        self._closed = False
+        self._abandoned = False  # close() timed out; queued sends are failed, not sent
+        
+        # Metrics
+        self._queued = 0
+        self._sent = 0
+        self._failed = 0
+        self._rate_limited = 0
+    
+    def submit(self, channel: str, function: Callable, /, *args, **kwargs) -> Future:
+        """
+        Queue an API call for a channel without blocking.
+        
+        Args:
+            channel: Channel the call sends to
+            function: Callable making the API call
+            *args: Positional arguments for function
+            **kwargs: Keyword arguments for function
+        
+        Returns:
+            Future with the call's return value or exception
+        
+        Raises:
+            RuntimeError: If the queue has been closed
+        """
+        return self._enqueue(channel, [_Send(function, args, kwargs)])[0]
+    
+    def submit_all(self, channel: str, function: Callable, calls: List[dict]) -> List[Future]:
+        """
+        Queue several API calls for a channel, to be sent in order, without blocking.
+        
+        If one of them fails, the ones after it are not sent and their
+        futures are cancelled.
+        
+        Args:
+            channel: Channel the calls send to
+            function: Callable making each API call
+            calls: Keyword arguments for each call, in the order to send them
+        
+        Returns:
+            list: A future per call with its return value or exception
+        
+        Raises:
+            RuntimeError: If the queue has been closed
+        """
+        batch = object()
+        return self._enqueue(channel, [_Send(function, (), kwargs, batch) for kwargs in calls])
+    
+    def call(self, channel: str, function: Callable, /, *args, **kwargs):
+        """
+        Queue an API call for a channel and wait for its result.
+        
+        Args:
+            channel: Channel the call sends to
+            function: Callable making the API call
+            *args: Positional arguments for function
+            **kwargs: Keyword arguments for function
+        
+        Returns:
+            The call's return value
+        
+        Raises:
+            Exception: Whatever the call raised, other than rate limiting
+        """
+        return self.submit(channel, function, *args, **kwargs).result()
+    
+    def _enqueue(self, channel: str, sends: List[_Send]) -> List[Future]:
+        """Add sends to the back of a channel's queue."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Send queue is closed")
+            
+            self._start_senders()
+            state = self._channels.get(channel)
+            if state is None:
+                state = self._channels[channel] = _Channel()
+            state.pending.extend(sends)
+            self._queued += len(sends)
+            self._condition.notify()
+        
+        return [send.future for send in sends]
+    
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop accepting sends and wait for the queued ones to go out.
+        
+        Sends still queued when the timeout passes are not sent; their
+        futures fail with RuntimeError, so no caller waits on them forever.
+        
+        Args:
+            timeout: Seconds to wait in total (None waits until done)
+        """
+        with self._condition:
+            self._closed = True
+            senders = list(self._senders)
+            self._condition.notify_all()
+        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for sender in senders:
+            sender.join(max(deadline - time.monotonic(), 0.0) if deadline is not None else None)
+        
+        with self._condition:
+            self._abandoned = True
+            unsent = [send for state in self._channels.values() for send in state.pending]
+            for state in self._channels.values():
+                state.pending.clear()
+            self._queued -= len(unsent)
+            self._condition.notify_all()
+        
+        if unsent:
+            logger.warning("Send queue closed with %d sends not sent", len(unsent))
+        for send in unsent:
+            send.future.set_exception(RuntimeError("Send queue closed"))
+    
+    def stats(self) -> dict:
+        """
+        Get send queue metrics.
+        
+        Returns:
+            dict: Queued sends, channels with queued sends, sends made, failed
+                and retried after rate limiting
+        """
+        with self._condition:
+            return {
+                'queued': self._queued,
+                'channels': sum(1 for state in self._channels.values() if state.pending),
+                'sent': self._sent,
+                'failed': self._failed,
+                'rate_limited': self._rate_limited
+            }
+    
+    def _start_senders(self):
+        """Start the sender threads if they are not already running. Call with the lock held."""
+        if self._senders:
+            return
+        
+        for index in range(self.num_senders):
+            sender = threading.Thread(target=self._run_sender, name=f"{self.name}-{index}", daemon=True)
+            sender.start()
+            self._senders.append(sender)
+    
+    def _run_sender(self):
+        """Send queued calls until the queue is closed and empty."""
+        while True:
+            with self._condition:
+                while True:
+                    channel, wait = self._next_ready()
+                    if channel is not None:
+                        break
+                    if wait is None and self._closed:
+                        return
+                    self._condition.wait(wait)
+                
+                state = self._channels[channel]
+                send = state.pending.popleft()
+                state.busy = True
+                self._queued -= 1
+            
+            self.limiter.acquire()
+            self._send(channel, state, send)
+    
+    def _next_ready(self):
+        """
+        Find the channel to send to next. Call with the lock held.
+        
+        Returns:
+            (channel, None) for a channel that may send now, otherwise
+            (None, seconds until one may) or (None, None) if nothing is queued
+        """
+        now = time.monotonic()
+        wait = None
+        
+        for channel, state in list(self._channels.items()):
+            if state.busy:
+                continue
+            if not state.pending:
+                # Idle channels are forgotten once their interval has passed
+                if state.next_send_at <= now:
+                    del self._channels[channel]
+                continue
+            if state.next_send_at <= now:
+                # Move to the back so busy channels take turns
+                del self._channels[channel]
+                self._channels[channel] = state
+                return channel, None
+            wait = min(wait, state.next_send_at - now) if wait is not None else state.next_send_at - now
+        
+        return None, wait
+    
+    def _send(self, channel: str, state: _Channel, send: _Send):
+        """Make one call, requeueing it at the head of its channel if it was rate limited."""
+        started_at = time.monotonic()
+        result = error = None
+        
+        try:
+            result = send.function(*send.args, **send.kwargs)
+        except SlackApiError as e:
+            if _is_rate_limited(e):
+                delay = _retry_after(e.response)
+                with self._condition:
+                    # Once close() has given up, a rate limited send fails instead of waiting
+                    if not self._abandoned:
+                        logger.warning("Slack rate limited sends to %s - retrying in %.1fs", channel, delay)
+                        state.pending.appendleft(send)
+                        state.next_send_at = time.monotonic() + delay
+                        state.busy = False
+                        self._queued += 1
+                        self._rate_limited += 1
+                        self._condition.notify_all()
+                        return
+            error = e
+        except Exception as e:
+            error = e
+        
+        cancelled = []
+        with self._condition:
+            state.next_send_at = started_at + self.channel_interval
+            state.busy = False
+            if error is None:
+                self._sent += 1
+            else:
+                self._failed += 1
+                if send.batch is not None:
+                    # The rest of the batch must not go out after a gap in it
+                    cancelled = [queued for queued in state.pending if queued.batch is send.batch]
+                    state.pending = collections.deque(
+                        queued for queued in state.pending if queued.batch is not send.batch
+                    )
+                    self._queued -= len(cancelled)
+            self._condition.notify_all()
+        
+        if error is None:
+            send.future.set_result(result)
+        else:
+            send.future.set_exception(error)
+        for queued in cancelled:
+            queued.future.cancel()
+
+
+class _AsyncChannel:
+    """Lock held while a channel is sent to, and when it may next be."""
+    
+    __slots__ = ('lock', 'next_send_at', 'waiting')
+    
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.next_send_at = 0.0
+        self.waiting = 0
+
+
+class AsyncChannelSendQueue:
+    """asyncio counterpart of ChannelSendQueue, for AsyncSlackService.
+    
+    Each channel is sent to by one coroutine at a time, in the order they
+    called, at least channel_interval apart, and all channels share a
+    RateLimiter for the workspace budget. A send rejected with rate_limited
+    is retried after the response's Retry-After while the channel is held,
+    so replies are delayed but never dropped. Waiting holds no thread.
+    """
+    
+    def __init__(self, channel_interval: float = 1.0, sends_per_minute: float = 100):
+        """
+        Initialize the send queue.
+        
+        Args:
+            channel_interval: Minimum seconds between sends to one channel
+            sends_per_minute: Workspace-wide send budget (0 for no limit)
+        
+        Raises:
+            ValueError: If channel_interval is negative
+        """
+        if channel_interval < 0:
+            raise ValueError("Channel send interval cannot be negative")
+        
+        self.channel_interval = channel_interval
+        self.limiter = RateLimiter(requests_per_minute=sends_per_minute, burst_seconds=1.0)
+        self._channels = {}
+        
+        # Metrics
+        self._queued = 0
+        self._sent = 0
+        self._failed = 0
+        self._rate_limited = 0
+    
+    async def call(self, channel: str, function: Callable[..., Awaitable], /, *args, **kwargs):
+        """
+        Make an API call in turn with the channel's other sends.
+        
+        Args:
+            channel: Channel the call sends to
+            function: Coroutine function making the API call
+            *args: Positional arguments for function
+            **kwargs: Keyword arguments for function
+        
+        Returns:
+            The call's return value
+        
+        Raises:
+            Exception: Whatever the call raised, other than rate limiting
+        """
+        return (await self.call_all(channel, functools.partial(function, *args), [kwargs]))[0]
+    
+    async def call_all(self, channel: str, function: Callable[..., Awaitable], calls: List[dict]) -> list:
+        """
+        Make several API calls to one channel back to back, with no other send in between.
+        
+        Args:
+            channel: Channel the calls send to
+            function: Coroutine function making each API call
+            calls: Keyword arguments for each call, in the order to send them
+        
+        Returns:
+            list: The calls' return values
+        
+        Raises:
+            Exception: Whatever the first failing call raised, other than
+                rate limiting; the calls after it are not made
+        """
+        state = self._channel(channel)
+        state.waiting += 1
+        self._queued += len(calls)
+        unsent = len(calls)
+        
+        try:
+            async with state.lock:
+                results = []
+                for kwargs in calls:
+                    self._queued -= 1
+                    unsent -= 1
+                    results.append(await self._send(channel, state, function, kwargs))
+                return results
+        finally:
+            state.waiting -= 1
+            self._queued -= unsent
+    
+    def stats(self) -> dict:
+        """
+        Get send queue metrics.
+        
+        Returns:
+            dict: Queued sends, channels with queued sends, sends made, failed
+                and retried after rate limiting
+        """
+        return {
+            'queued': self._queued,
+            'channels': sum(1 for state in self._channels.values() if state.waiting),
+            'sent': self._sent,
+            'failed': self._failed,
+            'rate_limited': self._rate_limited
+        }
+    
+    def _channel(self, channel: str) -> _AsyncChannel:
+        """Get a channel's state, forgetting idle channels whose interval has passed."""
+        state = self._channels.get(channel)
+        if state is None:
+            now = time.monotonic()
+            for idle in [name for name, idle_state in self._channels.items()
+                         if not idle_state.waiting and idle_state.next_send_at <= now]:
+                del self._channels[idle]
+            state = self._channels[channel] = _AsyncChannel()
+        return state
+    
+    async def _send(self, channel: str, state: _AsyncChannel, function: Callable[..., Awaitable], kwargs: dict):
+        """Make one call once the channel may send, retrying it after Retry-After while rate limited."""
+        while True:
+            delay = state.next_send_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.limiter.acquire_async()
+            
+            started_at = time.monotonic()
+            try:
+                result = await function(**kwargs)
+            except SlackApiError as e:
+                if _is_rate_limited(e):
+                    delay = _retry_after(e.response)
+                    logger.warning("Slack rate limited sends to %s - retrying in %.1fs", channel, delay)
+                    state.next_send_at = time.monotonic() + delay
+                    self._rate_limited += 1
+                    continue
+                state.next_send_at = started_at + self.channel_interval
+                self._failed += 1
+                raise
+            except Exception:
+                state.next_send_at = started_at + self.channel_interval
+                self._failed += 1
+                raise
+            
+            state.next_send_at = started_at + self.channel_interval
+            self._sent += 1
+            return result
+
+
+def _is_rate_limited(error: SlackApiError) -> bool:
+    """Whether a Slack API error is a rate_limited (429) response."""
+    return error.response.get("error") == "rate_limited" or getattr(error.response, 'status_code', None) == 429
+
+
+def _retry_after(response) -> float:
+    """Read the Retry-After seconds of a rate limited Slack response."""
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
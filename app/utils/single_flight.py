@@ -0,0 +1,137 @@
+import asyncio
+import threading
+from typing import Callable, Hashable, Tuple
+
+
+class _Call:
+    """An in-flight call that other callers with the same key wait on."""
+    
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one.
+    
+    The first caller for a key runs the call; callers arriving while it is
+    in flight wait and get its result (or its exception) instead of making
+    their own. Nothing is kept once the call finishes, so later callers run
+    it again - caching answers is the response cache's job.
+    """
+    
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+        self._leaders = 0
+        self._coalesced = 0
+    
+    def do(self, key: Hashable, function: Callable, *args, **kwargs) -> Tuple[object, bool]:
+        """
+        Run a call, or wait for the identical call already in flight.
+        
+        Args:
+            key: Identifies calls that may share a result
+            function: Callable making the call
+            *args: Positional arguments for function
+            **kwargs: Keyword arguments for function
+        
+        Returns:
+            (the call's return value, whether it was shared from another caller's call)
+        
+        Raises:
+            Exception: Whatever the call raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        
+        return call.result, False
+    
+    async def do_async(self, key: Hashable, function: Callable, *args, **kwargs) -> Tuple[object, bool]:
+        """
+        Await a coroutine function, or wait for the identical call already in flight.
+        
+        Args:
+            key: Identifies calls that may share a result
+            function: Coroutine function making the call
+            *args: Positional arguments for function
+            **kwargs: Keyword arguments for function
+        
+        Returns:
+            (the awaited return value, whether it was shared from another caller's call)
+        
+        Raises:
+            Exception: Whatever the call raised
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._futures[key] = asyncio.get_running_loop().create_future()
+                self._leaders += 1
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+        
+        if not leader:
+            # A waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(future), True
+        
+        try:
+            result = await function(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved, so an unshared error is not logged as unhandled
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._futures[key]
+        
+        return result, False
+    
+    def stats(self) -> dict:
+        """
+        Get coalescing metrics.
+        
+        Returns:
+            dict: Calls made, calls that shared another's result, and calls in flight
+        """
+        with self._lock:
+            return {
+                'calls': self._leaders,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls) + len(self._futures)
+            }
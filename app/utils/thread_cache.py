@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+# Rough per-message bookkeeping cost on top of the text itself
+MESSAGE_OVERHEAD_BYTES = 128
+
+
+def message_size(message: dict) -> int:
+    """
+    Estimate the memory cost of a cached message.
+    
+    Args:
+        message: Slack message dict
+    
+    Returns:
+        int: Approximate size in bytes
+    """
+    return len((message.get('text') or '').encode('utf-8')) + MESSAGE_OVERHEAD_BYTES
+
+
+def compact_message(message: dict, is_bot: Optional[bool] = None) -> dict:
+    """
+    Keep only the fields of a Slack message that are needed to rebuild a conversation.
+    
+    Args:
+        message: Slack message or event dict
+        is_bot: Whether the message came from a bot (default: it has a bot_id)
+    
+    Returns:
+        dict: Message with 'ts', 'user', 'text' and 'is_bot'
+    """
+    return {
+        'ts': message.get('ts'),
+        'user': message.get('user'),
+        'text': message.get('text') or '',
+        'is_bot': bool(message.get('bot_id')) if is_bot is None else is_bot
+    }
+
+
+class ThreadHistoryCache:
+    """LRU cache of Slack thread messages keyed by (channel, thread_ts), bounded by total bytes.
+    
+    Entries expire after ttl seconds so that replies the bot never received
+    an event for are picked up by the next fetch.
+    """
+    
+    def __init__(self, max_bytes: int = 5 * 1024 * 1024, ttl: float = 300.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_bytes: Maximum approximate bytes of cached messages
+            ttl: Seconds a cached thread is trusted before it is fetched again
+        
+        Raises:
+            ValueError: If max_bytes is less than 1
+        """
+        if max_bytes < 1:
+            raise ValueError("Thread cache size must be at least 1 byte")
+        
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._threads = OrderedDict()  # key -> (messages, size in bytes, expiry time)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def get(self, channel: str, thread_ts: str) -> Optional[List[dict]]:
+        """
+        Get the cached messages of a thread.
+        
+        Args:
+            channel: Channel ID
+            thread_ts: Timestamp of the thread's parent message
+        
+        Returns:
+            Copy of the cached messages in posting order, or None on a miss
+        """
+        key = (channel, thread_ts)
+        
+        with self._lock:
+            entry = self._threads.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            self._hits += 1
+            self._threads.move_to_end(key)
+            return list(entry[0])
+    
+    def put(self, channel: str, thread_ts: str, messages: List[dict]):
+        """
+        Cache the full message list of a thread, replacing any cached copy.
+        
+        Args:
+            channel: Channel ID
+            thread_ts: Timestamp of the thread's parent message
+            messages: Thread messages in posting order
+        """
+        key = (channel, thread_ts)
+        messages = list(messages)
+        size = sum(message_size(message) for message in messages)
+        
+        with self._lock:
+            self._remove(key)
+            
+            # A thread larger than the whole cache is not worth keeping
+            if size > self.max_bytes:
+                return
+            
+            self._threads[key] = (messages, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            self._evict()
+    
+    def append(self, channel: str, thread_ts: str, message: dict) -> bool:
+        """
+        Add a new message to a cached thread.
+        
+        Threads that are not cached are left alone; the next get is a miss
+        and the full history is fetched then.
+        
+        Args:
+            channel: Channel ID
+            thread_ts: Timestamp of the thread's parent message
+            message: Slack message dict (must have a 'ts')
+        
+        Returns:
+            bool: True if the message was added to a cached thread
+        """
+        key = (channel, thread_ts)
+        
+        with self._lock:
+            entry = self._threads.get(key)
+            if entry is None:
+                return False
+            
+            messages, size, expires_at = entry
+            if any(cached.get('ts') == message.get('ts') for cached in messages):
+                return False
+            
+            messages.append(message)
+            added = message_size(message)
+            self._threads[key] = (messages, size + added, expires_at)
+            self._bytes += added
+            self._threads.move_to_end(key)
+            self._evict()
+            return True
+    
+    def update_text(self, channel: str, thread_ts: str, ts: str, text: str) -> bool:
+        """
+        Replace the text of a cached message (e.g. after chat.update).
+        
+        Args:
+            channel: Channel ID
+            thread_ts: Timestamp of the thread's parent message
+            ts: Timestamp of the message to update
+            text: New message text
+        
+        Returns:
+            bool: True if the cached message was found and updated
+        """
+        key = (channel, thread_ts)
+        
+        with self._lock:
+            entry = self._threads.get(key)
+            if entry is None:
+                return False
+            
+            messages, size, expires_at = entry
+            for index, cached in enumerate(messages):
+                if cached.get('ts') == ts:
+                    updated = dict(cached, text=text)
+                    delta = message_size(updated) - message_size(cached)
+                    messages[index] = updated
+                    self._threads[key] = (messages, size + delta, expires_at)
+                    self._bytes += delta
+                    self._evict()
+                    return True
+            
+            return False
+    
+    def stats(self) -> dict:
+        """
+        Get cache metrics.
+        
+        Returns:
+            dict: Hits, misses, hit rate, evictions, cached threads and bytes
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'threads': len(self._threads),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+    
+    def _remove(self, key: Tuple[str, str]):
+        """Drop a thread from the cache. Caller must hold the lock."""
+        entry = self._threads.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+    
+    def _evict(self):
+        """Evict least recently used threads until under the byte bound. Caller must hold the lock."""
+        while self._bytes > self.max_bytes and self._threads:
+            _, (_, size, _) = self._threads.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
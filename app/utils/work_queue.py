@@ -0,0 +1,255 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional, Sequence
+from app.utils.fair_queue import FairQueue
+from app.utils.priority_scheduler import PRIORITY_NORMAL, ClassQueue
+
+
+logger = logging.getLogger(__name__)
+
+
+class WorkQueue:
+    """Bounded in-process work queue served by a fixed pool of worker threads.
+    
+    Jobs are submitted with a priority class, so a backlog of bulk jobs
+    does not hold up interactive ones: the classes share the workers by
+    weighted fair queuing (see WeightedClasses), and within a class jobs
+    run in arrival order or, with a fair queue, take turns by key.
+    
+    Once shut down the queue stays stopped: later submits are rejected
+    rather than starting a new pool of workers.
+    """
+    
+    def __init__(self, max_size: int = 100, num_workers: int = 4, name: str = "work-queue",
+                 fair_queue: Optional[FairQueue] = None):
+        """
+        Initialize the work queue. Worker threads start on first submit.
+        
+        Args:
+            max_size: Maximum number of jobs waiting to be processed
+            num_workers: Number of worker threads
+            name: Prefix for worker thread names
+            fair_queue: Queue that shares the workers between the keys jobs
+                are submitted with (default: jobs are run in arrival order);
+                its maxsize replaces max_size
+        
+        Raises:
+            ValueError: If max_size or num_workers is less than 1
+        """
+        if fair_queue is not None:
+            max_size = fair_queue.maxsize
+        
+        if max_size < 1:
+            raise ValueError("Work queue size must be at least 1")
+        
+        if num_workers < 1:
+            raise ValueError("Worker count must be at least 1")
+        
+        self.max_size = max_size
+        self.num_workers = num_workers
+        self.name = name
+        self.fair_queue = fair_queue
+        
+        self._queue = fair_queue if fair_queue is not None else ClassQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._workers = []
+        self._stopped = False
+        self._started_at = None
+        
+        # Metrics
+        self._busy_workers = 0
+        self._busy_seconds = 0.0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+    
+    def start(self):
+        """Start the worker threads if they are not already running or shut down."""
+        with self._lock:
+            if self._workers or self._stopped:
+                return
+            
+            self._started_at = time.monotonic()
+            for index in range(self.num_workers):
+                worker = threading.Thread(
+                    target=self._run_worker,
+                    name=f"{self.name}-{index}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+    
+    def submit(self, func: Callable, /, *args, priority: str = PRIORITY_NORMAL, **kwargs) -> bool:
+        """
+        Queue a job without blocking.
+        
+        Args:
+            func: Callable to run on a worker thread
+            *args: Positional arguments for func
+            priority: Priority class of the job (not passed to func)
+            **kwargs: Keyword arguments for func
+        
+        Returns:
+            bool: True if the job was queued, False if the queue is full or shut down
+        
+        Raises:
+            ValueError: If priority is unknown
+        """
+        return self.submit_keyed((), func, *args, priority=priority, **kwargs)
+    
+    def submit_keyed(self, key: Sequence[str], func: Callable, /, *args, priority: str = PRIORITY_NORMAL,
+                     **kwargs) -> bool:
+        """
+        Queue a job for a tenant without blocking.
+        
+        With a fair queue, the key's jobs take turns with other keys' and
+        count against its quotas; otherwise the key is ignored.
+        
+        Args:
+            key: One tenant key per fair queue level, e.g. (channel, user)
+            func: Callable to run on a worker thread
+            *args: Positional arguments for func
+            priority: Priority class of the job (not passed to func)
+            **kwargs: Keyword arguments for func
+        
+        Returns:
+            bool: True if the job was queued, False if the queue is full,
+                shut down, or the key is over its quota
+        
+        Raises:
+            ValueError: If priority is unknown
+        """
+        self.start()
+        
+        with self._lock:
+            if self._stopped:
+                self._rejected += 1
+                return False
+        
+        job = (func, args, kwargs)
+        if self.fair_queue is not None:
+            job = (tuple(key) or (None,) * len(self.fair_queue.key_names), job, priority)
+        else:
+            job = (priority, job)
+        
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+        
+        with self._lock:
+            self._submitted += 1
+        return True
+    
+    def join(self):
+        """Block until every queued job has been processed."""
+        self._queue.join()
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the queued and running jobs to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits until done)
+        
+        Returns:
+            bool: True if every job finished, False if the timeout passed first
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the worker threads after the queued jobs are processed.
+        
+        Never blocks when wait is False, even with the queue full, and the
+        queue cannot be started again afterwards.
+        
+        Args:
+            wait: Whether to wait for the worker threads to exit
+        """
+        with self._lock:
+            self._stopped = True
+            workers = list(self._workers)
+            self._workers = []
+        
+        for _ in workers:
+            self._put_sentinel()
+        
+        if wait:
+            for worker in workers:
+                worker.join()
+    
+    def stats(self) -> dict:
+        """
+        Get queue depth and worker utilisation metrics.
+        
+        Returns:
+            dict: Current queue and worker metrics
+        """
+        with self._lock:
+            busy_seconds = self._busy_seconds
+            uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+            capacity_seconds = uptime * len(self._workers)
+            
+            return {
+                'depth': self._queue.qsize(),
+                'max_size': self.max_size,
+                'workers': len(self._workers),
+                'busy_workers': self._busy_workers,
+                'utilisation': round(busy_seconds / capacity_seconds, 4) if capacity_seconds else 0.0,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected
+            }
+    
+    def _put_sentinel(self):
+        """Queue a worker's shutdown sentinel past maxsize, so shutdown never waits for room."""
+        with self._queue.mutex:
+            self._queue._put(None)
+            self._queue.unfinished_tasks += 1
+            self._queue.not_empty.notify()
+    
+    def _run_worker(self):
+        """Process jobs until a shutdown sentinel is received."""
+        while True:
+            job = self._queue.get()
+            
+            if job is None:
+                self._queue.task_done()
+                return
+            
+            func, args, kwargs = job
+            with self._lock:
+                self._busy_workers += 1
+            started = time.monotonic()
+            failed = True
+            
+            try:
+                func(*args, **kwargs)
+                failed = False
+            except Exception:
+                logger.exception("Work queue job failed")
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self._busy_workers -= 1
+                    self._busy_seconds += elapsed
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+                self._queue.task_done()
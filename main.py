@@ -1 +1,259 @@
-# Empty file - Application entry point will be implemented later 
\ No newline at end of file
+"""
+Application entry point.
+
+With FLASK_ENV=development this runs Flask's debug server. Otherwise (the
+default here, although Config itself defaults to development) the app is
+served by gunicorn with SERVER_WORKERS processes of SERVER_THREADS threads
+each, loaded once before the workers fork when SERVER_PRELOAD is set. On
+SIGTERM every worker stops taking requests and answers the mentions it has
+queued or in flight before it exits, for up to SERVER_DRAIN_SECONDS. The
+workers share their metrics through METRICS_DIR (a temporary directory by
+default), so a /metrics scrape reports all of them.
+
+Without gunicorn installed, production mode falls back to Werkzeug's threaded
+server in a single process, with the same drain on shutdown.
+"""
+
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from app import create_app, get_shared_metrics
+from app.utils.config import Config
+from app.utils.metrics import clear_shared_metrics
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+
+logger = logging.getLogger(__name__)
+
+# Extra seconds gunicorn gives a worker past the drain deadline before killing it
+DRAIN_MARGIN_SECONDS = 5.0
+
+
+def load_app(config):
+    """
+    Create the Flask app and log how long it took.
+    
+    Services, worker threads and health probes start on first use, so a
+    preloaded app forks without any threads running.
+    
+    Args:
+        config: Application configuration
+    
+    Returns:
+        Flask: The application
+    """
+    started = time.perf_counter()
+    app = create_app(config_override=config)
+    logger.info("App loaded in %.1f ms", (time.perf_counter() - started) * 1000)
+    return app
+
+
+def drain_app(app) -> bool:
+    """
+    Answer the mentions an app has queued or in flight before the process exits.
+    
+    Args:
+        app: Flask app from create_app
+    
+    Returns:
+        bool: True if every mention was answered within SERVER_DRAIN_SECONDS
+    """
+    slack_handler = app.config.get('SLACK_HANDLER')
+    if slack_handler is None:
+        return True
+    
+    started = time.perf_counter()
+    drained = slack_handler.drain(slack_handler.config.server_drain_seconds)
+    logger.info("Drained in %.1f ms", (time.perf_counter() - started) * 1000)
+    return drained
+
+
+def resume_app(app):
+    """
+    Start answering mentions a previous process left in the durable job queue.
+    
+    Args:
+        app: Flask app from create_app
+    """
+    slack_handler = app.config.get('SLACK_HANDLER')
+    if slack_handler is not None:
+        slack_handler.resume_jobs()
+
+
+def prepare_metrics_dir(config):
+    """
+    Set up the directory gunicorn workers share their metrics through.
+    
+    Without METRICS_DIR, several workers get a new temporary directory. Files
+    left by a previous run are removed, as their workers are gone.
+    
+    Args:
+        config: Application configuration, whose metrics_dir is filled in
+    """
+    if not config.metrics_dir and config.server_workers > 1:
+        config.metrics_dir = tempfile.mkdtemp(prefix='slackbot-metrics-')
+    if config.metrics_dir:
+        clear_shared_metrics(config.metrics_dir)
+        logger.info("Sharing metrics between workers through %s", config.metrics_dir)
+
+
+def share_metrics(app):
+    """
+    Start writing a worker's metrics for the other workers' scrapes.
+    
+    Args:
+        app: Flask app from create_app
+    """
+    if app.config.get('SLACK_HANDLER') is None:
+        return
+    shared = get_shared_metrics(app)
+    if shared is not None:
+        shared.start()
+
+
+def unshare_metrics(app):
+    """
+    Write a worker's final metrics as it exits, so its counts are kept.
+    
+    Args:
+        app: Flask app from create_app
+    """
+    shared = app.config.get('SHARED_METRICS')
+    if shared is not None:
+        shared.stop()
+        shared.write()
+
+
+def gunicorn_options(config) -> dict:
+    """
+    Build gunicorn settings from the configuration.
+    
+    Args:
+        config: Application configuration
+    
+    Returns:
+        dict: gunicorn setting name to value
+    """
+    def post_worker_init(worker):
+        # Worker threads start after the fork, never in the preloading master
+        resume_app(worker.wsgi)
+        share_metrics(worker.wsgi)
+    
+    def worker_exit(server, worker):
+        # The worker has stopped accepting requests; finish its mentions
+        drain_app(worker.wsgi)
+        unshare_metrics(worker.wsgi)
+    
+    return {
+        'bind': f"0.0.0.0:{config.flask_port}",
+        'workers': config.server_workers,
+        'threads': config.server_threads,
+        'worker_class': 'gthread',
+        'preload_app': config.server_preload,
+        'graceful_timeout': config.server_drain_seconds + DRAIN_MARGIN_SECONDS,
+        'loglevel': config.log_level.lower(),
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit
+    }
+
+
+if BaseApplication is not None:
+    class GunicornServer(BaseApplication):
+        """gunicorn application configured from Config instead of the command line."""
+        
+        def __init__(self, config):
+            self.bot_config = config
+            super().__init__()
+        
+        def load_config(self):
+            for name, value in gunicorn_options(self.bot_config).items():
+                self.cfg.set(name, value)
+        
+        def load(self):
+            # Called once in the master with preload_app, otherwise in each worker
+            return load_app(self.bot_config)
+
+
+def serve(app, server) -> bool:
+    """
+    Serve requests until server.shutdown() is called, then drain.
+    
+    Args:
+        app: Flask app being served
+        server: Werkzeug server from make_server
+    
+    Returns:
+        bool: True if every mention was answered before returning
+    """
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    return drain_app(app)
+
+
+def run_threaded_server(config, started: float) -> int:
+    """Serve from one process with Werkzeug's threaded server until SIGTERM or SIGINT."""
+    from werkzeug.serving import make_server
+    
+    app = load_app(config)
+    resume_app(app)
+    server = make_server('0.0.0.0', config.flask_port, app, threaded=True)
+    
+    def stop(signum, frame):
+        logger.info("Received signal %d, shutting down", signum)
+        # shutdown() blocks until serve_forever returns, so it cannot run on the serving thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    logger.info("Serving on port %d, started in %.1f ms", config.flask_port, (time.perf_counter() - started) * 1000)
+    return 0 if serve(app, server) else 1
+
+
+def main() -> int:
+    """
+    Run the bot.
+    
+    Returns:
+        int: Process exit code
+    """
+    started = time.perf_counter()
+    # The entry point serves production unless development is asked for
+    os.environ.setdefault('FLASK_ENV', 'production')
+    try:
+        config = Config()
+    except Exception as e:
+        print(f"Configuration error: {e}", file=sys.stderr)
+        return 1
+    
+    logging.basicConfig(
+        level=config.log_level.upper(),
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    
+    if config.flask_env == 'development':
+        create_app(config_override=config).run(host='0.0.0.0', port=config.flask_port, debug=True)
+        return 0
+    
+    if BaseApplication is None:
+        logger.warning("gunicorn is not installed - serving from a single process")
+        return run_threaded_server(config, started)
+    
+    prepare_metrics_dir(config)
+    GunicornServer(config).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import re
+import pytest
+
+
+@pytest.fixture
+def long_reply():
+    """Build a model-style answer of about length characters: prose paragraphs and code blocks."""
+    def build(length: int) -> str:
+        parts = []
+        size = 0
+        n = 0
+        while size < length:
+            if n % 3 == 2:
+                part = "```python\n" + "\n".join(f"result_{n}_{i} = compute({i})  # step {i}" for i in range(60)) + "\n```"
+            else:
+                part = f"Paragraph {n}. " + " ".join(f"word{i}" for i in range(150))
+            parts.append(part)
+            size += len(part) + 2
+            n += 1
+        return "\n\n".join(parts)
+    return build
+
+
+@pytest.fixture
+def words():
+    """Text without whitespace or code fences, to compare content across chunks."""
+    def strip(text: str) -> str:
+        return re.sub(r"\s+|```(python)?", "", text)
+    return strip
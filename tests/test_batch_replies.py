@@ -0,0 +1,132 @@
+import json
+import pytest
+from unittest.mock import Mock
+from app.handlers.batch_replies import BatchReplies
+from app.services.openai_service import OpenAIService
+from app.services.slack_service import SlackService
+from app.utils.retry import RetryPolicy
+from tests.test_main import StubUpstream
+from tests.test_retry import server_error
+
+
+class TestBatchReplies:
+    """Test suite for answering messages through a local fake Batch API."""
+    
+    def setup_method(self):
+        """Point the services at a stub that finishes batches on their second status check."""
+        self.upstream = StubUpstream(batch_polls=2)
+        self.openai_service = OpenAIService("sk-test", validation='lazy', base_url=f"{self.upstream.url}/v1")
+        self.slack_service = SlackService("xoxb-test", validation='lazy', base_url=f"{self.upstream.url}/api/")
+        self.replies = BatchReplies(self.openai_service, self.slack_service, poll_interval=0.01)
+    
+    def teardown_method(self):
+        self.upstream.close()
+    
+    def test_answers_are_posted_where_they_were_asked(self):
+        """Test that each answer is posted to its channel and thread, in the order added."""
+        for n in range(5):
+            self.replies.add('C1' if n % 2 else 'C2', f"question {n}", thread_ts=f"1700000000.00000{n}")
+        
+        results = self.replies.run()
+        
+        assert [result['ok'] for result in results] == [True] * 5
+        assert [result['channel'] for result in results] == ['C2', 'C1', 'C2', 'C1', 'C2']
+        posted = self.upstream.posted()
+        assert sorted((params['channel'], params['thread_ts'], params['text']) for params in posted) == sorted(
+            ('C1' if n % 2 else 'C2', f"1700000000.00000{n}", f"answer to question {n}") for n in range(5)
+        )
+        assert [params['text'] for params in posted if params['channel'] == 'C1'] == [
+            "answer to question 1", "answer to question 3"
+        ]
+        assert self.upstream.completions == 5
+        assert self.replies.pending == []
+    
+    def test_requests_are_one_jsonl_upload(self):
+        """Test that the batch input is a JSONL file of chat completion requests."""
+        self.replies.add('C1', "question 0")
+        self.replies.add('C1', [{'role': 'system', 'content': "Be brief."}, {'role': 'user', 'content': "*hi*"}])
+        
+        batch_ids = self.replies.submit()
+        
+        assert batch_ids == ['batch_0']
+        lines = [json.loads(line) for line in self.upstream.files['file-0'].splitlines()]
+        assert [line['custom_id'] for line in lines] == ['0:C1:', '1:C1:']
+        assert all(line['url'] == '/v1/chat/completions' and line['method'] == 'POST' for line in lines)
+        assert lines[1]['body']['messages'] == [{'role': 'system', 'content': "Be brief."},
+                                                {'role': 'user', 'content': "hi"}]
+        assert lines[1]['body']['model'] == 'gpt-4'
+        assert self.upstream.batches['batch_0']['completion_window'] == '24h'
+    
+    def test_large_backlogs_are_split_into_batches(self):
+        """Test that no batch has more than max_requests requests."""
+        replies = BatchReplies(self.openai_service, self.slack_service, max_requests=2, poll_interval=0.01)
+        for n in range(5):
+            replies.add('C1', f"question {n}")
+        
+        results = replies.run()
+        
+        assert len(self.upstream.batches) == 3
+        assert [result['ok'] for result in results] == [True] * 5
+        assert [params['text'] for params in self.upstream.posted()] == [f"answer to question {n}" for n in range(5)]
+    
+    def test_failed_requests_are_reported_not_posted(self):
+        """Test that a request in the batch's error file is returned as an error and nothing is posted for it."""
+        self.replies.add('C1', "question 0")
+        self.replies.add('C1', "fail please")
+        
+        results = self.replies.run()
+        
+        assert results[0]['ok'] is True
+        assert results[1] == {'channel': 'C1', 'ok': False, 'ts': None,
+                              'error': "OpenAI API error: The server had an error"}
+        assert [params['text'] for params in self.upstream.posted()] == ["answer to question 0"]
+    
+    def test_batch_is_delivered_from_its_id_alone(self):
+        """Test that another process can post a batch's answers given its ID."""
+        self.replies.add('C1', "question 0", thread_ts="1700000000.000100")
+        batch_id = self.replies.submit()[0]
+        
+        results = BatchReplies(self.openai_service, self.slack_service, poll_interval=0.01).deliver(batch_id)
+        
+        assert [result['ok'] for result in results] == [True]
+        assert self.upstream.posted()[0]['thread_ts'] == "1700000000.000100"
+    
+    def test_wait_times_out(self):
+        """Test that waiting gives up after the timeout while the batch is still running."""
+        self.upstream.batch_polls = 1000
+        self.replies.timeout = 0.05
+        self.replies.add('C1', "question 0")
+        
+        with pytest.raises(TimeoutError, match="still in_progress"):
+            self.replies.run()
+    
+    def test_failed_batch_raises_error(self):
+        """Test that a batch that failed as a whole raises instead of posting nothing."""
+        openai_service = Mock()
+        openai_service.wait_for_batch.return_value = Mock(status='failed', errors="invalid input file")
+        
+        with pytest.raises(RuntimeError, match="failed: invalid input file"):
+            BatchReplies(openai_service, Mock()).deliver('batch_0')
+    
+    def test_invalid_requests_raise_error(self):
+        """Test that empty batches, repeated IDs and bad sizes are rejected."""
+        with pytest.raises(ValueError, match="at least one request"):
+            self.openai_service.submit_batch([])
+        with pytest.raises(ValueError, match="Duplicate batch request ID: a"):
+            self.openai_service.submit_batch([('a', "hi"), ('a', "hello")])
+        with pytest.raises(ValueError, match="Batch size must be between"):
+            BatchReplies(self.openai_service, self.slack_service, max_requests=0)
+        with pytest.raises(ValueError, match="Channel cannot be empty"):
+            self.replies.add('', "hi")
+    
+    def test_batch_requests_go_through_the_retry_policy(self):
+        """Test that a transient upload failure is retried."""
+        openai_service = OpenAIService("sk-test", validation='lazy', base_url=f"{self.upstream.url}/v1",
+                                       retry_policy=RetryPolicy(max_retries=2, base_delay=0.0))
+        create = Mock(side_effect=[server_error(), Mock(id='file-9')])
+        openai_service.client = Mock()
+        openai_service.client.files.create = create
+        openai_service.client.batches.create.return_value = Mock(id='batch_9')
+        
+        assert openai_service.submit_batch([('a', "hi")]) == 'batch_9'
+        assert create.call_count == 2
@@ -11,7 +11,24 @@ class TestConfig:
         """Clean up environment variables before each test."""
         env_vars = [
             'SLACK_BOT_TOKEN', 'SLACK_SIGNING_SECRET', 'OPENAI_API_KEY',
-            'OPENAI_MODEL', 'FLASK_ENV', 'FLASK_PORT', 'LOG_LEVEL'
+            'OPENAI_MODEL', 'FLASK_ENV', 'FLASK_PORT', 'LOG_LEVEL',
+            'WORKER_COUNT', 'WORK_QUEUE_SIZE', 'DEDUP_TTL_SECONDS', 'DEDUP_MAX_SIZE',
+            'FAIR_QUEUE', 'FAIR_QUEUE_QUANTUM', 'FAIR_QUEUE_MAX_PER_CHANNEL', 'FAIR_QUEUE_MAX_PER_USER',
+            'SERVICE_VALIDATION', 'STREAM_RESPONSES', 'STREAM_UPDATE_INTERVAL',
+            'THREAD_HISTORY_LIMIT', 'THREAD_CACHE_MAX_BYTES', 'THREAD_CACHE_TTL_SECONDS',
+            'OPENAI_MAX_INPUT_TOKENS', 'RESPONSE_CACHE', 'RESPONSE_CACHE_TTL_SECONDS',
+            'RESPONSE_CACHE_MAX_ENTRIES', 'RESPONSE_CACHE_PATH', 'RESPONSE_CACHE_EXCLUDE_CHANNELS',
+            'SEMANTIC_CACHE', 'SEMANTIC_CACHE_THRESHOLD', 'SEMANTIC_CACHE_MAX_ENTRIES',
+            'SEMANTIC_CACHE_DTYPE', 'SEMANTIC_CACHE_EMBEDDING_MODEL',
+            'HTTP_POOL_SIZE', 'HTTP_CONNECT_TIMEOUT', 'HTTP_READ_TIMEOUT', 'HTTP_KEEPALIVE_SECONDS',
+            'OPENAI_MAX_RETRIES', 'OPENAI_RETRY_BASE_DELAY', 'OPENAI_RETRY_MAX_DELAY', 'OPENAI_RETRY_DEADLINE',
+            'OPENAI_REQUESTS_PER_MINUTE', 'OPENAI_TOKENS_PER_MINUTE', 'OPENAI_RATE_LIMIT_BURST_SECONDS',
+            'OPENAI_PRIORITY_SCHEDULING', 'OPENAI_PRIORITY_MAX_WAIT',
+            'SLACK_SEND_QUEUE', 'SLACK_CHANNEL_SEND_INTERVAL', 'SLACK_SENDS_PER_MINUTE', 'SLACK_REPLY_BLOCKS', 'OPENAI_COALESCE_REQUESTS',
+            'HEALTH_PROBE_INTERVAL', 'SERVER_WORKERS', 'SERVER_THREADS', 'SERVER_PRELOAD', 'SERVER_DRAIN_SECONDS',
+            'METRICS_DIR',
+            'OPENAI_BASE_URL', 'SLACK_API_URL', 'JOB_QUEUE', 'JOB_QUEUE_PATH', 'JOB_VISIBILITY_TIMEOUT_SECONDS',
+            'JOB_MAX_ATTEMPTS', 'JOB_FAILED_RETENTION_SECONDS'
         ]
         for var in env_vars:
             if var in os.environ:
@@ -70,9 +87,65 @@ class TestConfig:
         config = Config()
         
         assert config.openai_model == 'gpt-4'
+        assert config.openai_max_input_tokens == 6000
         assert config.flask_env == 'development'
         assert config.flask_port == 3000
         assert config.log_level == 'INFO'
+        assert config.worker_count == 4
+        assert config.work_queue_size == 100
+        assert config.fair_queue is True
+        assert config.fair_queue_quantum == 1
+        assert config.fair_queue_max_per_channel == 50
+        assert config.fair_queue_max_per_user == 20
+        assert config.dedup_ttl_seconds == 600
+        assert config.dedup_max_size == 10000
+        assert config.service_validation == 'lazy'
+        assert config.stream_responses is False
+        assert config.stream_update_interval == 1.0
+        assert config.thread_history_limit == 50
+        assert config.thread_cache_max_bytes == 5242880
+        assert config.thread_cache_ttl_seconds == 300
+        assert config.response_cache == 'off'
+        assert config.response_cache_ttl_seconds == 3600
+        assert config.response_cache_max_entries == 1000
+        assert config.response_cache_path == 'response_cache.sqlite3'
+        assert config.response_cache_exclude_channels == []
+        assert config.semantic_cache is False
+        assert config.semantic_cache_threshold == 0.92
+        assert config.semantic_cache_max_entries == 10000
+        assert config.semantic_cache_dtype == 'int8'
+        assert config.semantic_cache_embedding_model == 'text-embedding-3-small'
+        assert config.http_pool_size == 10
+        assert config.http_connect_timeout == 5.0
+        assert config.http_read_timeout == 60.0
+        assert config.http_keepalive_seconds == 60.0
+        assert config.openai_max_retries == 3
+        assert config.openai_retry_base_delay == 0.5
+        assert config.openai_retry_max_delay == 20.0
+        assert config.openai_retry_deadline == 60.0
+        assert config.openai_requests_per_minute == 0
+        assert config.openai_tokens_per_minute == 0
+        assert config.openai_rate_limit_burst_seconds == 10.0
+        assert config.openai_priority_scheduling is True
+        assert config.openai_priority_max_wait == 30.0
+        assert config.slack_send_queue is True
+        assert config.slack_channel_send_interval == 1.0
+        assert config.slack_sends_per_minute == 100.0
+        assert config.slack_reply_blocks is False
+        assert config.openai_coalesce_requests is True
+        assert config.health_probe_interval == 30.0
+        assert config.server_workers == 2
+        assert config.server_threads == 8
+        assert config.server_preload is True
+        assert config.server_drain_seconds == 30.0
+        assert config.metrics_dir == ''
+        assert config.openai_base_url is None
+        assert config.slack_api_url is None
+        assert config.job_queue == 'memory'
+        assert config.job_queue_path == 'jobs.sqlite3'
+        assert config.job_visibility_timeout_seconds == 300.0
+        assert config.job_max_attempts == 5
+        assert config.job_failed_retention_seconds == 604800.0
     
     def test_custom_values_for_optional_vars(self):
         """Test that custom values override defaults for optional variables."""
@@ -80,16 +153,76 @@ class TestConfig:
         os.environ['SLACK_SIGNING_SECRET'] = 'test-signing-secret'
         os.environ['OPENAI_API_KEY'] = 'sk-test-api-key'
         os.environ['OPENAI_MODEL'] = 'gpt-3.5-turbo'
+        os.environ['OPENAI_MAX_INPUT_TOKENS'] = '3000'
         os.environ['FLASK_ENV'] = 'production'
         os.environ['FLASK_PORT'] = '8080'
         os.environ['LOG_LEVEL'] = 'DEBUG'
+        os.environ['WORKER_COUNT'] = '8'
+        os.environ['WORK_QUEUE_SIZE'] = '500'
+        os.environ['FAIR_QUEUE'] = 'false'
+        os.environ['FAIR_QUEUE_QUANTUM'] = '2'
+        os.environ['FAIR_QUEUE_MAX_PER_CHANNEL'] = '0'
+        os.environ['FAIR_QUEUE_MAX_PER_USER'] = '5'
+        os.environ['STREAM_RESPONSES'] = 'true'
+        os.environ['THREAD_HISTORY_LIMIT'] = '0'
+        os.environ['RESPONSE_CACHE'] = 'SQLite'
+        os.environ['RESPONSE_CACHE_EXCLUDE_CHANNELS'] = 'C111, C222,'
+        os.environ['SEMANTIC_CACHE'] = 'yes'
+        os.environ['HTTP_POOL_SIZE'] = '4'
+        os.environ['HTTP_READ_TIMEOUT'] = '30'
+        os.environ['OPENAI_MAX_RETRIES'] = '0'
+        os.environ['OPENAI_TOKENS_PER_MINUTE'] = '40000'
+        os.environ['OPENAI_PRIORITY_SCHEDULING'] = 'false'
+        os.environ['OPENAI_PRIORITY_MAX_WAIT'] = '5'
+        os.environ['SLACK_SEND_QUEUE'] = 'false'
+        os.environ['OPENAI_COALESCE_REQUESTS'] = 'no'
+        os.environ['HEALTH_PROBE_INTERVAL'] = '10'
+        os.environ['SERVER_WORKERS'] = '4'
+        os.environ['SERVER_PRELOAD'] = 'false'
+        os.environ['SERVER_DRAIN_SECONDS'] = '45'
+        os.environ['METRICS_DIR'] = '/tmp/slackbot-metrics'
+        os.environ['SLACK_API_URL'] = 'http://localhost:9000/api/'
+        os.environ['JOB_QUEUE'] = 'SQLite'
+        os.environ['JOB_VISIBILITY_TIMEOUT_SECONDS'] = '120'
+        os.environ['JOB_FAILED_RETENTION_SECONDS'] = '86400'
+        os.environ['SLACK_REPLY_BLOCKS'] = 'true'
         
         config = Config()
         
         assert config.openai_model == 'gpt-3.5-turbo'
+        assert config.openai_max_input_tokens == 3000
         assert config.flask_env == 'production'
         assert config.flask_port == 8080
         assert config.log_level == 'DEBUG'
+        assert config.worker_count == 8
+        assert config.work_queue_size == 500
+        assert config.fair_queue is False
+        assert config.fair_queue_quantum == 2
+        assert config.fair_queue_max_per_channel == 0
+        assert config.fair_queue_max_per_user == 5
+        assert config.stream_responses is True
+        assert config.thread_history_limit == 0
+        assert config.response_cache == 'sqlite'
+        assert config.response_cache_exclude_channels == ['C111', 'C222']
+        assert config.semantic_cache is True
+        assert config.http_pool_size == 4
+        assert config.http_read_timeout == 30.0
+        assert config.openai_max_retries == 0
+        assert config.openai_tokens_per_minute == 40000.0
+        assert config.openai_priority_scheduling is False
+        assert config.openai_priority_max_wait == 5.0
+        assert config.slack_send_queue is False
+        assert config.openai_coalesce_requests is False
+        assert config.health_probe_interval == 10.0
+        assert config.server_workers == 4
+        assert config.server_preload is False
+        assert config.server_drain_seconds == 45.0
+        assert config.metrics_dir == '/tmp/slackbot-metrics'
+        assert config.slack_api_url == 'http://localhost:9000/api/'
+        assert config.job_queue == 'sqlite'
+        assert config.job_visibility_timeout_seconds == 120.0
+        assert config.job_failed_retention_seconds == 86400.0
+        assert config.slack_reply_blocks is True
     
     @patch('app.utils.config.load_dotenv')
     def test_dotenv_is_called(self, mock_load_dotenv):
@@ -109,7 +242,24 @@ class TestConfig:
         """Clean up environment variables after each test."""
         env_vars = [
             'SLACK_BOT_TOKEN', 'SLACK_SIGNING_SECRET', 'OPENAI_API_KEY',
-            'OPENAI_MODEL', 'FLASK_ENV', 'FLASK_PORT', 'LOG_LEVEL'
+            'OPENAI_MODEL', 'FLASK_ENV', 'FLASK_PORT', 'LOG_LEVEL',
+            'WORKER_COUNT', 'WORK_QUEUE_SIZE', 'DEDUP_TTL_SECONDS', 'DEDUP_MAX_SIZE',
+            'FAIR_QUEUE', 'FAIR_QUEUE_QUANTUM', 'FAIR_QUEUE_MAX_PER_CHANNEL', 'FAIR_QUEUE_MAX_PER_USER',
+            'SERVICE_VALIDATION', 'STREAM_RESPONSES', 'STREAM_UPDATE_INTERVAL',
+            'THREAD_HISTORY_LIMIT', 'THREAD_CACHE_MAX_BYTES', 'THREAD_CACHE_TTL_SECONDS',
+            'OPENAI_MAX_INPUT_TOKENS', 'RESPONSE_CACHE', 'RESPONSE_CACHE_TTL_SECONDS',
+            'RESPONSE_CACHE_MAX_ENTRIES', 'RESPONSE_CACHE_PATH', 'RESPONSE_CACHE_EXCLUDE_CHANNELS',
+            'SEMANTIC_CACHE', 'SEMANTIC_CACHE_THRESHOLD', 'SEMANTIC_CACHE_MAX_ENTRIES',
+            'SEMANTIC_CACHE_DTYPE', 'SEMANTIC_CACHE_EMBEDDING_MODEL',
+            'HTTP_POOL_SIZE', 'HTTP_CONNECT_TIMEOUT', 'HTTP_READ_TIMEOUT', 'HTTP_KEEPALIVE_SECONDS',
+            'OPENAI_MAX_RETRIES', 'OPENAI_RETRY_BASE_DELAY', 'OPENAI_RETRY_MAX_DELAY', 'OPENAI_RETRY_DEADLINE',
+            'OPENAI_REQUESTS_PER_MINUTE', 'OPENAI_TOKENS_PER_MINUTE', 'OPENAI_RATE_LIMIT_BURST_SECONDS',
+            'OPENAI_PRIORITY_SCHEDULING', 'OPENAI_PRIORITY_MAX_WAIT',
+            'SLACK_SEND_QUEUE', 'SLACK_CHANNEL_SEND_INTERVAL', 'SLACK_SENDS_PER_MINUTE', 'SLACK_REPLY_BLOCKS', 'OPENAI_COALESCE_REQUESTS',
+            'HEALTH_PROBE_INTERVAL', 'SERVER_WORKERS', 'SERVER_THREADS', 'SERVER_PRELOAD', 'SERVER_DRAIN_SECONDS',
+            'METRICS_DIR',
+            'OPENAI_BASE_URL', 'SLACK_API_URL', 'JOB_QUEUE', 'JOB_QUEUE_PATH', 'JOB_VISIBILITY_TIMEOUT_SECONDS',
+            'JOB_MAX_ATTEMPTS', 'JOB_FAILED_RETENTION_SECONDS'
         ]
         for var in env_vars:
             if var in os.environ:
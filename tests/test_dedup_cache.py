@@ -0,0 +1,122 @@
+import time
+import pytest
+from unittest.mock import patch
+from app.utils.dedup_cache import DedupBackend, EventDeduplicator, InMemoryDedupBackend
+
+
+class TestInMemoryDedupBackend:
+    """Test suite for the in-memory dedup backend."""
+    
+    def test_invalid_size_raises_error(self):
+        """Test that a size below 1 raises ValueError."""
+        with pytest.raises(ValueError, match="Dedup cache size must be at least 1"):
+            InMemoryDedupBackend(max_size=0)
+    
+    def test_add_returns_false_for_seen_key(self):
+        """Test that a key is only added once within its TTL."""
+        backend = InMemoryDedupBackend()
+        
+        assert backend.add("event:Ev1", ttl=60) is True
+        assert backend.add("event:Ev1", ttl=60) is False
+        assert backend.add("event:Ev2", ttl=60) is True
+    
+    @patch('app.utils.dedup_cache.time.monotonic')
+    def test_expired_key_is_added_again(self, mock_monotonic):
+        """Test that a key is accepted again after its TTL."""
+        backend = InMemoryDedupBackend()
+        
+        mock_monotonic.return_value = 1000.0
+        assert backend.add("event:Ev1", ttl=60) is True
+        
+        mock_monotonic.return_value = 1059.0
+        assert backend.add("event:Ev1", ttl=60) is False
+        
+        mock_monotonic.return_value = 1061.0
+        assert backend.add("event:Ev1", ttl=60) is True
+    
+    def test_size_is_bounded_with_lru_eviction(self):
+        """Test that the least recently seen keys are evicted first."""
+        backend = InMemoryDedupBackend(max_size=3)
+        
+        for key in ("a", "b", "c"):
+            backend.add(key, ttl=60)
+        backend.add("a", ttl=60)  # Refresh "a"
+        backend.add("d", ttl=60)  # Evicts "b"
+        
+        assert len(backend) == 3
+        assert backend.add("a", ttl=60) is False
+        assert backend.add("b", ttl=60) is True
+    
+    def test_discard(self):
+        """Test that a discarded key can be added again."""
+        backend = InMemoryDedupBackend()
+        backend.add("event:Ev1", ttl=60)
+        
+        backend.discard("event:Ev1")
+        backend.discard("event:missing")
+        
+        assert backend.add("event:Ev1", ttl=60) is True
+
+
+class TestEventDeduplicator:
+    """Test suite for the event deduplicator."""
+    
+    def test_event_key_prefers_event_id(self):
+        """Test that event_id is used when present."""
+        payload = {'event_id': 'Ev1', 'event': {'client_msg_id': 'abc'}}
+        assert EventDeduplicator.event_key(payload) == "event:Ev1"
+    
+    def test_event_key_falls_back_to_client_msg_id(self):
+        """Test that client_msg_id is used when event_id is missing."""
+        payload = {'event': {'client_msg_id': 'abc'}}
+        assert EventDeduplicator.event_key(payload) == "msg:abc"
+    
+    def test_payload_without_key_is_never_duplicate(self):
+        """Test that payloads without any id are always processed."""
+        deduplicator = EventDeduplicator()
+        
+        assert deduplicator.is_duplicate({'event': {}}) is False
+        assert deduplicator.is_duplicate({'event': {}}) is False
+        assert deduplicator.stats() == {'hits': 0, 'misses': 0}
+    
+    def test_hits_and_misses_counted(self):
+        """Test that duplicates and new events are counted."""
+        deduplicator = EventDeduplicator()
+        
+        assert deduplicator.is_duplicate({'event_id': 'Ev1'}) is False
+        assert deduplicator.is_duplicate({'event_id': 'Ev1'}) is True
+        assert deduplicator.is_duplicate({'event_id': 'Ev1'}) is True
+        assert deduplicator.is_duplicate({'event_id': 'Ev2'}) is False
+        
+        assert deduplicator.stats() == {'hits': 2, 'misses': 2}
+    
+    def test_forget(self):
+        """Test that a forgotten event is processed on redelivery."""
+        deduplicator = EventDeduplicator()
+        deduplicator.is_duplicate({'event_id': 'Ev1'})
+        
+        deduplicator.forget({'event_id': 'Ev1'})
+        
+        assert deduplicator.is_duplicate({'event_id': 'Ev1'}) is False
+    
+    def test_custom_backend(self):
+        """Test that a shared backend can be plugged in."""
+        class SharedBackend(DedupBackend):
+            def __init__(self):
+                self.keys = set()
+            
+            def add(self, key, ttl):
+                if key in self.keys:
+                    return False
+                self.keys.add(key)
+                return True
+            
+            def discard(self, key):
+                self.keys.discard(key)
+        
+        backend = SharedBackend()
+        first = EventDeduplicator(backend, ttl=30)
+        second = EventDeduplicator(backend, ttl=30)
+        
+        assert first.is_duplicate({'event_id': 'Ev1'}) is False
+        assert second.is_duplicate({'event_id': 'Ev1'}) is True
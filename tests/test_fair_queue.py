@@ -0,0 +1,293 @@
+import json
+import queue
+import threading
+import time
+import pytest
+from app import create_app
+from app.handlers.slack_handler import SlackEventHandler
+from app.utils.fair_queue import FairQueue
+from app.utils.thread_cache import ThreadHistoryCache
+from app.utils.work_queue import WorkQueue
+from tests.test_metrics import parse_exposition, sample
+from tests.test_retry import FakeClock
+from tests.test_single_flight import wait_for
+from tests.test_slack_handler import SlowOpenAIService, make_config, mention_payload, signed_headers
+from unittest.mock import Mock
+
+
+def drain(fair_queue: FairQueue) -> list:
+    """Get every item queued, in the order they are served."""
+    items = []
+    while not fair_queue.empty():
+        items.append(fair_queue.get_nowait())
+    return items
+
+
+class TestFairQueue:
+    """Test suite for deficit round robin between channels and users."""
+    
+    def test_invalid_arguments_raise_error(self):
+        """Test that missing levels, extra or negative quotas and bad sizes are rejected."""
+        with pytest.raises(ValueError, match="at least one key level"):
+            FairQueue(key_names=())
+        with pytest.raises(ValueError, match="more quotas than key levels"):
+            FairQueue(quotas=(1, 2, 3))
+        with pytest.raises(ValueError, match="quotas cannot be negative"):
+            FairQueue(quotas=(-1,))
+        with pytest.raises(ValueError, match="quantum must be at least 1"):
+            FairQueue(quantum=0)
+        with pytest.raises(ValueError, match="Tracked tenant keys must be at least 1"):
+            FairQueue(max_tracked_keys=0)
+        with pytest.raises(ValueError, match="key must have 2 parts"):
+            FairQueue().put_nowait((('C1',), 'a1'))
+    
+    def test_channels_then_users_take_turns(self):
+        """Test that channels take turns, then users within a channel, each user's items in order."""
+        fair_queue = FairQueue()
+        for item in ('a1', 'a2', 'a3'):
+            fair_queue.put_nowait((('C1', 'U1'), item))
+        fair_queue.put_nowait((('C1', 'U2'), 'b1'))
+        for item in ('c1', 'c2'):
+            fair_queue.put_nowait((('C2', 'U3'), item))
+        
+        assert drain(fair_queue) == ['a1', 'c1', 'b1', 'c2', 'a2', 'a3']
+    
+    def test_quantum_serves_items_in_a_row(self):
+        """Test that a key is served quantum items each time its turn comes."""
+        fair_queue = FairQueue(key_names=('user',), quantum=2)
+        for n in range(1, 5):
+            fair_queue.put_nowait((('U1',), f"a{n}"))
+        for n in range(1, 5):
+            fair_queue.put_nowait((('U2',), f"b{n}"))
+        
+        assert drain(fair_queue) == ['a1', 'a2', 'b1', 'b2', 'a3', 'a4', 'b3', 'b4']
+    
+    def test_quota_rejects_only_the_busy_key(self):
+        """Test that a user over quota is turned away while others are not, until it is served."""
+        fair_queue = FairQueue(maxsize=10, quotas=(0, 2))
+        fair_queue.put_nowait((('C1', 'U1'), 'a1'))
+        fair_queue.put_nowait((('C1', 'U1'), 'a2'))
+        
+        with pytest.raises(queue.Full):
+            fair_queue.put_nowait((('C1', 'U1'), 'a3'))
+        fair_queue.put_nowait((('C1', 'U2'), 'b1'))
+        
+        assert fair_queue.get_nowait() == 'a1'
+        fair_queue.put_nowait((('C1', 'U1'), 'a3'))
+        stats = fair_queue.stats()
+        assert stats['depth'] == 3
+        assert stats['tenants']['user:U1'] == {'queued': 2, 'submitted': 3, 'served': 1, 'rejected': 1,
+                                               'mean_wait_seconds': 0.0}
+        assert stats['tenants']['channel:C1']['submitted'] == 4
+        
+        # Items without a tenant are not held to a quota
+        for _ in range(3):
+            fair_queue.put_nowait(((None, None), 'x'))
+    
+    def test_waits_are_reported_per_tenant(self):
+        """Test that each tenant's mean wait is measured from put to get."""
+        clock = FakeClock()
+        fair_queue = FairQueue(key_names=('user',), clock=clock)
+        fair_queue.put_nowait((('U1',), 'a1'))
+        fair_queue.put_nowait((('U1',), 'a2'))
+        clock.now = 2.0
+        drain(fair_queue)
+        
+        assert fair_queue.stats()['tenants']['user:U1']['mean_wait_seconds'] == 2.0
+    
+    def test_sentinel_is_served_last(self):
+        """Test that a shutdown sentinel does not overtake keyed items."""
+        fair_queue = FairQueue()
+        fair_queue.put_nowait(None)
+        fair_queue.put_nowait((('C1', 'U1'), 'a1'))
+        
+        assert drain(fair_queue) == ['a1', None]
+    
+    def test_tracked_keys_stay_bounded(self):
+        """Test that idle tenant keys are forgotten beyond max_tracked_keys, queued ones never."""
+        fair_queue = FairQueue(key_names=('user',), max_tracked_keys=100)
+        for n in range(10000):
+            fair_queue.put_nowait(((f"U{n}",), n))
+            fair_queue.get_nowait()
+        assert fair_queue.stats()['tracked_keys'] <= 100
+        
+        fair_queue = FairQueue(key_names=('user',), max_tracked_keys=3)
+        for n in range(5):
+            fair_queue.put_nowait(((f"U{n}",), n))
+        assert fair_queue.stats()['tracked_keys'] == 5
+        assert drain(fair_queue) == [0, 1, 2, 3, 4]
+        
+        fair_queue.put_nowait((('U5',), 5))
+        assert fair_queue.stats()['tracked_keys'] == 3
+    
+    def test_stats_list_the_busiest_tenants(self):
+        """Test that stats are limited to the top tenants by items submitted."""
+        fair_queue = FairQueue(key_names=('user',))
+        for n in range(5):
+            for _ in range(n + 1):
+                fair_queue.put_nowait(((f"U{n}",), n))
+        
+        assert list(fair_queue.stats(top=2)['tenants']) == ['user:U4', 'user:U3']
+
+
+class TestWorkQueueFairness:
+    """Test suite for keyed jobs on a work queue with a fair queue."""
+    
+    def test_jobs_run_in_fair_order(self):
+        """Test that a single worker runs queued jobs round robin between users."""
+        work_queue = WorkQueue(num_workers=1, fair_queue=FairQueue(maxsize=20))
+        release = threading.Event()
+        order = []
+        work_queue.submit(release.wait)
+        for n in range(3):
+            assert work_queue.submit_keyed(('C1', 'U1'), order.append, f"a{n}")
+        assert work_queue.submit_keyed(('C1', 'U2'), order.append, 'b0')
+        
+        release.set()
+        work_queue.join()
+        work_queue.shutdown()
+        
+        assert order == ['a0', 'b0', 'a1', 'a2']
+        assert work_queue.max_size == 20
+    
+    def test_over_quota_job_is_rejected(self):
+        """Test that a job over its user's quota is rejected without blocking."""
+        work_queue = WorkQueue(num_workers=1, fair_queue=FairQueue(maxsize=20, quotas=(0, 1)))
+        release = threading.Event()
+        work_queue.submit(release.wait)
+        
+        assert work_queue.submit_keyed(('C1', 'U1'), lambda: None)
+        assert not work_queue.submit_keyed(('C1', 'U1'), lambda: None)
+        assert work_queue.submit_keyed(('C1', 'U2'), lambda: None)
+        
+        release.set()
+        work_queue.join()
+        work_queue.shutdown()
+        assert work_queue.stats()['rejected'] == 1
+
+
+class TestHandlerFairness:
+    """Test suite for fair queuing mentions in the event handler."""
+    
+    def setup_method(self):
+        """Create an app with fake services."""
+        self.config = make_config()
+        self.config.fair_queue_max_per_user = 1
+        self.app = create_app(config_override=self.config)
+        self.handler = self.app.config['SLACK_HANDLER']
+        self.handler.openai_service = SlowOpenAIService(delay=0.2)
+        self.handler.slack_service = Mock()
+        self.handler.slack_service.validation_status.return_value = {
+            'state': 'pending', 'error': None, 'checked_at': None
+        }
+        self.handler.slack_service.thread_cache = ThreadHistoryCache()
+        self.handler.slack_service.send_queue = None
+    
+    def teardown_method(self):
+        """Stop the worker threads."""
+        if self.handler.work_queue is not None:
+            self.handler.work_queue.shutdown()
+    
+    def post(self, payload):
+        """Post a payload to the events endpoint."""
+        body = json.dumps(payload)
+        with self.app.test_client() as client:
+            return client.post('/slack/events', data=body, headers=signed_headers(body))
+    
+    def test_user_over_quota_is_asked_to_retry(self):
+        """Test that a user with a mention waiting is asked to retry while another user is not."""
+        release = threading.Event()
+        self.handler._get_work_queue()
+        for _ in range(self.config.worker_count):
+            self.handler.work_queue.submit(release.wait)
+        wait_for(lambda: self.handler.work_queue.stats()['depth'] == 0)
+        
+        try:
+            other = mention_payload(event_id="Ev3")
+            other['event']['user'] = 'U999'
+            statuses = [self.post(payload).status_code
+                        for payload in (mention_payload(event_id="Ev1"), mention_payload(event_id="Ev2"), other)]
+            stats = self.handler.fairness_stats()
+        finally:
+            release.set()
+        
+        assert statuses == [200, 503, 200]
+        assert stats['enabled'] is True
+        assert stats['tenants']['user:U123456']['rejected'] == 1
+        assert stats['tenants']['channel:C123456']['queued'] == 2
+    
+    def test_metrics_report_every_tenant(self):
+        """Test that /metrics has depth, served and rejected series for every tracked channel and user."""
+        # Workers that are never started leave every mention queued
+        self.handler.work_queue = WorkQueue(num_workers=1, fair_queue=self.handler._build_fair_queue())
+        self.handler.work_queue.start = lambda: None
+        for n in range(6):
+            payload = mention_payload(event_id=f"Ev{n}")
+            payload['event']['user'] = f"U{n}"
+            assert self.post(payload).status_code == 200
+        self.handler.work_queue.fair_queue.get_nowait()
+        
+        with self.app.test_client() as client:
+            parsed = parse_exposition(client.get('/metrics').get_data(as_text=True))
+        
+        assert sample(parsed, 'slackbot_tenant_queue_depth', level='channel', tenant='C123456') == 5
+        assert sample(parsed, 'slackbot_tenant_served', level='user', tenant='U0') == 1
+        assert sample(parsed, 'slackbot_tenant_queue_depth', level='user', tenant='U5') == 1
+        assert sample(parsed, 'slackbot_tenant_rejected', level='user', tenant='U5') == 0
+    
+    def test_health_reports_fairness(self):
+        """Test that /health reports per tenant metrics, and that fair queuing can be turned off."""
+        with self.app.test_client() as client:
+            assert json.loads(client.get('/health').data)['fairness']['enabled'] is False
+        
+        self.handler._get_work_queue()
+        with self.app.test_client() as client:
+            assert json.loads(client.get('/health').data)['fairness']['enabled'] is True
+        
+        self.config.fair_queue = False
+        assert SlackEventHandler(self.config)._build_fair_queue() is None
+
+
+class TestFairQueueLatency:
+    """Simulate one user flooding the bot while others mention it occasionally."""
+    
+    WORKERS = 2
+    JOB_SECONDS = 0.01     # Time a worker spends answering one mention
+    HEAVY_MENTIONS = 60    # Mentions the heavy user sends at once
+    LIGHT_MENTIONS = 10    # Mentions from other users, spread out
+    LIGHT_INTERVAL = 0.02
+    
+    def simulate(self, fair: bool) -> float:
+        """Return the p95 time other users' mentions wait for a worker."""
+        fair_queue = FairQueue(maxsize=200) if fair else None
+        work_queue = WorkQueue(max_size=200, num_workers=self.WORKERS, fair_queue=fair_queue)
+        waits = []
+        
+        def answer(submitted_at: float = None):
+            if submitted_at is not None:
+                waits.append(time.perf_counter() - submitted_at)
+            time.sleep(self.JOB_SECONDS)
+        
+        for _ in range(self.HEAVY_MENTIONS):
+            assert work_queue.submit_keyed(('C1', 'UHEAVY'), answer)
+        for n in range(self.LIGHT_MENTIONS):
+            channel = 'C1' if n % 2 else f"C{n + 2}"
+            assert work_queue.submit_keyed((channel, f"U{n}"), answer, time.perf_counter())
+            time.sleep(self.LIGHT_INTERVAL)
+        
+        work_queue.join()
+        work_queue.shutdown()
+        return sorted(waits)[int(0.95 * (len(waits) - 1))]
+    
+    def test_heavy_user_does_not_delay_others(self):
+        """Benchmark: other users' p95 wait stays within a few answers' time under a flood."""
+        fifo_p95 = self.simulate(fair=False)
+        fair_p95 = self.simulate(fair=True)
+        
+        print(f"\n{self.HEAVY_MENTIONS} mentions from one user, {self.LIGHT_MENTIONS} from others, "
+              f"{self.WORKERS} workers: p95 wait for others arrival order {fifo_p95 * 1000:.0f}ms, "
+              f"fair {fair_p95 * 1000:.0f}ms")
+        
+        # Behind at most one answer per worker, plus scheduling slack
+        assert fair_p95 < 5 * self.JOB_SECONDS
+        assert fair_p95 < fifo_p95 / 3
@@ -0,0 +1,426 @@
+import os
+import queue
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from app.handlers.slack_handler import SlackEventHandler
+from app.utils.job_queue import (
+    JOB_DONE, JOB_FAILED, JOB_QUEUED, InMemoryJobStore, JobQueue, SqliteJobStore
+)
+from tests.test_single_flight import wait_for
+from tests.test_slack_handler import make_config, mention_payload
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    """Each job store backend."""
+    if request.param == 'memory':
+        yield InMemoryJobStore()
+    else:
+        store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+        yield store
+        store.close()
+
+
+class TestJobStore:
+    """Test suite for the job store backends."""
+    
+    def test_enqueue_is_idempotent(self, store):
+        """Test that a key is only queued once, even after its job is done."""
+        assert store.enqueue("Ev001", {'text': 'hello'}) is True
+        assert store.enqueue("Ev001", {'text': 'hello'}) is False
+        
+        job = store.claim(60)
+        store.complete(job)
+        
+        assert store.enqueue("Ev001", {'text': 'hello'}) is False
+        assert store.counts() == {JOB_QUEUED: 0, JOB_DONE: 1, JOB_FAILED: 0}
+    
+    def test_claim_hides_job_until_visibility_timeout(self, store):
+        """Test that a leased job is handed out again once its lease expires."""
+        store.enqueue("Ev001", {'text': 'hello'})
+        
+        job = store.claim(0.05)
+        assert job.key == "Ev001"
+        assert job.payload == {'text': 'hello'}
+        assert job.attempts == 1
+        assert store.claim(0.05) is None
+        
+        time.sleep(0.06)
+        redelivered = store.claim(60)
+        assert redelivered.id == job.id
+        assert redelivered.attempts == 2
+    
+    def test_claims_are_fifo(self, store):
+        """Test that jobs are claimed oldest first."""
+        for n in range(3):
+            store.enqueue(f"Ev{n}", {'n': n})
+        
+        assert [store.claim(60).payload['n'] for _ in range(3)] == [0, 1, 2]
+        assert store.depth() == 3
+    
+    def test_retry_until_max_attempts(self, store):
+        """Test that a failing job is delayed, then marked failed after its last attempt."""
+        store.enqueue("Ev001", {})
+        
+        assert store.retry(store.claim(60), delay=0, max_attempts=2) is True
+        assert store.retry(store.claim(60), delay=0, max_attempts=2) is False
+        
+        assert store.claim(60) is None
+        assert store.counts()[JOB_FAILED] == 1
+    
+    def test_replied_is_kept_across_deliveries(self, store):
+        """Test that a redelivered job carries the replied marker."""
+        store.enqueue("Ev001", {})
+        store.mark_replied(store.claim(0.01))
+        time.sleep(0.02)
+        
+        assert store.claim(60).replied is True
+    
+    def test_purge_forgets_old_done_jobs(self, store):
+        """Test that purged keys can be queued again and queued jobs are kept."""
+        store.enqueue("Ev001", {})
+        store.enqueue("Ev002", {})
+        store.complete(store.claim(60))
+        
+        assert store.purge(time.time() + 1) == 1
+        assert store.enqueue("Ev001", {}) is True
+        assert store.depth() == 2
+    
+    def test_purge_forgets_failed_jobs_after_their_retention(self, store):
+        """Test that failed jobs are kept unless a failed cutoff past them is given."""
+        store.enqueue("Ev001", {})
+        store.retry(store.claim(60), 0, max_attempts=1)
+        
+        assert store.purge(time.time() + 1) == 0
+        assert store.purge(time.time() + 1, failed_before=time.time() - 60) == 0
+        assert store.purge(time.time() + 1, failed_before=time.time() + 1) == 1
+        assert store.counts()[JOB_FAILED] == 0
+    
+    def test_claims_take_turns_between_tenants(self, store):
+        """Test that channels take turns, then users within a channel, each user's jobs in order."""
+        jobs = [('a1', 'C1', 'U1'), ('a2', 'C1', 'U1'), ('a3', 'C1', 'U1'), ('b1', 'C1', 'U2'),
+                ('c1', 'C2', 'U3'), ('c2', 'C2', 'U3')]
+        for name, channel, user in jobs:
+            store.enqueue(name, {}, (f"channel:{channel}", f"user:{user}"))
+        
+        claimed = [store.claim(60) for _ in jobs]
+        assert [job.key for job in claimed] == ['a1', 'c1', 'b1', 'c2', 'a2', 'a3']
+        
+        for job in claimed[:2]:
+            store.complete(job)
+        stats = store.tenant_stats()
+        assert stats['depth'] == 4
+        user = stats['tenants']['user:U1']
+        assert (user['queued'], user['submitted'], user['served'], user['rejected']) == (2, 3, 3, 0)
+        assert stats['tenants']['channel:C1']['submitted'] == 4
+        assert list(store.tenant_stats(top=1)['tenants']) == ['channel:C1']
+    
+    def test_tenant_over_quota_is_refused(self, store):
+        """Test that a tenant with its quota of jobs queued is refused until one finishes, others are not."""
+        store.enqueue("Ev1", {}, ('user:U1',), (1,))
+        with pytest.raises(queue.Full):
+            store.enqueue("Ev2", {}, ('user:U1',), (1,))
+        assert store.enqueue("Ev3", {}, ('user:U2',), (1,)) is True
+        
+        store.complete(store.claim(60))
+        assert store.enqueue("Ev2", {}, ('user:U1',), (1,)) is True
+        assert store.tenant_stats()['tenants']['user:U1']['rejected'] == 1
+        with pytest.raises(ValueError, match="at most 2 tenant keys"):
+            store.enqueue("Ev4", {}, ('a', 'b', 'c'))
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_idle_tenants_are_forgotten(backend, tmp_path):
+    """Test that tenant keys with nothing queued are forgotten beyond max_tracked_keys."""
+    if backend == 'memory':
+        store = InMemoryJobStore(max_tracked_keys=3)
+    else:
+        store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"), max_tracked_keys=3)
+    
+    for n in range(5):
+        store.enqueue(f"Ev{n}", {}, (f"user:U{n}",))
+    assert store.tenant_stats()['tracked_keys'] == 5
+    for _ in range(5):
+        store.complete(store.claim(60))
+    
+    store.enqueue("Ev5", {}, ("user:U5",))
+    assert store.tenant_stats()['tracked_keys'] == 3
+
+
+def test_processes_sharing_a_database_share_turns(tmp_path):
+    """Test that stores opened on one file, as by separate processes, take one round robin."""
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = SqliteJobStore(path), SqliteJobStore(path)
+    for n in range(3):
+        first.enqueue(f"a{n}", {}, ('user:U1',))
+    second.enqueue("b0", {}, ('user:U2',))
+    
+    assert [store.claim(60).key for store in (first, second, first, second)] == ['a0', 'b0', 'a1', 'a2']
+    first.close()
+    second.close()
+
+
+def test_database_from_before_tenants_is_upgraded(tmp_path):
+    """Test that a jobs table without the tenants column gets it, and its jobs are still claimed."""
+    path = str(tmp_path / "jobs.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, payload TEXT NOT NULL, "
+        "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, visible_at REAL NOT NULL, "
+        "replied INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO jobs (key, payload, status, visible_at, updated_at) VALUES ('Ev0', '{}', 'queued', 0, 0)")
+    conn.commit()
+    conn.close()
+    
+    store = SqliteJobStore(path)
+    store.enqueue("Ev1", {}, ('user:U1',))
+    assert [store.claim(60).key for _ in range(2)] == ['Ev0', 'Ev1']
+    store.close()
+
+
+def test_database_with_json_tenants_is_upgraded(tmp_path):
+    """Test that jobs stored with their tenant keys in one JSON column keep their turns."""
+    path = str(tmp_path / "jobs.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, payload TEXT NOT NULL, "
+        "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, visible_at REAL NOT NULL, "
+        "replied INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, tenants TEXT NOT NULL DEFAULT '[]')"
+    )
+    conn.executemany(
+        "INSERT INTO jobs (key, payload, status, visible_at, updated_at, tenants) VALUES (?, '{}', 'queued', 0, 0, ?)",
+        [('a0', '["user:U1"]'), ('a1', '["user:U1"]'), ('b0', '["user:U2"]')]
+    )
+    conn.execute(
+        "CREATE TABLE tenants (key TEXT PRIMARY KEY, queued INTEGER NOT NULL DEFAULT 0, "
+        "submitted INTEGER NOT NULL DEFAULT 0, served INTEGER NOT NULL DEFAULT 0, rejected INTEGER NOT NULL DEFAULT 0, "
+        "wait_seconds REAL NOT NULL DEFAULT 0, last_served INTEGER NOT NULL DEFAULT 0, seen_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO tenants (key, queued, submitted, seen_at) VALUES ('user:U1', 2, 2, 0), ('user:U2', 1, 1, 0)")
+    conn.commit()
+    conn.close()
+    
+    store = SqliteJobStore(path)
+    claimed = [store.claim(60) for _ in range(3)]
+    assert [job.key for job in claimed] == ['a0', 'b0', 'a1']
+    assert claimed[1].tenants == ('user:U2',)
+    store.close()
+
+
+class TestJobQueue:
+    """Test suite for running stored jobs on worker threads."""
+    
+    def test_jobs_are_run_and_completed(self):
+        """Test that submitted jobs are handed to the handler once each."""
+        handled = []
+        job_queue = JobQueue(InMemoryJobStore(), lambda job: handled.append(job.key), num_workers=2)
+        
+        for n in range(5):
+            assert job_queue.submit(f"Ev{n}", {}) is True
+        assert job_queue.submit("Ev0", {}) is True
+        wait_for(lambda: job_queue.stats()['completed'] == 5)
+        job_queue.shutdown()
+        
+        assert sorted(handled) == [f"Ev{n}" for n in range(5)]
+        assert job_queue.stats()['submitted'] == 5
+    
+    def test_failed_jobs_are_retried_then_dead_lettered(self):
+        """Test that a job that raises is retried with backoff up to max_attempts."""
+        handler = Mock(side_effect=RuntimeError("Slack API error: fatal_error"))
+        job_queue = JobQueue(InMemoryJobStore(), handler, num_workers=1, max_attempts=3,
+                             retry_delay=0.01, poll_interval=0.01)
+        
+        job_queue.submit("Ev001", {})
+        wait_for(lambda: job_queue.stats()['failed'] == 1)
+        job_queue.shutdown()
+        
+        stats = job_queue.stats()
+        assert handler.call_count == 3
+        assert stats['retried'] == 2
+        assert stats['dead_letters'] == 1
+    
+    def test_full_queue_rejects(self):
+        """Test that submit refuses jobs beyond max_size so Slack retries them."""
+        store = InMemoryJobStore()
+        job_queue = JobQueue(store, Mock(), max_size=2)
+        job_queue.shutdown()
+        
+        assert job_queue.submit("Ev1", {}) is True
+        assert job_queue.submit("Ev2", {}) is True
+        assert job_queue.submit("Ev3", {}) is False
+        assert job_queue.stats()['rejected'] == 1
+    
+    def test_drain_waits_for_running_jobs_only(self):
+        """Test that drain finishes running jobs and leaves queued ones in the store."""
+        release = threading.Event()
+        store = InMemoryJobStore()
+        job_queue = JobQueue(store, lambda job: release.wait(timeout=5), num_workers=1)
+        for n in range(3):
+            job_queue.submit(f"Ev{n}", {})
+        wait_for(lambda: job_queue.stats()['busy_workers'] == 1)
+        
+        assert job_queue.drain(timeout=0.05) is False
+        release.set()
+        assert job_queue.drain(timeout=5) is True
+        job_queue.shutdown()
+        
+        assert store.counts() == {JOB_QUEUED: 2, JOB_DONE: 1, JOB_FAILED: 0}
+    
+    def test_invalid_settings_raise_error(self):
+        """Test that settings which would never run a job are rejected."""
+        with pytest.raises(ValueError, match="Visibility timeout must be positive"):
+            JobQueue(InMemoryJobStore(), Mock(), visibility_timeout=0)
+        with pytest.raises(ValueError, match="Job attempts must be at least 1"):
+            JobQueue(InMemoryJobStore(), Mock(), max_attempts=0)
+
+
+CRASHING_WORKER = """
+import os, sys
+from app.utils.job_queue import SqliteJobStore
+store = SqliteJobStore(sys.argv[1])
+for n in range(3):
+    store.enqueue(f"Ev{n}", {'n': n})
+store.complete(store.claim(60))
+store.claim(0.2)
+os._exit(1)
+"""
+
+
+class TestCrashRecovery:
+    """Test suite for jobs surviving the process that accepted them."""
+    
+    def test_jobs_survive_a_crashed_process(self, tmp_path):
+        """Test that a new process runs the queued jobs and redelivers the one that was in flight."""
+        path = str(tmp_path / "jobs.sqlite3")
+        result = subprocess.run([sys.executable, '-c', CRASHING_WORKER, path],
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert result.returncode == 1
+        
+        handled = []
+        store = SqliteJobStore(path)
+        job_queue = JobQueue(store, lambda job: handled.append((job.key, job.attempts)), poll_interval=0.05)
+        job_queue.start()
+        wait_for(lambda: len(handled) == 2)
+        job_queue.shutdown()
+        
+        assert sorted(handled) == [("Ev1", 2), ("Ev2", 1)]
+        assert store.counts() == {JOB_QUEUED: 0, JOB_DONE: 3, JOB_FAILED: 0}
+    
+    def test_throughput(self, tmp_path):
+        """Test that the SQLite store enqueues and dequeues at least 1k jobs/s."""
+        store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+        payload = mention_payload()['event']
+        
+        started = time.perf_counter()
+        for n in range(1000):
+            store.enqueue(f"Ev{n}", payload)
+        enqueued = time.perf_counter()
+        for _ in range(1000):
+            store.complete(store.claim(60))
+        dequeued = time.perf_counter()
+        
+        assert enqueued - started < 1.0
+        assert dequeued - enqueued < 1.0
+        assert store.counts()[JOB_DONE] == 1000
+    
+    def test_fair_throughput(self, tmp_path):
+        """Test that taking turns between tenants keeps the SQLite store above 500 jobs/s each way."""
+        store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+        payload = mention_payload()['event']
+        
+        started = time.perf_counter()
+        for n in range(1000):
+            store.enqueue(f"Ev{n}", payload, (f"channel:C{n % 10}", f"user:U{n % 50}"), (0, 100))
+        enqueued = time.perf_counter()
+        for _ in range(1000):
+            store.complete(store.claim(60))
+        dequeued = time.perf_counter()
+        
+        assert enqueued - started < 2.0
+        assert dequeued - enqueued < 2.0
+        assert store.tenant_stats()['depth'] == 0
+
+
+class TestHandlerJobQueue:
+    """Test suite for answering mentions from the durable job queue."""
+    
+    def make_handler(self, path: str) -> SlackEventHandler:
+        config = make_config()
+        config.job_queue = 'sqlite'
+        config.job_queue_path = path
+        handler = SlackEventHandler(config, openai_service=Mock(), slack_service=Mock())
+        handler.openai_service.get_chat_completion.return_value = "Hi!"
+        return handler
+    
+    def test_mentions_go_through_the_job_queue(self, tmp_path):
+        """Test that a mention is stored, answered and its key remembered across restarts."""
+        path = str(tmp_path / "jobs.sqlite3")
+        handler = self.make_handler(path)
+        
+        assert handler.dispatch(mention_payload("Ev001")) is True
+        wait_for(lambda: handler.queue_stats()['completed'] == 1)
+        handler.drain(timeout=5)
+        handler.slack_service.post_message.assert_called_once_with('C123456', "Hi!", thread_ts='1700000000.000100')
+        assert handler.work_queue is None
+        
+        restarted = self.make_handler(path)
+        assert restarted.dispatch(mention_payload("Ev001")) is True
+        restarted.drain(timeout=5)
+        restarted.openai_service.get_chat_completion.assert_not_called()
+    
+    def test_mentions_are_stored_under_their_channel_and_user(self, tmp_path):
+        """Test that stored mentions take turns by channel and user and are held to the fair queue quotas."""
+        handler = self.make_handler(str(tmp_path / "jobs.sqlite3"))
+        handler.config.fair_queue_max_per_user = 1
+        job_queue = handler._get_job_queue()
+        job_queue.shutdown()
+        
+        assert handler.dispatch(mention_payload("Ev001")) is True
+        assert handler.dispatch(mention_payload("Ev002")) is False
+        stats = handler.fairness_stats()
+        
+        assert stats['enabled'] is True
+        assert stats['tenants']['user:U123456'] == {'queued': 1, 'submitted': 1, 'served': 0, 'rejected': 1,
+                                                    'mean_wait_seconds': 0.0}
+        assert job_queue.store.claim(60).tenants == ('channel:C123456', 'user:U123456')
+        
+        handler.config.fair_queue = False
+        assert handler._job_tenants(mention_payload()['event']) == ((), ())
+    
+    def test_failed_post_is_retried(self, tmp_path):
+        """Test that a reply which could not be posted is tried again."""
+        handler = self.make_handler(str(tmp_path / "jobs.sqlite3"))
+        handler.slack_service.post_message.side_effect = [RuntimeError("Slack API error: fatal_error"), True]
+        
+        job_queue = handler._get_job_queue()
+        job_queue.retry_delay = 0.0
+        job_queue.poll_interval = 0.01
+        
+        handler.dispatch(mention_payload("Ev001"))
+        wait_for(lambda: handler.queue_stats()['completed'] == 1)
+        handler.drain(timeout=5)
+        
+        assert handler.queue_stats()['retried'] == 1
+        assert handler.slack_service.post_message.call_count == 2
+    
+    def test_posted_reply_is_not_repeated_after_a_crash(self, tmp_path):
+        """Test that a job interrupted after its reply was posted is completed without posting again."""
+        path = str(tmp_path / "jobs.sqlite3")
+        store = SqliteJobStore(path)
+        store.enqueue("Ev001", mention_payload("Ev001")['event'])
+        store.mark_replied(store.claim(0.01))
+        store.close()
+        time.sleep(0.02)
+        
+        handler = self.make_handler(path)
+        handler.resume_jobs()
+        wait_for(lambda: handler.queue_stats()['completed'] == 1)
+        handler.drain(timeout=5)
+        
+        handler.slack_service.post_message.assert_not_called()
@@ -0,0 +1,88 @@
+import pytest
+from app.utils.message_splitter import (
+    FENCE, MAX_BLOCKS, MAX_MESSAGE_CHARS, MAX_SECTION_CHARS, pack_sections, section_block, split_message
+)
+
+
+class TestSplitMessage:
+    """Test suite for splitting long replies."""
+    
+    def test_short_text_is_one_chunk(self):
+        """Test that text within the limit is returned as is, stripped."""
+        assert split_message("  Hello!\n") == ["Hello!"]
+    
+    @pytest.mark.parametrize("length", [10000, 20000, 40000])
+    def test_long_replies_are_split_within_the_limit(self, length, long_reply, words):
+        """Test that 10k-40k replies are split under the limit with nothing lost or reordered."""
+        text = long_reply(length)
+        
+        chunks = split_message(text)
+        
+        assert len(chunks) >= length // MAX_MESSAGE_CHARS
+        assert all(len(chunk) <= MAX_MESSAGE_CHARS for chunk in chunks)
+        assert words("".join(chunks)) == words(text)
+    
+    def test_splits_at_paragraph_boundaries(self):
+        """Test that whole paragraphs are kept together when they fit."""
+        paragraphs = [f"{n} " + "x" * 1500 for n in range(6)]
+        
+        chunks = split_message("\n\n".join(paragraphs))
+        
+        assert chunks == ["\n\n".join(paragraphs[0:2]), "\n\n".join(paragraphs[2:4]), "\n\n".join(paragraphs[4:6])]
+    
+    def test_code_blocks_are_closed_and_reopened(self):
+        """Test that a code block split across chunks renders in each one, with its language."""
+        code = "```python\n" + "\n".join(f"print({i})" for i in range(1000)) + "\n```"
+        
+        chunks = split_message("Here you go:\n\n" + code)
+        
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert chunk.count(FENCE) % 2 == 0
+        assert chunks[0].startswith("Here you go:\n\n```python\nprint(0)")
+        assert all(chunk.startswith("```python\n") for chunk in chunks[1:])
+        assert chunks[-1].endswith("print(999)\n```")
+    
+    def test_blank_lines_inside_code_blocks_are_kept(self):
+        """Test that a blank line in a code block is not treated as a paragraph break."""
+        code = "```\n" + "\n\n".join("a = 1" for _ in range(10)) + "\n```"
+        
+        assert split_message(code + "\n\n" + "y" * MAX_MESSAGE_CHARS)[0] == code
+    
+    def test_long_lines_break_between_words(self):
+        """Test that a paragraph with no line breaks is split between words, or anywhere if it must."""
+        chunks = split_message(" ".join(["word"] * 3000))
+        assert all(len(chunk) <= MAX_MESSAGE_CHARS for chunk in chunks)
+        assert all(not chunk.startswith(" ") and not chunk.endswith(" ") for chunk in chunks)
+        
+        chunks = split_message("z" * 9000)
+        assert "".join(chunks).replace("\n", "") == "z" * 9000
+    
+    def test_limit_too_small_raises_error(self):
+        """Test that a limit with no room for fences is rejected."""
+        with pytest.raises(ValueError, match="Chunk limit must be at least"):
+            split_message("hello", limit=10)
+
+
+class TestPackSections:
+    """Test suite for packing chunks into Block Kit messages."""
+    
+    def test_sections_are_packed_in_order(self, long_reply):
+        """Test that consecutive sections share a message up to the character limit."""
+        sections = split_message(long_reply(40000), MAX_SECTION_CHARS)
+        
+        messages = pack_sections(sections)
+        
+        assert [section for message in messages for section in message] == sections
+        assert all(sum(len(section) for section in message) <= 12000 for message in messages)
+        assert len(messages) < len(split_message(long_reply(40000)))
+    
+    def test_block_count_is_limited(self):
+        """Test that a message never has more than MAX_BLOCKS sections."""
+        messages = pack_sections(["x"] * 120)
+        
+        assert [len(message) for message in messages] == [MAX_BLOCKS, MAX_BLOCKS, 20]
+    
+    def test_section_block(self):
+        """Test the mrkdwn section block format."""
+        assert section_block("*hi*") == {'type': 'section', 'text': {'type': 'mrkdwn', 'text': "*hi*"}}
@@ -1,7 +1,13 @@
 import pytest
+import random
+import timeit
 from unittest.mock import Mock, patch, MagicMock
 import openai
-from app.services.openai_service import OpenAIService
+from app.utils.response_cache import ResponseCache
+from app.services.openai_service import (
+    ContextPacker, MESSAGE_TOKEN_OVERHEAD, OpenAIService, TokenCounter, _estimate_tokens,
+    _format_slack_message_sequential
+)
 
 
 class TestOpenAIService:
@@ -126,6 +132,104 @@ class TestOpenAIService:
             assert service.model == "gpt-3.5-turbo"
 
 
+class TestDeferredValidation:
+    """Test suite for lazy and background API key validation."""
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_invalid_validation_mode_raises_error(self, mock_openai_class):
+        """Test that an unknown validation mode raises ValueError."""
+        with pytest.raises(ValueError, match="Invalid validation mode: sometimes"):
+            OpenAIService("test-api-key", validation="sometimes")
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_eager_validation_status(self, mock_openai_class):
+        """Test that eager validation records a valid key."""
+        mock_openai_class.return_value.chat.completions.create.return_value = Mock()
+        
+        service = OpenAIService("test-api-key")
+        
+        assert service.validation_status()['state'] == 'valid'
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_lazy_validation_makes_no_request(self, mock_openai_class):
+        """Test that lazy validation does not call the API in the constructor."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        
+        mock_client.chat.completions.create.assert_not_called()
+        assert service.validation_status()['state'] == 'pending'
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_lazy_validation_first_completion_validates(self, mock_openai_class):
+        """Test that the first successful completion marks the key valid."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        service.get_chat_completion("Hello!")
+        
+        assert mock_client.chat.completions.create.call_count == 1
+        status = service.validation_status()
+        assert status['state'] == 'valid'
+        assert status['checked_at'] is not None
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_lazy_validation_auth_error_marks_invalid(self, mock_openai_class):
+        """Test that an authentication failure on first use marks the key invalid."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = openai.AuthenticationError(
+            "Invalid API key", response=Mock(), body=Mock()
+        )
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        with pytest.raises(RuntimeError, match="OpenAI API authentication failed"):
+            service.get_chat_completion("Hello!")
+        
+        status = service.validation_status()
+        assert status['state'] == 'invalid'
+        assert status['error'] == "Invalid OpenAI API key"
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_background_validation(self, mock_openai_class):
+        """Test that background validation probes the key off the calling thread."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.return_value = Mock()
+        
+        service = OpenAIService("test-api-key", validation="background")
+        service.credential_check.wait(5)
+        
+        mock_client.chat.completions.create.assert_called_once_with(
+            model="gpt-4",
+            messages=[{"role": "user", "content": "test"}],
+            max_tokens=1
+        )
+        assert service.validation_status()['state'] == 'valid'
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_background_validation_failure_is_cached(self, mock_openai_class):
+        """Test that a failed background probe is recorded instead of raised."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = openai.AuthenticationError(
+            "Invalid API key", response=Mock(), body=Mock()
+        )
+        
+        service = OpenAIService("test-api-key", validation="background")
+        service.credential_check.wait(5)
+        
+        status = service.validation_status()
+        assert status['state'] == 'invalid'
+        assert status['error'] == "Invalid OpenAI API key"
+
+
 class TestMessageFormatting:
     """Test suite for Slack message formatting functionality."""
     
@@ -243,6 +347,89 @@ class TestMessageFormatting:
         # Message with only formatting
         result = service.format_slack_message("*bold* _italic_ `code`")
         assert result == "bold italic code"
+    
+    def test_format_slack_message_formatting_inside_links(self):
+        """Test that formatting marks inside link text are paired with the rest of the message."""
+        service = self.setup_service()
+        
+        result = service.format_slack_message("*<https://example.com|see* the docs>")
+        assert result == "see the docs"
+        
+        result = service.format_slack_message("Open <https://example.com/a_b_c>")
+        assert result == "Open https://example.com/abc"
+    
+    def test_format_slack_message_unpaired_marks(self):
+        """Test that unpaired or empty formatting marks are kept."""
+        service = self.setup_service()
+        
+        assert service.format_slack_message("2 * 3 = 6") == "2 * 3 = 6"
+        assert service.format_slack_message("**not bold**") == "*not bold*"
+        assert service.format_slack_message("snake_case_name") == "snakecasename"
+    
+    def test_format_slack_message_nested_brackets(self):
+        """Test that nested and stray angle brackets match the rule-by-rule passes."""
+        service = self.setup_service()
+        
+        messages = [
+            "<<@U123456>#C123456>",
+            "<https://example.com|a<@U123456>b>",
+            "<h<@U123456>ttps://example.com>",
+            "if a < b and <@U123456> then c > d",
+        ]
+        for message in messages:
+            assert service.format_slack_message(message) == _format_slack_message_sequential(message)
+    
+    def test_format_slack_message_matches_sequential_passes(self):
+        """Test that randomly generated markup formats the same as the rule-by-rule passes."""
+        service = self.setup_service()
+        
+        tokens = [
+            "<@U123456>", "<@U789012|jo_e>", "<#C123456>", "<#C123456|general>",
+            "<https://example.com|site>", "<https://a_b.com>", "<https://x.com|a*b>",
+            "*", "_", "`", "~", "<", ">", "|", " ", "\n", "\t", "text", "https://",
+            "@U1", "#C1", "<http", "ttps://z.com>", "**", "__",
+        ]
+        rng = random.Random(42)
+        for _ in range(20000):
+            message = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+            assert service.format_slack_message(message) == _format_slack_message_sequential(message), message
+
+
+class TestMessageFormattingBenchmark:
+    """Micro-benchmark of the single-pass formatter against the rule-by-rule passes."""
+    
+    LINE = (
+        "<@U123456> can you *summarise* the _results_ from "
+        "<https://example.com/run|the last run> and check `config.yaml`? "
+    )
+    
+    @patch('app.services.openai_service.OpenAI')
+    def setup_service(self, mock_openai_class):
+        """Helper to set up service for benchmarking."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.return_value = Mock()
+        return OpenAIService("test-api-key")
+    
+    @pytest.mark.parametrize("size", [120, 2000, 40000])
+    def test_format_slack_message_benchmark(self, size):
+        """Compare formatting time on short, medium and 40 KB messages."""
+        service = self.setup_service()
+        message = (self.LINE * (size // len(self.LINE) + 1))[:size]
+        number = max(5, 20000 // size)
+        
+        assert service.format_slack_message(message) == _format_slack_message_sequential(message)
+        
+        single_pass = min(timeit.repeat(
+            lambda: service.format_slack_message(message), number=number, repeat=5))
+        sequential = min(timeit.repeat(
+            lambda: _format_slack_message_sequential(message), number=number, repeat=5))
+        
+        print(f"\n{size} chars: single-pass {single_pass / number * 1e6:.1f}us, "
+              f"sequential {sequential / number * 1e6:.1f}us")
+        
+        # Generous bound so the benchmark stays stable on loaded machines
+        assert single_pass < sequential * 1.5
 
 
 class TestChatCompletion:
@@ -493,6 +680,342 @@ class TestChatCompletion:
         assert chat_call[1]['temperature'] == 0.7
 
 
+class TestStreamingChatCompletion:
+    """Test suite for streamed chat completions."""
+    
+    @staticmethod
+    def make_chunk(content):
+        """Build a streamed chunk carrying a content delta."""
+        chunk = Mock()
+        chunk.choices = [Mock()]
+        chunk.choices[0].delta.content = content
+        return chunk
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_stream_yields_deltas(self, mock_openai_class):
+        """Test that content deltas are yielded in order and empty ones skipped."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        role_chunk = self.make_chunk(None)
+        final_chunk = Mock()
+        final_chunk.choices = []
+        mock_client.chat.completions.create.return_value = iter([
+            role_chunk, self.make_chunk("Hel"), self.make_chunk("lo"), final_chunk
+        ])
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        fragments = list(service.stream_chat_completion("<@U123456> *Hi*"))
+        
+        assert fragments == ["Hel", "lo"]
+        call = mock_client.chat.completions.create.call_args
+        assert call[1]['stream'] is True
+        assert call[1]['messages'] == [{"role": "user", "content": "Hi"}]
+        assert service.validation_status()['state'] == 'valid'
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_stream_empty_message_raises_error(self, mock_openai_class):
+        """Test that empty messages are rejected before any request."""
+        service = OpenAIService("test-api-key", validation="lazy")
+        
+        with pytest.raises(ValueError, match="Message cannot be empty or None"):
+            service.stream_chat_completion("   ")
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_stream_authentication_error(self, mock_openai_class):
+        """Test that authentication errors are raised when the stream is opened."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = openai.AuthenticationError(
+            "Invalid API key", response=Mock(), body=Mock()
+        )
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        
+        with pytest.raises(RuntimeError, match="OpenAI API authentication failed"):
+            service.stream_chat_completion("Hello!")
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_stream_rate_limit_error(self, mock_openai_class):
+        """Test that rate limit errors are mapped when the stream is opened."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = openai.RateLimitError(
+            "Rate limit exceeded", response=Mock(), body=Mock()
+        )
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        
+        with pytest.raises(RuntimeError, match="OpenAI API rate limit exceeded"):
+            service.stream_chat_completion("Hello!")
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_stream_error_mid_stream(self, mock_openai_class):
+        """Test that errors while iterating are mapped to RuntimeError."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        def broken_stream():
+            yield self.make_chunk("Partial")
+            raise openai.APIError("Connection dropped", request=Mock(), body=Mock())
+        
+        mock_client.chat.completions.create.return_value = broken_stream()
+        service = OpenAIService("test-api-key", validation="lazy")
+        fragments = service.stream_chat_completion("Hello!")
+        
+        assert next(fragments) == "Partial"
+        with pytest.raises(RuntimeError, match="OpenAI API error:"):
+            next(fragments)
+
+
+class TestConversationCompletion:
+    """Test suite for completions over a list of chat messages."""
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_message_list_is_formatted_and_sent(self, mock_openai_class):
+        """Test that each message is formatted and empty ones are dropped."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Follow-up answer"
+        mock_client.chat.completions.create.return_value = mock_response
+        
+        service = OpenAIService("test-api-key", validation="lazy")
+        result = service.get_chat_completion([
+            {"role": "user", "content": "<@U123456> *What* is Flask?"},
+            {"role": "assistant", "content": "A web framework."},
+            {"role": "user", "content": "<@U123456>"},
+            {"role": "user", "content": "<@U123456> Who wrote it?"}
+        ])
+        
+        assert result == "Follow-up answer"
+        assert mock_client.chat.completions.create.call_args[1]['messages'] == [
+            {"role": "user", "content": "What is Flask?"},
+            {"role": "assistant", "content": "A web framework."},
+            {"role": "user", "content": "Who wrote it?"}
+        ]
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_invalid_message_lists(self, mock_openai_class):
+        """Test that empty lists, unknown roles and all-empty content are rejected."""
+        service = OpenAIService("test-api-key", validation="lazy")
+        
+        with pytest.raises(ValueError, match="Messages cannot be empty"):
+            service.get_chat_completion([])
+        with pytest.raises(ValueError, match="Invalid message role: tool"):
+            service.get_chat_completion([{"role": "tool", "content": "x"}])
+        with pytest.raises(ValueError, match="Message cannot be empty after formatting"):
+            service.stream_chat_completion([{"role": "user", "content": "<@U123456>"}])
+
+
+def word_counter(**kwargs) -> TokenCounter:
+    """Token counter that counts one token per word."""
+    return TokenCounter(encode=str.split, **kwargs)
+
+
+def turn(role: str, words: int, label: str = "w") -> dict:
+    """Build a chat message with a given number of one-token words."""
+    return {"role": role, "content": " ".join(f"{label}{i}" for i in range(words))}
+
+
+class TestResponseCaching:
+    """Test suite for reusing responses to identical prompts."""
+    
+    def setup_method(self):
+        """Set up a service with a mocked client and an in-memory response cache."""
+        with patch('app.services.openai_service.OpenAI') as mock_openai_class:
+            self.mock_client = Mock()
+            mock_openai_class.return_value = self.mock_client
+            self.service = OpenAIService("test-api-key", validation="lazy", response_cache=ResponseCache())
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "The password is on the fridge."
+        self.mock_client.chat.completions.create.return_value = mock_response
+    
+    def test_identical_prompt_is_answered_from_cache(self):
+        """Test that a repeated question does not call the API again."""
+        first = self.service.get_chat_completion("<@U123456> What's the *wifi* password?")
+        second = self.service.get_chat_completion("what's the wifi   password?")
+        
+        assert first == second == "The password is on the fridge."
+        self.mock_client.chat.completions.create.assert_called_once()
+        assert self.service.response_cache.stats()['hits'] == 1
+    
+    def test_cache_opt_out(self):
+        """Test that use_cache=False always calls the API."""
+        self.service.get_chat_completion("What's the wifi password?")
+        self.service.get_chat_completion("What's the wifi password?", use_cache=False)
+        
+        assert self.mock_client.chat.completions.create.call_count == 2
+    
+    def test_errors_are_not_cached(self):
+        """Test that a failed call leaves nothing behind."""
+        self.mock_client.chat.completions.create.side_effect = [
+            openai.APIError("Server error", request=Mock(), body=Mock()),
+            self.mock_client.chat.completions.create.return_value
+        ]
+        
+        with pytest.raises(RuntimeError):
+            self.service.get_chat_completion("Hello")
+        
+        assert self.service.get_chat_completion("Hello") == "The password is on the fridge."
+    
+    def test_streamed_response_is_cached(self):
+        """Test that a completed stream fills the cache and a hit is one fragment."""
+        chunks = []
+        for content in ("The password ", "is on the fridge."):
+            chunk = Mock()
+            chunk.choices = [Mock()]
+            chunk.choices[0].delta.content = content
+            chunks.append(chunk)
+        self.mock_client.chat.completions.create.return_value = iter(chunks)
+        
+        assert list(self.service.stream_chat_completion("wifi?")) == ["The password ", "is on the fridge."]
+        assert list(self.service.stream_chat_completion("WIFI?")) == ["The password is on the fridge."]
+        self.mock_client.chat.completions.create.assert_called_once()
+
+
+class TestTokenCounter:
+    """Test suite for cached token counting."""
+    
+    def test_counts_are_cached(self):
+        """Test that a repeated text is counted once."""
+        encode = Mock(side_effect=str.split)
+        counter = TokenCounter(encode=encode)
+        
+        assert counter.count("one two three") == 3
+        assert counter.count("one two three") == 3
+        
+        encode.assert_called_once_with("one two three")
+        assert counter.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+    
+    def test_cache_is_bounded(self):
+        """Test that the least recently used counts are evicted."""
+        counter = word_counter(max_entries=2)
+        
+        for text in ("a", "b", "a", "c"):
+            counter.count(text)
+        
+        assert counter.stats()['entries'] == 2
+        counter.count("b")
+        assert counter.stats()['misses'] == 4
+    
+    def test_count_message_adds_overhead(self):
+        """Test that each chat message carries the per-message overhead."""
+        counter = word_counter()
+        
+        assert counter.count_message({"role": "user", "content": "a b"}) == 2 + MESSAGE_TOKEN_OVERHEAD
+        assert counter.count_message({"role": "user", "content": None}) == MESSAGE_TOKEN_OVERHEAD
+    
+    def test_estimate_without_tokenizer(self):
+        """Test that the fallback estimate is close to real token counts."""
+        assert _estimate_tokens("") == 0
+        assert _estimate_tokens("Hello, world! This is a test.") == 9
+        assert _estimate_tokens("snake_case") == 3
+
+
+class TestContextPacker:
+    """Test suite for fitting conversations into the input token budget."""
+    
+    def test_budget_must_be_positive(self):
+        """Test that a budget below 1 raises ValueError."""
+        with pytest.raises(ValueError, match="Input token budget must be at least 1"):
+            ContextPacker(word_counter(), max_input_tokens=0)
+    
+    def test_conversation_within_budget_is_unchanged(self):
+        """Test that nothing is dropped when everything fits."""
+        messages = [turn("user", 10), turn("assistant", 10), turn("user", 10)]
+        
+        assert ContextPacker(word_counter(), max_input_tokens=1000).pack(messages) == messages
+    
+    def test_keeps_first_and_most_recent_turns(self):
+        """Test that middle turns are replaced by a note when over budget."""
+        messages = [turn("user", 20, "q")] + [
+            turn("assistant" if i % 2 else "user", 20, f"m{i}") for i in range(1, 9)
+        ] + [turn("user", 20, "latest")]
+        packer = ContextPacker(word_counter(), max_input_tokens=120)
+        
+        packed = packer.pack(messages)
+        
+        assert packed[0] == messages[0]
+        assert packed[1] == {"role": "system", "content": "6 earlier messages in this conversation were omitted."}
+        assert packed[2:] == messages[-3:]
+        assert sum(packer.counter.count_message(m) for m in packed) <= 120
+    
+    def test_first_turn_dropped_when_too_large(self):
+        """Test that recency wins when the opening message does not fit."""
+        messages = [turn("user", 200, "q"), turn("assistant", 10), turn("user", 10, "latest")]
+        
+        packed = ContextPacker(word_counter(), max_input_tokens=60).pack(messages)
+        
+        assert packed[0]["content"] == "1 earlier message in this conversation were omitted."
+        assert packed[1:] == messages[1:]
+    
+    def test_latest_message_always_kept(self):
+        """Test that an oversized latest message is still sent."""
+        messages = [turn("user", 10), turn("user", 500, "latest")]
+        
+        packed = ContextPacker(word_counter(), max_input_tokens=100).pack(messages)
+        
+        assert packed[-1] == messages[-1]
+        assert packed[0]["role"] == "system"
+    
+    @patch('app.services.openai_service.OpenAI')
+    def test_service_packs_conversations(self, mock_openai_class):
+        """Test that completions send the packed conversation."""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.return_value = iter([])
+        service = OpenAIService("test-api-key", validation="lazy", max_input_tokens=100)
+        
+        conversation = [turn("user", 10)] + [turn("assistant", 50, "long")] * 5 + [turn("user", 10, "latest")]
+        list(service.stream_chat_completion(conversation))
+        
+        sent = mock_client.chat.completions.create.call_args[1]['messages']
+        assert sent[-1] == conversation[-1]
+        assert len(sent) < len(conversation)
+        assert sum(service.token_counter.count_message(m) for m in sent) <= 100
+
+
+class TestContextPackerBenchmark:
+    """Benchmark packing a growing thread turn by turn with and without the count cache."""
+    
+    TURNS = 40
+    
+    def conversation(self, turns: int) -> list:
+        """Build a thread of long, distinct messages."""
+        text = "Could you explain how the deployment pipeline handles rollbacks, step by step? " * 6
+        return [
+            {"role": "assistant" if i % 2 else "user", "content": f"{i}: {text}"}
+            for i in range(turns)
+        ]
+    
+    def replay(self, counter: TokenCounter) -> float:
+        """Pack every prefix of the thread, as each new turn in a thread would."""
+        packer = ContextPacker(counter, max_input_tokens=2000)
+        messages = self.conversation(self.TURNS)
+        return min(timeit.repeat(
+            lambda: [packer.pack(messages[:n]) for n in range(1, self.TURNS + 1)],
+            number=1, repeat=5
+        ))
+    
+    def test_token_count_cache_benchmark(self):
+        """Test that re-sent history is not re-tokenized on every turn."""
+        cached = TokenCounter()
+        uncached_time = self.replay(TokenCounter(max_entries=0))
+        cached_time = self.replay(cached)
+        
+        stats = cached.stats()
+        hit_rate = stats['hits'] / (stats['hits'] + stats['misses'])
+        print(f"\n{self.TURNS} turns: cached {cached_time * 1e3:.2f}ms, "
+              f"uncached {uncached_time * 1e3:.2f}ms, hit rate {hit_rate:.1%}")
+        
+        # Only the newest turn of each prefix (and the omission notes) are new text
+        assert hit_rate > 0.9
+        assert cached_time < uncached_time
+
+
 class TestOpenAIServiceIntegration:
     """Integration tests for OpenAI service with real API (if available)."""
     
@@ -0,0 +1,323 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.handlers.async_slack_handler import AsyncSlackEventHandler
+from app.handlers.slack_handler import SlackEventHandler
+from app.services.async_openai_service import AsyncOpenAIService
+from app.services.openai_service import OpenAIService
+from app.utils.priority_scheduler import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, ClassQueue, PriorityScheduler
+)
+from app.utils.rate_limiter import RateLimiter
+from tests.test_retry import FakeClock, completion
+from tests.test_single_flight import wait_for
+from tests.test_slack_handler import make_config
+
+# Token count the gated limiter holds the turn on until released
+BLOCKER = -1
+
+
+class GatedLimiter:
+    """Rate limiter stand-in recording the order requests reserve in.
+    
+    Requests are told apart by their token counts. The request with BLOCKER
+    tokens keeps its turn until `release` is set.
+    """
+    
+    def __init__(self):
+        self.order = []
+        self.release = threading.Event()
+    
+    def acquire(self, tokens: int = 0) -> float:
+        if tokens == BLOCKER:
+            self.release.wait(timeout=5)
+        else:
+            self.order.append(tokens)
+        return 0.0
+    
+    async def acquire_async(self, tokens: int = 0) -> float:
+        self.order.append(tokens)
+        return 0.0
+
+
+class TestPriorityScheduler:
+    """Test suite for sharing the rate limit budget by priority."""
+    
+    def hold_turn(self, scheduler: PriorityScheduler) -> threading.Thread:
+        """Start a bulk request that keeps the turn until the gated limiter is released."""
+        thread = threading.Thread(target=scheduler.acquire, args=(BLOCKER, PRIORITY_BULK))
+        thread.start()
+        wait_for(lambda: scheduler.stats()[PRIORITY_BULK]['requests'] == 1)
+        return thread
+    
+    def queue(self, scheduler: PriorityScheduler, requests: list) -> list:
+        """Queue (tokens, priority) requests one after another and return their threads."""
+        threads = []
+        for tokens, priority in requests:
+            queued = sum(stats['queued'] for stats in scheduler.stats().values())
+            thread = threading.Thread(target=scheduler.acquire, args=(tokens, priority))
+            thread.start()
+            threads.append(thread)
+            wait_for(lambda: sum(stats['queued'] for stats in scheduler.stats().values()) == queued + 1)
+        return threads
+    
+    def test_invalid_arguments_raise_error(self):
+        """Test that incomplete weights, bad values and unknown classes are rejected."""
+        with pytest.raises(ValueError, match="weights must be given"):
+            PriorityScheduler(Mock(), weights={PRIORITY_INTERACTIVE: 1})
+        with pytest.raises(ValueError, match="weights must be positive"):
+            PriorityScheduler(Mock(), weights={PRIORITY_INTERACTIVE: 1, PRIORITY_NORMAL: 0, PRIORITY_BULK: 1})
+        with pytest.raises(ValueError, match="Maximum wait must be positive"):
+            PriorityScheduler(Mock(), max_wait=0)
+        with pytest.raises(ValueError, match="Invalid priority: urgent"):
+            PriorityScheduler(Mock()).acquire(0, 'urgent')
+    
+    def test_budget_is_shared_by_weight(self):
+        """Test that waiting classes are served in proportion to their weights, FIFO within a class."""
+        limiter = GatedLimiter()
+        scheduler = PriorityScheduler(limiter, weights={PRIORITY_INTERACTIVE: 4, PRIORITY_NORMAL: 2,
+                                                        PRIORITY_BULK: 1})
+        bulk = [(200 + n, PRIORITY_BULK) for n in range(8)]
+        normal = [(100 + n, PRIORITY_NORMAL) for n in range(8)]
+        interactive = [(n, PRIORITY_INTERACTIVE) for n in range(8)]
+        threads = [self.hold_turn(scheduler)] + self.queue(scheduler, bulk + normal + interactive)
+        
+        limiter.release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        
+        # Roughly 4:2:1 while all three are waiting (bulk already had the first turn)
+        classes = [tokens // 100 for tokens in limiter.order]
+        assert [classes[:14].count(n) for n in range(3)] == [8, 5, 1]
+        assert [tokens for tokens in limiter.order if tokens < 100] == list(range(8))
+        assert [tokens for tokens in limiter.order if tokens >= 200] == list(range(200, 208))
+        assert len(limiter.order) == 24
+    
+    def test_class_alone_gets_the_whole_budget(self):
+        """Test that a low weight does not hold back a class nobody else competes with."""
+        limiter = RateLimiter(requests_per_minute=600, burst_seconds=1.0)
+        scheduler = PriorityScheduler(limiter)
+        
+        waited = [scheduler.acquire(0, PRIORITY_BULK) for _ in range(10)]
+        
+        assert sum(waited) < 0.1
+        assert scheduler.stats()[PRIORITY_BULK]['requests'] == 10
+    
+    def test_long_wait_goes_first(self):
+        """Test that a request waiting max_wait seconds is not starved by more urgent ones."""
+        clock = FakeClock()
+        limiter = GatedLimiter()
+        scheduler = PriorityScheduler(limiter, max_wait=30.0, clock=clock)
+        threads = [self.hold_turn(scheduler)] + self.queue(scheduler, [(200, PRIORITY_BULK)])
+        clock.now = 31.0
+        threads += self.queue(scheduler, [(n, PRIORITY_INTERACTIVE) for n in range(3)])
+        
+        limiter.release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        
+        assert limiter.order == [200, 0, 1, 2]
+        assert scheduler.stats()[PRIORITY_BULK]['promoted'] == 1
+    
+    def test_failed_wait_frees_the_turn(self):
+        """Test that a request whose limiter wait raises lets the next one through."""
+        limiter = Mock()
+        limiter.acquire.side_effect = [RuntimeError("interrupted"), 0.0]
+        scheduler = PriorityScheduler(limiter)
+        
+        with pytest.raises(RuntimeError, match="interrupted"):
+            scheduler.acquire(0, PRIORITY_INTERACTIVE)
+        scheduler.acquire(0, PRIORITY_BULK)
+        
+        assert limiter.acquire.call_count == 2
+    
+    def test_coroutines_take_turns_with_threads(self):
+        """Test that coroutines wait in the same classes as threads, and a cancelled one gives up its place."""
+        limiter = GatedLimiter()
+        scheduler = PriorityScheduler(limiter)
+        blocker = self.hold_turn(scheduler)
+        
+        async def run():
+            bulk = asyncio.create_task(scheduler.acquire_async(200, PRIORITY_BULK))
+            cancelled = asyncio.create_task(scheduler.acquire_async(100, PRIORITY_INTERACTIVE))
+            interactive = asyncio.create_task(scheduler.acquire_async(0, PRIORITY_INTERACTIVE))
+            while sum(stats['queued'] for stats in scheduler.stats().values()) < 3:
+                await asyncio.sleep(0.001)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            limiter.release.set()
+            await asyncio.gather(bulk, interactive)
+        
+        asyncio.run(run())
+        blocker.join(timeout=5)
+        
+        assert limiter.order == [0, 200]
+        assert sum(stats['queued'] for stats in scheduler.stats().values()) == 0
+        scheduler.acquire(300, PRIORITY_NORMAL)
+        assert limiter.order == [0, 200, 300]
+
+
+class TestClassQueue:
+    """Test suite for the queue with a FIFO per priority class."""
+    
+    def test_classes_are_served_by_weight(self):
+        """Test that waiting classes are served by weight, each in arrival order, sentinels last."""
+        class_queue = ClassQueue()
+        class_queue.put_nowait(None)
+        for n in range(8):
+            class_queue.put_nowait((PRIORITY_BULK, f"b{n}"))
+        for n in range(8):
+            class_queue.put_nowait((PRIORITY_INTERACTIVE, f"i{n}"))
+        
+        order = [class_queue.get_nowait() for _ in range(17)]
+        
+        assert order[:10] == ['i0', 'b0', 'i1', 'i2', 'i3', 'i4', 'i5', 'i6', 'i7', 'b1']
+        assert order[-1] is None
+        with pytest.raises(ValueError, match="Invalid priority: urgent"):
+            class_queue.put_nowait(('urgent', 'x'))
+    
+    def test_long_wait_goes_first(self):
+        """Test that a class not served for max_wait seconds goes next."""
+        clock = FakeClock()
+        class_queue = ClassQueue(max_wait=30.0, clock=clock)
+        class_queue.put_nowait((PRIORITY_BULK, 'b0'))
+        clock.now = 31.0
+        for n in range(3):
+            class_queue.put_nowait((PRIORITY_INTERACTIVE, f"i{n}"))
+        
+        assert [class_queue.get_nowait() for _ in range(4)] == ['b0', 'i0', 'i1', 'i2']
+
+
+class TestOpenAIServicePriority:
+    """Test suite for the priority scheduler in front of OpenAIService."""
+    
+    def test_completions_wait_in_their_class(self):
+        """Test that each request reserves its rate limit budget in the class it was given."""
+        limiter = RateLimiter(requests_per_minute=600)
+        scheduler = Mock(wraps=PriorityScheduler(limiter))
+        with patch('app.services.openai_service.OpenAI'):
+            service = OpenAIService("test-api-key", validation="lazy", rate_limiter=limiter, scheduler=scheduler)
+        service.client = Mock()
+        raw_response = service.client.chat.completions.with_raw_response.create.return_value
+        raw_response.headers = {}
+        raw_response.parse.return_value = completion("Hi")
+        
+        service.get_chat_completion("Summarise the channel", priority=PRIORITY_BULK)
+        service.get_chat_completion("What is Flask?")
+        
+        assert [call.args[1] for call in scheduler.acquire.call_args_list] == [PRIORITY_BULK, PRIORITY_NORMAL]
+    
+    def test_async_completions_wait_in_their_class(self):
+        """Test that the asyncio service reserves its budget through the scheduler by class too."""
+        limiter = RateLimiter(requests_per_minute=600)
+        scheduler = Mock(wraps=PriorityScheduler(limiter))
+        with patch('app.services.async_openai_service.AsyncOpenAI'):
+            service = AsyncOpenAIService("test-api-key", validation="lazy", rate_limiter=limiter,
+                                         scheduler=scheduler)
+        raw_response = Mock(headers={})
+        raw_response.parse.return_value = completion("Hi")
+        service.client = Mock()
+        service.client.chat.completions.with_raw_response.create = AsyncMock(return_value=raw_response)
+        
+        async def run():
+            await service.get_chat_completion("Summarise the channel", priority=PRIORITY_BULK)
+            await service.get_chat_completion("What is Flask?")
+        
+        asyncio.run(run())
+        
+        assert [call.args[1] for call in scheduler.acquire_async.call_args_list] == [PRIORITY_BULK, PRIORITY_NORMAL]
+
+
+class TestHandlerPriorityScheduler:
+    """Test suite for building the scheduler from config."""
+    
+    def test_built_with_the_rate_limiter(self):
+        """Test that a configured rate limiter is shared by priority and reported per class."""
+        config = make_config()
+        config.openai_requests_per_minute = 600
+        handler = SlackEventHandler(config)
+        
+        with patch('app.services.openai_service.OpenAI'):
+            service = handler._get_openai_service()
+        
+        assert service.scheduler.rate_limiter is service.rate_limiter
+        assert service.scheduler.max_wait == 30.0
+        assert handler.rate_limit_stats()['priorities'][PRIORITY_INTERACTIVE]['weight'] == 8
+    
+    def test_off_without_a_limiter_or_when_disabled(self):
+        """Test that there is nothing to schedule without a limiter, and that it can be turned off."""
+        config = make_config()
+        assert SlackEventHandler(config)._build_scheduler(None) is None
+        
+        config.openai_priority_scheduling = False
+        assert SlackEventHandler(config)._build_scheduler(RateLimiter(requests_per_minute=600)) is None
+    
+    def test_async_handler_builds_the_scheduler(self):
+        """Test that the asyncio handler shares its rate limiter by priority as well."""
+        config = make_config()
+        config.openai_requests_per_minute = 600
+        handler = AsyncSlackEventHandler(config)
+        
+        with patch('app.services.async_openai_service.AsyncOpenAI'):
+            service = asyncio.run(handler._get_openai_service_async())
+        
+        assert service.scheduler.rate_limiter is service.rate_limiter
+
+
+class TestPrioritySchedulerBenchmark:
+    """Simulate live mentions arriving while bulk jobs saturate the rate limit."""
+    
+    RATE = 50            # Requests per second the limiter lets through
+    BULK_WORKERS = 8     # Threads sending bulk requests back to back
+    MENTIONS = 20
+    MENTION_INTERVAL = 0.05
+    
+    def simulate(self, scheduled: bool):
+        """Return the p95 interactive wait and the number of bulk requests sent."""
+        limiter = RateLimiter(requests_per_minute=self.RATE * 60, burst_seconds=1.0 / self.RATE)
+        scheduler = PriorityScheduler(limiter) if scheduled else None
+        stop = threading.Event()
+        bulk_sent = []
+        
+        def send(priority: str) -> float:
+            started = time.perf_counter()
+            if scheduler is None:
+                limiter.acquire(0)
+            else:
+                scheduler.acquire(0, priority)
+            return time.perf_counter() - started
+        
+        def bulk_worker():
+            while not stop.is_set():
+                send(PRIORITY_BULK)
+                bulk_sent.append(1)
+        
+        workers = [threading.Thread(target=bulk_worker) for _ in range(self.BULK_WORKERS)]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.2)
+        
+        waits = []
+        for _ in range(self.MENTIONS):
+            waits.append(send(PRIORITY_INTERACTIVE))
+            time.sleep(self.MENTION_INTERVAL)
+        
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=5)
+        return sorted(waits)[int(0.95 * (len(waits) - 1))], len(bulk_sent)
+    
+    def test_interactive_p95_under_bulk_load(self):
+        """Benchmark: scheduled mentions wait a fraction of what they wait in arrival order."""
+        fifo_p95, _ = self.simulate(scheduled=False)
+        scheduled_p95, bulk_sent = self.simulate(scheduled=True)
+        
+        print(f"\n{self.MENTIONS} mentions under {self.BULK_WORKERS} saturating bulk workers at {self.RATE}/s: "
+              f"p95 wait arrival order {fifo_p95 * 1000:.0f}ms, prioritised {scheduled_p95 * 1000:.0f}ms, "
+              f"{bulk_sent} bulk requests sent")
+        
+        assert scheduled_p95 < fifo_p95 / 2
+        # Bulk still gets the budget mentions leave unused
+        assert bulk_sent >= self.RATE // 2
@@ -0,0 +1,231 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+from app.handlers.slack_handler import SlackEventHandler
+from app.services.openai_service import OpenAIService
+from app.utils.rate_limiter import RateLimiter
+from tests.test_retry import FakeClock, completion, rate_limited
+from tests.test_slack_handler import make_config
+
+
+class FakeRateLimitedAPI:
+    """Fake chat.completions enforcing per-minute limits like the OpenAI API.
+    
+    Each limit is a bucket holding a full minute's worth, refilled
+    continuously. Requests over either limit get a 429; every response
+    carries the x-ratelimit-* headers.
+    """
+    
+    def __init__(self, clock: FakeClock, requests_per_minute: int, tokens_per_minute: int, count_tokens):
+        self.clock = clock
+        self.limits = {'requests': requests_per_minute, 'tokens': tokens_per_minute}
+        self.levels = dict(self.limits)
+        self.updated_at = clock()
+        self.count_tokens = count_tokens
+        self.sent_at = []
+        self.rejected = 0
+    
+    def create_raw(self, **kwargs):
+        """Answer like chat.completions.with_raw_response.create."""
+        now = self.clock()
+        for name, limit in self.limits.items():
+            self.levels[name] = min(limit, self.levels[name] + (now - self.updated_at) * limit / 60)
+        self.updated_at = now
+        
+        cost = {'requests': 1, 'tokens': self.count_tokens(kwargs['messages'])}
+        if any(self.levels[name] < cost[name] for name in cost):
+            self.rejected += 1
+            raise rate_limited(self.headers())
+        
+        for name in cost:
+            self.levels[name] -= cost[name]
+        self.sent_at.append(now)
+        
+        raw_response = Mock()
+        raw_response.headers = self.headers()
+        raw_response.parse.return_value = completion("ok")
+        return raw_response
+    
+    def create(self, **kwargs):
+        """Answer like chat.completions.create."""
+        return self.create_raw(**kwargs).parse()
+    
+    def headers(self) -> dict:
+        """Build the rate limit headers for the current bucket levels."""
+        headers = {}
+        for name, limit in self.limits.items():
+            headers[f'x-ratelimit-limit-{name}'] = str(limit)
+            headers[f'x-ratelimit-remaining-{name}'] = str(int(self.levels[name]))
+        return headers
+
+
+class TestRateLimiter:
+    """Test suite for the requests and tokens per minute budgets."""
+    
+    def test_invalid_arguments_raise_error(self):
+        """Test that negative limits and a non-positive burst window raise ValueError."""
+        with pytest.raises(ValueError, match="Rate limits cannot be negative"):
+            RateLimiter(requests_per_minute=-1)
+        with pytest.raises(ValueError, match="Burst window must be positive"):
+            RateLimiter(requests_per_minute=60, burst_seconds=0)
+    
+    def test_burst_is_queued_in_arrival_order(self):
+        """Test that requests beyond the burst wait their turn instead of failing."""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, burst_seconds=2, clock=clock)
+        
+        delays = [limiter.reserve() for _ in range(5)]
+        
+        assert delays == [0.0, 0.0, 1.0, 2.0, 3.0]
+        assert limiter.stats() == {
+            'requests': 5, 'throttled': 3, 'wait_seconds': 6.0,
+            'requests_per_minute': 60, 'tokens_per_minute': 0
+        }
+    
+    def test_token_budget(self):
+        """Test that a request waits until the tokens it needs have accrued."""
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=6000, burst_seconds=10, clock=clock)
+        
+        assert limiter.reserve(800) == 0.0
+        assert limiter.reserve(800) == pytest.approx(6.0)
+        
+        clock.now += 60
+        assert limiter.reserve(800) == 0.0
+    
+    def test_unknown_limits_do_not_wait(self):
+        """Test that nothing is held back before any limit is known."""
+        limiter = RateLimiter(clock=FakeClock())
+        
+        assert all(limiter.reserve(100000) == 0.0 for _ in range(100))
+    
+    def test_limits_are_learned_from_headers(self):
+        """Test that response headers set the limits and lower exhausted budgets."""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, burst_seconds=10, clock=clock)
+        
+        limiter.update_from_headers({
+            'x-ratelimit-limit-requests': '120', 'x-ratelimit-remaining-requests': '0',
+            'x-ratelimit-limit-tokens': '40000', 'x-ratelimit-remaining-tokens': '39000'
+        })
+        
+        stats = limiter.stats()
+        assert stats['requests_per_minute'] == 120
+        assert stats['tokens_per_minute'] == 40000
+        # Another client used up the shared requests budget: wait for one to accrue
+        assert limiter.reserve(1000) == pytest.approx(0.5)
+    
+    def test_acquire_sleeps(self):
+        """Test that acquire sleeps for the reserved delay, sync and async."""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, burst_seconds=1, clock=clock, sleep=clock.sleep)
+        
+        assert limiter.acquire() == 0.0
+        assert limiter.acquire() == 1.0
+        assert clock.sleeps == [1.0]
+        
+        limiter = RateLimiter(requests_per_minute=6000, burst_seconds=0.01, clock=clock)
+        limiter.reserve()
+        assert asyncio.run(limiter.acquire_async()) == pytest.approx(0.01)
+
+
+class TestOpenAIServiceRateLimit:
+    """Test suite for the rate limiter in front of OpenAIService."""
+    
+    def make_service(self, limiter=None) -> OpenAIService:
+        """Build a service whose client is a fake rate limited API."""
+        with patch('app.services.openai_service.OpenAI'):
+            service = OpenAIService("test-api-key", validation="lazy", rate_limiter=limiter)
+        self.api = FakeRateLimitedAPI(
+            self.clock, requests_per_minute=60, tokens_per_minute=40000, count_tokens=service._request_tokens
+        )
+        service.client = Mock()
+        service.client.chat.completions.create.side_effect = self.api.create
+        service.client.chat.completions.with_raw_response.create.side_effect = self.api.create_raw
+        return service
+    
+    def burst(self, service: OpenAIService, size: int) -> int:
+        """Send a burst of distinct questions at once; return how many failed."""
+        failures = 0
+        for i in range(size):
+            try:
+                service.get_chat_completion(f"Question number {i} about the quarterly report")
+            except RuntimeError:
+                failures += 1
+        return failures
+    
+    def test_request_tokens_include_max_tokens(self):
+        """Test that the token estimate counts the prompt and max_tokens."""
+        self.clock = FakeClock()
+        service = self.make_service()
+        
+        tokens = service._request_tokens([{"role": "user", "content": "hello"}])
+        
+        assert tokens == service.token_counter.count("hello") + 4 + 1000
+    
+    def test_429_headers_are_learned(self):
+        """Test that the limiter learns from the headers of a rejected request."""
+        self.clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=600, clock=self.clock, sleep=self.clock.sleep)
+        service = self.make_service(limiter)
+        self.api.levels['requests'] = 0
+        
+        with pytest.raises(RuntimeError, match="rate limit exceeded"):
+            service.get_chat_completion("hello")
+        
+        assert limiter.stats()['requests_per_minute'] == 60
+    
+    def test_synthetic_burst_is_smoothed_without_429s(self):
+        """Simulate 120 questions arriving at once against 60 RPM / 40k TPM limits.
+        
+        Unlimited, everything past the API's burst allowance gets a 429. With
+        the limiter (given only the request limit; the token limit is learned
+        from the first response) the burst is queued and sent at the rate the
+        token limit allows, with no 429s.
+        """
+        self.clock = FakeClock()
+        unlimited = self.make_service()
+        unlimited_failures = self.burst(unlimited, 120)
+        
+        self.clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, burst_seconds=10, clock=self.clock, sleep=self.clock.sleep)
+        limited = self.make_service(limiter)
+        limited_failures = self.burst(limited, 120)
+        
+        sent_at = self.api.sent_at
+        question = {"role": "user", "content": "Question number 100 about the quarterly report"}
+        tokens_per_request = limited._request_tokens([question])
+        steady_gap = 60 * tokens_per_request / 40000
+        gaps = [later - earlier for earlier, later in zip(sent_at, sent_at[1:])]
+        
+        assert unlimited_failures > 60
+        assert limited_failures == 0
+        assert self.api.rejected == 0
+        assert len(sent_at) == 120
+        # A short initial burst, then an even pace at the token limit
+        assert sum(1 for t in sent_at if t == 0) <= 10
+        assert all(gap == pytest.approx(steady_gap, rel=0.05) for gap in gaps[20:])
+        assert limiter.stats()['tokens_per_minute'] == 40000
+
+
+class TestHandlerRateLimiter:
+    """Test suite for building the rate limiter from config."""
+    
+    def test_off_by_default(self):
+        """Test that no limiter is built when no limit is configured."""
+        handler = SlackEventHandler(make_config())
+        
+        assert handler._build_rate_limiter() is None
+        assert handler.rate_limit_stats()['enabled'] is False
+    
+    def test_built_from_config(self):
+        """Test that configured limits build a limiter the service uses."""
+        config = make_config()
+        config.openai_tokens_per_minute = 40000
+        handler = SlackEventHandler(config)
+        
+        with patch('app.services.openai_service.OpenAI'):
+            service = handler._get_openai_service()
+        
+        assert service.rate_limiter.stats()['tokens_per_minute'] == 40000
+        assert handler.rate_limit_stats()['enabled'] is True
@@ -0,0 +1,121 @@
+import pytest
+from unittest.mock import patch
+from app.utils.response_cache import InMemoryResponseBackend, ResponseCache, SqliteResponseBackend
+
+
+def user(content: str) -> list:
+    """Build a single-message conversation."""
+    return [{'role': 'user', 'content': content}]
+
+
+class TestInMemoryResponseBackend:
+    """Test suite for the in-memory response backend."""
+    
+    def test_invalid_size_raises_error(self):
+        """Test that a size below 1 raises ValueError."""
+        with pytest.raises(ValueError, match="Response cache size must be at least 1"):
+            InMemoryResponseBackend(max_entries=0)
+    
+    @patch('app.utils.response_cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        """Test that a response is not returned after its TTL."""
+        backend = InMemoryResponseBackend()
+        
+        mock_monotonic.return_value = 1000.0
+        backend.set("k", "answer", ttl=60)
+        
+        mock_monotonic.return_value = 1059.0
+        assert backend.get("k") == "answer"
+        
+        mock_monotonic.return_value = 1061.0
+        assert backend.get("k") is None
+        assert len(backend) == 0
+    
+    def test_size_is_bounded_with_lru_eviction(self):
+        """Test that the least recently used responses are evicted first."""
+        backend = InMemoryResponseBackend(max_entries=2)
+        
+        backend.set("a", "1", ttl=60)
+        backend.set("b", "2", ttl=60)
+        backend.get("a")
+        backend.set("c", "3", ttl=60)
+        
+        assert backend.get("b") is None
+        assert backend.get("a") == "1"
+        assert len(backend) == 2
+
+
+class TestSqliteResponseBackend:
+    """Test suite for the SQLite response backend."""
+    
+    def test_responses_survive_reopening(self, tmp_path):
+        """Test that responses are read back by a new backend on the same file."""
+        path = str(tmp_path / "cache.sqlite3")
+        backend = SqliteResponseBackend(path)
+        backend.set("k", "answer", ttl=60)
+        backend.close()
+        
+        assert SqliteResponseBackend(path).get("k") == "answer"
+    
+    @patch('app.utils.response_cache.time.time')
+    def test_entries_expire(self, mock_time):
+        """Test that expired responses are not returned."""
+        backend = SqliteResponseBackend(":memory:")
+        
+        mock_time.return_value = 1000.0
+        backend.set("k", "answer", ttl=60)
+        
+        mock_time.return_value = 1061.0
+        assert backend.get("k") is None
+        assert len(backend) == 0
+    
+    @patch('app.utils.response_cache.time.time')
+    def test_size_is_bounded_with_lru_eviction(self, mock_time):
+        """Test that the least recently used responses are evicted first."""
+        backend = SqliteResponseBackend(":memory:", max_entries=2)
+        
+        mock_time.return_value = 1000.0
+        backend.set("a", "1", ttl=600)
+        mock_time.return_value = 1001.0
+        backend.set("b", "2", ttl=600)
+        mock_time.return_value = 1002.0
+        backend.get("a")
+        mock_time.return_value = 1003.0
+        backend.set("c", "3", ttl=600)
+        
+        assert len(backend) == 2
+        assert backend.get("b") is None
+        assert backend.get("a") == "1"
+
+
+class TestResponseCache:
+    """Test suite for the response cache."""
+    
+    def test_key_normalises_message_text(self):
+        """Test that case and whitespace differences share a key."""
+        key = ResponseCache.make_key(user("What's the wifi password?"), "gpt-4", temperature=0.7)
+        
+        assert ResponseCache.make_key(user("  what's the   WIFI password? "), "gpt-4", temperature=0.7) == key
+        assert ResponseCache.make_key(user("What's the wifi password?"), "gpt-3.5-turbo", temperature=0.7) != key
+        assert ResponseCache.make_key(user("What's the wifi password?"), "gpt-4", temperature=0.2) != key
+        assert ResponseCache.make_key(
+            [{'role': 'assistant', 'content': "What's the wifi password?"}], "gpt-4", temperature=0.7
+        ) != key
+    
+    def test_stats_report_hit_ratio_and_saved_latency(self):
+        """Test that hits are counted and priced at the mean miss latency."""
+        cache = ResponseCache()
+        key = cache.make_key(user("faq"), "gpt-4")
+        
+        assert cache.get(key) is None
+        cache.put(key, "answer", latency=2.0)
+        assert cache.get(key) == "answer"
+        assert cache.get(key) == "answer"
+        
+        assert cache.stats() == {
+            'hits': 2,
+            'misses': 1,
+            'hit_ratio': 0.6667,
+            'mean_miss_latency': 2.0,
+            'saved_seconds': 4.0
+        }
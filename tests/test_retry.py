@@ -0,0 +1,241 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+import openai
+from app.services.openai_service import OpenAIService
+from app.utils.retry import RetryPolicy, parse_duration, retry_after
+
+try:
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+
+REQUEST = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+
+
+def rate_limited(headers: dict = None, code: str = None) -> openai.RateLimitError:
+    """Build a 429 error as raised by the OpenAI client."""
+    body = {'code': code} if code else None
+    return openai.RateLimitError(
+        "Rate limit reached", response=httpx.Response(429, headers=headers or {}, request=REQUEST), body=body
+    )
+
+
+def server_error() -> openai.InternalServerError:
+    """Build a 500 error as raised by the OpenAI client."""
+    return openai.InternalServerError(
+        "Server error", response=httpx.Response(500, request=REQUEST), body=None
+    )
+
+
+def completion(text: str):
+    """Build a chat completion response with one choice."""
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = text
+    return response
+
+
+class FakeClock:
+    """Monotonic clock advanced by the fake sleep."""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def __call__(self) -> float:
+        return self.now
+    
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ScriptedCompletions:
+    """Fake chat.completions that raises or answers from a script, one entry per call."""
+    
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+    
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion(outcome)
+    
+    async def create_async(self, **kwargs):
+        return self.create(**kwargs)
+
+
+def make_policy(clock: FakeClock, **kwargs) -> RetryPolicy:
+    """Build a retry policy on the fake clock with deterministic jitter."""
+    return RetryPolicy(clock=clock, sleep=clock.sleep, jitter=lambda: 0.5, **kwargs)
+
+
+class TestRetryAfter:
+    """Test suite for reading wait hints from response headers."""
+    
+    @pytest.mark.parametrize("value, seconds", [
+        ("20ms", 0.02), ("1s", 1.0), ("6m0s", 360.0), ("1h2m3.5s", 3723.5), ("soon", None), ("", None)
+    ])
+    def test_parse_duration(self, value, seconds):
+        """Test the duration formats used by x-ratelimit-reset-* headers."""
+        assert parse_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+    
+    def test_retry_after_headers_take_precedence(self):
+        """Test that Retry-After-Ms, then Retry-After are used first."""
+        assert retry_after({'retry-after-ms': '1500', 'retry-after': '9'}) == 1.5
+        assert retry_after({'retry-after': '9', 'x-ratelimit-remaining-requests': '0',
+                            'x-ratelimit-reset-requests': '30s'}) == 9.0
+        assert retry_after({'retry-after': 'Wed, 21 Oct 2015 07:28:10 GMT'}, now=1445412480.0) == 10.0
+    
+    def test_reset_of_exhausted_limits(self):
+        """Test that only exhausted limits' reset times are used, taking the longest."""
+        headers = {
+            'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '2s',
+            'x-ratelimit-remaining-tokens': '0', 'x-ratelimit-reset-tokens': '6m0s'
+        }
+        assert retry_after(headers) == 360.0
+        
+        headers['x-ratelimit-remaining-tokens'] = '1200'
+        assert retry_after(headers) == 2.0
+        
+        assert retry_after({'x-ratelimit-reset-tokens': '1s'}) is None
+        assert retry_after({}) is None
+
+
+class TestRetryPolicy:
+    """Test suite for the retry policy with scripted 429 sequences."""
+    
+    def test_invalid_retry_count_raises_error(self):
+        """Test that a negative retry count raises ValueError."""
+        with pytest.raises(ValueError, match="Retry count cannot be negative"):
+            RetryPolicy(max_retries=-1)
+    
+    def test_retries_until_success_honouring_retry_after(self):
+        """Test that server wait hints are followed before each retry."""
+        clock = FakeClock()
+        policy = make_policy(clock)
+        completions = ScriptedCompletions(
+            rate_limited({'retry-after': '2'}), rate_limited({'retry-after-ms': '250'}), "ok"
+        )
+        
+        response = policy.call(completions.create, model="gpt-4")
+        
+        assert response.choices[0].message.content == "ok"
+        assert clock.sleeps == [2.0, 0.25]
+        assert policy.stats() == {'calls': 1, 'retries': 2, 'give_ups': 0, 'wait_seconds': 2.25}
+    
+    def test_backoff_is_exponential_with_full_jitter(self):
+        """Test that waits without a hint are jittered below a doubling, capped ceiling."""
+        clock = FakeClock()
+        policy = make_policy(clock, max_retries=4, base_delay=1.0, max_delay=5.0)
+        completions = ScriptedCompletions(server_error(), server_error(), rate_limited(), rate_limited(), "ok")
+        
+        policy.call(completions.create)
+        
+        # Ceilings 1, 2, 4, 5 (capped) scaled by the jitter of 0.5
+        assert clock.sleeps == [0.5, 1.0, 2.0, 2.5]
+    
+    def test_gives_up_after_max_retries(self):
+        """Test that the last 429 is raised once the retries are used up."""
+        clock = FakeClock()
+        policy = make_policy(clock, max_retries=2)
+        completions = ScriptedCompletions(rate_limited(), rate_limited(), rate_limited(), "never")
+        
+        with pytest.raises(openai.RateLimitError):
+            policy.call(completions.create)
+        
+        assert completions.calls == 3
+        assert policy.stats()['give_ups'] == 1
+    
+    def test_gives_up_when_wait_would_pass_deadline(self):
+        """Test that a hint longer than the remaining deadline is not waited for."""
+        clock = FakeClock()
+        policy = make_policy(clock, deadline=10.0)
+        completions = ScriptedCompletions(rate_limited({'retry-after': '4'}), rate_limited({'retry-after': '7'}))
+        
+        with pytest.raises(openai.RateLimitError):
+            policy.call(completions.create)
+        
+        assert clock.sleeps == [4.0]
+        assert policy.stats()['give_ups'] == 1
+    
+    def test_permanent_errors_are_not_retried(self):
+        """Test that a used-up quota and other client errors are raised immediately."""
+        clock = FakeClock()
+        policy = make_policy(clock)
+        auth_error = openai.AuthenticationError(
+            "bad key", response=httpx.Response(401, request=REQUEST), body=None
+        )
+        
+        with pytest.raises(openai.RateLimitError):
+            policy.call(ScriptedCompletions(rate_limited(code='insufficient_quota')).create)
+        with pytest.raises(openai.AuthenticationError):
+            policy.call(ScriptedCompletions(auth_error).create)
+        
+        assert clock.sleeps == []
+        assert policy.stats()['retries'] == 0
+    
+    def test_async_calls_are_retried(self):
+        """Test that coroutine functions are retried the same way."""
+        clock = FakeClock()
+        policy = make_policy(clock, base_delay=0.001)
+        completions = ScriptedCompletions(rate_limited(), "ok")
+        
+        response = asyncio.run(policy.call_async(completions.create_async))
+        
+        assert response.choices[0].message.content == "ok"
+        assert policy.stats()['retries'] == 1
+
+
+class TestOpenAIServiceRetries:
+    """Test suite for retries in OpenAIService."""
+    
+    def make_service(self, completions: ScriptedCompletions, **policy_kwargs) -> OpenAIService:
+        """Build a service whose client answers from a script."""
+        self.clock = FakeClock()
+        with patch('app.services.openai_service.OpenAI') as mock_openai_class:
+            service = OpenAIService(
+                "test-api-key", validation="lazy", retry_policy=make_policy(self.clock, **policy_kwargs)
+            )
+            self.client_kwargs = mock_openai_class.call_args[1]
+        service.client = Mock()
+        service.client.chat.completions.create.side_effect = completions.create
+        return service
+    
+    def test_client_retries_are_disabled(self):
+        """Test that the OpenAI client's own retries are turned off under a policy."""
+        self.make_service(ScriptedCompletions())
+        
+        assert self.client_kwargs['max_retries'] == 0
+    
+    def test_burst_of_429s_is_absorbed(self):
+        """Test that a short burst of rate limits does not reach the user."""
+        service = self.make_service(ScriptedCompletions(rate_limited(), rate_limited(), "Hi there"))
+        
+        assert service.get_chat_completion("hello") == "Hi there"
+        assert service.retry_policy.stats()['retries'] == 2
+    
+    def test_give_up_maps_to_rate_limit_error(self):
+        """Test that giving up raises the usual rate limit RuntimeError."""
+        service = self.make_service(ScriptedCompletions(*[rate_limited()] * 4), max_retries=3)
+        
+        with pytest.raises(RuntimeError, match="OpenAI API rate limit exceeded"):
+            service.get_chat_completion("hello")
+        
+        assert service.retry_policy.stats()['give_ups'] == 1
+    
+    def test_stream_request_is_retried(self):
+        """Test that the streaming request is retried before any text is yielded."""
+        chunk = Mock()
+        chunk.choices = [Mock()]
+        chunk.choices[0].delta.content = "streamed"
+        service = self.make_service(ScriptedCompletions(rate_limited()))
+        service.client.chat.completions.create.side_effect = [rate_limited(), iter([chunk])]
+        
+        assert list(service.stream_chat_completion("hello")) == ["streamed"]
+        assert len(self.clock.sleeps) == 1
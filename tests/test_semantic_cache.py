@@ -0,0 +1,254 @@
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+np = pytest.importorskip("numpy")
+
+from app.services.openai_service import OpenAIService
+from app.utils.semantic_cache import BruteForceIndex, HashingEmbedder, OpenAIEmbedder, SemanticCache
+
+
+def random_unit_vectors(rng, count: int, dim: int):
+    """Build random unit-length float32 vectors."""
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Hashing embedder that records the size of each batch."""
+    
+    def __init__(self, dim: int = 64):
+        super().__init__(dim)
+        self.batches = []
+    
+    def embed(self, texts):
+        self.batches.append(len(texts))
+        return super().embed(texts)
+
+
+class TestHashingEmbedder:
+    """Test suite for the offline embedder."""
+    
+    def test_embeddings_are_deterministic_unit_vectors(self):
+        """Test that the same text always maps to the same unit vector."""
+        embedder = HashingEmbedder(dim=128)
+        
+        first, second, empty = embedder.embed(["What's the wifi password?", "What's the wifi password?", ""])
+        
+        assert first.shape == (128,)
+        assert np.array_equal(first, second)
+        assert np.isclose(np.linalg.norm(first), 1.0)
+        assert not empty.any()
+    
+    def test_rewording_is_closer_than_a_different_question(self):
+        """Test that shared words give a higher similarity."""
+        question, reworded, other = HashingEmbedder().embed([
+            "what is the wifi password", "what's the wifi password", "how do I deploy the service"
+        ])
+        
+        assert question @ reworded > question @ other
+
+
+class TestOpenAIEmbedder:
+    """Test suite for batched OpenAI embeddings."""
+    
+    def test_requests_are_batched_and_reordered(self):
+        """Test that texts are sent in batches and results follow input order."""
+        client = Mock()
+        
+        def create(model, input, dimensions):
+            data = [Mock(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)]
+            return Mock(data=list(reversed(data)))
+        
+        client.embeddings.create.side_effect = create
+        embedder = OpenAIEmbedder(client, dim=2, batch_size=2)
+        
+        vectors = embedder.embed(["a", "bbb", "cc"])
+        
+        assert client.embeddings.create.call_count == 2
+        assert client.embeddings.create.call_args_list[0][1] == {
+            'model': 'text-embedding-3-small', 'input': ['a', 'bbb'], 'dimensions': 2
+        }
+        assert vectors.shape == (3, 2)
+        assert np.allclose(vectors[1], np.array([3.0, 1.0]) / np.sqrt(10))
+
+
+class TestBruteForceIndex:
+    """Test suite for the brute force vector index."""
+    
+    def test_invalid_arguments(self):
+        """Test that a bad capacity or dtype raises ValueError."""
+        with pytest.raises(ValueError, match="Semantic cache size must be at least 1"):
+            BruteForceIndex(dim=8, capacity=0)
+        with pytest.raises(ValueError, match="Invalid index dtype: float64"):
+            BruteForceIndex(dim=8, dtype='float64')
+    
+    @pytest.mark.parametrize("dtype", ['float16', 'int8'])
+    def test_search_finds_nearest_neighbour(self, dtype):
+        """Test that compact storage still ranks the true neighbour first."""
+        rng = np.random.default_rng(0)
+        vectors = random_unit_vectors(rng, 5000, 64)
+        index = BruteForceIndex(dim=64, capacity=5000, dtype=dtype, block_size=1000)
+        index.add(vectors)
+        
+        (slot, score), = index.search(vectors[1234], k=1)
+        
+        assert slot == 1234
+        assert score == pytest.approx(1.0, abs=0.02)
+        assert [s for s, _ in index.search(vectors[42], k=3)][0] == 42
+    
+    def test_memory_is_compact(self):
+        """Test that int8 uses a quarter and float16 half of float32 storage."""
+        assert BruteForceIndex(dim=256, capacity=1000, dtype='int8').memory_bytes == 256 * 1000
+        assert BruteForceIndex(dim=256, capacity=1000, dtype='float16').memory_bytes == 2 * 256 * 1000
+    
+    def test_full_index_overwrites_oldest(self):
+        """Test that the index is a ring buffer once full."""
+        rng = np.random.default_rng(1)
+        vectors = random_unit_vectors(rng, 5, 16)
+        index = BruteForceIndex(dim=16, capacity=3)
+        
+        assert index.add(vectors[:3]) == [0, 1, 2]
+        assert index.add(vectors[3:]) == [0, 1]
+        assert len(index) == 3
+        assert index.search(vectors[4], k=1)[0][0] == 1
+
+
+class TestSemanticCache:
+    """Test suite for the semantic cache."""
+    
+    def test_similar_question_hits(self):
+        """Test that a reworded question reuses the cached answer."""
+        cache = SemanticCache(HashingEmbedder(), threshold=0.7)
+        answer, vector = cache.lookup("what is the wifi password")
+        assert answer is None
+        
+        cache.store("what is the wifi password", "It's on the fridge.", vector=vector)
+        
+        assert cache.lookup("What is the WiFi password?")[0] == "It's on the fridge."
+        assert cache.lookup("how do I deploy the service")[0] is None
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['entries'] == 1
+    
+    @patch('app.utils.semantic_cache.time.monotonic')
+    def test_expired_answers_are_not_reused(self, mock_monotonic):
+        """Test that answers older than the TTL are ignored."""
+        cache = SemanticCache(HashingEmbedder(), ttl=60)
+        
+        mock_monotonic.return_value = 1000.0
+        cache.store("wifi password", "It's on the fridge.")
+        
+        mock_monotonic.return_value = 1061.0
+        assert cache.lookup("wifi password")[0] is None
+    
+    def test_store_many_embeds_in_one_batch(self):
+        """Test that preloading embeds all questions together."""
+        embedder = CountingEmbedder()
+        cache = SemanticCache(embedder)
+        
+        cache.store_many(["q one", "q two", "q three"], ["a1", "a2", "a3"])
+        
+        assert embedder.batches == [3]
+        assert cache.lookup("q two")[0] == "a2"
+
+
+class TestSemanticCacheService:
+    """Test suite for the semantic cache in OpenAIService."""
+    
+    def setup_method(self):
+        """Set up a service with a mocked client and a semantic cache."""
+        with patch('app.services.openai_service.OpenAI') as mock_openai_class:
+            self.mock_client = Mock()
+            mock_openai_class.return_value = self.mock_client
+            self.service = OpenAIService(
+                "test-api-key", validation="lazy",
+                semantic_cache=SemanticCache(HashingEmbedder(), threshold=0.7)
+            )
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "It's on the fridge."
+        self.mock_client.chat.completions.create.return_value = mock_response
+    
+    def test_reworded_question_skips_the_api(self):
+        """Test that a paraphrase is answered from the semantic cache."""
+        assert self.service.get_chat_completion("<@U123456> what is the wifi password") == "It's on the fridge."
+        assert self.service.get_chat_completion("What is the *WiFi* password?") == "It's on the fridge."
+        
+        self.mock_client.chat.completions.create.assert_called_once()
+    
+    def test_conversations_are_not_matched(self):
+        """Test that thread context bypasses the semantic cache."""
+        conversation = [
+            {"role": "user", "content": "what is the wifi password"},
+            {"role": "assistant", "content": "It's on the fridge."},
+            {"role": "user", "content": "what is the wifi password"}
+        ]
+        
+        self.service.get_chat_completion(conversation)
+        self.service.get_chat_completion(conversation)
+        
+        assert self.mock_client.chat.completions.create.call_count == 2
+        assert self.service.semantic_cache.stats()['entries'] == 0
+    
+    def test_embedding_failure_falls_back_to_api(self):
+        """Test that a broken embedder does not fail the request."""
+        self.service.semantic_cache.embedder = Mock()
+        self.service.semantic_cache.embedder.embed.side_effect = RuntimeError("Embeddings unavailable")
+        
+        assert self.service.get_chat_completion("what is the wifi password") == "It's on the fridge."
+
+    
+    def test_handler_builds_cache_from_config(self):
+        """Test that enabling the semantic cache attaches one with OpenAI embeddings."""
+        from app.handlers.slack_handler import SlackEventHandler
+        from tests.test_slack_handler import make_config
+        
+        config = make_config()
+        config.semantic_cache = True
+        config.semantic_cache_threshold = 0.9
+        config.semantic_cache_max_entries = 100
+        config.semantic_cache_dtype = 'float16'
+        config.semantic_cache_embedding_model = 'text-embedding-3-small'
+        config.response_cache_ttl_seconds = 60
+        handler = SlackEventHandler(config)
+        
+        with patch('app.services.openai_service.OpenAI'):
+            cache = handler._get_openai_service().semantic_cache
+        
+        assert isinstance(cache.embedder, OpenAIEmbedder)
+        assert cache.index.capacity == 100
+        assert handler.semantic_cache_stats()['enabled'] is True
+
+
+class TestSemanticCacheBenchmark:
+    """Benchmark lookup latency over 10k, 100k and 1M cached entries."""
+    
+    DIM = 256
+    
+    @pytest.mark.parametrize("entries", [10_000, 100_000, 1_000_000])
+    def test_lookup_latency_benchmark(self, entries):
+        """Measure embedding plus brute force search with the deterministic fake embedder."""
+        rng = np.random.default_rng(entries)
+        embedder = HashingEmbedder(dim=self.DIM)
+        cache = SemanticCache(embedder, threshold=0.7, capacity=entries)
+        
+        # Fill the index directly in large batches; embedding 1M texts is not what is measured
+        for start in range(0, entries, 100_000):
+            count = min(100_000, entries - start)
+            cache._add(random_unit_vectors(rng, count, self.DIM), ["cached answer"] * count)
+        cache.store("what is the wifi password", "It's on the fridge.")
+        
+        timings = []
+        for _ in range(5):
+            started_at = time.perf_counter()
+            answer, _ = cache.lookup("what's the wifi password")
+            timings.append(time.perf_counter() - started_at)
+        
+        print(f"\n{entries} entries: lookup {min(timings) * 1e3:.2f}ms, "
+              f"index {cache.stats()['memory_bytes'] / 1e6:.0f}MB")
+        
+        assert answer == "It's on the fridge."
+        assert cache.stats()['memory_bytes'] == entries * self.DIM
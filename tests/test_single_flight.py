@@ -0,0 +1,212 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock, patch
+from app.services.async_openai_service import AsyncOpenAIService
+from app.services.openai_service import OpenAIService
+from app.utils.response_cache import ResponseCache
+from app.utils.single_flight import SingleFlight
+from tests.test_retry import completion
+
+
+class CountingCompletions:
+    """Fake chat.completions.create that counts calls and holds each one open.
+    
+    A call finishes once `release` is set, so a test can make sure every
+    concurrent request has arrived before the first answer comes back.
+    """
+    
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+    
+    def create(self, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.release.wait(timeout=5)
+        return completion(f"answer to {messages[-1]['content']}")
+
+
+def make_service(completions: CountingCompletions, single_flight=None) -> OpenAIService:
+    """Build a service whose client is a counting fake."""
+    with patch('app.services.openai_service.OpenAI'):
+        service = OpenAIService("test-api-key", validation="lazy", single_flight=single_flight)
+    service.client = Mock()
+    service.client.chat.completions.create.side_effect = completions.create
+    return service
+
+
+def wait_for(condition, timeout: float = 5.0):
+    """Poll until a condition holds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+class TestSingleFlight:
+    """Test suite for coalescing concurrent calls."""
+    
+    def test_concurrent_calls_share_one_result(self):
+        """Test that callers arriving during a call get its result."""
+        single_flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        
+        def slow_call():
+            calls.append(1)
+            release.wait(timeout=5)
+            return "result"
+        
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(single_flight.do, "key", slow_call) for _ in range(10)]
+            wait_for(lambda: single_flight.stats()['coalesced'] == 9)
+            release.set()
+            results = [future.result() for future in futures]
+        
+        assert len(calls) == 1
+        assert sorted(results) == [("result", False)] + [("result", True)] * 9
+        assert single_flight.stats() == {'calls': 1, 'coalesced': 9, 'in_flight': 0}
+    
+    def test_errors_are_shared(self):
+        """Test that waiting callers get the exception of the call they waited on."""
+        single_flight = SingleFlight()
+        release = threading.Event()
+        
+        def failing_call():
+            release.wait(timeout=5)
+            raise RuntimeError("OpenAI API error: boom")
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(single_flight.do, "key", failing_call) for _ in range(3)]
+            wait_for(lambda: single_flight.stats()['coalesced'] == 2)
+            release.set()
+            for future in futures:
+                with pytest.raises(RuntimeError, match="boom"):
+                    future.result()
+    
+    def test_finished_calls_are_not_reused(self):
+        """Test that a call made after the previous one finished runs again."""
+        single_flight = SingleFlight()
+        function = Mock(side_effect=["first", "second"])
+        
+        assert single_flight.do("key", function) == ("first", False)
+        assert single_flight.do("key", function) == ("second", False)
+        assert single_flight.stats()['coalesced'] == 0
+    
+    def test_async_calls_share_one_result(self):
+        """Test that concurrent coroutines with one key await a single call."""
+        single_flight = SingleFlight()
+        function = AsyncMock(return_value="result")
+        
+        async def slow_call():
+            await asyncio.sleep(0.01)
+            return await function()
+        
+        async def main():
+            return await asyncio.gather(*(single_flight.do_async("key", slow_call) for _ in range(20)))
+        
+        results = asyncio.run(main())
+        
+        assert function.await_count == 1
+        assert results.count(("result", False)) == 1
+        assert results.count(("result", True)) == 19
+
+
+class TestOpenAIServiceCoalescing:
+    """Test suite for coalesced chat completions."""
+    
+    def test_100_identical_requests_make_one_call(self):
+        """Test that 100 concurrent identical requests share one upstream call."""
+        completions = CountingCompletions()
+        service = make_service(completions, single_flight=SingleFlight())
+        
+        with ThreadPoolExecutor(max_workers=100) as executor:
+            futures = [executor.submit(service.get_chat_completion, "What is our VPN address?") for _ in range(100)]
+            wait_for(lambda: service.single_flight.stats()['coalesced'] == 99)
+            completions.release.set()
+            answers = [future.result() for future in futures]
+        
+        assert completions.calls == 1
+        assert answers == ["answer to What is our VPN address?"] * 100
+        assert service.single_flight.stats() == {'calls': 1, 'coalesced': 99, 'in_flight': 0}
+    
+    def test_without_coalescing_every_request_is_sent(self):
+        """Test the baseline: the same 100 requests make 100 calls without single-flight."""
+        completions = CountingCompletions()
+        completions.release.set()
+        service = make_service(completions)
+        
+        with ThreadPoolExecutor(max_workers=100) as executor:
+            list(executor.map(lambda _: service.get_chat_completion("What is our VPN address?"), range(100)))
+        
+        assert completions.calls == 100
+    
+    def test_key_uses_normalised_prompt(self):
+        """Test that prompts differing only in case and spacing share a call, other prompts do not."""
+        completions = CountingCompletions()
+        service = make_service(completions, single_flight=SingleFlight())
+        prompts = ["What is our VPN address?", "what is  our vpn address?", "Where is the office?"]
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(service.get_chat_completion, prompt) for prompt in prompts]
+            wait_for(lambda: service.single_flight.stats()['coalesced'] == 1 and completions.calls == 2)
+            completions.release.set()
+            for future in futures:
+                future.result()
+        
+        assert completions.calls == 2
+    
+    def test_uncached_requests_are_coalesced_but_not_cached(self):
+        """Test that use_cache=False requests share a call in flight without filling the cache."""
+        completions = CountingCompletions()
+        service = make_service(completions, single_flight=SingleFlight())
+        service.response_cache = ResponseCache()
+        
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(service.get_chat_completion, "hello", use_cache=False) for _ in range(10)]
+            wait_for(lambda: service.single_flight.stats()['coalesced'] == 9)
+            completions.release.set()
+            for future in futures:
+                future.result()
+        
+        assert completions.calls == 1
+        service.get_chat_completion("hello")
+        assert completions.calls == 2
+    
+    def test_priority_classes_are_not_coalesced(self):
+        """Test that identical requests share a call only within their priority class."""
+        completions = CountingCompletions()
+        service = make_service(completions, single_flight=SingleFlight())
+        priorities = ['interactive'] * 5 + ['bulk'] * 5
+        
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(service.get_chat_completion, "hello", priority=priority)
+                       for priority in priorities]
+            wait_for(lambda: service.single_flight.stats()['coalesced'] == 8)
+            completions.release.set()
+            for future in futures:
+                future.result()
+        
+        assert completions.calls == 2
+    
+    def test_async_identical_requests_make_one_call(self):
+        """Test coalescing in the asyncio service."""
+        with patch('app.services.async_openai_service.AsyncOpenAI'):
+            service = AsyncOpenAIService("test-api-key", validation="lazy", single_flight=SingleFlight())
+        
+        async def create(**kwargs):
+            await asyncio.sleep(0.01)
+            return completion("Hi")
+        
+        service.client = Mock()
+        service.client.chat.completions.create = AsyncMock(side_effect=create)
+        
+        async def main():
+            return await asyncio.gather(*(service.get_chat_completion("hello") for _ in range(25)))
+        
+        assert asyncio.run(main()) == ["Hi"] * 25
+        assert service.client.chat.completions.create.await_count == 1
@@ -0,0 +1,198 @@
+import pytest
+from app.handlers.streaming_reply import StreamingReply, PLACEHOLDER_TEXT
+from app.utils.message_splitter import MAX_MESSAGE_CHARS, split_message
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RecordingSlackService:
+    """Fake Slack service that records when each update happens."""
+    
+    def __init__(self, clock, fail_updates=0):
+        self.clock = clock
+        self.fail_updates = fail_updates
+        self.posts = []
+        self.updates = []
+        self.messages = []
+    
+    def start_message(self, channel, text, thread_ts=None):
+        self.posts.append((self.clock(), channel, text, thread_ts))
+        return "1700000000.000200"
+    
+    def update_message(self, channel, ts, text, thread_ts=None):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise RuntimeError("Rate limit exceeded - please try again later")
+        self.updates.append((self.clock(), text))
+        return True
+    
+    def post_message(self, channel, text, thread_ts=None):
+        self.messages.append((text, thread_ts))
+        return True
+
+
+def token_stream(clock, tokens, gap):
+    """Yield tokens with a fixed simulated gap between them."""
+    for token in tokens:
+        clock.now += gap
+        yield token
+
+
+def failing_stream(clock, tokens, gap):
+    """Yield some tokens then fail like a dropped connection."""
+    yield from token_stream(clock, tokens, gap)
+    raise RuntimeError("OpenAI API error: connection reset")
+
+
+class TestStreamingReply:
+    """Test harness for streamed replies with a fake token stream."""
+    
+    def setup_method(self):
+        """Create a fake clock and Slack service."""
+        self.clock = FakeClock()
+        self.slack = RecordingSlackService(self.clock)
+    
+    def make_reply(self, update_interval=1.0):
+        """Build a streaming reply using the fakes."""
+        return StreamingReply(
+            self.slack, "C123456", thread_ts="1700000000.000100",
+            update_interval=update_interval, clock=self.clock, sleep=self.clock.sleep
+        )
+    
+    def test_invalid_interval_raises_error(self):
+        """Test that a negative update interval raises ValueError."""
+        with pytest.raises(ValueError, match="Update interval cannot be negative"):
+            StreamingReply(self.slack, "C123456", update_interval=-1)
+    
+    def test_placeholder_posted_in_thread(self):
+        """Test that the placeholder is posted as a thread reply."""
+        reply = self.make_reply()
+        
+        assert reply.start() == "1700000000.000200"
+        assert self.slack.posts == [(0.0, "C123456", PLACEHOLDER_TEXT, "1700000000.000100")]
+    
+    def test_update_cadence(self):
+        """Test that 200 tokens at 50 ms produce throttled updates and the full text."""
+        tokens = [f"tok{i} " for i in range(200)]
+        reply = self.make_reply(update_interval=1.0)
+        reply.start()
+        
+        final_text = reply.relay(token_stream(self.clock, tokens, gap=0.05), error_text="error")
+        
+        update_times = [at for at, _ in self.slack.updates]
+        gaps = [later - earlier for earlier, later in zip(update_times, update_times[1:])]
+        
+        # First text is visible as soon as the first token arrives
+        assert reply.first_text_latency == pytest.approx(0.05)
+        assert self.slack.updates[0][1] == "tok0"
+        
+        # Intermediate updates never come faster than the interval
+        assert all(gap >= 1.0 - 1e-9 for gap in gaps[:-1])
+        assert 9 <= len(self.slack.updates) <= 12
+        
+        # The last update carries the complete answer
+        assert final_text == "".join(tokens).strip()
+        assert self.slack.updates[-1][1] == final_text
+        assert len(reply.updates) == len(self.slack.updates)
+    
+    def test_fast_stream_updates_twice(self):
+        """Test that a stream shorter than the interval needs only first and final updates."""
+        reply = self.make_reply(update_interval=1.0)
+        reply.start()
+        
+        reply.relay(token_stream(self.clock, ["Hello", " there", "!"], gap=0.01), error_text="error")
+        
+        assert [text for _, text in self.slack.updates] == ["Hello", "Hello there!"]
+    
+    def test_no_redundant_final_update(self):
+        """Test that the final update is skipped when the text is already shown."""
+        reply = self.make_reply(update_interval=0.0)
+        reply.start()
+        
+        reply.relay(token_stream(self.clock, ["One", " two"], gap=0.5), error_text="error")
+        
+        assert [text for _, text in self.slack.updates] == ["One", "One two"]
+    
+    def test_intermediate_update_failure_is_retried_later(self):
+        """Test that a rate-limited intermediate update does not stop the stream."""
+        self.slack.fail_updates = 1
+        reply = self.make_reply(update_interval=1.0)
+        reply.start()
+        
+        final_text = reply.relay(token_stream(self.clock, ["a"] * 40, gap=0.1), error_text="error")
+        
+        assert final_text == "a" * 40
+        assert self.slack.updates[0][0] >= 1.0
+        assert self.slack.updates[-1][1] == final_text
+    
+    def test_stream_failure_keeps_partial_answer(self):
+        """Test that a mid-stream failure shows the partial answer and the error text."""
+        reply = self.make_reply()
+        reply.start()
+        
+        final_text = reply.relay(failing_stream(self.clock, ["Partial", " answer"], gap=0.1),
+                                 error_text="Sorry, something went wrong.")
+        
+        assert final_text == "Partial answer\n\nSorry, something went wrong."
+        assert self.slack.updates[-1][1] == final_text
+    
+    def test_empty_stream_shows_error_text(self):
+        """Test that a stream with no text shows the error text."""
+        reply = self.make_reply()
+        reply.start()
+        
+        assert reply.relay(iter([]), error_text="No answer") == "No answer"
+        assert self.slack.updates[-1][1] == "No answer"
+    
+    def test_final_update_retried(self):
+        """Test that the final update is retried after a failure."""
+        reply = self.make_reply()
+        reply.start()
+        self.slack.fail_updates = 2
+        
+        reply.finish("Done")
+        
+        assert self.slack.updates == [(2.0, "Done")]
+    
+    def test_final_update_gives_up(self):
+        """Test that the final update raises after all attempts fail."""
+        reply = self.make_reply()
+        reply.start()
+        self.slack.fail_updates = 3
+        
+        with pytest.raises(RuntimeError, match="Rate limit exceeded"):
+            reply.finish("Done")
+    
+    def test_relay_starts_reply_if_needed(self):
+        """Test that relay posts the placeholder when start was not called."""
+        reply = self.make_reply()
+        
+        reply.relay(iter(["Hi"]), error_text="error")
+        
+        assert len(self.slack.posts) == 1
+        assert self.slack.updates[-1][1] == "Hi"
+    
+    def test_long_reply_continues_in_follow_up_messages(self, long_reply):
+        """Test that a reply past one message's limit shows its first chunk, then posts the rest."""
+        text = long_reply(15000)
+        tokens = [text[i:i + 50] for i in range(0, len(text), 50)]
+        reply = self.make_reply(update_interval=0.0)
+        reply.start()
+        
+        reply.relay(token_stream(self.clock, tokens, gap=0.01), error_text="error")
+        
+        chunks = split_message(text)
+        assert all(len(shown) <= MAX_MESSAGE_CHARS for _, shown in self.slack.updates)
+        assert self.slack.updates[-1][1] == chunks[0]
+        assert self.slack.messages == [("\n\n".join(chunks[1:]), "1700000000.000100")]
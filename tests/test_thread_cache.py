@@ -0,0 +1,122 @@
+import pytest
+from unittest.mock import patch
+from app.utils.thread_cache import MESSAGE_OVERHEAD_BYTES, ThreadHistoryCache, compact_message, message_size
+
+
+def make_message(ts: str, text: str = "hello") -> dict:
+    """Build a compact thread message."""
+    return {'ts': ts, 'user': 'U123456', 'text': text, 'is_bot': False}
+
+
+class TestThreadHistoryCache:
+    """Test suite for the thread history cache."""
+    
+    def test_invalid_size_raises_error(self):
+        """Test that a size below 1 raises ValueError."""
+        with pytest.raises(ValueError, match="Thread cache size must be at least 1 byte"):
+            ThreadHistoryCache(max_bytes=0)
+    
+    def test_message_size_counts_utf8_bytes(self):
+        """Test that message size is the encoded text plus a fixed overhead."""
+        assert message_size({'text': 'héllo'}) == 6 + MESSAGE_OVERHEAD_BYTES
+        assert message_size({'text': None}) == MESSAGE_OVERHEAD_BYTES
+    
+    def test_compact_message(self):
+        """Test that only the fields needed for context are kept."""
+        message = {'ts': '1.1', 'user': 'U1', 'text': 'hi', 'bot_id': 'B1', 'blocks': [{}]}
+        
+        assert compact_message(message) == {'ts': '1.1', 'user': 'U1', 'text': 'hi', 'is_bot': True}
+        assert compact_message({'ts': '1.2', 'text': 'yo'})['is_bot'] is False
+        assert compact_message({'ts': '1.3'}, is_bot=True)['is_bot'] is True
+    
+    def test_get_miss_then_hit(self):
+        """Test that a put thread is returned and counted as a hit."""
+        cache = ThreadHistoryCache()
+        
+        assert cache.get('C1', '1.0') is None
+        cache.put('C1', '1.0', [make_message('1.0'), make_message('1.1')])
+        
+        assert [m['ts'] for m in cache.get('C1', '1.0')] == ['1.0', '1.1']
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+    
+    def test_get_returns_a_copy(self):
+        """Test that callers cannot change the cached list."""
+        cache = ThreadHistoryCache()
+        cache.put('C1', '1.0', [make_message('1.0')])
+        
+        cache.get('C1', '1.0').append(make_message('9.9'))
+        
+        assert len(cache.get('C1', '1.0')) == 1
+    
+    def test_append_to_cached_thread(self):
+        """Test that new messages extend a cached thread once."""
+        cache = ThreadHistoryCache()
+        cache.put('C1', '1.0', [make_message('1.0')])
+        
+        assert cache.append('C1', '1.0', make_message('1.1')) is True
+        assert cache.append('C1', '1.0', make_message('1.1')) is False
+        assert [m['ts'] for m in cache.get('C1', '1.0')] == ['1.0', '1.1']
+        assert cache.stats()['bytes'] == 2 * message_size(make_message('1.0'))
+    
+    def test_append_to_uncached_thread_is_ignored(self):
+        """Test that appending does not create a partial thread."""
+        cache = ThreadHistoryCache()
+        
+        assert cache.append('C1', '1.0', make_message('1.1')) is False
+        assert cache.get('C1', '1.0') is None
+    
+    def test_update_text(self):
+        """Test that an edited message is replaced and its size re-counted."""
+        cache = ThreadHistoryCache()
+        cache.put('C1', '1.0', [make_message('1.0'), make_message('1.1', 'Thinking...')])
+        
+        assert cache.update_text('C1', '1.0', '1.1', 'The full answer') is True
+        assert cache.update_text('C1', '1.0', '9.9', 'missing') is False
+        assert cache.get('C1', '1.0')[1]['text'] == 'The full answer'
+        assert cache.stats()['bytes'] == sum(
+            message_size(m) for m in (make_message('1.0'), make_message('1.1', 'The full answer'))
+        )
+    
+    def test_bytes_bound_evicts_least_recently_used(self):
+        """Test that total cached bytes stay under the bound."""
+        size = message_size(make_message('1.0'))
+        cache = ThreadHistoryCache(max_bytes=3 * size)
+        
+        for thread in ('1.0', '2.0', '3.0'):
+            cache.put('C1', thread, [make_message(thread)])
+        cache.get('C1', '1.0')  # Refresh thread 1.0
+        cache.put('C1', '4.0', [make_message('4.0')])  # Evicts thread 2.0
+        
+        stats = cache.stats()
+        assert stats['bytes'] <= stats['max_bytes']
+        assert stats['threads'] == 3
+        assert stats['evictions'] == 1
+        assert cache.get('C1', '2.0') is None
+        assert cache.get('C1', '1.0') is not None
+    
+    def test_oversized_thread_is_not_cached(self):
+        """Test that a thread larger than the bound is skipped."""
+        cache = ThreadHistoryCache(max_bytes=MESSAGE_OVERHEAD_BYTES)
+        
+        cache.put('C1', '1.0', [make_message('1.0', 'x' * 100)])
+        
+        assert cache.get('C1', '1.0') is None
+        assert cache.stats()['bytes'] == 0
+    
+    @patch('app.utils.thread_cache.time.monotonic')
+    def test_expired_thread_is_a_miss(self, mock_monotonic):
+        """Test that a thread is refetched once its TTL has passed."""
+        cache = ThreadHistoryCache(ttl=60)
+        
+        mock_monotonic.return_value = 1000.0
+        cache.put('C1', '1.0', [make_message('1.0')])
+        
+        mock_monotonic.return_value = 1059.0
+        assert cache.get('C1', '1.0') is not None
+        
+        mock_monotonic.return_value = 1061.0
+        assert cache.get('C1', '1.0') is None
+        assert cache.stats()['bytes'] == 0
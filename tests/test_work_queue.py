@@ -0,0 +1,159 @@
+import threading
+import time
+import pytest
+from app.utils.fair_queue import FairQueue
+from app.utils.work_queue import WorkQueue
+
+
+class TestWorkQueue:
+    """Test suite for the bounded work queue."""
+    
+    def test_invalid_size_raises_error(self):
+        """Test that a queue size below 1 raises ValueError."""
+        with pytest.raises(ValueError, match="Work queue size must be at least 1"):
+            WorkQueue(max_size=0)
+    
+    def test_invalid_worker_count_raises_error(self):
+        """Test that a worker count below 1 raises ValueError."""
+        with pytest.raises(ValueError, match="Worker count must be at least 1"):
+            WorkQueue(num_workers=0)
+    
+    def test_workers_start_on_first_submit(self):
+        """Test that no threads are started until work is submitted."""
+        work_queue = WorkQueue(max_size=5, num_workers=2)
+        assert work_queue.stats()['workers'] == 0
+        
+        work_queue.submit(lambda: None)
+        work_queue.join()
+        
+        assert work_queue.stats()['workers'] == 2
+        work_queue.shutdown()
+    
+    def test_jobs_are_processed(self):
+        """Test that submitted jobs run with their arguments."""
+        work_queue = WorkQueue(max_size=10, num_workers=3)
+        results = []
+        lock = threading.Lock()
+        
+        def job(value, offset=0):
+            with lock:
+                results.append(value + offset)
+        
+        for value in range(10):
+            assert work_queue.submit(job, value, offset=100)
+        work_queue.join()
+        
+        assert sorted(results) == list(range(100, 110))
+        stats = work_queue.stats()
+        assert stats['submitted'] == 10
+        assert stats['completed'] == 10
+        assert stats['depth'] == 0
+        work_queue.shutdown()
+    
+    def test_full_queue_rejects_without_blocking(self):
+        """Test that submit returns False instead of blocking when the queue is full."""
+        work_queue = WorkQueue(max_size=1, num_workers=1)
+        release = threading.Event()
+        started = threading.Event()
+        
+        def blocking_job():
+            started.set()
+            release.wait()
+        
+        assert work_queue.submit(blocking_job)
+        started.wait(1)
+        assert work_queue.submit(blocking_job)  # Waits in the queue
+        
+        begin = time.perf_counter()
+        assert work_queue.submit(blocking_job) is False
+        assert time.perf_counter() - begin < 0.05
+        
+        stats = work_queue.stats()
+        assert stats['depth'] == 1
+        assert stats['busy_workers'] == 1
+        assert stats['rejected'] == 1
+        
+        release.set()
+        work_queue.shutdown()
+    
+    @pytest.mark.parametrize('fair', [False, True])
+    def test_shutdown_on_a_full_queue_does_not_block(self, fair):
+        """Test that shutdown(wait=False) returns at once with a full backlog, whose jobs still run."""
+        work_queue = WorkQueue(max_size=2, num_workers=2, fair_queue=FairQueue(maxsize=2) if fair else None)
+        release = threading.Event()
+        for _ in range(2):
+            assert work_queue.submit(release.wait)
+        while work_queue.stats()['busy_workers'] < 2:
+            time.sleep(0.001)
+        results = []
+        for n in range(2):
+            assert work_queue.submit(results.append, n)
+        
+        begin = time.perf_counter()
+        work_queue.shutdown(wait=False)
+        assert time.perf_counter() - begin < 0.05
+        
+        release.set()
+        work_queue.join()
+        assert sorted(results) == [0, 1]
+    
+    def test_shut_down_queue_is_not_restarted(self):
+        """Test that submitting after shutdown is rejected instead of starting new workers."""
+        work_queue = WorkQueue(max_size=5, num_workers=1)
+        work_queue.shutdown()
+        
+        assert work_queue.submit(lambda: None) is False
+        assert work_queue.submit_keyed(('C1', 'U1'), lambda: None) is False
+        work_queue.start()
+        
+        stats = work_queue.stats()
+        assert stats['workers'] == 0
+        assert stats['rejected'] == 2
+    
+    def test_failed_job_is_counted_and_worker_survives(self):
+        """Test that a failing job does not kill its worker thread."""
+        work_queue = WorkQueue(max_size=5, num_workers=1)
+        results = []
+        
+        def failing_job():
+            raise RuntimeError("boom")
+        
+        work_queue.submit(failing_job)
+        work_queue.submit(results.append, "ok")
+        work_queue.join()
+        
+        assert results == ["ok"]
+        stats = work_queue.stats()
+        assert stats['failed'] == 1
+        assert stats['completed'] == 1
+        work_queue.shutdown()
+    
+    def test_utilisation_reported(self):
+        """Test that worker utilisation reflects time spent on jobs."""
+        work_queue = WorkQueue(max_size=5, num_workers=1)
+        work_queue.submit(time.sleep, 0.05)
+        work_queue.join()
+        
+        utilisation = work_queue.stats()['utilisation']
+        assert 0.0 < utilisation <= 1.0
+        work_queue.shutdown()
+    
+    @pytest.mark.parametrize('fair', [False, True])
+    def test_interactive_jobs_go_ahead_of_bulk(self, fair):
+        """Test that a mention submitted behind a bulk backlog runs next, with or without a fair queue."""
+        work_queue = WorkQueue(max_size=10, num_workers=1, fair_queue=FairQueue(maxsize=10) if fair else None)
+        release = threading.Event()
+        order = []
+        work_queue.submit(release.wait)
+        for n in range(3):
+            assert work_queue.submit(order.append, f"bulk {n}", priority='bulk')
+        assert work_queue.submit_keyed(('C1', 'U1'), order.append, 'mention', priority='interactive')
+        
+        with pytest.raises(ValueError, match="Invalid priority: urgent"):
+            work_queue.submit(order.append, 'urgent', priority='urgent')
+        release.set()
+        work_queue.join()
+        work_queue.shutdown()
+        
+        assert order == ['mention', 'bulk 0', 'bulk 1', 'bulk 2']
+        assert work_queue.stats()['depth'] == 0